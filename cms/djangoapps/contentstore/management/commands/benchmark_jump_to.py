@@ -0,0 +1,160 @@
+"""
+Script for timing the lookup behind jump_to links (path_to_location) on a
+synthetic Mongo backed course, with and without the cached parent index
+"""
+import random
+import time
+from optparse import make_option
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.search import path_to_location
+
+CHAPTERS = 10
+SEQUENTIALS_PER_CHAPTER = 10
+VERTICALS_PER_SEQUENTIAL = 5
+CONTAINERS = 1 + CHAPTERS * (1 + SEQUENTIALS_PER_CHAPTER * (1 + VERTICALS_PER_SEQUENTIAL))
+
+
+class UnindexedModuleStore(object):
+    """
+    Delegates to a MongoModuleStore, except that parents are found with a query
+    per lookup, as they were before the parent index
+    """
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def get_parent_locations(self, location, course_id):
+        "Query for the parents of location"
+        return self.store._find_parent_locations(Location.ensure_fully_specified(location))  # pylint: disable=W0212
+
+
+class Command(BaseCommand):
+    """Time path_to_location on a synthetic course"""
+    help = '''Time path_to_location (the lookup behind jump_to links) on a synthetic course, with and without
+the cached parent index. The synthetic course is deleted afterwards.'''
+
+    option_list = BaseCommand.option_list + (
+        make_option('--blocks',
+                    type='int',
+                    dest='blocks',
+                    default=5000,
+                    help='Number of blocks in the synthetic course'),
+        make_option('--lookups',
+                    type='int',
+                    dest='lookups',
+                    default=200,
+                    help='Number of leaves to look up'),
+    )
+
+    def handle(self, *args, **options):
+        "Execute the command"
+        if options['blocks'] <= CONTAINERS:
+            raise CommandError("--blocks must be more than the {0} containers of the course".format(CONTAINERS))
+
+        store = modulestore('direct')
+        course_id = 'benchmark/jump_to_{0}/synthetic'.format(uuid4().hex[:8])
+        course_location = CourseDescriptor.id_to_location(course_id)
+
+        print("Creating synthetic course {0} with {1} blocks".format(course_id, options['blocks']))
+        try:
+            leaves = self.create_course(store, course_location, options['blocks'])
+            sample = random.sample(leaves, min(options['lookups'], len(leaves)))
+
+            before = self.time_lookups(UnindexedModuleStore(store), course_id, sample)
+
+            # start from an empty index, to time building it separately
+            store.refresh_cached_metadata_inheritance_tree(course_location)
+            self.clear_request_cache(store)
+            start = time.time()
+            store.get_parent_locations(sample[0], course_id)
+            build_time = time.time() - start
+
+            after = self.time_lookups(store, course_id, sample)
+
+            print("Building the parent index: {0:.1f}ms".format(build_time * 1000))
+            self.report("Without parent index", before)
+            self.report("With parent index", after)
+        finally:
+            store.collection.remove({'_id.org': course_location.org, '_id.course': course_location.course})
+            store.refresh_cached_metadata_inheritance_tree(course_location)
+
+    def create_course(self, store, course_location, blocks):
+        """
+        Create the synthetic course, and return the locations of its leaves
+        """
+        pseudo_course_id = '{0}/{1}'.format(course_location.org, course_location.course)
+        store.ignore_write_events_on_courses.append(pseudo_course_id)
+
+        def create(category, name, parent_children):
+            "Create an item and add it to the children of its parent"
+            location = course_location.replace(category=category, name=name)
+            store.create_and_save_xmodule(location, metadata={'display_name': name})
+            parent_children.append(location.url())
+            return location
+
+        try:
+            course_children = []
+            store.create_and_save_xmodule(course_location, metadata={'display_name': 'jump_to benchmark'})
+            verticals = []
+            for chapter_index in xrange(CHAPTERS):
+                chapter = create('chapter', 'chapter_{0}'.format(chapter_index), course_children)
+                chapter_children = []
+                for sequential_index in xrange(SEQUENTIALS_PER_CHAPTER):
+                    sequential = create(
+                        'sequential', '{0}_{1}'.format(chapter.name, sequential_index), chapter_children
+                    )
+                    sequential_children = []
+                    for vertical_index in xrange(VERTICALS_PER_SEQUENTIAL):
+                        vertical = create(
+                            'vertical', '{0}_{1}'.format(sequential.name, vertical_index), sequential_children
+                        )
+                        verticals.append((vertical, []))
+                    store.update_children(sequential, sequential_children)
+                store.update_children(chapter, chapter_children)
+            store.update_children(course_location, course_children)
+
+            leaves = []
+            for index in xrange(blocks - CONTAINERS):
+                vertical, vertical_children = verticals[index % len(verticals)]
+                leaves.append(create('html', 'html_{0}'.format(index), vertical_children))
+            for vertical, vertical_children in verticals:
+                store.update_children(vertical, vertical_children)
+            return leaves
+        finally:
+            store.ignore_write_events_on_courses.remove(pseudo_course_id)
+            store.refresh_cached_metadata_inheritance_tree(course_location)
+
+    def clear_request_cache(self, store):
+        "Make the next lookup behave as the first one of a request"
+        if store.request_cache is not None:
+            store.request_cache.data.clear()
+
+    def time_lookups(self, store, course_id, locations):
+        """
+        Returns the time path_to_location took for each of locations, each
+        looked up as if it were a request of its own
+        """
+        timings = []
+        for location in locations:
+            self.clear_request_cache(store)
+            start = time.time()
+            path_to_location(store, course_id, location)
+            timings.append(time.time() - start)
+        return timings
+
+    def report(self, label, timings):
+        "Print the mean and 95th percentile of timings"
+        timings = sorted(timings)
+        print("{0}: {1:.2f}ms mean, {2:.2f}ms 95th percentile".format(
+            label,
+            sum(timings) * 1000 / len(timings),
+            timings[int(len(timings) * 0.95)] * 1000,
+        ))
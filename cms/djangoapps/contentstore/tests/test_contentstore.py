@@ -31,6 +31,7 @@ from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore import Location, mongo
 from xmodule.modulestore.store_utilities import clone_course
 from xmodule.modulestore.store_utilities import delete_course
+from xmodule.modulestore.search import path_to_location
 from xmodule.modulestore.django import modulestore
 from xmodule.contentstore.django import contentstore, _CONTENTSTORE
 from xmodule.modulestore.xml_exporter import export_to_xml
@@ -1809,6 +1810,91 @@ class ContentStoreTest(ModuleStoreTestCase):
 
         self.assertEqual(timedelta(1), new_module.graceperiod)
 
+    def test_metadata_inheritance_tree_updated_incrementally(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        chapter_location = Location(['i4x', 'edX', 'toy', 'chapter', 'Overview', None])
+        videosequence_location = Location(['i4x', 'edX', 'toy', 'videosequence', 'Toy_Videos', None])
+        html_location = Location(['i4x', 'edX', 'toy', 'html', 'toyhtml', None])
+
+        with mock.patch.object(
+            module_store, '_compute_metadata_inheritance_entry',
+            wraps=module_store._compute_metadata_inheritance_entry
+        ) as compute:
+            # an override on a container is passed down to its whole subtree
+            chapter = module_store.get_item(chapter_location)
+            chapter.xqa_key = 'overview_xqa_key'
+            chapter.save()
+            module_store.update_metadata(chapter_location, own_metadata(chapter))
+            self.assertEqual('overview_xqa_key', module_store.get_item(html_location).xqa_key)
+
+            # writes to leaves don't touch the tree
+            html = module_store.get_item(html_location)
+            html.display_name = 'new display name'
+            html.save()
+            module_store.update_metadata(html_location, own_metadata(html))
+
+            # new containers inherit once they are attached
+            new_vertical_location = Location(['i4x', 'edX', 'toy', 'vertical', 'new_vertical', None])
+            module_store.create_and_save_xmodule(new_vertical_location)
+            videosequence = module_store.get_item(videosequence_location)
+            module_store.update_children(
+                videosequence_location, videosequence.children + [new_vertical_location.url()]
+            )
+            self.assertEqual('overview_xqa_key', module_store.get_item(new_vertical_location).xqa_key)
+
+            self.assertFalse(compute.called)
+
+        self.assertEqual(
+            module_store.compute_metadata_inheritance_tree(course_location),
+            module_store.get_cached_metadata_inheritance_tree(course_location)
+        )
+
+    def test_parent_index(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_id = 'edX/toy/2012_Fall'
+        videosequence_location = Location(['i4x', 'edX', 'toy', 'videosequence', 'Toy_Videos', None])
+        chapter_location = Location(['i4x', 'edX', 'toy', 'chapter', 'Overview', None])
+        html_location = Location(['i4x', 'edX', 'toy', 'html', 'toyhtml', None])
+
+        def assert_parents(location, expected):
+            self.assertEqual(
+                [Location(parent) for parent in expected],
+                [Location(parent) for parent in module_store.get_parent_locations(location, course_id)]
+            )
+
+        with mock.patch.object(
+            module_store, '_find_parent_locations', wraps=module_store._find_parent_locations
+        ) as find_parent_locations:
+            assert_parents(html_location, [videosequence_location])
+            self.assertEqual(
+                (course_id, 'Overview', 'Toy_Videos', '3'),
+                path_to_location(module_store, course_id, html_location)
+            )
+
+            # move the html from the videosequence to the chapter
+            videosequence = module_store.get_item(videosequence_location)
+            module_store.update_children(
+                videosequence_location,
+                [child for child in videosequence.children if child != html_location.url()]
+            )
+            chapter = module_store.get_item(chapter_location)
+            module_store.update_children(chapter_location, chapter.children + [html_location.url()])
+            assert_parents(html_location, [chapter_location])
+
+            # deleting the parent drops it from the index
+            module_store.delete_item(chapter_location)
+            assert_parents(html_location, [])
+
+            self.assertFalse(find_parent_locations.called)
+
+        self.assertEqual(
+            module_store._find_parent_locations(html_location),
+            module_store.get_parent_locations(html_location, course_id)
+        )
+
     def test_default_metadata_inheritance(self):
         course = CourseFactory.create()
         vertical = ItemFactory.create(parent_location=course.location)
@@ -103,6 +103,8 @@ SITE_NAME = ENV_TOKENS['SITE_NAME']
 LOG_DIR = ENV_TOKENS['LOG_DIR']
 
 CACHES = ENV_TOKENS['CACHES']
+HEARTBEAT_CHECK_TIMEOUT = ENV_TOKENS.get('HEARTBEAT_CHECK_TIMEOUT', HEARTBEAT_CHECK_TIMEOUT)
+HEARTBEAT_DEEP_CACHE_TIMEOUT = ENV_TOKENS.get('HEARTBEAT_DEEP_CACHE_TIMEOUT', HEARTBEAT_DEEP_CACHE_TIMEOUT)
 
 SESSION_COOKIE_DOMAIN = ENV_TOKENS.get('SESSION_COOKIE_DOMAIN')
 SESSION_ENGINE = ENV_TOKENS.get('SESSION_ENGINE', SESSION_ENGINE)
@@ -163,6 +165,7 @@ DATABASES = AUTH_TOKENS['DATABASES']
 MODULESTORE = AUTH_TOKENS['MODULESTORE']
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
+STATIC_CONTENT_DISK_CACHE = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE', STATIC_CONTENT_DISK_CACHE)
 # Datadog for events!
 DATADOG = AUTH_TOKENS.get("DATADOG", {})
 DATADOG.update(ENV_TOKENS.get("DATADOG", {}))
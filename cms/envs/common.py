@@ -170,6 +170,11 @@ MIDDLEWARE_CLASSES = (
     'ratelimitbackend.middleware.RateLimitMiddleware',
 )
 
+# Local disk cache for static content too large for memcached, e.g.
+# {'ROOT': '/var/cache/edx/static_content', 'MAX_BYTES': 1073741824}
+# None serves it straight from the contentstore
+STATIC_CONTENT_DISK_CACHE = None
+
 ############# XBlock Configuration ##########
 
 # This should be moved into an XBlock Runtime/Application object
@@ -423,6 +428,11 @@ TRACKING_BACKENDS = {
 TRACKING_IGNORE_URL_PATTERNS = [r'^/event', r'^/login', r'^/heartbeat']
 TRACKING_ENABLED = True
 
+# The deep heartbeat gives each backend check this many seconds to finish
+HEARTBEAT_CHECK_TIMEOUT = 2
+# and each process makes the checks at most once in this many seconds
+HEARTBEAT_DEEP_CACHE_TIMEOUT = 30
+
 # Current youtube api for requesting transcripts.
 # for example: http://video.google.com/timedtext?lang=en&v=j_jEn79vS3g.
 YOUTUBE_API = {
@@ -97,7 +97,7 @@ urlpatterns = patterns('',  # nopep8
     url(r'^event$', 'contentstore.views.event', name='event'),
 
     url(r'^xmodule/', include('pipeline_js.urls')),
-    url(r'^heartbeat$', include('heartbeat.urls')),
+    url(r'^heartbeat', include('heartbeat.urls')),
 )
 
 # User creation and updating views
@@ -0,0 +1,157 @@
+"""
+A local disk tier for serving large static assets.
+
+Assets too large for memcached are otherwise read out of GridFS on every
+request. This keeps fixed size chunks of them on local disk, keyed on the md5
+of the asset (so a changed asset never serves stale chunks, and identical
+assets share them), and evicts the least recently read chunks once the cache
+grows past its size limit.
+"""
+import errno
+import logging
+import os
+import threading
+from uuid import uuid4
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+# bytes per chunk file; a multiple of the GridFS chunk size (256KB)
+DISK_CACHE_CHUNK_SIZE = 1024 * 1024
+# default bound on the bytes kept on disk
+DISK_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# when the cache outgrows its bound, chunks are evicted until it's below this fraction of it
+DISK_CACHE_CLEANUP_TARGET = 0.8
+
+
+class DiskChunkCache(object):
+    """
+    Chunks of static content, stored under root as <md5[:2]>/<md5>/<chunk index>
+    """
+    def __init__(self, root, max_bytes=DISK_CACHE_MAX_BYTES, chunk_size=DISK_CACHE_CHUNK_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        # bytes written since the last cleanup; the size of the cache is only
+        # measured when this could have pushed it past max_bytes
+        self._written = 0
+        self._size = None
+
+    def stream_data_in_range(self, content, first_byte, last_byte):
+        """
+        Yields the data of content from first_byte to last_byte, inclusive,
+        reading the chunks from disk and fetching the missing ones from content
+        """
+        for index in xrange(first_byte // self.chunk_size, last_byte // self.chunk_size + 1):
+            chunk = self._get_chunk(content, index)
+            chunk_start = index * self.chunk_size
+            yield chunk[max(first_byte - chunk_start, 0):last_byte - chunk_start + 1]
+
+    def _chunk_path(self, digest, index):
+        "The path of the file holding chunk index of the content with digest"
+        return os.path.join(self.root, digest[:2], digest, str(index))
+
+    def _get_chunk(self, content, index):
+        """
+        Returns chunk index of content, from disk if it's there, and otherwise
+        from content, writing it to disk on the way
+        """
+        path = self._chunk_path(content.content_digest, index)
+        try:
+            with open(path, 'rb') as chunk_file:
+                chunk = chunk_file.read()
+            # the modification time orders the chunks for eviction
+            os.utime(path, None)
+            return chunk
+        except (IOError, OSError) as err:
+            if err.errno != errno.ENOENT:
+                log.warning("Failed to read cached chunk %s: %s", path, err)
+
+        first_byte = index * self.chunk_size
+        last_byte = min(first_byte + self.chunk_size, content.length) - 1
+        chunk = ''.join(content.stream_data_in_range(first_byte, last_byte))
+        self._write_chunk(path, chunk)
+        return chunk
+
+    def _write_chunk(self, path, chunk):
+        """
+        Write chunk to path. Concurrent writers each write a file of their own
+        and rename it into place, so readers never see a partial chunk.
+        """
+        temp_path = '{0}.{1}.tmp'.format(path, uuid4().hex)
+        try:
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError as err:
+                if err.errno != errno.EEXIST:
+                    raise
+            with open(temp_path, 'wb') as chunk_file:
+                chunk_file.write(chunk)
+            os.rename(temp_path, path)
+        except (IOError, OSError) as err:
+            log.warning("Failed to cache chunk %s: %s", path, err)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._written += len(chunk)
+            if self._size is not None and self._size + self._written <= self.max_bytes:
+                return
+            self._written = 0
+        self.cleanup()
+
+    def cleanup(self):
+        """
+        Measure the cache and, if it's over max_bytes, remove the least recently
+        read chunks until it's below DISK_CACHE_CLEANUP_TARGET of it
+        """
+        chunks = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # removed by a concurrent cleanup
+                    continue
+                chunks.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(chunk_size for _, chunk_size, _ in chunks)
+        if size > self.max_bytes:
+            target = self.max_bytes * DISK_CACHE_CLEANUP_TARGET
+            for _, chunk_size, path in sorted(chunks):
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= chunk_size
+
+        with self._lock:
+            self._size = size
+
+
+_DISK_CACHE = None
+_DISK_CACHE_LOCK = threading.Lock()
+
+
+def disk_cache():
+    """
+    Returns the DiskChunkCache configured by settings.STATIC_CONTENT_DISK_CACHE,
+    or None if there isn't one. The setting is a dict with a ROOT directory and
+    optionally MAX_BYTES.
+    """
+    global _DISK_CACHE  # pylint: disable=W0603
+    config = getattr(settings, 'STATIC_CONTENT_DISK_CACHE', None)
+    if not config:
+        return None
+    with _DISK_CACHE_LOCK:
+        if _DISK_CACHE is None or _DISK_CACHE.root != config['ROOT']:
+            _DISK_CACHE = DiskChunkCache(config['ROOT'], config.get('MAX_BYTES', DISK_CACHE_MAX_BYTES))
+        return _DISK_CACHE
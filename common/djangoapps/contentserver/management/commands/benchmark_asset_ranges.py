@@ -0,0 +1,101 @@
+"""
+Script for measuring the throughput of StaticContentServer for concurrent
+byte range requests of an asset, as video players and PDF viewers make them
+"""
+import random
+import threading
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import Client
+
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.exceptions import NotFoundError
+from xmodule.modulestore import InvalidLocationError
+
+
+class Command(BaseCommand):
+    """Measure the throughput of concurrent range requests of an asset"""
+    args = '<asset url, e.g. /c4x/edX/toy/asset/video.mp4>'
+    help = '''Measure the throughput of StaticContentServer for concurrent, randomly placed byte range
+requests of an (unlocked) asset.'''
+
+    option_list = BaseCommand.option_list + (
+        make_option('--threads',
+                    type='int',
+                    dest='threads',
+                    default=8,
+                    help='Number of concurrent clients'),
+        make_option('--requests',
+                    type='int',
+                    dest='requests',
+                    default=50,
+                    help='Number of requests made by each client'),
+        make_option('--range-size',
+                    type='int',
+                    dest='range_size',
+                    default=1024 * 1024,
+                    help='Number of bytes requested by each request'),
+    )
+
+    def handle(self, *args, **options):
+        "Execute the command"
+        if len(args) != 1:
+            raise CommandError("benchmark_asset_ranges requires one argument: <asset url>")
+        url = args[0]
+        try:
+            content = contentstore().find(StaticContent.get_location_from_path(url), as_stream=True)
+        except (InvalidLocationError, NotFoundError):
+            raise CommandError("Asset {0} not found".format(url))
+        length = content.length
+        content.close()
+        if not length:
+            raise CommandError("Asset {0} is empty".format(url))
+        range_size = min(options['range_size'], length)
+
+        timings = []
+        errors = []
+        lock = threading.Lock()
+
+        def run():
+            "Make the requests of one client"
+            client = Client()
+            for _ in xrange(options['requests']):
+                first_byte = random.randint(0, length - range_size)
+                start = time.time()
+                response = client.get(url, HTTP_RANGE='bytes={0}-{1}'.format(first_byte, first_byte + range_size - 1))
+                received = len(response.content)
+                elapsed = time.time() - start
+                with lock:
+                    if response.status_code != 206 or received != range_size:
+                        errors.append(response.status_code)
+                    else:
+                        timings.append(elapsed)
+
+        print("Requesting {0} byte ranges of {1} ({2} bytes) from {3} threads".format(
+            range_size, url, length, options['threads']
+        ))
+        threads = [threading.Thread(target=run) for _ in xrange(options['threads'])]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        if errors:
+            print("{0} requests failed, with status codes {1}".format(len(errors), sorted(set(errors))))
+        if timings:
+            timings.sort()
+            print("{0} requests in {1:.2f}s: {2:.1f} requests/s, {3:.1f}MB/s".format(
+                len(timings),
+                elapsed,
+                len(timings) / elapsed,
+                len(timings) * range_size / elapsed / (1024 * 1024),
+            ))
+            print("Latency: {0:.1f}ms mean, {1:.1f}ms 95th percentile".format(
+                sum(timings) * 1000 / len(timings),
+                timings[int(len(timings) * 0.95)] * 1000,
+            ))
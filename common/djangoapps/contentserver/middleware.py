@@ -1,13 +1,71 @@
+import calendar
+import re
+
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.contentstore.django import contentstore
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.exceptions import NotFoundError
 
+from contentserver.disk_cache import disk_cache
+
+# content smaller than this is cached in memcached; larger content is streamed
+# from the contentstore, through the disk cache if there is one
+MEMCACHED_CONTENT_SIZE_LIMIT = 1048576
+
+# a single byte range: "first-last", "first-" or "-suffix length"
+SINGLE_BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    The requested byte range lies outside the content
+    """
+    pass
+
+
+def parse_range_header(header_value, content_length):
+    """
+    Returns the (first_byte, last_byte) requested by the Range header_value,
+    clamped to the content, or None if the header should be ignored (it's
+    malformed or asks for multiple ranges, which get the full content instead).
+    Raises RangeNotSatisfiable if the range lies outside the content.
+    """
+    match = SINGLE_BYTE_RANGE_RE.match(header_value.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first == '':
+        if last == '':
+            return None
+        suffix_length = int(last)
+        if suffix_length == 0:
+            raise RangeNotSatisfiable()
+        return (max(content_length - suffix_length, 0), content_length - 1)
+    first_byte = int(first)
+    last_byte = int(last) if last != '' else content_length - 1
+    if last_byte < first_byte:
+        return None
+    if first_byte >= content_length:
+        raise RangeNotSatisfiable()
+    return (first_byte, min(last_byte, content_length - 1))
+
+
+def etag_matches(header_value, etag):
+    """
+    Whether the If-None-Match header_value matches etag
+    """
+    for candidate in header_value.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate == etag or candidate == 'W/' + etag:
+            return True
+    return False
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -35,7 +93,7 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MEMCACHED_CONTENT_SIZE_LIMIT:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
@@ -52,18 +110,95 @@ class StaticContentServer(object):
                         request.user, course_partial_id):
                     return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # HTTP dates have a resolution of seconds
+            last_modified_at = calendar.timegm(content.last_modified_at.utctimetuple())
+            last_modified_at_str = http_date(last_modified_at)
+            # content cached before digests were recorded doesn't have one
+            digest = getattr(content, 'content_digest', None)
+            etag = '"{0}"'.format(digest) if digest else None
+
+            # see if the client has cached this content: If-None-Match takes
+            # precedence over If-Modified-Since when both are given
+            if etag is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+                if etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag):
+                    response = HttpResponseNotModified()
+                    response['ETag'] = etag
+                    response['Last-Modified'] = last_modified_at_str
+                    return response
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
+                if_modified_since = parse_http_date_safe(request.META['HTTP_IF_MODIFIED_SINCE'])
+                if if_modified_since is not None and last_modified_at <= if_modified_since:
+                    response = HttpResponseNotModified()
+                    if etag is not None:
+                        response['ETag'] = etag
+                    response['Last-Modified'] = last_modified_at_str
+                    return response
+
+            return self.content_response(request, content, etag, last_modified_at, last_modified_at_str)
+
+    def content_response(self, request, content, etag, last_modified_at, last_modified_at_str):
+        """
+        Returns the response with the content, or the byte range of it asked for
+        """
+        content_length = content.length
+        byte_range = None
+        if content_length is not None and 'HTTP_RANGE' in request.META and \
+                self.if_range_matches(request, etag, last_modified_at):
+            try:
+                byte_range = parse_range_header(request.META['HTTP_RANGE'], content_length)
+            except RangeNotSatisfiable:
+                response = HttpResponse()
+                response.status_code = 416
+                response['Content-Range'] = 'bytes */{0}'.format(content_length)
+                response['Accept-Ranges'] = 'bytes'
+                return response
+
+        if byte_range is not None:
+            first_byte, last_byte = byte_range
+            response = HttpResponse(
+                self.stream_data_in_range(content, first_byte, last_byte), content_type=content.content_type
+            )
+            response.status_code = 206
+            response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(first_byte, last_byte, content_length)
+            response['Content-Length'] = str(last_byte - first_byte + 1)
+        else:
+            if content_length is not None and content_length > 0:
+                data = self.stream_data_in_range(content, 0, content_length - 1)
+            else:
+                data = content.stream_data()
+            response = HttpResponse(data, content_type=content.content_type)
+            if content_length is not None:
+                response['Content-Length'] = str(content_length)
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+        if content_length is not None:
+            response['Accept-Ranges'] = 'bytes'
+        if etag is not None:
+            response['ETag'] = etag
+        response['Last-Modified'] = last_modified_at_str
+        return response
 
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
-            response['Last-Modified'] = last_modified_at_str
+    def if_range_matches(self, request, etag, last_modified_at):
+        """
+        Whether the Range header should be honored given the If-Range header, if
+        any: a range of content which changed since the client got its other
+        parts would be useless, so it gets the full content instead
+        """
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"'):
+            return etag is not None and if_range == etag
+        return parse_http_date_safe(if_range) == last_modified_at
 
-            return response
+    def stream_data_in_range(self, content, first_byte, last_byte):
+        """
+        Returns an iterator over the content from first_byte to last_byte,
+        inclusive. Content streamed from the contentstore goes through the disk
+        cache, if there is one.
+        """
+        cache = disk_cache()
+        if cache is not None and isinstance(content, StaticContentStream) and \
+                getattr(content, 'content_digest', None):
+            return cache.stream_data_in_range(content, first_byte, last_byte)
+        return content.stream_data_in_range(first_byte, last_byte)
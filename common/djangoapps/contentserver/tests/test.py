@@ -134,3 +134,80 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
 
+
+    def test_etag_not_modified(self):
+        """
+        Test that a request with the ETag of the asset gets a 304.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+        self.assertTrue(etag.startswith('"'))
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
+
+    def test_if_modified_since(self):
+        """
+        Test that If-Modified-Since is compared as a date.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked)
+        last_modified = resp['Last-Modified']
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2050 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 1970 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
+
+    def test_range_request(self):
+        """
+        Test that a byte range of an asset gets a 206 with just those bytes.
+        """
+        self.client.logout()
+        full = self.client.get(self.url_unlocked)
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+        length = len(full.content)
+        self.assertEqual(full['Content-Length'], str(length))
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp.content, full.content[10:20])
+        self.assertEqual(resp['Content-Range'], 'bytes 10-19/{0}'.format(length))
+        self.assertEqual(resp['Content-Length'], '10')
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-5')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp.content, full.content[-5:])
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100-')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp.content, full.content[100:])
+
+    def test_range_not_satisfiable(self):
+        """
+        Test that a byte range past the end of an asset gets a 416.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(resp.status_code, 416) #pylint: disable=E1103
+
+    def test_if_range_mismatch(self):
+        """
+        Test that a range request for a changed asset gets the full asset.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
+
+    def test_locked_asset_range_not_logged_in(self):
+        """
+        Test that range requests don't bypass the access check.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_locked, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(resp.status_code, 403) #pylint: disable=E1103
@@ -0,0 +1,64 @@
+"""
+Tests for the local disk tier of StaticContentServer
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from contentserver.disk_cache import DiskChunkCache
+
+
+class RangeSource(object):
+    """
+    Stands in for a StaticContentStream, recording the ranges read from it
+    """
+    def __init__(self, data, content_digest='0123456789abcdef'):
+        self.data = data
+        self.length = len(data)
+        self.content_digest = content_digest
+        self.reads = []
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        "Yield the data from first_byte to last_byte, inclusive"
+        self.reads.append((first_byte, last_byte))
+        yield self.data[first_byte:last_byte + 1]
+
+
+class TestDiskChunkCache(unittest.TestCase):
+    """
+    Tests of DiskChunkCache
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.content = RangeSource(''.join(chr(index % 256) for index in range(100)))
+
+    def read(self, cache, first_byte, last_byte):
+        "Read the range of the content through cache"
+        return ''.join(cache.stream_data_in_range(self.content, first_byte, last_byte))
+
+    def test_ranges_across_chunks(self):
+        cache = DiskChunkCache(self.root, chunk_size=16)
+        for first_byte, last_byte in [(0, 99), (5, 40), (16, 31), (90, 99), (99, 99)]:
+            self.assertEqual(self.content.data[first_byte:last_byte + 1], self.read(cache, first_byte, last_byte))
+
+    def test_chunks_read_once(self):
+        cache = DiskChunkCache(self.root, chunk_size=16)
+        self.read(cache, 5, 40)
+        self.assertEqual([(0, 15), (16, 31), (32, 47)], self.content.reads)
+        self.read(cache, 0, 47)
+        self.assertEqual(3, len(self.content.reads))
+        # the last chunk is short
+        self.read(cache, 95, 99)
+        self.assertEqual((96, 99), self.content.reads[-1])
+
+    def test_cleanup_evicts_least_recently_read(self):
+        cache = DiskChunkCache(self.root, max_bytes=64, chunk_size=16)
+        self.read(cache, 0, 63)
+        first_chunk = os.path.join(self.root, '01', self.content.content_digest, '0')
+        # make the first chunk the least recently read
+        os.utime(first_chunk, (0, 0))
+        self.read(cache, 64, 79)
+        self.assertFalse(os.path.exists(first_chunk))
+        self.assertLessEqual(cache._size, 64)  # pylint: disable=W0212
@@ -0,0 +1,74 @@
+"""
+Tests for the heartbeat views
+"""
+import json
+import threading
+import time
+
+from mock import patch, Mock
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from heartbeat import views
+
+
+class HeartbeatTestCase(TestCase):
+    def setUp(self):
+        # forget the deep checks made by other tests
+        patcher = patch.dict(views._deep_check, {'result': None, 'time': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def deep_heartbeat(self):
+        """Get the deep heartbeat, and its decoded result"""
+        response = self.client.get(reverse('deep_heartbeat'))
+        return response, json.loads(response.content)
+
+    def test_heartbeat_uses_no_backends(self):
+        with patch('heartbeat.views.modulestore') as mock_modulestore:
+            response = self.client.get(reverse('heartbeat'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('date', json.loads(response.content))
+        self.assertFalse(mock_modulestore.called)
+
+    def test_deep_heartbeat(self):
+        response, result = self.deep_heartbeat()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(result['ok'])
+        for name in ('modulestore.default', 'contentstore', 'cache.default', 'sql.default'):
+            self.assertTrue(result['checks'][name]['ok'])
+
+    def test_failing_check(self):
+        checks = [('good', lambda: None), ('bad', Mock(side_effect=ValueError("down")))]
+        with patch('heartbeat.views.backend_checks', return_value=checks):
+            response, result = self.deep_heartbeat()
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(result['ok'])
+        self.assertTrue(result['checks']['good']['ok'])
+        self.assertEqual(result['checks']['bad']['error'], "ValueError: down")
+
+    def test_check_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        checks = [('good', lambda: None), ('slow', lambda: release.wait(5))]
+        with override_settings(HEARTBEAT_CHECK_TIMEOUT=0.2):
+            with patch('heartbeat.views.backend_checks', return_value=checks):
+                start = time.time()
+                response, result = self.deep_heartbeat()
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(result['checks']['good']['ok'])
+        self.assertIn("Timed out", result['checks']['slow']['error'])
+
+    def test_result_cached(self):
+        backend_checks = Mock(return_value=[('good', lambda: None)])
+        with patch('heartbeat.views.backend_checks', backend_checks):
+            for _ in xrange(3):
+                self.deep_heartbeat()
+            self.assertEqual(backend_checks.call_count, 1)
+
+            with override_settings(HEARTBEAT_DEEP_CACHE_TIMEOUT=0):
+                self.deep_heartbeat()
+            self.assertEqual(backend_checks.call_count, 2)
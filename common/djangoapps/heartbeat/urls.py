@@ -2,4 +2,5 @@ from django.conf.urls import url, patterns
 
 urlpatterns = patterns('',  # nopep8
     url(r'^$', 'heartbeat.views.heartbeat', name='heartbeat'),
+    url(r'^/deep$', 'heartbeat.views.deep_heartbeat', name='deep_heartbeat'),
 )
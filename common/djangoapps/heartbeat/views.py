@@ -1,18 +1,164 @@
 import json
+import threading
+import time
 from datetime import datetime
 from pytz import UTC
+from django.conf import settings
+from django.core.cache import get_cache
+from django.db import connections
 from django.http import HttpResponse
+from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from dogapi import dog_stats_api
 
+# The last deep check made by this process, and the time it was made
+_deep_check = {'result': None, 'time': None}
+_deep_check_lock = threading.Lock()
+
 
 @dog_stats_api.timed('edxapp.heartbeat')
 def heartbeat(request):
     """
-    Simple view that a loadbalancer can check to verify that the app is up
+    Simple view that a loadbalancer can check to verify that the app is up.
+    It doesn't use any backend, so it's cheap enough to check as often as needed.
     """
     output = {
         'date': datetime.now(UTC).isoformat(),
-        'courses': [course.location.url() for course in modulestore().get_courses()],
     }
     return HttpResponse(json.dumps(output, indent=4))
+
+
+@dog_stats_api.timed('edxapp.heartbeat.deep')
+def deep_heartbeat(request):
+    """
+    View that checks the app can use each of its backends: the modulestores,
+    the contentstore, the caches and the databases. Responds with the outcome
+    of each check, with status 503 if any failed.
+
+    The checks are made at most once every HEARTBEAT_DEEP_CACHE_TIMEOUT seconds
+    by each process, which responds with its last result in between.
+    """
+    result = deep_check()
+    status = 200 if result['ok'] else 503
+    return HttpResponse(json.dumps(result, indent=4), status=status, content_type='application/json')
+
+
+def deep_check():
+    """
+    The result of run_checks, made by this process within the last
+    HEARTBEAT_DEEP_CACHE_TIMEOUT seconds.
+    """
+    with _deep_check_lock:
+        checked = _deep_check['time']
+        if checked is None or time.time() - checked >= settings.HEARTBEAT_DEEP_CACHE_TIMEOUT:
+            _deep_check['result'] = run_checks(backend_checks(), settings.HEARTBEAT_CHECK_TIMEOUT)
+            _deep_check['time'] = time.time()
+        return _deep_check['result']
+
+
+def _ping_modulestore(store):
+    """Ping the databases `store` uses, if any"""
+    if hasattr(store, 'modulestores'):
+        # a MixedModuleStore
+        for substore in store.modulestores.values():
+            _ping_modulestore(substore)
+    elif hasattr(store, 'collection'):
+        store.collection.database.command('ping')
+    elif hasattr(store, 'db'):
+        store.db.command('ping')
+    # an XMLModuleStore has nothing to reach once it's loaded
+
+
+def _ping_contentstore():
+    """Ping the database of the contentstore"""
+    contentstore().fs_files.database.command('ping')
+
+
+def _check_cache(alias):
+    """Check that a value stored in the cache `alias` can be read back"""
+    cache = get_cache(alias)
+    if settings.CACHES[alias]['BACKEND'].endswith('DummyCache'):
+        return
+    key = 'heartbeat_{0}'.format(id(threading.current_thread()))
+    cache.set(key, 'ok', 60)
+    if cache.get(key) != 'ok':
+        raise Exception("Value stored in the cache wasn't returned")
+
+
+def _check_database(alias):
+    """Run a query on the database `alias`, with a connection for this check"""
+    connection = connections[alias]
+    try:
+        connection.cursor().execute("SELECT 1")
+    finally:
+        connection.close()
+
+
+def backend_checks():
+    """
+    The (name, check) of each backend the app is configured with, where
+    check() raises an exception if the backend can't be used.
+    """
+    checks = [
+        ('modulestore.{0}'.format(name), lambda name=name: _ping_modulestore(modulestore(name)))
+        for name in settings.MODULESTORE
+    ]
+    checks.append(('contentstore', _ping_contentstore))
+    checks.extend(
+        ('cache.{0}'.format(alias), lambda alias=alias: _check_cache(alias))
+        for alias in settings.CACHES
+    )
+    checks.extend(
+        ('sql.{0}'.format(alias), lambda alias=alias: _check_database(alias))
+        for alias in settings.DATABASES
+    )
+    return checks
+
+
+class _CheckThread(threading.Thread):
+    """Runs a check, recording how it went"""
+    def __init__(self, check):
+        super(_CheckThread, self).__init__()
+        self.daemon = True
+        self.check = check
+        self.error = None
+        self.duration = None
+
+    def run(self):
+        start = time.time()
+        try:
+            self.check()
+        except Exception as err:
+            self.error = u"{0}: {1}".format(type(err).__name__, err)
+        self.duration = time.time() - start
+
+
+def run_checks(checks, timeout):
+    """
+    Run each of `checks`, a list of (name, check), in parallel, giving each
+    `timeout` seconds to finish. Returns whether they all succeeded, and the
+    outcome of each.
+    """
+    started = datetime.now(UTC).isoformat()
+    threads = [(name, _CheckThread(check)) for name, check in checks]
+    deadline = time.time() + timeout
+    for _, thread in threads:
+        thread.start()
+
+    outcomes = {}
+    for name, thread in threads:
+        thread.join(max(deadline - time.time(), 0))
+        if thread.is_alive():
+            outcomes[name] = {'ok': False, 'error': "Timed out after {0}s".format(timeout)}
+        elif thread.error is not None:
+            outcomes[name] = {'ok': False, 'error': thread.error, 'time': thread.duration}
+        else:
+            outcomes[name] = {'ok': True, 'time': thread.duration}
+        if not outcomes[name]['ok']:
+            dog_stats_api.increment('edxapp.heartbeat.deep.failure', tags=['check:{0}'.format(name)])
+
+    return {
+        'date': started,
+        'ok': all(outcome['ok'] for outcome in outcomes.itervalues()),
+        'checks': outcomes,
+    }
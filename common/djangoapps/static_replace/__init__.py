@@ -90,6 +90,54 @@ def replace_course_urls(text, course_id):
     return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
 
 
+def _static_url(prefix, rest, data_directory, course_id, static_asset_path):
+    """
+    Returns the url that the static url prefix + rest should be replaced with,
+    or None if it should be left alone. See replace_static_urls.
+    """
+    # Don't mess with things that end in '?raw'
+    if rest.endswith('?raw'):
+        return None
+
+    # In debug mode, if we can find the url as is,
+    if settings.DEBUG and finders.find(rest, True):
+        return None
+    # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
+    elif (not static_asset_path) and course_id and modulestore().get_modulestore_type(course_id) != XML_MODULESTORE_TYPE:
+        # first look in the static file pipeline and see if we are trying to reference
+        # a piece of static content which is in the mitx repo (e.g. JS associated with an xmodule)
+
+        exists_in_staticfiles_storage = False
+        try:
+            exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+
+        if exists_in_staticfiles_storage:
+            url = staticfiles_storage.url(rest)
+        else:
+            # if not, then assume it's courseware specific content and then look in the
+            # Mongo-backed database
+            url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+    # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
+    else:
+        course_path = "/".join((static_asset_path or data_directory, rest))
+
+        try:
+            if staticfiles_storage.exists(rest):
+                url = staticfiles_storage.url(rest)
+            else:
+                url = staticfiles_storage.url(course_path)
+        # And if that fails, assume that it's course content, and add manually data directory
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+            url = "".join([prefix, course_path])
+
+    return url
+
+
 def replace_static_urls(text, data_directory, course_id=None, static_asset_path=''):
     """
     Replace /static/$stuff urls either with their correct url as generated by collectstatic,
@@ -105,50 +153,13 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
 
     def replace_static_url(match):
         original = match.group(0)
-        prefix = match.group('prefix')
-        quote = match.group('quote')
-        rest = match.group('rest')
-
-        # Don't mess with things that end in '?raw'
-        if rest.endswith('?raw'):
-            return original
-
-        # In debug mode, if we can find the url as is,
-        if settings.DEBUG and finders.find(rest, True):
+        url = _static_url(
+            match.group('prefix'), match.group('rest'),
+            data_directory, course_id, static_asset_path
+        )
+        if url is None:
             return original
-        # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) and course_id and modulestore().get_modulestore_type(course_id) != XML_MODULESTORE_TYPE:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the mitx repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
-        # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
-        else:
-            course_path = "/".join((static_asset_path or data_directory, rest))
-
-            try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
-                else:
-                    url = staticfiles_storage.url(course_path)
-            # And if that fails, assume that it's course content, and add manually data directory
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-                url = "".join([prefix, course_path])
-
+        quote = match.group('quote')
         return "".join([quote, url, quote])
 
     return re.sub(
@@ -159,3 +170,68 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
         replace_static_url,
         text
     )
+
+
+_FUSED_URL_REGEXES = {}
+
+
+def _fused_url_replace_regex(static_prefix):
+    """
+    Match static, course and jump_to_id urls in quotes, like _url_replace_regex
+    does for each of them, naming the group of the prefix that matched.
+    """
+    regex = _FUSED_URL_REGEXES.get(static_prefix)
+    if regex is None:
+        regex = re.compile(r"""
+            (?x)                                # flags=re.VERBOSE
+            (?P<quote>\\?['"])                  # the opening quotes
+            (?:
+                (?P<static>{static_prefix})     # the static prefix
+                | (?P<course>/course/)          # or the course prefix
+                | (?P<jump_to_id>/jump_to_id/)  # or the jump_to_id prefix
+            )
+            (?P<rest>.*?)                       # everything else in the url
+            (?P=quote)                          # the first matching closing quote
+            """.format(static_prefix=static_prefix))
+        _FUSED_URL_REGEXES[static_prefix] = regex
+    return regex
+
+
+def replace_urls(text, data_directory, course_id, jump_to_id_base_url,
+                 static_asset_path='', url_cache=None):
+    """
+    Does what replace_static_urls, replace_course_urls and
+    replace_jump_to_id_urls do, in that order, in a single scan of text.
+
+    url_cache: a dict in which to remember how static urls were resolved, to
+        share between calls for the same request
+
+    returns: text with the links replaced
+    """
+    regex = _fused_url_replace_regex('(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=static_asset_path or data_directory
+    ))
+
+    def replace_url(match):
+        quote = match.group('quote')
+        rest = match.group('rest')
+        if match.group('course') is not None:
+            return "".join([quote, '/courses/' + course_id + '/', rest, quote])
+        if match.group('jump_to_id') is not None:
+            return "".join([quote, jump_to_id_base_url + rest, quote])
+
+        prefix = match.group('static')
+        if url_cache is None:
+            url = _static_url(prefix, rest, data_directory, course_id, static_asset_path)
+        else:
+            key = (prefix, rest, data_directory, course_id, static_asset_path)
+            try:
+                url = url_cache[key]
+            except KeyError:
+                url = url_cache[key] = _static_url(prefix, rest, data_directory, course_id, static_asset_path)
+        if url is None:
+            return match.group(0)
+        return "".join([quote, url, quote])
+
+    return regex.sub(replace_url, text)
@@ -2,9 +2,10 @@ import re
 
 from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=E0611
 from static_replace import (replace_static_urls, replace_course_urls,
+                            replace_jump_to_id_urls, replace_urls,
                             _url_replace_regex)
 from mock import patch, Mock
-from xmodule.modulestore import Location
+from xmodule.modulestore import Location, XML_MODULESTORE_TYPE
 from xmodule.modulestore.mongo import MongoModuleStore
 from xmodule.modulestore.xml import XMLModuleStore
 
@@ -108,3 +109,91 @@ def test_regex():
     for s in no:
         print 'Should not match: {0!r}'.format(s)
         assert_false(re.match(regex, s))
+
+
+JUMP_TO_ID_BASE_URL = '/courses/org/course/run/jump_to_id/'
+
+FUSED_SOURCES = (
+    '"/static/file.png"',
+    '<img src="/static/file.png"/><a href="/course/info">info</a>',
+    "<a href='/jump_to_id/abc123'>next</a> <a href=\"/course/x\">x</a>",
+    '<img src="/static/foo.png?raw"/>',
+    '"/static/data_dir/file.png" and "/static/other.png"',
+    '<script>var s = \\"/static/file.js\\";</script>',
+    '"/course/a" "/jump_to_id/b" "/static/c.png" "/static/',
+    'nothing to see here',
+)
+
+
+def _sequential_replace(text, **kwargs):
+    """The three replacements, one after another, as the LMS used to do them"""
+    text = replace_static_urls(text, DATA_DIRECTORY, **kwargs)
+    text = replace_course_urls(text, COURSE_ID)
+    return replace_jump_to_id_urls(text, COURSE_ID, JUMP_TO_ID_BASE_URL)
+
+
+@patch('static_replace.modulestore')
+@patch('static_replace.staticfiles_storage')
+def test_fused_replace_matches_sequential(mock_storage, mock_modulestore):
+    mock_modulestore.return_value = Mock(XMLModuleStore)
+    mock_modulestore.return_value.get_modulestore_type.return_value = XML_MODULESTORE_TYPE
+    mock_storage.exists.return_value = False
+    mock_storage.url.side_effect = lambda path: '/static/' + path
+
+    for source in FUSED_SOURCES:
+        print 'Replacing {0!r}'.format(source)
+        assert_equals(
+            _sequential_replace(source, course_id=COURSE_ID),
+            replace_urls(source, DATA_DIRECTORY, COURSE_ID, JUMP_TO_ID_BASE_URL)
+        )
+        assert_equals(
+            _sequential_replace(source, course_id=COURSE_ID, static_asset_path='assets'),
+            replace_urls(source, DATA_DIRECTORY, COURSE_ID, JUMP_TO_ID_BASE_URL, static_asset_path='assets')
+        )
+
+
+@patch('static_replace.StaticContent')
+@patch('static_replace.modulestore')
+def test_fused_replace_matches_sequential_mongo(mock_modulestore, mock_static_content):
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    mock_static_content.convert_legacy_static_url_with_course_id.side_effect = lambda rest, course_id: '/c4x/' + rest
+
+    for source in FUSED_SOURCES:
+        print 'Replacing {0!r}'.format(source)
+        assert_equals(
+            _sequential_replace(source, course_id=COURSE_ID),
+            replace_urls(source, DATA_DIRECTORY, COURSE_ID, JUMP_TO_ID_BASE_URL)
+        )
+
+
+@patch('static_replace.modulestore')
+@patch('static_replace.staticfiles_storage')
+def test_fused_replace_url_cache(mock_storage, mock_modulestore):
+    mock_modulestore.return_value.get_modulestore_type.return_value = XML_MODULESTORE_TYPE
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.png'
+    url_cache = {}
+
+    source = STATIC_SOURCE + STATIC_SOURCE
+    replace_urls(source, DATA_DIRECTORY, COURSE_ID, JUMP_TO_ID_BASE_URL, url_cache=url_cache)
+    replace_urls(source, DATA_DIRECTORY, COURSE_ID, JUMP_TO_ID_BASE_URL, url_cache=url_cache)
+
+    mock_storage.url.assert_called_once_with('file.png')
+
+
+@patch('static_replace.modulestore')
+@patch('static_replace.staticfiles_storage')
+def test_fused_replace_short_child(mock_storage, mock_modulestore):
+    mock_modulestore.return_value = Mock(XMLModuleStore)
+    mock_modulestore.return_value.get_modulestore_type.return_value = XML_MODULESTORE_TYPE
+    mock_storage.exists.return_value = False
+    mock_storage.url.side_effect = lambda path: '/static/' + path
+    url_cache = {}
+
+    # A container whose own markup includes the html of a child
+    child = replace_urls('Intro', DATA_DIRECTORY, COURSE_ID, JUMP_TO_ID_BASE_URL, url_cache=url_cache)
+    parent = '<img src="/static/Intro.png"/><a href="/course/Intro"/>{0}'.format(child)
+    result = replace_urls(parent, DATA_DIRECTORY, COURSE_ID, JUMP_TO_ID_BASE_URL, url_cache=url_cache)
+
+    assert_equals(_sequential_replace(parent, course_id=COURSE_ID), result)
+    assert_true('/courses/org/course/run/Intro' in result)
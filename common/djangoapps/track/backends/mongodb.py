@@ -2,7 +2,12 @@
 
 from __future__ import absolute_import
 
+import atexit
 import logging
+import os
+import threading
+import time
+from collections import deque
 
 import pymongo
 from pymongo import MongoClient
@@ -13,6 +18,10 @@ from track.backends import BaseBackend
 
 log = logging.getLogger(__name__)
 
+# What to do with a new event when the buffer is full
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
 
 class MongoBackend(BaseBackend):
     """Class for a MongoDB event tracker Backend"""
@@ -30,6 +39,18 @@ class MongoBackend(BaseBackend):
           - `database`: name of the database
           - `collection`: name of the collection
           - `extra`: parameters to pymongo.MongoClient not listed above
+          - `buffered`: if true, events are queued and inserted in batches
+            by a background thread instead of one at a time by the
+            thread sending them
+          - `buffer_size`: maximum number of queued events
+          - `batch_size`: number of queued events which triggers a flush
+          - `flush_interval`: maximum number of seconds an event stays
+            queued before it's flushed
+          - `overflow`: what to do when the buffer is full: 'drop_oldest'
+            discards the oldest queued event, 'block' waits for the
+            background thread to make room
+          - `block_timeout`: maximum number of seconds 'block' waits,
+            before discarding the oldest queued event
 
         """
 
@@ -73,6 +94,30 @@ class MongoBackend(BaseBackend):
 
         self._create_indexes()
 
+        self.buffered = kwargs.get('buffered', False)
+        self.buffer_size = kwargs.get('buffer_size', 10000)
+        self.batch_size = kwargs.get('batch_size', 100)
+        self.flush_interval = kwargs.get('flush_interval', 1.0)
+        self.overflow = kwargs.get('overflow', DROP_OLDEST)
+        self.block_timeout = kwargs.get('block_timeout', 5.0)
+        if self.overflow not in (DROP_OLDEST, BLOCK):
+            raise ValueError('Invalid overflow policy %s' % self.overflow)
+
+        # Counters of the events queued, inserted, and lost (either
+        # discarded because the buffer was full or failed to insert)
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._flusher = None
+        self._flusher_pid = None
+
+        if self.buffered:
+            atexit.register(self.close)
+
     def _create_indexes(self):
         """Ensures the proper fields are indexed"""
         # WARNING: The collection will be locked during the index
@@ -87,11 +132,143 @@ class MongoBackend(BaseBackend):
 
     def send(self, event):
         """Insert the event in to the Mongo collection"""
+        if not self.buffered:
+            self._insert(event)
+            return
+
+        with self._condition:
+            if not self._closed:
+                self._ensure_flusher()
+                if self.overflow == BLOCK:
+                    deadline = time.time() + self.block_timeout
+                    while len(self._buffer) >= self.buffer_size and not self._closed:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                if len(self._buffer) >= self.buffer_size and not self._closed:
+                    self._buffer.popleft()
+                    self.dropped += 1
+            if not self._closed:
+                self._buffer.append(event)
+                self.queued += 1
+                if len(self._buffer) >= self.batch_size:
+                    self._condition.notify_all()
+                return
+
+        # Sent during shutdown, after the last flush
+        self._insert(event)
+
+    def flush(self):
+        """Insert all the queued events"""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            self._insert(batch)
+
+    def close(self):
+        """Stop the background thread, and insert the queued events"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            flusher = self._flusher
+        if flusher is not None and flusher.is_alive() and flusher is not threading.current_thread():
+            flusher.join(self.flush_interval * 2)
+        self.flush()
+
+    def stats(self):
+        """Returns the counts of queued, flushed and dropped events"""
+        with self._condition:
+            return {
+                'queued': self.queued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'pending': len(self._buffer),
+            }
+
+    def _ensure_flusher(self):
+        """
+        Start the background thread, unless it's already running in this
+        process. The backends are created at import, so a forked worker
+        process inherits the buffer but not the thread. A thread that died
+        is replaced.
+
+        The caller must hold the condition.
+        """
+        pid = os.getpid()
+        if self._flusher is not None and self._flusher_pid == pid and self._flusher.is_alive():
+            return
+        if self._flusher_pid != pid:
+            # Events queued by the parent process belong to it
+            self._buffer.clear()
+        self._flusher_pid = pid
+        self._flusher = threading.Thread(target=self._run_flusher, name='MongoBackend flusher')
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _run_flusher(self):
+        """Insert the queued events in batches until the backend is closed"""
+        while True:
+            with self._condition:
+                deadline = time.time() + self.flush_interval
+                while len(self._buffer) < self.batch_size and not self._closed:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            batch = self._take_batch()
+            if batch:
+                try:
+                    self._insert(batch)
+                except Exception:  # pylint: disable=broad-except
+                    # Keep the thread alive for the next batches
+                    log.exception('Error flushing MongoDB event tracker backend')
+
+    def _take_batch(self):
+        """Remove and return up to batch_size of the queued events"""
+        with self._condition:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+            if batch:
+                # Make room for senders blocked on a full buffer
+                self._condition.notify_all()
+            return batch
+
+    def _insert(self, events):
+        """
+        Insert an event, or a list of events, counting them. If a list
+        can't be encoded, its events are inserted one at a time, so that
+        only the invalid ones are lost.
+        """
         try:
-            self.collection.insert(event, manipulate=False)
+            if isinstance(events, list):
+                count = len(events)
+                self.collection.insert(events, manipulate=False, continue_on_error=True)
+            else:
+                count = 1
+                self.collection.insert(events, manipulate=False)
         except PyMongoError:
-            # The event will be lost in case of a connection error.
+            # The events will be lost in case of a connection error.
             # pymongo will re-connect/re-authenticate automatically
-            # during the next event.
+            # during the next insert.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+            with self._condition:
+                self.dropped += count
+        except Exception:  # pylint: disable=broad-except
+            # Events from the browser can have keys with '.' or '$', or
+            # strings that aren't valid UTF-8, which bson can't encode
+            if isinstance(events, list) and count > 1:
+                for event in events:
+                    self._insert(event)
+                return
+            log.exception('Invalid event for MongoDB event tracker backend')
+            with self._condition:
+                self.dropped += count
+        else:
+            with self._condition:
+                self.flushed += count
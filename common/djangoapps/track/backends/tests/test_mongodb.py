@@ -1,7 +1,10 @@
 from __future__ import absolute_import
 
+import threading
+import time
 from uuid import uuid4
 
+from bson.errors import InvalidDocument
 from mock import patch
 
 from django.test import TestCase
@@ -38,3 +41,133 @@ class TestMongoBackend(TestCase):
 
         self.assertEqual(events[0], first_argument(calls[0]))
         self.assertEqual(events[1], first_argument(calls[1]))
+
+
+def reject_dotted_keys(events, **kwargs):
+    """ Raise like collection.insert for events with a '.' in a key """
+    for event in events if isinstance(events, list) else [events]:
+        for key in event:
+            if '.' in key:
+                raise InvalidDocument("key '{0}' must not contain '.'".format(key))
+
+
+class TestBufferedMongoBackend(TestCase):
+    def setUp(self):
+        self.mongo_patcher = patch('track.backends.mongodb.MongoClient')
+        self.addCleanup(self.mongo_patcher.stop)
+        self.mongo_patcher.start()
+
+    def make_backend(self, **kwargs):
+        options = {'buffered': True, 'batch_size': 100, 'flush_interval': 60}
+        options.update(kwargs)
+        backend = MongoBackend(**options)
+        self.addCleanup(backend.close)
+        return backend
+
+    def inserted(self, backend):
+        # The first argument of each call to collection.insert
+        return [args[0] for _, args, _ in backend.collection.insert.mock_calls]
+
+    def test_events_inserted_in_batches(self):
+        backend = self.make_backend(batch_size=2)
+        events = [{'test': i} for i in range(5)]
+        for event in events:
+            backend.send(event)
+        backend.flush()
+
+        batches = self.inserted(backend)
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+        self.assertEqual(events, [event for batch in batches for event in batch])
+        self.assertEqual({'queued': 5, 'flushed': 5, 'dropped': 0, 'pending': 0}, backend.stats())
+
+    def test_full_batch_flushed_in_background(self):
+        backend = self.make_backend(batch_size=2)
+        backend.send({'test': 1})
+        backend.send({'test': 2})
+
+        for _ in range(100):
+            if backend.stats()['flushed'] == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual([[{'test': 1}, {'test': 2}]], self.inserted(backend))
+
+    def test_drop_oldest(self):
+        backend = self.make_backend(buffer_size=2)
+        for i in range(3):
+            backend.send({'test': i})
+        backend.flush()
+
+        self.assertEqual([[{'test': 1}, {'test': 2}]], self.inserted(backend))
+        self.assertEqual({'queued': 3, 'flushed': 2, 'dropped': 1, 'pending': 0}, backend.stats())
+
+    def wait_for_flushed(self, backend, count):
+        for _ in range(100):
+            if backend.stats()['flushed'] >= count:
+                return
+            time.sleep(0.01)
+
+    def test_invalid_event(self):
+        backend = self.make_backend(batch_size=2)
+        backend.collection.insert.side_effect = reject_dotted_keys
+        backend.send({'test.key': 1})
+        backend.send({'test': 1})
+        self.wait_for_flushed(backend, 1)
+
+        # Only the invalid event was lost, and later events are still flushed
+        backend.send({'test': 2})
+        backend.send({'test': 3})
+        self.wait_for_flushed(backend, 3)
+        self.assertEqual({'queued': 4, 'flushed': 3, 'dropped': 1, 'pending': 0}, backend.stats())
+        self.assertTrue(backend._flusher.is_alive())
+
+    def test_dead_flusher_replaced(self):
+        backend = self.make_backend(batch_size=1)
+        backend.send({'test': 1})
+        dead = threading.Thread(target=lambda: None)
+        dead.start()
+        dead.join()
+        backend._flusher = dead
+
+        backend.send({'test': 2})
+        self.wait_for_flushed(backend, 2)
+        self.assertIsNot(dead, backend._flusher)
+        self.assertEqual([[{'test': 1}], [{'test': 2}]], self.inserted(backend))
+
+    def test_block_timeout(self):
+        backend = self.make_backend(buffer_size=1, overflow='block', block_timeout=0.05)
+        backend.send({'test': 1})
+        # Nothing makes room, so the oldest event is discarded after the timeout
+        backend.send({'test': 2})
+        backend.flush()
+        self.assertEqual([[{'test': 2}]], self.inserted(backend))
+        self.assertEqual({'queued': 2, 'flushed': 1, 'dropped': 1, 'pending': 0}, backend.stats())
+
+    def test_block(self):
+        backend = self.make_backend(buffer_size=1, overflow='block')
+        backend.send({'test': 1})
+        sender = threading.Thread(target=backend.send, args=({'test': 2},))
+        sender.start()
+        sender.join(0.05)
+        # The sender waits for room in the buffer
+        self.assertTrue(sender.is_alive())
+
+        backend.flush()
+        sender.join(1)
+        self.assertFalse(sender.is_alive())
+        backend.flush()
+        self.assertEqual([[{'test': 1}], [{'test': 2}]], self.inserted(backend))
+        self.assertEqual(0, backend.stats()['dropped'])
+
+    def test_close_flushes(self):
+        backend = self.make_backend()
+        backend.send({'test': 1})
+        backend.close()
+        self.assertEqual([[{'test': 1}]], self.inserted(backend))
+
+        # Events sent after closing are inserted right away
+        backend.send({'test': 2})
+        self.assertEqual({'test': 2}, self.inserted(backend)[-1])
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            MongoBackend(buffered=True, overflow='unknown')
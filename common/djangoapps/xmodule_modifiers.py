@@ -117,6 +117,26 @@ def replace_static_urls(data_dir, block, view, frag, context, course_id=None, st
     ))
 
 
+def replace_urls(data_dir, course_id, jump_to_id_base_url, block, view, frag, context,  # pylint: disable=unused-argument
+                 static_asset_path='', url_cache=None):
+    """
+    Substitutes /static/..., /course/... and /jump_to_id/... urls like
+    replace_static_urls, replace_course_urls and replace_jump_to_id_urls
+    would, in a single pass over the content.
+
+    `url_cache` is passed on to static_replace.replace_urls; kept for the
+    blocks of one request, it resolves each static url once.
+    """
+    return wrap_fragment(frag, static_replace.replace_urls(
+        frag.content,
+        data_dir,
+        course_id,
+        jump_to_id_base_url,
+        static_asset_path=static_asset_path,
+        url_cache=url_cache,
+    ))
+
+
 def grade_histogram(module_id):
     ''' Print out a histogram of grades on a given problem.
         Part of staff member debug info.
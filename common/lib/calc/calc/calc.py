@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -72,6 +75,18 @@ SUFFIXES = {
     'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12
 }
 
+# Functions which take and return numpy arrays elementwise, besides numpy's
+# ufuncs. Other functions get called on each element by `evaluate_batch`.
+VECTORIZED_FUNCTIONS = set([
+    functions.sec, functions.csc, functions.cot,
+    functions.arcsec, functions.arccsc,
+    functions.sech, functions.csch, functions.coth,
+    functions.arcsech, functions.arccsch, functions.arccoth
+])
+
+# How many compiled expressions `compile_expression` keeps around.
+COMPILED_EXPRESSION_CACHE_SIZE = 512
+
 
 class UndefinedVariable(Exception):
     """
@@ -228,34 +243,228 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
+
+
+def batch_evaluator(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each of a list of dictionaries of variables.
+
+    Return the list of what `evaluator` would return for each of them, but
+    parse the expression once and evaluate it with numpy arrays when possible.
+    """
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    return compile_expression(math_expr, case_sensitive).evaluate_batch(variables_list, functions)
+
+
+_COMPILED_EXPRESSIONS = OrderedDict()
+_COMPILED_EXPRESSIONS_LOCK = threading.Lock()
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the `CompiledExpression` for a string of math.
+
+    The most recently used ones are cached, so that evaluating the same
+    expression again (e.g. for every sample of a FormulaResponse) skips the
+    parsing. Raise a `ParseException` if the string doesn't parse.
+    """
+    key = (math_expr, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        compiled = _COMPILED_EXPRESSIONS.pop(key, None)
+        if compiled is not None:
+            _COMPILED_EXPRESSIONS[key] = compiled
+            return compiled
+
     math_interpreter = ParseAugmenter(math_expr, case_sensitive)
     math_interpreter.parse_algebra()
+    compiled = CompiledExpression(math_interpreter)
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        _COMPILED_EXPRESSIONS[key] = compiled
+        while len(_COMPILED_EXPRESSIONS) > COMPILED_EXPRESSION_CACHE_SIZE:
+            _COMPILED_EXPRESSIONS.popitem(last=False)
+    return compiled
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
-
-    return math_interpreter.reduce_tree(evaluate_actions)
+def call_vectorized(function, argument):
+    """
+    Call `function` on a numpy array `argument`, elementwise.
+
+    Use a single call for functions known to handle arrays, otherwise call
+    it on each element.
+    """
+    if not isinstance(argument, numpy.ndarray):
+        return function(argument)
+    if isinstance(function, numpy.ufunc) or function in VECTORIZED_FUNCTIONS:
+        return function(argument)
+    return numpy.array([function(element) for element in argument])
+
+
+class CompiledExpression(object):
+    """
+    A parsed expression, ready to be evaluated any number of times.
+
+    The parse tree is turned into nested closures once. Each of them computes
+    the value of a node of the tree from a dictionary of variables and a
+    function calling the named function on an argument.
+    """
+    def __init__(self, math_interpreter):
+        """
+        Compile the parse tree of `math_interpreter`, a `ParseAugmenter`
+        which has already parsed its expression.
+        """
+        self.math_expr = math_interpreter.math_expr
+        self.case_sensitive = math_interpreter.case_sensitive
+        self.variables_used = frozenset(math_interpreter.variables_used)
+        self.functions_used = frozenset(math_interpreter.functions_used)
+        self._math_interpreter = math_interpreter
+        self._evaluate = self._compile_node(math_interpreter.tree)
+        # The parse tree isn't needed anymore.
+        math_interpreter.tree = None
+
+    def _casify(self, name):
+        """
+        Lowercase `name` unless the expression is case sensitive.
+        """
+        if self.case_sensitive:
+            return name
+        return name.lower()
+
+    def _compile_node(self, node):
+        """
+        Return the closure computing the value of `node` of the parse tree.
+
+        The closures compute the same things as the `eval_*` functions, which
+        `evaluator` used to call on each node of each evaluation.
+        """
+        node_name = node.getName()
+        kids = list(node)
+
+        if node_name == 'number':
+            value = eval_number(kids)
+            return lambda variables, call: value
+
+        if node_name == 'variable':
+            varname = self._casify(kids[0])
+            return lambda variables, call: variables[varname]
+
+        if node_name == 'function':
+            funcname = self._casify(kids[0])
+            argument = self._compile_node(kids[1])
+            return lambda variables, call: call(funcname, argument(variables, call))
+
+        # The other nodes have their operands as subtrees, and their operators
+        # (or parentheses) as strings.
+        operands = [self._compile_node(kid) for kid in kids if isinstance(kid, ParseResults)]
+
+        if node_name == 'atom':
+            # Parentheses don't do anything.
+            return operands[0]
+
+        if len(operands) == 1 and node_name in ('power', 'parallel', 'product'):
+            return operands[0]
+
+        if node_name == 'power':
+            # Right to left: 2^3^2 is 2^(3^2)
+            operands.reverse()
+
+            def evaluate_power(variables, call):
+                """Exponentiate the operands, right to left."""
+                values = [operand(variables, call) for operand in operands]
+                return reduce(lambda a, b: b ** a, values)
+            return evaluate_power
+
+        if node_name == 'parallel':
+            def evaluate_parallel(variables, call):
+                """Combine the operands as parallel resistors."""
+                values = [operand(variables, call) for operand in operands]
+                # Arrays with zeros raise a FloatingPointError below instead,
+                # so `evaluate_batch` falls back to evaluating one by one.
+                if not any(isinstance(value, numpy.ndarray) for value in values) and 0 in values:
+                    return float('nan')
+                return 1. / sum(1. / value for value in values)
+            return evaluate_parallel
+
+        if node_name in ('product', 'sum'):
+            if node_name == 'product':
+                initial = 1.0
+                ops = {'*': operator.mul, '/': operator.truediv}
+            else:
+                initial = 0.0
+                ops = {'+': operator.add, '-': operator.sub}
+            # Pair each operand with the operator before it, if any.
+            steps = []
+            current_op = operator.mul if node_name == 'product' else operator.add
+            operand_iter = iter(operands)
+            for kid in kids:
+                if isinstance(kid, ParseResults):
+                    steps.append((current_op, next(operand_iter)))
+                else:
+                    current_op = ops[kid]
+
+            def evaluate_steps(variables, call):
+                """Apply each operator to the running total and its operand."""
+                total = initial
+                for step_op, operand in steps:
+                    total = step_op(total, operand(variables, call))
+                return total
+            return evaluate_steps
+
+        raise Exception(u"Unknown branch name '{}'".format(node_name))  # pragma: no cover
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression with the given variables and functions, like
+        `evaluator` does.
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self._math_interpreter.check_variables(all_variables, all_functions)
+        return self._evaluate(all_variables, lambda name, argument: all_functions[name](argument))
+
+    def evaluate_batch(self, variables_list, functions):
+        """
+        Evaluate the expression for each of the dictionaries of variables in
+        `variables_list`, and return the list of values.
+
+        When the dictionaries all have the same variables, the expression is
+        evaluated once, with numpy arrays of their values. That falls back to
+        evaluating each of them in turn if it runs into anything the arrays
+        don't handle the way `evaluate` does (division by zero, domain errors,
+        functions which can't take arrays...), so the results and the errors
+        raised are the same as calling `evaluate` for each of them.
+        """
+        if not variables_list:
+            return []
+        names = set(variables_list[0])
+        if len(variables_list) == 1 or any(set(variables) != names for variables in variables_list):
+            return [self.evaluate(variables, functions) for variables in variables_list]
+
+        arrays = {}
+        for name in names:
+            array = numpy.array([variables[name] for variables in variables_list])
+            if array.dtype.kind not in 'fc':
+                # Integers would overflow silently.
+                array = array.astype(float)
+            arrays[name] = array
+        all_variables, all_functions = add_defaults(arrays, functions, self.case_sensitive)
+        self._math_interpreter.check_variables(all_variables, all_functions)
+
+        try:
+            with numpy.errstate(all='raise', under='ignore'):
+                values = self._evaluate(
+                    all_variables,
+                    lambda name, argument: call_vectorized(all_functions[name], argument)
+                )
+        except Exception:  # pylint: disable=broad-except
+            return [self.evaluate(variables, functions) for variables in variables_list]
+
+        if isinstance(values, numpy.ndarray):
+            return list(values)
+        # None of the variables are used.
+        return [values] * len(variables_list)
 
 
 class ParseAugmenter(object):
@@ -0,0 +1,85 @@
+"""
+Benchmark of checking a FormulaResponse answer with calc.
+
+Compare evaluating the student and instructor formulas for every sample,
+parsing them each time (as FormulaResponse used to), with evaluating their
+compiled versions for every sample, and with `batch_evaluator`, which
+evaluates all the samples at once with numpy arrays.
+
+Run from common/lib/calc with:
+  PYTHONPATH=. python calc/tests/benchmark_evaluator.py
+"""
+import random
+import timeit
+
+import numpy
+
+import calc
+from calc import calc as calc_module
+
+# (formula, samples variables, number of samples)
+FORMULAS = [
+    ('x^2 + 2*x*y + y^2', ['x', 'y'], 50),
+    ('sin(x)*cos(y) + sqrt(R1 || R2)', ['x', 'y', 'R1', 'R2'], 50),
+    ('1/(1 + e^(-k*t/T))', ['t'], 20),
+    ('arccot(x) + fact(3)', ['x'], 20),
+]
+REPEAT = 5
+
+
+def sample_variables(names, count):
+    """
+    Return `count` dictionaries of random values for `names`, like
+    FormulaResponse.randomize_variables
+    """
+    return [dict((name, random.uniform(1, 10)) for name in names) for _ in range(count)]
+
+
+def parsing_check(formula, variables_list):
+    """
+    Evaluate the formula twice (student and instructor) for each sample,
+    parsing it each time, as FormulaResponse used to
+    """
+    for _ in range(2):
+        for variables in variables_list:
+            calc_module._COMPILED_EXPRESSIONS.clear()  # pylint: disable=protected-access
+            calc.evaluator(variables, {}, formula)
+
+
+def compiled_check(formula, variables_list):
+    """
+    Evaluate the formula twice (student and instructor) for each sample,
+    reusing the compiled formula
+    """
+    for _ in range(2):
+        for variables in variables_list:
+            calc.evaluator(variables, {}, formula)
+
+
+def batch_check(formula, variables_list):
+    """
+    Evaluate the formula twice (student and instructor) for all the samples at once
+    """
+    for _ in range(2):
+        calc.batch_evaluator(variables_list, {}, formula)
+
+
+def main():
+    """
+    Print the time per check of each of the formulas
+    """
+    numpy.seterr(all='ignore')
+    print "{0:<40} {1:>8} {2:>10} {3:>10} {4:>10}".format(
+        'formula', 'samples', 'parsing', 'compiled', 'batch'
+    )
+    for formula, names, count in FORMULAS:
+        variables_list = sample_variables(names, count)
+        timings = [
+            min(timeit.repeat(lambda: check(formula, variables_list), number=1, repeat=REPEAT)) * 1000
+            for check in (parsing_check, compiled_check, batch_check)
+        ]
+        print "{0:<40} {1:>8} {2:>8.2f}ms {3:>8.2f}ms {4:>8.2f}ms".format(formula, count, *timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -558,3 +558,80 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and calc.batch_evaluator
+    Check that evaluating compiled expressions, one by one or in batches,
+    gives the same results and errors as calc.evaluator.
+    """
+
+    def setUp(self):
+        self.variables_list = [
+            {'x': 0.5 + index, 'y': -2.0 + 0.3 * index, 'R1': 1.0 + index}
+            for index in range(10)
+        ]
+
+    def assert_batch_matches(self, math_expr, functions=None, case_sensitive=False):
+        """
+        Assert that batch_evaluator agrees with evaluator for `math_expr`
+        """
+        functions = functions or {}
+        expected = [
+            calc.evaluator(variables, functions, math_expr, case_sensitive=case_sensitive)
+            for variables in self.variables_list
+        ]
+        actual = calc.batch_evaluator(self.variables_list, functions, math_expr, case_sensitive=case_sensitive)
+        self.assertEqual(len(expected), len(actual))
+        for expected_value, actual_value in zip(expected, actual):
+            if numpy.isnan(expected_value):
+                self.assertTrue(numpy.isnan(actual_value))
+            else:
+                self.assertAlmostEqual(expected_value, actual_value)
+
+    def test_compiled_expression_cached(self):
+        compiled = calc.compile_expression('x^2 + 3*y')
+        self.assertIs(compiled, calc.compile_expression('x^2 + 3*y'))
+        self.assertIsNot(compiled, calc.compile_expression('x^2 + 3*y', case_sensitive=True))
+        self.assertEqual(7.0, compiled.evaluate({'x': 2, 'y': 1}, {}))
+        self.assertEqual(28.0, compiled.evaluate({'x': 5, 'y': 1}, {}))
+
+    def test_batch_arithmetic(self):
+        for math_expr in ['x+y', '-x-y*2', 'x/y', '2^x^0.5', 'x||R1||2', '5k + x*3%', '(x+y)*(x-y)', '4']:
+            self.assert_batch_matches(math_expr)
+
+    def test_batch_functions(self):
+        for math_expr in ['sin(x)*cos(y)', 'sqrt(x) + ln(R1)', 'arccot(y)', 'sec(x)^2 - tan(x)^2', 'e^(i*pi*x)']:
+            self.assert_batch_matches(math_expr)
+
+    def test_batch_case_sensitivity(self):
+        self.assert_batch_matches('X + r1')
+        self.assert_batch_matches('x + R1', case_sensitive=True)
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1'):
+            calc.batch_evaluator(self.variables_list, {}, 'x + r1', case_sensitive=True)
+
+    def test_batch_scalar_functions(self):
+        """
+        Functions which don't take arrays are called on each sample
+        """
+        def scalar_only(value):
+            """Raise if given an array"""
+            return float(value) + 1 if value > 0 else -float(value)
+        self.assert_batch_matches('f(y) * x', functions={'f': scalar_only})
+
+    def test_batch_falls_back_for_errors(self):
+        """
+        The errors are the ones raised by evaluating one sample at a time
+        """
+        self.assert_batch_matches('sqrt(y)')
+        self.assert_batch_matches('x || y || 0')
+        with self.assertRaises(ZeroDivisionError):
+            calc.batch_evaluator(self.variables_list, {}, 'x / (y - y)')
+        with self.assertRaisesRegexp(ValueError, 'factorial'):
+            calc.batch_evaluator(self.variables_list, {}, 'fact(x)')
+
+    def test_batch_empty_expression(self):
+        values = calc.batch_evaluator(self.variables_list, {}, ' ')
+        self.assertEqual(len(self.variables_list), len(values))
+        self.assertTrue(all(numpy.isnan(value) for value in values))
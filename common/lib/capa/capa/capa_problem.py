@@ -13,10 +13,13 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 '''
 
+from collections import OrderedDict
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from xml.sax.saxutils import unescape
@@ -61,8 +64,74 @@ html_problem_semantics = [
     "openendedrubric"
 ]
 
+# number of pre-processed problems kept by the process (see ProblemTemplate)
+PROBLEM_TEMPLATE_CACHE_SIZE = 256
+
 log = logging.getLogger(__name__)
 
+#-----------------------------------------------------------------------------
+# pre-processed problems, shared by the LoncapaProblems of the same problem
+
+
+class ProblemTemplate(object):
+    '''
+    The part of initializing a LoncapaProblem which depends neither on the seed nor on
+    the student: the problem XML, parsed, with its includes resolved and IDs assigned
+    to its responses and their inputs.
+
+    LoncapaProblems of the same problem share a template, each working on its own
+    copy of the tree.
+    '''
+    def __init__(self, problem_text, tree, responses, includes):
+        '''
+         - problem_text (string): the problem XML, with startouttext/endouttext converted
+         - tree         (Element): the pre-processed problem XML
+         - responses    (list): (response element, input and solution elements) for each response
+         - includes     (dict): the (modified time, size) of each included file, by filename
+        '''
+        self.problem_text = problem_text
+        self.tree = tree
+        self.responses = responses
+        self.includes = includes
+
+    def is_current(self, filestore):
+        '''
+        Whether none of the included files changed since the template was made.
+        '''
+        for filename, version in self.includes.items():
+            try:
+                info = filestore.getinfo(filename)
+            except Exception:
+                return False
+            if (info.get('modified_time'), info.get('size')) != version:
+                return False
+        return True
+
+    def clone(self):
+        '''
+        Return a copy of the tree, and the responses of the copy.
+        '''
+        tree = deepcopy(self.tree)
+        # the copy has the same structure, so the elements correspond in document order
+        copies = dict(zip(self.tree.iter(), tree.iter()))
+        responses = [
+            (copies[response], [copies[entry] for entry in inputfields])
+            for response, inputfields in self.responses
+        ]
+        return tree, responses
+
+
+_PROBLEM_TEMPLATES = OrderedDict()
+_PROBLEM_TEMPLATES_LOCK = threading.Lock()
+
+
+def clear_problem_templates():
+    '''
+    Forget all the pre-processed problems.
+    '''
+    with _PROBLEM_TEMPLATES_LOCK:
+        _PROBLEM_TEMPLATES.clear()
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -72,7 +141,7 @@ class LoncapaProblem(object):
     Main class for capa Problems.
     '''
 
-    def __init__(self, problem_text, id, state=None, seed=None, system=None):
+    def __init__(self, problem_text, id, state=None, seed=None, system=None, extract_tree=True):
         '''
         Initializes capa Problem.
 
@@ -89,6 +158,10 @@ class LoncapaProblem(object):
                                 - 'input_state' - (dict) maps input_id to a dictionary that holds the state for that input
          - system       (ModuleSystem): ModuleSystem instance which provides OS,
                                         rendering, and user context
+         - extract_tree (bool): whether to create the InputTypes and render the HTML
+                                tree right away. If False, that's done when first needed
+                                (get_html, or accessing inputs or extracted_tree), so
+                                callers which only grade never render templates.
 
         '''
 
@@ -113,34 +186,63 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # Parse the problem XML, resolve its includes and assign its IDs, or copy
+        # the result of doing so for another instance of the problem
+        template = self._get_template(problem_text)
+        self.problem_text = template.problem_text
+        self.tree, responses = template.clone()
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
-        # Response, values = Response instance
-        self._preprocess_problem(self.tree)
+        # Creates the dict (self.responders) of Response instances for each question in
+        # the problem. The dict has keys = xml subtree of Response, values = Response
+        # instance. Then gives the solutions their IDs.
+        self._create_responders(responses)
+        self._assign_solution_ids(self.tree)
 
         if not self.student_answers:  # True when student_answers is an empty dict
             self.set_initial_display()
 
         # dictionary of InputType objects associated with this problem
         #   input_id string -> InputType object
-        self.inputs = {}
+        # Both it and the HTML tree are created by _extract_tree.
+        self._inputs = None
+        self._extracted_tree = None
 
-        self.extracted_tree = self._extract_html(self.tree)
+        if extract_tree:
+            self._extract_tree()
+        else:
+            # Give each input the state entry creating its InputType would
+            for entry in self.tree.xpath('//' + '|//'.join(inputtypes.registry.registered_tags())):
+                input_id = entry.get('id')
+                if input_id is not None and input_id not in self.input_state:
+                    self.input_state[input_id] = {}
+
+    @property
+    def inputs(self):
+        '''
+        Dictionary of the InputType objects associated with this problem, by input_id
+        '''
+        if self._inputs is None:
+            self._extract_tree()
+        return self._inputs
+
+    @property
+    def extracted_tree(self):
+        '''
+        The HTML tree of the problem, as rendered when the InputTypes were created
+        '''
+        if self._inputs is None:
+            self._extract_tree()
+        return self._extracted_tree
+
+    def _extract_tree(self):
+        '''
+        Create the InputTypes, and render the problem's HTML tree
+        '''
+        self._inputs = {}
+        self._extracted_tree = self._extract_html(self.tree)
 
     def do_reset(self):
         '''
@@ -385,7 +487,13 @@ class LoncapaProblem(object):
         '''
         Main method called externally to get the HTML to be rendered for this capa Problem.
         '''
-        html = contextualize_text(etree.tostring(self._extract_html(self.tree)), self.context)
+        if self._inputs is None:
+            # Nothing has been rendered yet: render the tree along with creating the InputTypes
+            self._extract_tree()
+            tree = self._extracted_tree
+        else:
+            tree = self._extract_html(self.tree)
+        html = contextualize_text(etree.tostring(tree), self.context)
         return html
 
     def handle_input_ajax(self, data):
@@ -406,12 +514,55 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
-    def _process_includes(self):
+    def _get_template(self, problem_text):
+        '''
+        Return the ProblemTemplate for problem_text, pre-processing it unless a previous
+        instance of the problem already did.
+        '''
+        if isinstance(problem_text, unicode):
+            digest = hashlib.md5(problem_text.encode('utf-8')).hexdigest()
+        else:
+            digest = hashlib.md5(problem_text).hexdigest()
+        # the ids depend on the problem id, and the includes on the filestore
+        key = (self.problem_id, digest, getattr(self.system.filestore, 'root_path', None))
+
+        with _PROBLEM_TEMPLATES_LOCK:
+            template = _PROBLEM_TEMPLATES.pop(key, None)
+            if template is not None:
+                _PROBLEM_TEMPLATES[key] = template
+        if template is not None and template.is_current(self.system.filestore):
+            return template
+
+        # Convert startouttext and endouttext to proper <text></text>
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+        # parse problem XML file into an element tree
+        tree = etree.XML(problem_text)
+
+        # handle any <include file="foo"> tags
+        includes = self._process_includes(tree)
+
+        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
+        # transformations.
+        responses = self._assign_ids(tree)
+
+        template = ProblemTemplate(problem_text, tree, responses, includes)
+        with _PROBLEM_TEMPLATES_LOCK:
+            _PROBLEM_TEMPLATES[key] = template
+            while len(_PROBLEM_TEMPLATES) > PROBLEM_TEMPLATE_CACHE_SIZE:
+                _PROBLEM_TEMPLATES.popitem(last=False)
+        return template
+
+    def _process_includes(self, tree):
         '''
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
-        into our XML tree.  Fail gracefully if debugging.
+        into the XML tree.  Fail gracefully if debugging.
+
+        Returns the (modified time, size) of each included file, by filename.
         '''
-        includes = self.tree.findall('.//include')
+        included = {}
+        includes = tree.findall('.//include')
         for inc in includes:
             filename = inc.get('file')
             if filename is not None:
@@ -458,6 +609,14 @@ class LoncapaProblem(object):
                 parent.remove(inc)
                 log.debug('Included %s into %s' % (filename, self.problem_id))
 
+                try:
+                    info = self.system.filestore.getinfo(filename)
+                    included[filename] = (info.get('modified_time'), info.get('size'))
+                except Exception:
+                    # can't tell when it changes, so never reuse the template
+                    included[filename] = None
+        return included
+
     def _extract_system_path(self, script):
         """
         Extracts and normalizes additional paths for code execution.
@@ -604,8 +763,8 @@ class LoncapaProblem(object):
 
             input_type_cls = inputtypes.registry.get_class_for_tag(problemtree.tag)
             # save the input type so that we can make ajax calls on it if we need to
-            self.inputs[input_id] = input_type_cls(self.system, problemtree, state)
-            return self.inputs[input_id].get_html()
+            self._inputs[input_id] = input_type_cls(self.system, problemtree, state)
+            return self._inputs[input_id].get_html()
 
         # let each Response render itself
         if problemtree in self.responders:
@@ -639,19 +798,15 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _assign_ids(self, tree):  # private
         '''
-        Assign IDs to all the responses
-        Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
-        In-place transformation
+        Assign IDs to all the responses and their entries (textline, schematic, etc.)
+        In-place transformation.
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Returns a list of (response, inputfields) for each response.
         '''
         response_id = 1
-        self.responders = {}
+        responses = []
         for response in tree.xpath('//' + "|//".join(response_tag_dict)):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
@@ -672,6 +827,32 @@ class LoncapaProblem(object):
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
                 answer_id = answer_id + 1
 
+            responses.append((response, inputfields))
+
+        return responses
+
+    def _assign_solution_ids(self, tree):  # private
+        '''
+        Assign IDs to the solutions. Done after creating the responders, which see the
+        IDs the solutions got as entries of their responses.
+        '''
+        # <solution>...</solution> may not be associated with any specific response; give
+        # IDs for those separately
+        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
+        solution_id = 1
+        for solution in tree.findall('.//solution'):
+            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
+            solution_id += 1
+
+    def _create_responders(self, responses):  # private
+        '''
+        Create capa Response instances for each (response, inputfields) of responses and
+        save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        '''
+        self.responders = {}
+        for response, inputfields in responses:
             # instantiate capa Response
             responder = response_tag_dict[response.tag](response, inputfields,
                                                         self.context, self.system)
@@ -688,11 +869,3 @@ class LoncapaProblem(object):
                 log.debug('responder %s failed to properly return get_answers()',
                           self.responders[response])  # FIXME
                 raise
-
-        # <solution>...</solution> may not be associated with any specific response; give
-        # IDs for those separately
-        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
-        solution_id = 1
-        for solution in tree.findall('.//solution'):
-            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
-            solution_id += 1
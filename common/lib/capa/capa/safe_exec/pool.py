@@ -0,0 +1,310 @@
+"""
+A pool of warm sandbox workers for safe_exec.
+
+Executing code through codejail starts a new sandboxed Python for every
+execution, which then imports numpy, scipy and the rest of ASSUMED_IMPORTS
+from scratch. That start up dominates the cost of checking most problems.
+
+The workers in the pool are long running sandboxed Pythons, started the way
+codejail starts one: as the sandbox user, with an empty environment, in a new
+session and unable to write files. They import the assumed modules once and
+then fork a fresh child for each execution (see sandbox_worker.py). The
+children run under the codejail limits, and nothing one execution does is
+visible to the next.
+
+The pool is per process: workers are started on first use, so processes forked
+after configuration each start their own.
+"""
+import json
+import logging
+import os
+import resource
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import Queue
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+from dogapi import dog_stats_api
+
+from . import sandbox_worker
+
+log = logging.getLogger(__name__)
+
+# How long to wait for a worker beyond the real time limit of the execution,
+# before deciding it's wedged
+WORKER_TIMEOUT_MARGIN = 5
+
+# The modules a worker imports when it starts
+WORKER_IMPORTS = [
+    "numpy",
+    "math",
+    "scipy",
+    "calc",
+    "eia",
+    "chem.chemcalc",
+    "chem.chemtools",
+    "chem.miller",
+    "verifiers.draganddrop",
+]
+
+# The worker is run with `python -c`, so the sandbox needn't be able to read it.
+sandbox_worker_py_file = sandbox_worker.__file__
+if sandbox_worker_py_file.endswith("c"):
+    sandbox_worker_py_file = sandbox_worker_py_file[:-1]
+
+sandbox_worker_py = open(sandbox_worker_py_file).read()
+
+
+class WorkerError(Exception):
+    """A worker failed, rather than the code it was executing"""
+    pass
+
+
+def set_worker_limits():
+    """
+    Set limits on a worker, like codejail's set_process_limits, first thing in
+    the worker process.
+
+    The worker has to fork, and lives through many executions, so the process,
+    CPU and memory limits are set by each child it forks instead.
+    """
+    # A new session, so that the worker and its children can be killed together.
+    os.setsid()
+
+    # No files.
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+
+class SandboxWorker(object):
+    """
+    One long running sandboxed Python, running sandbox_worker.py, started
+    as codejail's jail_code starts a jailed program: with sudo as `user` if
+    there is one, an empty environment but for TMPDIR, and in its own
+    temporary home directory.
+    """
+    def __init__(self, cmdline, user=None, imports=WORKER_IMPORTS):
+        self.homedir = tempfile.mkdtemp(prefix='codejail-')
+        os.chmod(self.homedir, 0775)
+        tmptmp = os.path.join(self.homedir, "tmp")
+        os.mkdir(tmptmp)
+        os.chmod(tmptmp, 0777)
+
+        cmd = []
+        env = {}
+        if user:
+            # sudo doesn't pass the environment on, so TMPDIR goes on its command line
+            cmd.extend(['sudo', '-u', user, 'TMPDIR=tmp'])
+        else:
+            env['TMPDIR'] = 'tmp'
+        cmd.extend(cmdline)
+        cmd.extend(["-c", sandbox_worker_py])
+        cmd.extend(imports)
+
+        with open(os.devnull, 'wb') as devnull:
+            try:
+                self.proc = subprocess.Popen(
+                    cmd, preexec_fn=set_worker_limits, cwd=self.homedir, env=env,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+                    close_fds=True,
+                )
+            except OSError:
+                shutil.rmtree(self.homedir, ignore_errors=True)
+                raise
+
+    def execute(self, code, globals_dict, limits):
+        """
+        Execute `code` with `globals_dict` under `limits` (in the form of
+        codejail's LIMITS), and return the worker's response.
+        """
+        request = json.dumps({'code': code, 'globals': globals_dict, 'limits': limits})
+        timeout = (limits.get('REALTIME') or 0) + WORKER_TIMEOUT_MARGIN
+        timer = None
+        if limits.get('REALTIME'):
+            # The worker enforces the limit itself; this only catches a worker
+            # that stopped responding altogether.
+            timer = threading.Timer(timeout, self.kill)
+            timer.start()
+        try:
+            self.proc.stdin.write(struct.pack('>I', len(request)) + request)
+            self.proc.stdin.flush()
+            header = self.proc.stdout.read(4)
+            if len(header) < 4:
+                raise WorkerError("Worker exited with status {0}".format(self.proc.poll()))
+            length, = struct.unpack('>I', header)
+            return json.loads(self.proc.stdout.read(length))
+        except (IOError, OSError, ValueError, struct.error) as err:
+            raise WorkerError("Worker failed: {0}".format(err))
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def kill(self):
+        """Stop the worker"""
+        try:
+            self.proc.kill()
+        except OSError:
+            pass
+        self.proc.wait()
+        shutil.rmtree(self.homedir, ignore_errors=True)
+
+    @property
+    def alive(self):
+        """Whether the worker is still running"""
+        return self.proc.poll() is None
+
+
+class SandboxPool(object):
+    """
+    Up to `size` SandboxWorkers, started with `cmdline` as `user` as they're
+    needed.
+
+    `cmdline` and `user` default to the command line and the user codejail is
+    configured to run Python with.
+    """
+    def __init__(self, size, cmdline=None, user=None):
+        self.size = size
+        self._cmdline = cmdline
+        self._user = user
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """
+        Forget the workers, which belong to another process if we've forked.
+        The queue holds the idle workers, and None for each worker yet to be
+        started, so it's never empty while there's room in the pool.
+        """
+        self._pid = os.getpid()
+        self._idle = Queue.LifoQueue()
+        for _ in xrange(self.size):
+            self._idle.put(None)
+        self._started = 0
+        self.executions = 0
+        self.failures = 0
+
+    @property
+    def cmdline(self):
+        """The command line workers are started with"""
+        if self._cmdline is not None:
+            return self._cmdline
+        return jail_code.COMMANDS['python']['cmdline_start']
+
+    @property
+    def user(self):
+        """The user workers are run as, or None to run them as this process's user"""
+        if self._cmdline is not None:
+            return self._user
+        return jail_code.COMMANDS['python']['user']
+
+    def _checkout(self):
+        "Get an idle worker, starting one if there's room in the pool"
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+        worker = self._idle.get()
+        if worker is None:
+            try:
+                worker = SandboxWorker(self.cmdline, self.user)
+            except OSError:
+                self._idle.put(None)
+                raise WorkerError("Couldn't start a sandbox worker")
+            with self._lock:
+                self._started += 1
+        return worker
+
+    def _checkin(self, worker):
+        "Return a worker to the pool, making room for a new one if it's died"
+        if worker.alive:
+            self._idle.put(worker)
+        else:
+            with self._lock:
+                self._started -= 1
+            self._idle.put(None)
+
+    def safe_exec(self, code, globals_dict, python_path=None, slug=None):
+        """
+        Execute `code` with `globals_dict` in a worker, like codejail's
+        safe_exec. Only JSON-safe globals are passed in and out.
+
+        Raises SafeExecException if the code raises an exception or exceeds
+        the limits, and WorkerError if the pool couldn't run it at all.
+        """
+        if python_path:
+            raise WorkerError("Pool workers can't extend the Python path")
+
+        start = time.time()
+        worker = self._checkout()
+        checked_out = time.time()
+        dog_stats_api.histogram('capa.safe_exec.pool.wait_time', checked_out - start)
+        try:
+            response = worker.execute(code, json_safe(globals_dict), dict(jail_code.LIMITS))
+        except WorkerError:
+            worker.kill()
+            with self._lock:
+                self.failures += 1
+            log.exception("Sandbox worker failed executing %s", slug)
+            raise
+        finally:
+            self._checkin(worker)
+        dog_stats_api.histogram('capa.safe_exec.pool.exec_time', time.time() - checked_out)
+        with self._lock:
+            self.executions += 1
+
+        if 'error' in response:
+            raise SafeExecException("Couldn't execute jailed code: %s" % response['error'])
+        globals_dict.update(response['globals'])
+
+    def stats(self):
+        """
+        The size of the pool, the workers started, how many executions could
+        start without waiting, and the executions and worker failures seen in
+        this process.
+        """
+        return {
+            'size': self.size,
+            'started': self._started,
+            'available': self._idle.qsize(),
+            'executions': self.executions,
+            'failures': self.failures,
+        }
+
+    def close(self):
+        """Stop the idle workers"""
+        workers = []
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+            except Queue.Empty:
+                break
+        for worker in workers:
+            if worker is not None:
+                worker.kill()
+                with self._lock:
+                    self._started -= 1
+            self._idle.put(None)
+
+
+_POOL = None
+
+
+def configure_pool(size):
+    """
+    Use a pool of `size` warm workers for sandboxed executions, or none if
+    `size` is 0. Takes effect only if codejail is configured to run Python.
+    """
+    global _POOL  # pylint: disable=W0603
+    if _POOL is not None:
+        _POOL.close()
+    _POOL = SandboxPool(size) if size else None
+
+
+def get_pool():
+    """The configured SandboxPool, or None"""
+    if _POOL is None or not jail_code.is_configured("python"):
+        return None
+    return _POOL
@@ -0,0 +1,190 @@
+"""
+A warm sandbox worker, run by the sandboxed Python as `python -c <this source>`.
+
+It imports the modules named on its command line once, then executes each
+request it reads from stdin in a forked child, so every execution starts from
+the same freshly imported state and nothing it does survives it. The child
+closes every file descriptor but the one it writes its result to, so it can't
+see the requests or forge the responses of other executions, and applies the
+codejail limits to itself: no processes, no files, the CPU limit, and the
+memory limit, counting only what it allocates beyond the worker's imports. The
+worker kills it when it runs out of real time.
+
+Requests and responses are JSON objects, each preceded by its length as a
+4 byte big-endian integer. A request has the `code` to run, the `globals` to
+run it with, and the `limits`; the response has either the resulting
+JSON-safe `globals`, or an `error` message.
+"""
+import json
+import os
+import random
+import resource
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+
+def read_message(stream):
+    """Read a message, or return None at the end of the stream"""
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    length, = struct.unpack('>I', header)
+    return json.loads(stream.read(length))
+
+
+def write_message(stream, message):
+    """Write a message"""
+    data = json.dumps(message)
+    stream.write(struct.pack('>I', len(data)) + data)
+    stream.flush()
+
+
+def json_safe(globals_dict):
+    """The entries of globals_dict which survive a round trip through JSON"""
+    ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+    safe = {}
+    for key, value in globals_dict.iteritems():
+        if key == '__builtins__' or not isinstance(value, ok_types):
+            continue
+        try:
+            safe[key] = json.loads(json.dumps(value))
+        except Exception:  # pylint: disable=broad-except
+            continue
+    return safe
+
+
+def current_vmem():
+    """The size in bytes of this process's address space"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[0]) * resource.getpagesize()
+
+
+def close_fds_except(keep_fd):
+    """Close every file descriptor of this process beyond stderr, but keep_fd"""
+    # The hard limit on descriptors can be huge, so close those that are open.
+    for fd in [int(name) for name in os.listdir('/proc/self/fd')]:
+        if fd > 2 and fd != keep_fd:
+            try:
+                os.close(fd)
+            except OSError:
+                # the descriptor listdir used
+                pass
+
+
+def run_child(request, result_fd, workdir):
+    """Execute the request in the forked child, and write the result to result_fd"""
+    try:
+        close_fds_except(result_fd)
+
+        limits = request['limits']
+        # No subprocesses or files.
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+        if limits.get('CPU'):
+            resource.setrlimit(resource.RLIMIT_CPU, (limits['CPU'], limits['CPU']))
+        if limits.get('VMEM'):
+            # The child starts with everything the worker imported, so it may
+            # use VMEM bytes beyond that.
+            vmem = current_vmem() + limits['VMEM']
+            resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+        os.chdir(workdir)
+
+        # Don't let executions share random sequences inherited from the worker
+        random.seed()
+        if 'numpy' in sys.modules:
+            sys.modules['numpy'].random.seed()
+
+        globals_dict = request['globals']
+        exec compile(request['code'], '<jailed code>', 'exec') in globals_dict  # pylint: disable=exec-used
+        result = {'globals': json_safe(globals_dict)}
+    except BaseException:  # pylint: disable=broad-except
+        result = {'error': traceback.format_exc()}
+
+    data = json.dumps(result)
+    while data:
+        written = os.write(result_fd, data)
+        data = data[written:]
+
+
+def execute(request):
+    """Execute the request in a forked child, and return the response"""
+    # tempfile can't find a temporary directory itself: it checks them by
+    # writing a file, which the worker isn't allowed to.
+    workdir = tempfile.mkdtemp(prefix='sandbox-', dir=os.path.abspath(os.environ.get('TMPDIR', '.')))
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            run_child(request, write_fd, workdir)
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+    os.close(write_fd)
+
+    realtime = request['limits'].get('REALTIME')
+    deadline = time.time() + realtime if realtime else None
+    chunks = []
+    timed_out = False
+    while True:
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                timed_out = True
+                break
+        readable, _, _ = select.select([read_fd], [], [], timeout)
+        if not readable:
+            timed_out = True
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+    os.close(read_fd)
+    _, status = os.waitpid(pid, 0)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if timed_out:
+        return {'error': 'Execution exceeded the real time limit of {0} seconds'.format(realtime)}
+    try:
+        return json.loads(''.join(chunks))
+    except ValueError:
+        if os.WIFSIGNALED(status):
+            return {'error': 'Execution was killed by signal {0}'.format(os.WTERMSIG(status))}
+        return {'error': 'Execution ended without a result'}
+
+
+def main(module_names):
+    """Import the modules, then serve requests until stdin closes"""
+    for module_name in module_names:
+        try:
+            __import__(module_name)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    requests = os.fdopen(os.dup(0), 'rb', 0)
+    responses = os.fdopen(os.dup(1), 'wb', 0)
+    # Whatever the executed code prints mustn't get mixed with the responses
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+
+    while True:
+        request = read_message(requests)
+        if request is None:
+            break
+        write_message(responses, execute(request))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,73 @@
+"""
+Benchmark of executing problem code in a new Python process each time (as
+codejail does) and in a warm SandboxPool worker.
+
+Both run this Python, unsandboxed, so the difference is the cost of starting a
+Python and importing the assumed modules, which the sandbox doesn't change.
+
+Run from common/lib/capa with:
+  PYTHONPATH=. python capa/safe_exec/tests/benchmark_pool.py
+"""
+import json
+import subprocess
+import sys
+import timeit
+
+from codejail import jail_code
+
+from capa.safe_exec.pool import SandboxPool
+from capa.safe_exec.safe_exec import CODE_PROLOG, LAZY_IMPORTS
+
+# Without -E, so both find the sandbox packages on this PYTHONPATH
+CMDLINE = [sys.executable, "-B"]
+NUMBER = 20
+REPEAT = 3
+
+# (description, code)
+SNIPPETS = [
+    ("assignment", "a = 17"),
+    ("math", "a = math.sqrt(2) * math.pi"),
+    ("numpy", "a = float(numpy.linalg.det(numpy.array([[1.0, 2.0], [3.0, 4.0]])))"),
+    ("calc", "a = calc.evaluator({'x': 2}, {}, 'x^2 + sin(x)')"),
+]
+
+# Roughly what codejail's jailed code wrapper does with its input.
+COLD_WRAPPER = """\
+import json, sys
+code, g = json.load(sys.stdin)
+exec code in g
+"""
+
+
+def cold_exec(code):
+    """Execute code in a new Python process"""
+    proc = subprocess.Popen(
+        CMDLINE + ["-c", COLD_WRAPPER],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    proc.communicate(json.dumps([code, {}]))
+
+
+def main():
+    """
+    Print the time per execution of each of the snippets
+    """
+    jail_code.LIMITS.update({'CPU': 0, 'REALTIME': 0, 'VMEM': 0})
+    pool = SandboxPool(1, cmdline=CMDLINE)
+    print "{0:<12} {1:>10} {2:>10}".format('code', 'cold', 'pooled')
+    try:
+        for description, snippet in SNIPPETS:
+            code = CODE_PROLOG % 17 + LAZY_IMPORTS + snippet
+            # Start the worker before timing it.
+            pool.safe_exec(code, {})
+            timings = [
+                min(timeit.repeat(lambda: run(code), number=NUMBER, repeat=REPEAT)) / NUMBER * 1000
+                for run in (cold_exec, lambda code: pool.safe_exec(code, {}))
+            ]
+            print "{0:<12} {1:>8.1f}ms {2:>8.1f}ms".format(description, *timings)
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Test pool.py"""
+
+import sys
+import unittest
+from textwrap import dedent
+
+from mock import patch
+
+from capa.safe_exec import safe_exec
+from capa.safe_exec.pool import SandboxPool, WorkerError
+from codejail.safe_exec import SafeExecException
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    The workers run with this Python, unsandboxed, so these tests exercise the
+    pool itself rather than the sandbox.
+    """
+    def setUp(self):
+        self.pool = SandboxPool(2, cmdline=[sys.executable, "-E", "-B"])
+        self.addCleanup(self.pool.close)
+        patcher = patch.dict('codejail.jail_code.LIMITS', {'CPU': 1, 'REALTIME': 5, 'VMEM': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_set_values(self):
+        g = {'a': 17}
+        self.pool.safe_exec("b = a + 1\nc = object()", g)
+        self.assertEqual(g['a'], 17)
+        self.assertEqual(g['b'], 18)
+        # Only JSON-safe values come back.
+        self.assertNotIn('c', g)
+
+    def test_preimported_modules(self):
+        g = {}
+        self.pool.safe_exec("import sys\nhave_math = 'math' in sys.modules", g)
+        self.assertTrue(g['have_math'])
+
+    def test_executions_are_isolated(self):
+        g = {}
+        self.pool.safe_exec("import math\nmath.leftover = 1", g)
+        self.pool.safe_exec("import math\nleftover = hasattr(math, 'leftover')", g)
+        self.assertFalse(g['leftover'])
+        self.assertEqual(self.pool.stats()['started'], 1)
+
+    def test_random_is_reseeded(self):
+        g1, g2 = {}, {}
+        code = "import random\nr = random.random()"
+        self.pool.safe_exec(code, g1)
+        self.pool.safe_exec(code, g2)
+        self.assertNotEqual(g1['r'], g2['r'])
+
+    def test_exception(self):
+        with self.assertRaisesRegexp(SafeExecException, "ValueError"):
+            self.pool.safe_exec("raise ValueError(1)", {})
+        # The worker survives the exception.
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+        self.assertEqual(self.pool.stats()['started'], 1)
+
+    def test_cpu_limit(self):
+        with self.assertRaisesRegexp(SafeExecException, "killed by signal"):
+            self.pool.safe_exec("while True: pass", {})
+
+    def test_realtime_limit(self):
+        with patch.dict('codejail.jail_code.LIMITS', {'REALTIME': 0.5}):
+            with self.assertRaisesRegexp(SafeExecException, "real time limit"):
+                self.pool.safe_exec("import time\ntime.sleep(5)", {})
+
+    def test_vmem_limit(self):
+        # The limit counts memory beyond what the worker has imported.
+        with patch.dict('codejail.jail_code.LIMITS', {'VMEM': 50000000}):
+            g = {}
+            self.pool.safe_exec("import numpy\na = len('x' * 10000000)", g)
+            self.assertEqual(g['a'], 10000000)
+            with self.assertRaisesRegexp(SafeExecException, "MemoryError"):
+                self.pool.safe_exec("a = len('x' * 100000000)", {})
+
+    def test_no_processes_or_files(self):
+        g = {}
+        self.pool.safe_exec(dedent("""\
+            import resource
+            nproc = resource.getrlimit(resource.RLIMIT_NPROC)
+            fsize = resource.getrlimit(resource.RLIMIT_FSIZE)
+            try:
+                with open('written', 'w') as f:
+                    f.write('x')
+                wrote = True
+            except IOError:
+                wrote = False
+            """), g)
+        self.assertEqual(g['nproc'], [0, 0])
+        self.assertEqual(g['fsize'], [0, 0])
+        self.assertFalse(g['wrote'])
+
+    def test_worker_fds_are_closed(self):
+        # Of the worker's pipes, only the one the result is written to is left
+        # open, so the code can't read or answer the worker's requests.
+        g = {}
+        self.pool.safe_exec(dedent("""\
+            import os, stat
+            pipes = []
+            for fd in range(1024):
+                try:
+                    if stat.S_ISFIFO(os.fstat(fd).st_mode):
+                        pipes.append(fd)
+                except OSError:
+                    pass
+            """), g)
+        self.assertEqual(len(g['pipes']), 1)
+
+    def test_empty_environment(self):
+        g = {}
+        self.pool.safe_exec("import os\nenv = dict(os.environ)", g)
+        self.assertEqual(g['env'], {'TMPDIR': 'tmp'})
+
+    def test_printing(self):
+        g = {}
+        self.pool.safe_exec("print 'hello'\na = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_dead_worker_is_replaced(self):
+        self.pool.safe_exec("a = 1", {})
+        worker = self.pool._idle.get()  # pylint: disable=protected-access
+        worker.kill()
+        self.pool._checkin(worker)  # pylint: disable=protected-access
+        g = {}
+        self.pool.safe_exec("a = 2", g)
+        self.assertEqual(g['a'], 2)
+        self.assertEqual(self.pool.stats()['started'], 1)
+
+    def test_python_path(self):
+        with self.assertRaises(WorkerError):
+            self.pool.safe_exec("a = 1", {}, python_path=["/tmp"])
+
+
+# The safe_exec function shadows its module in the package.
+SAFE_EXEC_MODULE = sys.modules['capa.safe_exec.safe_exec']
+
+
+class TestSafeExecWithPool(unittest.TestCase):
+    """safe_exec uses the pool when there is one"""
+    def setUp(self):
+        self.pool = SandboxPool(1, cmdline=[sys.executable, "-E", "-B"])
+        self.addCleanup(self.pool.close)
+        patcher = patch.object(SAFE_EXEC_MODULE, 'get_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pooled_execution(self):
+        g = {}
+        safe_exec("a = 1/2\nb = int(math.pi)", g)
+        self.assertEqual(g['a'], 0.5)
+        self.assertEqual(g['b'], 3)
+        self.assertEqual(self.pool.stats()['executions'], 1)
+
+    def test_random_seeding(self):
+        g1, g2 = {}, {}
+        code = "rnums = [random.randint(0, 999) for _ in xrange(10)]"
+        safe_exec(code, g1, random_seed=17)
+        safe_exec(code, g2, random_seed=17)
+        self.assertEqual(g1['rnums'], g2['rnums'])
+
+    def test_unsafely_bypasses_pool(self):
+        g = {}
+        safe_exec("a = 1", g, unsafely=True)
+        self.assertEqual(g['a'], 1)
+        self.assertEqual(self.pool.stats()['executions'], 0)
+
+    def test_falls_back_when_worker_fails(self):
+        with patch.object(self.pool, 'safe_exec', side_effect=WorkerError("broken")):
+            with patch.object(SAFE_EXEC_MODULE, 'codejail_safe_exec') as cold_exec:
+                safe_exec("a = 1", {})
+        self.assertTrue(cold_exec.called)
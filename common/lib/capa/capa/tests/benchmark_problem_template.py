@@ -0,0 +1,66 @@
+"""
+Benchmark of instantiating a LoncapaProblem for a problem with 20 customresponse
+inputs, pre-processing the problem XML every time (as before problem
+templates) and reusing the pre-processed problem.
+
+Run from common/lib/capa with:
+  python -m capa.tests.benchmark_problem_template
+"""
+import textwrap
+import timeit
+
+from capa.capa_problem import LoncapaProblem, clear_problem_templates
+from capa.tests import test_system
+
+INPUTS = 20
+NUMBER = 50
+REPEAT = 5
+
+
+def problem_xml(inputs):
+    """
+    Return the XML of a problem with `inputs` customresponses of a textline each
+    """
+    responses = "\n".join(
+        textwrap.dedent("""
+            <p>Enter {0}</p>
+            <customresponse cfn="check" expect="{0}">
+                <textline size="10"/>
+            </customresponse>
+        """).format(index)
+        for index in range(inputs)
+    )
+    return textwrap.dedent("""
+        <problem>
+            <startouttext/>Enter the numbers from 0 to {last}.<endouttext/>
+            <script type="loncapa/python">
+        def check(expect, answer):
+            return expect == answer
+            </script>
+            {responses}
+            <solution><p>Count from 0.</p></solution>
+        </problem>
+    """).format(last=inputs - 1, responses=responses)
+
+
+def main():
+    """
+    Print the time per instantiation with and without the problem templates
+    """
+    system = test_system()
+    xml = problem_xml(INPUTS)
+
+    def instantiate():
+        LoncapaProblem(xml, id='benchmark', seed=1, system=system)
+
+    def instantiate_uncached():
+        clear_problem_templates()
+        instantiate()
+
+    for label, function in (('pre-processing every time', instantiate_uncached), ('problem template', instantiate)):
+        timing = min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) / NUMBER
+        print "{0:<30} {1:>8.2f}ms".format(label, timing * 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ import textwrap
 import mock
 
 from .response_xml_factory import StringResponseXMLFactory, CustomResponseXMLFactory
+from capa.capa_problem import LoncapaProblem
 from . import test_system, new_loncapa_problem
 
 
@@ -252,6 +253,43 @@ class CapaHtmlRenderTest(unittest.TestCase):
         the_html = problem.get_html()
         self.assertRegexpMatches(the_html, r"<div>\s+</div>")
 
+    def test_lazy_extraction_for_grading(self):
+        # Generate some XML for a string response
+        xml_str = StringResponseXMLFactory().build_xml(answer='Test answer')
+
+        # Create the problem without rendering it, then grade it
+        the_system = test_system()
+        the_system.render_template = mock.Mock(return_value="<div>Input Template Render</div>")
+        problem = LoncapaProblem(xml_str, id='1', seed=723, system=the_system, extract_tree=False)
+        problem.grade_answers({'1_2_1': 'Test answer'})
+        self.assertEqual(problem.get_score()['score'], 1)
+
+        # Expect that no template was rendered, but the input has its state
+        self.assertFalse(the_system.render_template.called)
+        self.assertEqual(problem.input_state, {'1_2_1': {}})
+
+        # Expect that the inputs are created when first needed
+        self.assertEqual(problem.inputs.keys(), ['1_2_1'])
+        self.assertTrue(the_system.render_template.called)
+
+    def test_lazy_extraction_renders_once(self):
+        xml_str = StringResponseXMLFactory().build_xml(answer='Test answer')
+
+        the_system = test_system()
+        the_system.render_template = mock.Mock(return_value="<div>Input Template Render</div>")
+        eager_problem = LoncapaProblem(xml_str, id='1', seed=723, system=the_system)
+        eager_html = eager_problem.get_html()
+        eager_count = the_system.render_template.call_count
+
+        the_system.render_template.reset_mock()
+        lazy_problem = LoncapaProblem(xml_str, id='1', seed=723, system=the_system, extract_tree=False)
+        self.assertEqual(lazy_problem.get_html(), eager_html)
+
+        # Expect that the lazy problem rendered its templates only once
+        self.assertEqual(the_system.render_template.call_count * 2, eager_count)
+        self.assertEqual(lazy_problem.inputs.keys(), ['1_2_1'])
+        self.assertEqual(the_system.render_template.call_count * 2, eager_count)
+
     def _create_test_file(self, path, content_str):
         test_fp = self.system.filestore.open(path, "w")
         test_fp.write(content_str)
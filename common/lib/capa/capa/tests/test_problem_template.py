@@ -0,0 +1,84 @@
+"""
+Tests of the pre-processed problems shared by LoncapaProblems
+"""
+import os
+import textwrap
+import unittest
+
+import mock
+from lxml import etree
+
+from capa.capa_problem import ProblemTemplate, clear_problem_templates
+from . import test_system, new_loncapa_problem
+
+
+class ProblemTemplateTest(unittest.TestCase):
+
+    xml_str = textwrap.dedent("""
+        <problem>
+            <startouttext/>Test text<endouttext/>
+            <stringresponse answer="first">
+                <textline size="20"/>
+            </stringresponse>
+            <stringresponse answer="second">
+                <textline size="20"/>
+            </stringresponse>
+            <solution><p>The first and the second</p></solution>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ProblemTemplateTest, self).setUp()
+        clear_problem_templates()
+        self.addCleanup(clear_problem_templates)
+        self.system = test_system()
+
+    def test_parsed_once(self):
+        with mock.patch('capa.capa_problem.ProblemTemplate', wraps=ProblemTemplate) as mock_template:
+            first = new_loncapa_problem(self.xml_str, system=self.system)
+            second = new_loncapa_problem(self.xml_str, system=self.system)
+        self.assertEqual(mock_template.call_count, 1)
+
+        # Each problem has its own copy of the tree, and responders on it
+        self.assertIsNot(first.tree, second.tree)
+        self.assertEqual(etree.tostring(first.tree), etree.tostring(second.tree))
+        for problem in (first, second):
+            for response in problem.responders:
+                self.assertIs(response.getroottree().getroot(), problem.tree)
+
+    def test_same_as_uncached(self):
+        first = new_loncapa_problem(self.xml_str, system=self.system)
+        second = new_loncapa_problem(self.xml_str, system=self.system)
+
+        for problem in (first, second):
+            self.assertEqual(
+                sorted(responder.answer_ids for responder in problem.responders.values()),
+                [['1_2_1'], ['1_3_1']]
+            )
+            self.assertEqual(problem.tree.find('.//solution').get('id'), '1_solution_1')
+            self.assertEqual(problem.tree.find('text').text, 'Test text')
+
+    def test_copies_are_independent(self):
+        first = new_loncapa_problem(self.xml_str, system=self.system)
+        first.tree.find('.//textline').set('size', '40')
+        second = new_loncapa_problem(self.xml_str, system=self.system)
+        self.assertEqual(second.tree.find('.//textline').get('size'), '20')
+
+    def test_include_changed(self):
+        path = os.path.join(self.system.filestore.root_path, 'test_template_include.xml')
+        self.addCleanup(os.remove, path)
+        xml_str = textwrap.dedent("""
+            <problem>
+                <include file="test_template_include.xml"/>
+            </problem>
+        """)
+
+        with open(path, 'w') as include_file:
+            include_file.write('<test>First include</test>')
+        problem = new_loncapa_problem(xml_str, system=self.system)
+        self.assertEqual(problem.tree.find('test').text, 'First include')
+
+        with open(path, 'w') as include_file:
+            include_file.write('<test>Second, longer include</test>')
+        problem = new_loncapa_problem(xml_str, system=self.system)
+        self.assertEqual(problem.tree.find('test').text, 'Second, longer include')
@@ -272,6 +272,9 @@ class CapaModule(CapaFields, XModule):
             state=state,
             seed=self.seed,
             system=self.system,
+            # Most modules are only created to be graded; the html is rendered when
+            # it's first needed
+            extract_tree=False,
         )
 
     def get_state_for_lcp(self):
@@ -40,6 +40,12 @@ class CrowdsourceHinterFields(object):
     mod_queue = Dict(help='A dictionary containing hints still awaiting approval', scope=Scope.content,
                      default={})
     hint_pk = Integer(help='Used to index hints.', scope=Scope.content, default=0)
+    # Usage: hint_votes[str(pk)] = #votes
+    # The votes students gave each hint, on top of the #votes stored in hints.
+    # Kept by the system's user_state_summary_counters, so that students voting
+    # at the same time don't overwrite each other's votes.
+    hint_votes = Dict(help='The votes for each hint, since it was added.', scope=Scope.user_state_summary,
+                      default={})
 
     # A list of previous hints that a student viewed.
     # Of the form [answer, [hint_pk_1, ...]] for each problem.
@@ -176,6 +182,18 @@ class CrowdsourceHinterModule(CrowdsourceHinterFields, XModule):
             out.update({'op': dispatch})
         return json.dumps({'contents': self.runtime.render_template('hinter_display.html', out)})
 
+    def hints_with_votes(self):
+        """
+        A copy of self.hints, with the votes counted in hint_votes added to
+        the #votes of each hint.
+        """
+        votes = self.system.user_state_summary_counters.totals(self, 'hint_votes')
+        hints = copy.deepcopy(self.hints)
+        for answer_hints in hints.itervalues():
+            for pk, hint in answer_hints.iteritems():
+                hint[1] += votes.get(pk, 0)
+        return hints
+
     def get_hint(self, data):
         """
         The student got the incorrect answer found in data.  Give him a hint.
@@ -206,9 +224,10 @@ class CrowdsourceHinterModule(CrowdsourceHinterFields, XModule):
         # For all answers similar enough to our own, accumulate all hints together.
         # Also track the original answer of each hint.
         matching_answers = self.get_matching_answers(answer)
+        all_hints = self.hints_with_votes() if matching_answers else {}
         matching_hints = {}
         for matching_answer in matching_answers:
-            temp_dict = copy.deepcopy(self.hints[matching_answer])
+            temp_dict = all_hints[matching_answer]
             for key, value in temp_dict.items():
                 # Each value now has hint, votes, matching_answer.
                 temp_dict[key] = value + [matching_answer]
@@ -306,15 +325,12 @@ class CrowdsourceHinterModule(CrowdsourceHinterFields, XModule):
             log.exception('Failure in hinter tally_vote: Unable to parse answer: {ans}'.format(ans=ans))
             return {'error': 'Failure in voting!'}
         hint_pk = str(data['hint'])
-        # We use temp_dict because we need to do a direct write for the database to update.
-        temp_dict = self.hints
-        try:
-            temp_dict[ans][hint_pk][1] += 1
-        except KeyError:
+        if hint_pk not in self.hints.get(ans, {}):
             log.exception('''Failure in hinter tally_vote: User voted for non-existant hint:
                              Answer={ans} pk={hint_pk}'''.format(ans=ans, hint_pk=hint_pk))
             return {'error': 'Failure in voting!'}
-        self.hints = temp_dict
+        self.system.user_state_summary_counters.increment(self, 'hint_votes', hint_pk)
+        temp_dict = self.hints_with_votes()
         # Don't let the user vote again!
         self.user_voted = True
 
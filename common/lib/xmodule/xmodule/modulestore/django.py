@@ -8,10 +8,12 @@ from __future__ import absolute_import
 from importlib import import_module
 
 import re
+from uuid import uuid4
 
 from django.conf import settings
 from django.core.cache import get_cache, InvalidCacheBackendError
 from django.dispatch import Signal
+from xmodule.modulestore import XML_MODULESTORE_TYPE
 from xmodule.modulestore.loc_mapper_store import LocMapperStore
 from xmodule.util.django import get_current_request_hostname
 
@@ -24,6 +26,9 @@ except ImportError:
 
 _MODULESTORES = {}
 
+# version stamp of XML courses, which only change when the process restarts
+_XML_COURSE_VERSION = uuid4().hex
+
 FUNCTION_KEYS = ['render_template']
 
 
@@ -38,6 +43,55 @@ def load_function(path):
     return getattr(import_module(module_path), name)
 
 
+def _course_version_cache():
+    """
+    The cache holding course version stamps: the one holding the metadata
+    inheritance trees, which is shared by the LMS and Studio.
+    """
+    try:
+        return get_cache('mongo_metadata_inheritance')
+    except InvalidCacheBackendError:
+        return get_cache('default')
+
+
+def course_version_cache_key(course_id):
+    """Cache key of the version stamp of `course_id`, which is org/course"""
+    return u"course_version/{0}".format(course_id)
+
+
+def course_version(location):
+    """
+    Returns a stamp which changes whenever a modulestore writes to the course
+    of `location`, in this or any other process sharing the cache, so it can
+    be used to key anything derived from the course's contents.
+    """
+    cache = _course_version_cache()
+    key = course_version_cache_key(u"{0.org}/{0.course}".format(location))
+    # if the stamp was never set, or was evicted, anything keyed on the old
+    # one may be stale, so start a new one
+    cache.add(key, uuid4().hex)
+    return cache.get(key)
+
+
+def course_contents_version(course):
+    """
+    Returns a stamp which changes whenever the contents of `course` do, like
+    course_version, but for courses in any kind of modulestore.
+    """
+    if modulestore().get_modulestore_type(course.id) == XML_MODULESTORE_TYPE:
+        return _XML_COURSE_VERSION
+    return course_version(course.location)
+
+
+def bump_course_version(sender, course_id=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver of modulestore_update_signal, which changes the version stamp of
+    the course written to. The signal's course_id is org/course.
+    """
+    if course_id is not None:
+        _course_version_cache().set(course_version_cache_key(course_id), uuid4().hex)
+
+
 def create_modulestore_instance(engine, doc_store_config, options):
     """
     This will return a new instance of a modulestore given an engine and options
@@ -61,10 +115,13 @@ def create_modulestore_instance(engine, doc_store_config, options):
     except InvalidCacheBackendError:
         metadata_inheritance_cache = get_cache('default')
 
+    modulestore_update_signal = Signal(providing_args=['modulestore', 'course_id', 'location'])
+    modulestore_update_signal.connect(bump_course_version)
+
     return class_(
         metadata_inheritance_cache_subsystem=metadata_inheritance_cache,
         request_cache=request_cache,
-        modulestore_update_signal=Signal(providing_args=['modulestore', 'course_id', 'location']),
+        modulestore_update_signal=modulestore_update_signal,
         xblock_mixins=getattr(settings, 'XBLOCK_MIXINS', ()),
         doc_store_config=doc_store_config,
         **_options
@@ -15,12 +15,14 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
+import threading
 
 from bson.son import SON
+from collections import OrderedDict
 from fs.osfs import OSFS
 from itertools import repeat
 from path import path
+from uuid import uuid4
 
 from importlib import import_module
 from xmodule.errortracker import null_error_tracker, exc_info_to_str
@@ -251,6 +253,82 @@ def metadata_cache_key(location):
     return u"{0.org}/{0.course}".format(location)
 
 
+def parent_index_cache_key(location):
+    """Cache key of the child to parent index of the course of `location`"""
+    return u"{0}/parents".format(metadata_cache_key(location))
+
+
+def version_cache_key(key):
+    """Cache key of the version stamp of the entry cached under `key`"""
+    return u"{0}/version".format(key)
+
+
+# categories of the modules which can pass metadata down to children. Only these
+# are fetched when computing the metadata inheritance tree.
+# note this is a bit ugly as when we add new categories of containers, we have to add it here
+INHERITANCE_CONTAINER_CATEGORIES = [
+    'course', 'chapter', 'sequential', 'vertical', 'videosequence',
+    'wrapper', 'problemset', 'conditional', 'randomize'
+]
+
+# number of per course entries (metadata inheritance trees and parent indexes)
+# kept in process memory
+COURSE_CACHE_LRU_SIZE = 128
+
+
+class CourseCacheLRU(object):
+    """
+    A thread safe, in process least-recently-used cache of per course entries
+    (metadata inheritance trees and parent indexes), which sits in front of the
+    metadata_inheritance_cache_subsystem so that a hit doesn't have to unpickle
+    the whole entry.
+
+    Only the newest version of each entry is kept. Entries are only
+    returned for the version stamp asked for, so that a write made in another
+    process (which bumps the version stamp in the shared cache) makes the entry
+    stale here as well.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """
+        Return the entry stored for `key` if it has `version`, else None
+        """
+        with self._lock:
+            cached = self._entries.pop(key, None)
+            if cached is None:
+                return None
+            self._entries[key] = cached
+        cached_version, entry = cached
+        return entry if cached_version == version else None
+
+    def set(self, key, version, entry):
+        """
+        Store `entry` as the `version` for `key`, evicting the least recently
+        used course if the cache is full
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (version, entry)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop all entries
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# shared by all the MongoModuleStore instances of the process, so that a write
+# through the draft store is immediately seen by the direct store and vice versa
+_COURSE_CACHE_LRU = CourseCacheLRU(COURSE_CACHE_LRU_SIZE)
+
+
 class MongoModuleStore(ModuleStoreBase):
     """
     A Mongodb backed ModuleStore
@@ -309,16 +387,19 @@ class MongoModuleStore(ModuleStoreBase):
 
     def compute_metadata_inheritance_tree(self, location):
         '''
+        Returns a dict mapping the url of every child of a container of the course
+        of `location` to the metadata it inherits.
+
         TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
         '''
+        return self._compute_metadata_inheritance_entry(location)['tree']
 
-        # get all collections in the course, this query should not return any leaf nodes
-        # note this is a bit ugly as when we add new categories of containers, we have to add it here
-        query = {'_id.org': location.org,
-                 '_id.course': location.course,
-                 '_id.category': {'$in': ['course', 'chapter', 'sequential', 'vertical', 'videosequence',
-                                          'wrapper', 'problemset', 'conditional', 'randomize']}
-                 }
+    def _query_inheritance_containers(self, query):
+        """
+        Returns a dict mapping the non-draft urls of the containers that match
+        `query` to a dict with the list of their 'children' and the inheritable
+        'metadata' they set themselves.
+        """
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
 
@@ -327,97 +408,231 @@ class MongoModuleStore(ModuleStoreBase):
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
-
-        results_by_url = {}
-        root = None
-
-        # now go through the results and order them by the location url
-        for result in resultset:
-            location = Location(result['_id'])
+        containers = {}
+        for result in self.collection.find(query, record_filter):
             # We need to collate between draft and non-draft
             # i.e. draft verticals will have draft children but will have non-draft parents currently
-            location = location.replace(revision=None)
-            location_url = location.url()
-            if location_url in results_by_url:
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                results_by_url[location_url].setdefault('definition', {})['children'] = total_children
-            results_by_url[location.url()] = result
-            if location.category == 'course':
-                root = location.url()
-
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
+            location_url = Location(result['_id']).replace(revision=None).url()
+            children = result.get('definition', {}).get('children', [])
+            if location_url in containers:
+                existing_children = containers[location_url]['children']
+                children = existing_children + [child for child in children if child not in existing_children]
             # check for presence of metadata key. Note that a given module may not yet be fully formed.
             # example: update_item -> update_children -> update_metadata sequence on new item create
             # if we get called here without update_metadata called first then 'metadata' hasn't been set
-            # as we're not fully transactional at the DB layer. Same comment applies to below key name
-            # check
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata
+            # as we're not fully transactional at the DB layer.
+            containers[location_url] = {
+                'metadata': result.get('metadata', {}),
+                'children': children,
+            }
+        return containers
+
+    def _compute_metadata_inheritance_entry(self, location):
+        """
+        Computes the metadata inheritance tree of the course of `location` from
+        scratch. Returns the entry which is cached: the 'tree' itself, plus the
+        'containers' of the course and the url of its 'root', which are what
+        `_update_metadata_inheritance_entry` needs to patch the tree after a write.
+        """
+        # get all collections in the course, this query should not return any leaf nodes
+        query = {
+            '_id.org': location.org,
+            '_id.course': location.course,
+            '_id.category': {'$in': INHERITANCE_CONTAINER_CATEGORIES},
+        }
+        containers = self._query_inheritance_containers(query)
+        root = None
+        for location_url in containers:
+            if Location(location_url).category == 'course':
+                root = location_url
 
+        tree = {}
         if root is not None:
-            _compute_inherited_metadata(root)
+            self._inherit_metadata_down(containers, tree, root, containers[root]['metadata'])
+
+        return {'root': root, 'containers': containers, 'tree': tree}
+
+    def _inherit_metadata_down(self, containers, tree, url, metadata):
+        """
+        Records in `tree` the metadata inherited by all the descendants of the
+        container `url`, given the `metadata` that container ends up with.
+
+        The dicts are shared rather than copied: children which don't set any
+        inheritable metadata of their own get their parent's dict, and a child
+        that does gets a shallow copy of it. Nothing mutates these dicts once
+        they are in the tree.
+        """
+        # go through all the children and recurse, but only if we have
+        # them in the containers. Remember containers don't include leaf nodes
+        for child in containers[url]['children']:
+            if child in containers:
+                child_metadata = self._child_metadata(containers, child, metadata)
+                tree[child] = child_metadata
+                self._inherit_metadata_down(containers, tree, child, child_metadata)
+            else:
+                # this is likely a leaf node, so let's record what metadata we need to inherit
+                tree[child] = metadata
+
+    def _child_metadata(self, containers, child, parent_metadata):
+        """
+        Returns the metadata the container `child` ends up with, given its
+        parent's
+        """
+        own_metadata = containers[child]['metadata']
+        if not own_metadata:
+            return parent_metadata
+        child_metadata = parent_metadata.copy()
+        child_metadata.update(own_metadata)
+        return child_metadata
+
+    def _update_metadata_inheritance_entry(self, entry, location):
+        """
+        Returns a copy of the cached `entry` patched after a write to the
+        container at `location`, recomputing only the subtree below it. Returns
+        None if the change can't be applied incrementally.
+        """
+        location_url = location.replace(revision=None).url()
+        root = entry['root']
+        if root is None and location.category == 'course':
+            # a new course: there's nothing to patch yet
+            return None
+        containers = dict(entry['containers'])
+        tree = dict(entry['tree'])
+
+        query = location_to_query(location.replace(revision=None))
+        del query['_id.revision']
+        records = self._query_inheritance_containers(query)
+        if location_url in records:
+            containers[location_url] = records[location_url]
+        elif location_url == root:
+            # the course itself is gone
+            return None
+        else:
+            containers.pop(location_url, None)
+
+        if location_url == root:
+            self._inherit_metadata_down(containers, tree, root, containers[root]['metadata'])
+        else:
+            parents = [
+                url for url, container in containers.iteritems()
+                if location_url in container['children'] and (url == root or url in tree)
+            ]
+            if len(parents) > 1:
+                # ambiguous, let the full computation decide
+                return None
+            if parents:
+                parent = parents[0]
+                parent_metadata = containers[root]['metadata'] if parent == root else tree[parent]
+                if location_url in containers:
+                    metadata = self._child_metadata(containers, location_url, parent_metadata)
+                    tree[location_url] = metadata
+                    self._inherit_metadata_down(containers, tree, location_url, metadata)
+                else:
+                    tree[location_url] = parent_metadata
+            # else the container isn't attached to the course (yet), so there's nothing
+            # to pass down: it'll be picked up when its parent's children are updated
+
+        return {'root': root, 'containers': containers, 'tree': tree}
+
+    def _get_course_cache_entry(self, key):
+        """
+        Returns the entry cached under `key`, first looking in the in process LRU,
+        then in the metadata_inheritance_cache_subsystem. Returns None on a miss,
+        or if the entry isn't for the current version stamp.
+        """
+        if self.metadata_inheritance_cache_subsystem is None:
+            return None
+
+        version = self.metadata_inheritance_cache_subsystem.get(version_cache_key(key))
+        if version is None:
+            return None
+
+        lru_key = (self.collection.full_name, key)
+        entry = _COURSE_CACHE_LRU.get(lru_key, version)
+        if entry is None:
+            entry = self.metadata_inheritance_cache_subsystem.get(key)
+            if entry is None or entry.get('version') != version:
+                return None
+            _COURSE_CACHE_LRU.set(lru_key, version, entry)
+        return entry
+
+    def _set_course_cache_entry(self, key, entry):
+        """
+        Stamps `entry` with a new version and writes it out to the caches under
+        `key`. Bumping the version stamp in the caching subsystem is what
+        invalidates the LRU entries of other processes.
+        """
+        entry['version'] = uuid4().hex
+        if self.metadata_inheritance_cache_subsystem is None:
+            return
 
-        return metadata_to_inherit
+        # write the entry before the version stamp, so that anybody who sees the
+        # new stamp finds the entry which goes with it
+        self.metadata_inheritance_cache_subsystem.set(key, entry)
+        self.metadata_inheritance_cache_subsystem.set(version_cache_key(key), entry['version'])
+        _COURSE_CACHE_LRU.set((self.collection.full_name, key), entry['version'], entry)
+
+    def _is_current_course_cache_entry(self, key, entry):
+        """
+        Returns True if `entry` is still the version cached under `key`.
+
+        There's no compare-and-set in the caching subsystem, so checking this right
+        before writing a patched entry only narrows the window in which a
+        concurrent incremental update can be lost.
+        """
+        return self.metadata_inheritance_cache_subsystem.get(version_cache_key(key)) == entry['version']
+
+    def _get_request_cached(self, name, key):
+        """
+        Returns what is in the `name` part of the request_cache under `key`, or
+        None if it isn't there or there's no request_cache
+        """
+        if self.request_cache is None:
+            return None
+        return self.request_cache.data.get(name, {}).get(key)
+
+    def _set_request_cached(self, name, key, value):
+        """
+        Populate the `name` part of the request_cache, if available, with value under key
+        """
+        if self.request_cache is not None:
+            # we can't assume the `name` part of the request cache dict has been
+            # defined
+            if name not in self.request_cache.data:
+                self.request_cache.data[name] = {}
+            self.request_cache.data[name][key] = value
 
     def get_cached_metadata_inheritance_tree(self, location, force_refresh=False):
         '''
         TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
         '''
         key = metadata_cache_key(location)
-        tree = {}
+        entry = None
 
         if not force_refresh:
             # see if we are first in the request cache (if present)
             if self.request_cache is not None and key in self.request_cache.data.get('metadata_inheritance', {}):
                 return self.request_cache.data['metadata_inheritance'][key]
 
-            # then look in any caching subsystem (e.g. memcached)
+            # then look in process memory and any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(key, {})
+                entry = self._get_course_cache_entry(key)
             else:
                 logging.warning('Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is OK in localdev and testing environment. Not OK in production.')
 
-        if not tree:
-            # if not in subsystem, or we are on force refresh, then we have to compute
-            tree = self.compute_metadata_inheritance_tree(location)
+        if entry is None:
+            # if not in cache, or we are on force refresh, then we have to compute
+            entry = self._compute_metadata_inheritance_entry(location)
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(key, tree)
+            self._set_course_cache_entry(key, entry)
 
         # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
+        # scope of the above if: statement so that after a cache hit, it'll get
         # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][key] = tree
+        self._set_request_cached('metadata_inheritance', key, entry['tree'])
 
-        return tree
+        return entry['tree']
 
     def refresh_cached_metadata_inheritance_tree(self, location):
         """
@@ -427,6 +642,129 @@ class MongoModuleStore(ModuleStoreBase):
         pseudo_course_id = '/'.join([location.org, location.course])
         if pseudo_course_id not in self.ignore_write_events_on_courses:
             self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
+            # the parent index goes stale in the same circumstances (e.g. after an
+            # import which ignored write events), so have it rebuilt on next use
+            self._invalidate_parent_index(location)
+
+    def update_cached_metadata_inheritance_tree(self, location):
+        """
+        Bring the cached metadata inheritance tree up to date after a write to the
+        item at location.
+
+        Unlike refresh_cached_metadata_inheritance_tree, this doesn't recompute the
+        whole tree: writes to leaves don't change it, and writes to containers only
+        recompute the subtree below them. It falls back to a full refresh if there
+        is no cached tree, or if another process wrote to the course meanwhile.
+        """
+        location = Location(location)
+        pseudo_course_id = '/'.join([location.org, location.course])
+        if pseudo_course_id in self.ignore_write_events_on_courses:
+            return
+
+        if location.category not in INHERITANCE_CONTAINER_CATEGORIES:
+            # leaves don't pass anything down, and they only appear in the tree once
+            # they are added to their parent's children, which is a write to the parent
+            return
+
+        key = metadata_cache_key(location)
+        entry = self._get_course_cache_entry(key)
+        if entry is not None:
+            updated_entry = self._update_metadata_inheritance_entry(entry, location)
+            if updated_entry is not None and self._is_current_course_cache_entry(key, entry):
+                self._set_course_cache_entry(key, updated_entry)
+                self._set_request_cached('metadata_inheritance', key, updated_entry['tree'])
+                return
+
+        self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
+
+    def _compute_parent_index(self, location):
+        """
+        Computes the child to parent index of the course of `location`: 'parents'
+        maps child urls to the locations (as tuples, revision included) of the
+        items which list them as children, and 'children' is the reverse mapping,
+        used to patch the index when an item's children change.
+        """
+        # unlike the metadata inheritance tree, this can't be restricted to the
+        # container categories: anything with children can be a parent
+        query = {
+            '_id.tag': location.tag,
+            '_id.org': location.org,
+            '_id.course': location.course,
+            'definition.children.0': {'$exists': True},
+        }
+        parents = {}
+        children_by_parent = {}
+        for result in self.collection.find(query, {'_id': 1, 'definition.children': 1}):
+            parent = tuple(Location(result['_id']))
+            children_by_parent[parent] = result['definition']['children']
+            for child in children_by_parent[parent]:
+                if parent not in parents.setdefault(child, []):
+                    parents[child].append(parent)
+        return {'parents': parents, 'children': children_by_parent}
+
+    def _get_parent_index(self, location):
+        """
+        Returns the child to parent index of the course of `location`, from the
+        request_cache, the in process LRU or the caching subsystem if possible
+        """
+        key = parent_index_cache_key(location)
+        entry = self._get_request_cached('parent_index', key)
+        if entry is None:
+            entry = self._get_course_cache_entry(key)
+            if entry is None:
+                entry = self._compute_parent_index(location)
+                self._set_course_cache_entry(key, entry)
+            self._set_request_cached('parent_index', key, entry)
+        return entry
+
+    def _invalidate_parent_index(self, location):
+        """
+        Drop the cached child to parent index of the course of `location`
+        """
+        key = parent_index_cache_key(location)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.delete(version_cache_key(key))
+        if self.request_cache is not None:
+            self.request_cache.data.get('parent_index', {}).pop(key, None)
+
+    def update_cached_parent_index(self, location, children):
+        """
+        Bring the cached child to parent index up to date after the children of
+        the item at `location` were set to `children` (which is empty when the item
+        was deleted).
+        """
+        location = Location(location)
+        pseudo_course_id = '/'.join([location.org, location.course])
+        if pseudo_course_id in self.ignore_write_events_on_courses:
+            return
+
+        key = parent_index_cache_key(location)
+        entry = self._get_course_cache_entry(key)
+        if entry is None:
+            # nothing to patch, the index will be built on next use
+            return
+
+        parent = tuple(location)
+        parents = dict(entry['parents'])
+        children_by_parent = dict(entry['children'])
+        for child in children_by_parent.pop(parent, []):
+            remaining = [other for other in parents.get(child, []) if other != parent]
+            if remaining:
+                parents[child] = remaining
+            else:
+                parents.pop(child, None)
+        if children:
+            children_by_parent[parent] = list(children)
+            for child in children:
+                if parent not in parents.get(child, []):
+                    parents[child] = parents.get(child, []) + [parent]
+
+        if self._is_current_course_cache_entry(key, entry):
+            updated_entry = {'parents': parents, 'children': children_by_parent}
+            self._set_course_cache_entry(key, updated_entry)
+            self._set_request_cached('parent_index', key, updated_entry)
+        else:
+            self._invalidate_parent_index(location)
 
     def _clean_item_data(self, item):
         """
@@ -661,8 +999,14 @@ class MongoModuleStore(ModuleStoreBase):
                     'children': xmodule.children if xmodule.has_children else []
                 }
             })
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(xmodule.location)
+        if xmodule.location.category == 'course':
+            # most likely a new course: start the caches afresh rather than patching
+            # whatever might be left over from a course which had the same location
+            self.refresh_cached_metadata_inheritance_tree(xmodule.location)
+        else:
+            # update the metadata inheritance tree and parent index which are cached
+            self.update_cached_metadata_inheritance_tree(xmodule.location)
+            self.update_cached_parent_index(xmodule.location, xmodule.children if xmodule.has_children else [])
         self.fire_updated_modulestore_signal(get_course_id_no_run(xmodule.location), xmodule.location)
 
     def create_and_save_xmodule(self, location, definition_data=None, metadata=None, system=None):
@@ -779,8 +1123,9 @@ class MongoModuleStore(ModuleStoreBase):
         """
 
         self._update_single_item(location, {'definition.children': children})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree and parent index which are cached
+        self.update_cached_metadata_inheritance_tree(Location(location))
+        self.update_cached_parent_index(location, children)
         # fire signal that we've written to DB
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
@@ -809,8 +1154,8 @@ class MongoModuleStore(ModuleStoreBase):
             self.update_metadata(course.location, own_metadata(course))
 
         self._update_single_item(location, {'metadata': metadata})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(loc)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(loc)
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
     def delete_item(self, location, delete_all_versions=False):
@@ -835,15 +1180,29 @@ class MongoModuleStore(ModuleStoreBase):
         # Must include this to avoid the django debug toolbar (which defines the deprecated "safe=False")
         # from overriding our default value set in the init method.
         self.collection.remove({'_id': Location(location).dict()}, safe=self.collection.safe)
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree and parent index which are cached
+        self.update_cached_metadata_inheritance_tree(Location(location))
+        self.update_cached_parent_index(location, [])
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
     def get_parent_locations(self, location, course_id):
         '''Find all locations that are the parents of this location in this
         course.  Needed for path_to_location().
+
+        Looked up in a cached child to parent index of the course, if there's a
+        metadata_inheritance_cache_subsystem to keep it in.
         '''
         location = Location.ensure_fully_specified(location)
+        if self.metadata_inheritance_cache_subsystem is None:
+            return self._find_parent_locations(location)
+
+        parents = self._get_parent_index(location)['parents'].get(location.url(), [])
+        return [Location(parent).dict() for parent in parents]
+
+    def _find_parent_locations(self, location):
+        '''
+        Query for the locations which list location as a child
+        '''
         items = self.collection.find({'definition.children': location.url()},
                                      {'_id': True})
         return [i['_id'] for i in items]
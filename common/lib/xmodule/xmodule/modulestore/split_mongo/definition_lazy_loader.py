@@ -8,19 +8,67 @@ class DefinitionLazyLoader(object):
     object doesn't force access during init but waits until client wants the
     definition. Only works if the modulestore is a split mongo store.
     """
-    def __init__(self, modulestore, definition_id):
+    def __init__(self, modulestore, definition_id, batch=None):
         """
         Simple placeholder for yet-to-be-fetched data
         :param modulestore: the pymongo db connection with the definitions
         :param definition_locator: the id of the record in the above to fetch
+        :param batch: the DefinitionBatch this loader belongs to, if any
         """
         self.modulestore = modulestore
         self.definition_locator = DefinitionLocator(definition_id)
+        self.batch = batch
+        if batch is not None:
+            batch.add(definition_id)
 
     def fetch(self):
         """
         Fetch the definition. Note, the caller should replace this lazy
         loader pointer with the result so as not to fetch more than once
         """
-        return self.modulestore.definitions.find_one(
-            {'_id': self.definition_locator.definition_id})
+        if self.batch is not None:
+            return self.batch.fetch(self.definition_locator.definition_id)
+        return self.modulestore.fetch_definition(self.definition_locator.definition_id)
+
+
+class DefinitionBatch(object):
+    """
+    The definitions of the blocks cached together (e.g. a unit and its
+    components). The first fetch of any of them fetches up to `window` of the
+    definitions which haven't been fetched yet, in one query, instead of one
+    query per block as its fields get touched.
+    """
+    def __init__(self, modulestore, window):
+        """
+        :param modulestore: the split mongo store with the definitions
+        :param window: the maximum number of definitions fetched at once
+        """
+        self.modulestore = modulestore
+        self.window = window
+        self._unfetched = []
+        self._definitions = {}
+
+    def add(self, definition_id):
+        """
+        Add a definition to the batch
+        """
+        self._unfetched.append(definition_id)
+
+    def fetch(self, definition_id):
+        """
+        Returns the definition, or None if it doesn't exist. Fetches the
+        definition along with the next unfetched ones of the batch, unless a
+        previous fetch already got it.
+        """
+        if definition_id not in self._definitions:
+            definition_ids = [definition_id]
+            for other_id in self._unfetched:
+                if len(definition_ids) >= self.window:
+                    break
+                if other_id not in definition_ids:
+                    definition_ids.append(other_id)
+            self._definitions.update(self.modulestore.fetch_definitions(definition_ids))
+            fetched = set(definition_ids)
+            self._unfetched = [other_id for other_id in self._unfetched if other_id not in fetched]
+        # the loader is replaced by what it fetched; so, don't hold on to it
+        return self._definitions.pop(definition_id, None)
@@ -0,0 +1,102 @@
+"""
+A process wide cache of split mongo structure and definition documents.
+
+Both are immutable once written (changing either creates a new one with a new
+_id), so they can be shared by every thread and every SplitMongoModuleStore of
+the process, keyed on their collection and _id. The documents are kept BSON
+encoded: every hit decodes a private copy which the caller can freely modify
+(CachingDescriptorSystems and the update methods do), and the size of the cache
+can be bounded in bytes.
+"""
+import threading
+from collections import OrderedDict
+
+from bson import BSON
+
+# maximum number of bytes of BSON encoded documents kept in the process
+DOCUMENT_CACHE_SIZE = 64 * 1024 * 1024
+
+
+class DocumentCache(object):
+    """
+    A thread safe, byte bounded, least-recently-used cache of BSON documents,
+    counting its hits, misses and evictions
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._documents = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, tz_aware=True):
+        """
+        Return a copy of the document cached under key, or None
+        """
+        with self._lock:
+            raw = self._documents.pop(key, None)
+            if raw is None:
+                self.misses += 1
+                return None
+            self._documents[key] = raw
+            self.hits += 1
+        return BSON(raw).decode(tz_aware=tz_aware)
+
+    def set(self, key, document):
+        """
+        Cache a copy of document under key, evicting the least recently used
+        documents to stay within max_bytes
+        """
+        raw = BSON.encode(document)
+        if len(raw) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._documents[key] = raw
+            self._size += len(raw)
+            while self._size > self.max_bytes:
+                _, evicted = self._documents.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Drop the document cached under key, if any. Only needed when a document
+        is overwritten in place, which breaks the immutability assumption.
+        """
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        "Remove key from the cache; the caller must hold the lock"
+        raw = self._documents.pop(key, None)
+        if raw is not None:
+            self._size -= len(raw)
+
+    def clear(self):
+        """
+        Drop all documents. The counters are left alone.
+        """
+        with self._lock:
+            self._documents.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Returns a dict of the hit, miss and eviction counts, and the number of
+        documents and bytes currently cached
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'documents': len(self._documents),
+                'bytes': self._size,
+            }
+
+
+# shared by all the SplitMongoModuleStores of the process
+document_cache = DocumentCache(DOCUMENT_CACHE_SIZE)
@@ -16,13 +16,21 @@ from xmodule.modulestore.exceptions import InsufficientSpecificationError, Versi
 from xmodule.modulestore import inheritance, ModuleStoreBase, Location
 
 from ..exceptions import ItemNotFoundError
-from .definition_lazy_loader import DefinitionLazyLoader
+from .definition_lazy_loader import DefinitionLazyLoader, DefinitionBatch
 from .caching_descriptor_system import CachingDescriptorSystem
+from .document_cache import document_cache
 from xblock.fields import Scope
 from xblock.runtime import Mixologist
 from bson.objectid import ObjectId
 
 log = logging.getLogger(__name__)
+
+# number of course versions whose CachingDescriptorSystem each thread keeps
+THREAD_COURSE_CACHE_SIZE = 16
+
+# default maximum number of lazily loaded definitions fetched in one query
+DEFINITION_PREFETCH_WINDOW = 100
+
 #==============================================================================
 # Documentation is at
 # https://edx-wiki.atlassian.net/wiki/display/ENG/Mongostore+Data+Structure
@@ -54,13 +62,17 @@ class SplitMongoModuleStore(ModuleStoreBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  loc_mapper=None,
+                 definition_prefetch_window=DEFINITION_PREFETCH_WINDOW,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param definition_prefetch_window: the maximum number of the lazily loaded definitions of blocks
+            cached together to fetch in one query. 1 fetches each one on its own.
         """
 
         super(SplitMongoModuleStore, self).__init__(**kwargs)
         self.loc_mapper = loc_mapper
+        self.definition_prefetch_window = definition_prefetch_window
 
         def do_connection(
             db, collection, host, port=27017, tz_aware=True, user=None, password=None, **kwargs
@@ -81,17 +93,18 @@ class SplitMongoModuleStore(ModuleStoreBase):
             if user is not None and password is not None:
                 self.db.authenticate(user, password)
 
+            self.tz_aware = tz_aware
             self.course_index = self.db[collection + '.active_versions']
             self.structures = self.db[collection + '.structures']
             self.definitions = self.db[collection + '.definitions']
 
         do_connection(**doc_store_config)
 
-        # Code review question: How should I expire entries?
-        # _add_cache could use a lru mechanism to control the cache size?
+        # CachingDescriptorSystems aren't thread safe, so each thread keeps its own for the
+        # THREAD_COURSE_CACHE_SIZE most recently used course versions. The structures and
+        # definitions they are built from are shared by the process wide document_cache.
         self.thread_cache = threading.local()
 
-
         # every app has write access to the db (v having a flag to indicate r/o v write)
         # Force mongo to report errors, at the expense of performance
         # pymongo docs suck but explanation:
@@ -124,7 +137,8 @@ class SplitMongoModuleStore(ModuleStoreBase):
         :param depth: how deep below these to prefetch
         :param lazy: whether to fetch definitions or use placeholders
         '''
-        new_module_data = {}
+        # ordered so that the definitions prefetched together are those of nearby blocks
+        new_module_data = collections.OrderedDict()
         for usage_id in base_usage_ids:
             new_module_data = self.descendants(
                 system.course_entry['structure']['blocks'],
@@ -134,16 +148,16 @@ class SplitMongoModuleStore(ModuleStoreBase):
             )
 
         if lazy:
+            # the first definition fetched fetches those of the other blocks cached here
+            batch = None
+            if self.definition_prefetch_window > 1:
+                batch = DefinitionBatch(self, self.definition_prefetch_window)
             for block in new_module_data.itervalues():
-                block['definition'] = DefinitionLazyLoader(self, block['definition'])
+                block['definition'] = DefinitionLazyLoader(self, block['definition'], batch)
         else:
             # Load all descendants by id
-            descendent_definitions = self.definitions.find({
-                '_id': {'$in': [block['definition']
-                                for block in new_module_data.itervalues()]}})
-            # turn into a map
-            definitions = {definition['_id']: definition
-                           for definition in descendent_definitions}
+            definitions = self.fetch_definitions([block['definition']
+                                                  for block in new_module_data.itervalues()])
 
             for block in new_module_data.itervalues():
                 if block['definition'] in definitions:
@@ -181,30 +195,82 @@ class SplitMongoModuleStore(ModuleStoreBase):
         :param course_version_guid:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        system = self.thread_cache.course_cache
-        return system.get(course_version_guid)
+            self.thread_cache.course_cache = collections.OrderedDict()
+        system = self.thread_cache.course_cache.pop(course_version_guid, None)
+        if system is not None:
+            # move to the most recently used end
+            self.thread_cache.course_cache[course_version_guid] = system
+        return system
 
     def _add_cache(self, course_version_guid, system):
         """
-        Save this cache for subsequent access
+        Save this cache for subsequent access, dropping the least recently used
+        one if the thread already has THREAD_COURSE_CACHE_SIZE of them
         :param course_version_guid:
         :param system:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache = collections.OrderedDict()
         self.thread_cache.course_cache[course_version_guid] = system
+        while len(self.thread_cache.course_cache) > THREAD_COURSE_CACHE_SIZE:
+            self.thread_cache.course_cache.popitem(last=False)
         return system
 
     def _clear_cache(self, course_version_guid=None):
         """
         Should only be used by testing or something which implements transactional boundary semantics.
+        Also drops the structure from the process wide document_cache, as this is called after
+        a structure is overwritten in place.
         :param course_version_guid: if provided, clear only this entry
         """
         if course_version_guid:
-            del self.thread_cache.course_cache[course_version_guid]
+            if hasattr(self.thread_cache, 'course_cache'):
+                self.thread_cache.course_cache.pop(course_version_guid, None)
+            document_cache.delete((self.structures.full_name, course_version_guid))
         else:
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache = collections.OrderedDict()
+            document_cache.clear()
+
+    def _fetch_documents(self, collection, ids):
+        """
+        Returns a dict mapping each of ids which exists in collection to a copy of its
+        document, using the process wide document_cache for structures and definitions
+        (which are immutable) and querying for the rest in one round trip.
+        """
+        documents = {}
+        missing = []
+        for doc_id in ids:
+            if doc_id in documents:
+                continue
+            document = document_cache.get((collection.full_name, doc_id), self.tz_aware)
+            if document is None:
+                missing.append(doc_id)
+            else:
+                documents[doc_id] = document
+        if missing:
+            for document in collection.find({'_id': {'$in': missing}}):
+                document_cache.set((collection.full_name, document['_id']), document)
+                documents[document['_id']] = document
+        return documents
+
+    def _fetch_structure(self, version_guid):
+        """
+        Returns a copy of the structure with the given id, or None
+        """
+        return self._fetch_documents(self.structures, [version_guid]).get(version_guid)
+
+    def fetch_definitions(self, definition_ids):
+        """
+        Returns a dict mapping the ids of the existing definitions among
+        definition_ids to a copy of the definition
+        """
+        return self._fetch_documents(self.definitions, definition_ids)
+
+    def fetch_definition(self, definition_id):
+        """
+        Returns a copy of the definition with the given id, or None
+        """
+        return self.fetch_definitions([definition_id]).get(definition_id)
 
     def _lookup_course(self, course_locator):
         '''
@@ -219,8 +285,8 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         :param course_locator: any subclass of CourseLocator
         '''
-        # NOTE: if and when this uses cache, the update if changed logic will break if the cache
-        # holds the same objects as the descriptors!
+        # NOTE: the structure comes from the document_cache, which hands out a new copy on every
+        # fetch, so that the update if changed logic doesn't see the same objects as the descriptors
         if not course_locator.is_fully_specified():
             raise InsufficientSpecificationError('Not fully specified: %s' % course_locator)
 
@@ -241,7 +307,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         # cast string to ObjectId if necessary
         version_guid = course_locator.as_object_id(version_guid)
-        entry = self.structures.find_one({'_id': version_guid})
+        entry = self._fetch_structure(version_guid)
 
         # b/c more than one course can use same structure, the 'course_id' and 'branch' are not intrinsic to structure
         # and the one assoc'd w/ it by another fetch may not be the one relevant to this fetch; so,
@@ -279,7 +345,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
             version_guids.append(version_guid)
             id_version_map[version_guid] = structure['_id']
 
-        course_entries = self.structures.find({'_id': {'$in': version_guids}})
+        course_entries = self._fetch_documents(self.structures, version_guids).itervalues()
 
         # get the block for the course element (s/b the root)
         result = []
@@ -487,7 +553,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
             'edited_on': when the change was made
         }
         """
-        definition = self.definitions.find_one({'_id': definition_locator.definition_id})
+        definition = self.fetch_definition(definition_locator.definition_id)
         if definition is None:
             return None
         return definition['edit_info']
@@ -0,0 +1,86 @@
+"""
+Tests for batching the fetches of split mongo's lazily loaded definitions
+"""
+import unittest
+
+from bson.objectid import ObjectId
+
+from xmodule.modulestore.split_mongo.definition_lazy_loader import DefinitionLazyLoader, DefinitionBatch
+
+
+class DefinitionSource(object):
+    """
+    Stands in for the split mongo store, recording which definitions each
+    fetch_definitions call asked for
+    """
+    def __init__(self, definition_ids):
+        self.definitions = dict(
+            (definition_id, {'_id': definition_id, 'fields': {'data': str(definition_id)}})
+            for definition_id in definition_ids
+        )
+        self.queries = []
+
+    def fetch_definitions(self, definition_ids):
+        "Return the known definitions among definition_ids"
+        self.queries.append(list(definition_ids))
+        return dict(
+            (definition_id, self.definitions[definition_id])
+            for definition_id in definition_ids if definition_id in self.definitions
+        )
+
+    def fetch_definition(self, definition_id):
+        "Return the definition, if known"
+        return self.fetch_definitions([definition_id]).get(definition_id)
+
+
+class TestDefinitionBatch(unittest.TestCase):
+    """
+    Tests of DefinitionLazyLoaders sharing a DefinitionBatch
+    """
+    def setUp(self):
+        self.definition_ids = [ObjectId() for _ in range(5)]
+        self.store = DefinitionSource(self.definition_ids)
+
+    def make_loaders(self, window):
+        "Make a loader for each definition, sharing a batch with the given window"
+        batch = DefinitionBatch(self.store, window)
+        return [DefinitionLazyLoader(self.store, definition_id, batch) for definition_id in self.definition_ids]
+
+    def test_one_query_for_the_batch(self):
+        loaders = self.make_loaders(100)
+        # fetch in a different order than cached
+        for loader in reversed(loaders):
+            self.assertEqual(
+                self.store.definitions[loader.definition_locator.definition_id],
+                loader.fetch()
+            )
+        self.assertEqual(1, len(self.store.queries))
+        self.assertEqual(set(self.definition_ids), set(self.store.queries[0]))
+        # the fetched definition comes first
+        self.assertEqual(self.definition_ids[-1], self.store.queries[0][0])
+
+    def test_window(self):
+        loaders = self.make_loaders(2)
+        for loader in loaders:
+            self.assertIsNotNone(loader.fetch())
+        self.assertEqual(
+            [self.definition_ids[0:2], self.definition_ids[2:4], self.definition_ids[4:5]],
+            self.store.queries
+        )
+
+    def test_missing_definition(self):
+        missing_id = ObjectId()
+        batch = DefinitionBatch(self.store, 100)
+        loader = DefinitionLazyLoader(self.store, missing_id, batch)
+        self.assertIsNone(loader.fetch())
+
+    def test_shared_definition(self):
+        batch = DefinitionBatch(self.store, 100)
+        loaders = [DefinitionLazyLoader(self.store, self.definition_ids[0], batch) for _ in range(2)]
+        for loader in loaders:
+            self.assertEqual(self.store.definitions[self.definition_ids[0]], loader.fetch())
+
+    def test_without_batch(self):
+        loader = DefinitionLazyLoader(self.store, self.definition_ids[0])
+        self.assertEqual(self.store.definitions[self.definition_ids[0]], loader.fetch())
+        self.assertEqual([[self.definition_ids[0]]], self.store.queries)
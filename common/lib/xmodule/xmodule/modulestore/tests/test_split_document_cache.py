@@ -0,0 +1,89 @@
+"""
+Tests for the process wide cache of split mongo documents
+"""
+import datetime
+import unittest
+
+from bson import BSON
+from bson.objectid import ObjectId
+from pytz import UTC
+
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
+
+
+class TestDocumentCache(unittest.TestCase):
+    """
+    Tests of DocumentCache
+    """
+    def make_document(self, children=()):
+        "Make a structure like document"
+        return {
+            '_id': ObjectId(),
+            'edited_on': datetime.datetime(2013, 10, 1, 12, tzinfo=UTC),
+            'blocks': {'root': {'fields': {'children': list(children)}}},
+        }
+
+    def test_hit_returns_private_copy(self):
+        cache = DocumentCache(1024 * 1024)
+        document = self.make_document(['a'])
+        cache.set(document['_id'], document)
+
+        first = cache.get(document['_id'])
+        self.assertEqual(document, first)
+        first['blocks']['root']['fields']['children'].append('b')
+        self.assertEqual(['a'], cache.get(document['_id'])['blocks']['root']['fields']['children'])
+        self.assertEqual(UTC.utcoffset(None), cache.get(document['_id'])['edited_on'].utcoffset())
+
+    def test_counters(self):
+        cache = DocumentCache(1024 * 1024)
+        document = self.make_document()
+        self.assertIsNone(cache.get(document['_id']))
+        cache.set(document['_id'], document)
+        cache.get(document['_id'])
+        cache.get(document['_id'])
+
+        stats = cache.stats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(0, stats['evictions'])
+        self.assertEqual(1, stats['documents'])
+        self.assertEqual(len(BSON.encode(document)), stats['bytes'])
+
+    def test_evicts_least_recently_used_by_size(self):
+        documents = [self.make_document() for _ in range(3)]
+        size = len(BSON.encode(documents[0]))
+        cache = DocumentCache(size * 2)
+        cache.set(documents[0]['_id'], documents[0])
+        cache.set(documents[1]['_id'], documents[1])
+        # touch the first, so that the second is the least recently used
+        cache.get(documents[0]['_id'])
+        cache.set(documents[2]['_id'], documents[2])
+
+        self.assertIsNotNone(cache.get(documents[0]['_id']))
+        self.assertIsNone(cache.get(documents[1]['_id']))
+        self.assertIsNotNone(cache.get(documents[2]['_id']))
+        self.assertEqual(1, cache.stats()['evictions'])
+        self.assertEqual(size * 2, cache.stats()['bytes'])
+
+    def test_oversized_documents_not_cached(self):
+        document = self.make_document(['child_{0}'.format(index) for index in range(100)])
+        cache = DocumentCache(100)
+        cache.set(document['_id'], document)
+        self.assertIsNone(cache.get(document['_id']))
+        self.assertEqual(0, cache.stats()['bytes'])
+
+    def test_delete_and_clear(self):
+        cache = DocumentCache(1024 * 1024)
+        documents = [self.make_document() for _ in range(2)]
+        for document in documents:
+            cache.set(document['_id'], document)
+
+        cache.delete(documents[0]['_id'])
+        self.assertIsNone(cache.get(documents[0]['_id']))
+        self.assertIsNotNone(cache.get(documents[1]['_id']))
+
+        cache.clear()
+        self.assertIsNone(cache.get(documents[1]['_id']))
+        self.assertEqual({'documents': 0, 'bytes': 0}, {
+            key: value for key, value in cache.stats().items() if key in ('documents', 'bytes')
+        })
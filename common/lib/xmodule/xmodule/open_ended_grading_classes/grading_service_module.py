@@ -9,6 +9,10 @@ from lxml import etree
 
 log = logging.getLogger(__name__)
 
+# Seconds to wait for the grading controller to respond, unless the config
+# gives a 'timeout'
+DEFAULT_TIMEOUT = 30
+
 
 class GradingServiceError(Exception):
     """
@@ -27,6 +31,7 @@ class GradingService(object):
         self.password = config['password']
         self.session = requests.Session()
         self.system = config['system']
+        self.timeout = config.get('timeout', DEFAULT_TIMEOUT)
 
     def _login(self):
         """
@@ -38,7 +43,8 @@ class GradingService(object):
         """
         response = self.session.post(self.login_url,
                                      {'username': self.username,
-                                      'password': self.password, })
+                                      'password': self.password, },
+                                     timeout=self.timeout)
 
         response.raise_for_status()
 
@@ -50,7 +56,8 @@ class GradingService(object):
         """
         try:
             op = lambda: self.session.post(url, data=data,
-                                           allow_redirects=allow_redirects)
+                                           allow_redirects=allow_redirects,
+                                           timeout=self.timeout)
             r = self._try_with_login(op)
         except (RequestException, ConnectionError, HTTPError) as err:
             # reraise as promised GradingServiceError, but preserve stacktrace.
@@ -67,7 +74,8 @@ class GradingService(object):
         """
         op = lambda: self.session.get(url,
                                       allow_redirects=allow_redirects,
-                                      params=params)
+                                      params=params,
+                                      timeout=self.timeout)
         try:
             r = self._try_with_login(op)
         except (RequestException, ConnectionError, HTTPError) as err:
@@ -360,6 +360,19 @@ class CrowdsourceHinterTest(unittest.TestCase):
         self.assertTrue('Best hint' in out['hints'])
         self.assertTrue(len(out['hints']) == 3)
 
+    def test_gethint_countedvotes(self):
+        """
+        Someone asks for a hint, and the votes counted since the hints were
+        added make another hint the top-rated one.
+        """
+        mock_module = CHModuleFactory.create(previous_answers=[])
+        mock_module.hint_votes = {'6': 50}
+        json_in = {'problem_name': '24.0'}
+        out = mock_module.get_hint(json_in)
+        self.assertTrue('A less popular hint' in out['hints'])
+        # The top-rated hint is logged first.
+        self.assertTrue(mock_module.previous_answers[0] == ['24.0', ['6']])
+
     def test_getfeedback_0wronganswers(self):
         """
         Someone has gotten the problem correct on the first try.
@@ -424,8 +437,11 @@ class CrowdsourceHinterTest(unittest.TestCase):
             previous_answers=[['24.0', [0, 3, None]]])
         json_in = {'answer': '24.0', 'hint': 3, 'pk_list': json.dumps([['24.0', 0], ['24.0', 3]])}
         dict_out = mock_module.tally_vote(json_in)
-        self.assertTrue(mock_module.hints['24.0']['0'][1] == 40)
-        self.assertTrue(mock_module.hints['24.0']['3'][1] == 31)
+        # The vote is counted apart from the hints.
+        self.assertTrue(mock_module.hints['24.0']['3'][1] == 30)
+        self.assertTrue(mock_module.hint_votes == {'3': 1})
+        self.assertTrue(mock_module.hints_with_votes()['24.0']['0'][1] == 40)
+        self.assertTrue(mock_module.hints_with_votes()['24.0']['3'][1] == 31)
         self.assertTrue(['Best hint', 40] in dict_out['hint_and_votes'])
         self.assertTrue(['Another hint', 31] in dict_out['hint_and_votes'])
 
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 """Test for Word cloud Xmodule functional logic."""
 
+from mock import Mock
+
 from xmodule.word_cloud_module import WordCloudDescriptor
 from . import PostData, LogicTest
 
@@ -46,3 +48,48 @@ class WordCloudModuleTest(LogicTest):
             100.0,
             sum(i['percent'] for i in response['top_words']))
 
+    def test_similar_words(self):
+        "Make sure that words differing only in accents, or after 255 characters, are counted apart"
+        long_word = 'a' * 300
+        self.xmodule.submitted = False
+        post_data = PostData({'student_words[]': [u'résumé', 'resume', long_word + 'x', long_word + 'y']})
+        response = self.ajax_request('submit', post_data)
+        self.assertEqual(response['status'], 'success')
+        self.assertDictEqual(
+            response['student_words'],
+            {u'résumé': 1, 'resume': 1, long_word + 'x': 1, long_word + 'y': 1}
+        )
+
+    def test_top_words_cached(self):
+        "Make sure that viewing the cloud only counts the student's own words, until the next submission"
+        cache = {}
+        self.system.cache = Mock(get=cache.get, set=lambda key, value, timeout=None: cache.__setitem__(key, value))
+        self.xmodule.all_words = {'cat': 10, 'dog': 5, 'mom': 1, 'dad': 2}
+        self.xmodule.student_words = ['cat']
+        self.xmodule.submitted = True
+        self.system.user_state_summary_counters = Mock(wraps=self.system.user_state_summary_counters)
+        totals = self.system.user_state_summary_counters.totals
+        for _ in xrange(3):
+            response = self.ajax_request('get_state', {})
+            self.assertEqual(response['total_count'], 18)
+            self.assertDictEqual(response['student_words'], {'cat': 10})
+        self.assertEqual(
+            [call[0][2:] for call in totals.call_args_list],
+            [(), (['cat'],), (['cat'],), (['cat'],)]
+        )
+
+        # a submission counts the top words again
+        self.xmodule.submitted = False
+        response = self.ajax_request('submit', PostData({'student_words[]': ['sun']}))
+        self.assertEqual(response['total_count'], 19)
+        self.assertIn('sun', [word['text'] for word in response['top_words']])
+        self.assertEqual(self.ajax_request('get_state', {})['total_count'], 19)
+
+    def test_uncounted_student_word(self):
+        "Make sure that a student word missing from the totals counts as 0"
+        self.xmodule.student_words = ['cat', 'sun']
+        self.xmodule.submitted = True
+        self.system.user_state_summary_counters = Mock()
+        self.system.user_state_summary_counters.totals.return_value = {'cat': 10}
+        response = self.ajax_request('get_state', {})
+        self.assertDictEqual(response['student_words'], {'cat': 10, 'sun': 0})
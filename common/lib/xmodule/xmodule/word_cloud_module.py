@@ -18,6 +18,11 @@ from xblock.fields import Scope, Dict, Boolean, List, Integer, String
 
 log = logging.getLogger(__name__)
 
+# How long the top words of a word cloud are cached for. Each submission
+# recounts them, so this only bounds how long the submissions of students
+# served by other processes take to show.
+TOP_WORDS_CACHE_TIMEOUT = 60
+
 
 def pretty_bool(value):
     """Check value for possible `True` value.
@@ -73,6 +78,7 @@ class WordCloudFields(object):
         help="All possible words from all students.",
         scope=Scope.user_state_summary
     )
+    # No longer written: the top words are worked out from all_words, and cached.
     top_words = Dict(
         help="Top num_top_words words for word cloud.",
         scope=Scope.user_state_summary
@@ -95,7 +101,11 @@ class WordCloudModule(WordCloudFields, XModule):
     def get_state(self):
         """Return success json answer for client."""
         if self.submitted:
-            total_count = sum(self.all_words.itervalues())
+            summary = self.top_words_summary()
+            total_count = summary['total_count']
+            student_counts = self.system.user_state_summary_counters.totals(
+                self, 'all_words', self.student_words
+            )
             return json.dumps({
                 'status': 'success',
                 'submitted': True,
@@ -103,10 +113,10 @@ class WordCloudModule(WordCloudFields, XModule):
                     self.display_student_percents
                 ),
                 'student_words': {
-                    word: self.all_words[word] for word in self.student_words
+                    word: student_counts.get(word, 0) for word in self.student_words
                 },
                 'total_count': total_count,
-                'top_words': self.prepare_words(self.top_words, total_count)
+                'top_words': self.prepare_words(summary['top_words'], total_count)
             })
         else:
             return json.dumps({
@@ -118,6 +128,26 @@ class WordCloudModule(WordCloudFields, XModule):
                 'top_words': {}
             })
 
+    def top_words_summary(self, refresh=False):
+        """Return the top words and the total count of all words.
+
+        Counting all words reads every counter of the word cloud, so the
+        result is kept in the cache for TOP_WORDS_CACHE_TIMEOUT seconds,
+        unless `refresh` is set.
+
+        :rtype: dict with keys top_words and total_count
+        """
+        cache_key = 'word_cloud.top_words.{0}.{1}'.format(self.scope_ids.usage_id, self.num_top_words)
+        summary = None if refresh else self.system.cache.get(cache_key)
+        if summary is None:
+            all_words = self.system.user_state_summary_counters.totals(self, 'all_words')
+            summary = {
+                'top_words': self.top_dict(all_words, self.num_top_words),
+                'total_count': sum(all_words.itervalues()),
+            }
+            self.system.cache.set(cache_key, summary, TOP_WORDS_CACHE_TIMEOUT)
+        return summary
+
     def good_word(self, word):
         """Convert raw word to suitable word."""
         return word.strip().lower()
@@ -198,25 +228,13 @@ class WordCloudModule(WordCloudFields, XModule):
 
             self.student_words = student_words
 
-            # FIXME: fix this, when xblock will support mutable types.
-            # Now we use this hack.
-            # speed issues
-            temp_all_words = self.all_words
-
             self.submitted = True
 
-            # Save in all_words.
+            # Count the words in all_words, without rewriting the words
+            # other students are submitting at the same time.
             for word in self.student_words:
-                temp_all_words[word] = temp_all_words.get(word, 0) + 1
-
-            # Update top_words.
-            self.top_words = self.top_dict(
-                temp_all_words,
-                self.num_top_words
-            )
-
-            # Save all_words in database.
-            self.all_words = temp_all_words
+                self.system.user_state_summary_counters.increment(self, 'all_words', word)
+            self.top_words_summary(refresh=True)
 
             return self.get_state()
         elif dispatch == 'get_state':
@@ -919,7 +919,8 @@ class ModuleSystem(ConfigurableFragmentWrapper, Runtime):  # pylint: disable=abs
             anonymous_student_id='', course_id=None,
             open_ended_grading_interface=None, s3_interface=None,
             cache=None, can_execute_unsafe_code=None, replace_course_urls=None,
-            replace_jump_to_id_urls=None, error_descriptor_class=None, **kwargs):
+            replace_jump_to_id_urls=None, error_descriptor_class=None,
+            user_state_summary_counters=None, **kwargs):
         """
         Create a closure around the system environment.
 
@@ -970,6 +971,13 @@ class ModuleSystem(ConfigurableFragmentWrapper, Runtime):  # pylint: disable=abs
 
         error_descriptor_class - The class to use to render XModules with errors
 
+        user_state_summary_counters - An object keeping counters in Scope.user_state_summary
+            Dict fields, with two methods:
+            .increment(block, field_name, key, amount=1) adds amount to the count of key.
+            .totals(block, field_name, keys=None) returns a dict of the count of each key,
+                or only of those in keys.
+            Defaults to a FieldValueCounters.
+
         """
 
         # Right now, usage_store is unused, and field_data is always supplanted
@@ -1005,6 +1013,7 @@ class ModuleSystem(ConfigurableFragmentWrapper, Runtime):  # pylint: disable=abs
         self.replace_course_urls = replace_course_urls
         self.replace_jump_to_id_urls = replace_jump_to_id_urls
         self.error_descriptor_class = error_descriptor_class
+        self.user_state_summary_counters = user_state_summary_counters or FieldValueCounters()
         self.xmodule_instance = None
 
     def get(self, attr):
@@ -1029,3 +1038,22 @@ class DoNothingCache(object):
 
     def set(self, key, value, timeout=None):
         pass
+
+
+class FieldValueCounters(object):
+    """
+    A user_state_summary_counters for ModuleSystem that keeps the counts in
+    the value of the field itself, reading and writing all of it on each
+    increment. Concurrent increments can overwrite each other, so runtimes
+    serving many students should provide their own.
+    """
+    def increment(self, block, field_name, key, amount=1):
+        counts = dict(getattr(block, field_name) or {})
+        counts[key] = counts.get(key, 0) + amount
+        setattr(block, field_name, counts)
+
+    def totals(self, block, field_name, keys=None):
+        totals = dict(getattr(block, field_name) or {})
+        if keys is not None:
+            totals = dict((key, totals[key]) for key in keys if key in totals)
+        return totals
@@ -13,6 +13,37 @@ PROFILE_FEATURES = ('name', 'language', 'location', 'year_of_birth', 'gender',
                     'level_of_education', 'mailing_address', 'goals')
 AVAILABLE_FEATURES = STUDENT_FEATURES + PROFILE_FEATURES
 
+# Number of students loaded at a time by enrolled_students_batches
+STUDENT_BATCH_SIZE = 1000
+
+
+def enrolled_students_batches(course_id, batch_size=STUDENT_BATCH_SIZE, prefetch_related=()):
+    """
+    Yield the students actively enrolled in `course_id`, with their profiles,
+    in lists of up to `batch_size`, ordered by id.
+
+    Each batch is the first `batch_size` students with an id greater than the
+    last one of the previous batch, so every query is cheap however far into
+    the course it is, and only one batch is held in memory at a time.
+
+    `prefetch_related` is passed on to the query of each batch.
+    """
+    students = User.objects.filter(
+        courseenrollment__course_id=course_id,
+        courseenrollment__is_active=1,
+    ).order_by('id').select_related('profile')
+    if prefetch_related:
+        students = students.prefetch_related(*prefetch_related)
+
+    last_id = 0
+    while True:
+        batch = list(students.filter(id__gt=last_id)[:batch_size])
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1].id
+
 
 def enrolled_students_features(course_id, features):
     """
@@ -30,21 +61,32 @@ def enrolled_students_features(course_id, features):
         courseenrollment__is_active=1,
     ).order_by('username').select_related('profile')
 
-    def extract_student(student, features):
-        """ convert student to dictionary """
-        student_features = [x for x in STUDENT_FEATURES if x in features]
-        profile_features = [x for x in PROFILE_FEATURES if x in features]
-
-        student_dict = dict((feature, getattr(student, feature))
-                            for feature in student_features)
-        profile = student.profile
-        if profile is not None:
-            profile_dict = dict((feature, getattr(profile, feature))
-                                for feature in profile_features)
-            student_dict.update(profile_dict)
-        return student_dict
-
-    return [extract_student(student, features) for student in students]
+    return [_extract_student(student, features) for student in students]
+
+
+def iter_enrolled_students_features(course_id, features):
+    """
+    Like enrolled_students_features, but yields the dictionaries one at a
+    time, in order of user id, loading the students in batches.
+    """
+    for students in enrolled_students_batches(course_id):
+        for student in students:
+            yield _extract_student(student, features)
+
+
+def _extract_student(student, features):
+    """ convert student to dictionary """
+    student_features = [x for x in STUDENT_FEATURES if x in features]
+    profile_features = [x for x in PROFILE_FEATURES if x in features]
+
+    student_dict = dict((feature, getattr(student, feature))
+                        for feature in student_features)
+    profile = student.profile
+    if profile is not None:
+        profile_dict = dict((feature, getattr(profile, feature))
+                            for feature in profile_features)
+        student_dict.update(profile_dict)
+    return student_dict
 
 
 def dump_grading_context(course):
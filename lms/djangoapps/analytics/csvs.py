@@ -7,27 +7,62 @@ Format and create csv responses
 import csv
 from django.http import HttpResponse
 
+# Number of rows written to the response at a time by stream_csv
+CSV_ROWS_PER_CHUNK = 100
 
-def create_csv_response(filename, header, datarows):
+
+class _ChunkBuffer(object):
+    """ File-like object that holds what is written to it until it is taken """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        """ hold data """
+        self.chunks.append(data)
+
+    def take(self):
+        """ return everything written since the last take """
+        data = ''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_csv(header, datarows, rows_per_chunk=CSV_ROWS_PER_CHUNK):
     """
-    Create an HttpResponse with an attached .csv file
+    Generate the contents of a .csv file, `rows_per_chunk` rows at a time.
 
-    header   e.g. ['Name', 'Email']
-    datarows e.g. [['Jim', 'jim@edy.org'], ['Jake', 'jake@edy.org'], ...]
+    `datarows` may be any iterable, including a generator; it is only read as
+    the contents are generated, so rows needn't all be in memory at once.
     """
-    response = HttpResponse(mimetype='text/csv')
-    response['Content-Disposition'] = 'attachment; filename={0}'\
-        .format(filename)
+    csvbuffer = _ChunkBuffer()
     csvwriter = csv.writer(
-        response,
+        csvbuffer,
         dialect='excel',
         quotechar='"',
         quoting=csv.QUOTE_ALL)
 
     csvwriter.writerow(header)
-    for datarow in datarows:
+    for index, datarow in enumerate(datarows, 1):
         encoded_row = [unicode(s).encode('utf-8') for s in datarow]
         csvwriter.writerow(encoded_row)
+        if index % rows_per_chunk == 0:
+            yield csvbuffer.take()
+    yield csvbuffer.take()
+
+
+def create_csv_response(filename, header, datarows):
+    """
+    Create an HttpResponse with an attached .csv file
+
+    header   e.g. ['Name', 'Email']
+    datarows e.g. [['Jim', 'jim@edy.org'], ['Jake', 'jake@edy.org'], ...]
+
+    The response streams the file as it is generated (see stream_csv), so
+    `datarows` can be a generator which does its work as rows are needed.
+    """
+    response = HttpResponse(stream_csv(header, datarows), mimetype='text/csv')
+    response['Content-Disposition'] = 'attachment; filename={0}'\
+        .format(filename)
     return response
 
 
@@ -64,19 +99,31 @@ def format_dictlist(dictlist, features):
     }
     """
 
-    def dict_to_entry(dct):
-        """ Convert dictionary to a list for a csv row """
-        relevant_items = [(k, v) for (k, v) in dct.items() if k in features]
-        ordered = sorted(relevant_items, key=lambda (k, v): header.index(k))
-        vals = [v for (_, v) in ordered]
-        return vals
+    header = features
+    datarows = [_dict_to_entry(dct, header) for dct in dictlist]
 
+    return header, datarows
+
+
+def iter_format_dictlist(dicts, features):
+    """
+    Like format_dictlist, but `dicts` can be any iterable of dictionaries,
+    and the datarows are generated from it as they are read.
+    """
     header = features
-    datarows = map(dict_to_entry, dictlist)
+    datarows = (_dict_to_entry(dct, header) for dct in dicts)
 
     return header, datarows
 
 
+def _dict_to_entry(dct, header):
+    """ Convert dictionary to a list for a csv row """
+    relevant_items = [(k, v) for (k, v) in dct.items() if k in header]
+    ordered = sorted(relevant_items, key=lambda (k, v): header.index(k))
+    vals = [v for (_, v) in ordered]
+    return vals
+
+
 def format_instances(instances, features):
     """
     Convert a list of instances into a header list and datarows list.
@@ -21,6 +21,9 @@ The distribution in a course for gender might look like:
 }
 """
 
+from collections import defaultdict
+
+from django.core.cache import cache
 from django.db.models import Count
 from student.models import CourseEnrollment, UserProfile
 
@@ -36,6 +39,9 @@ DISPLAY_NAMES = {
     'year_of_birth': 'Year Of Birth',
 }
 
+# how long cached distributions are used for, in seconds
+DISTRIBUTION_CACHE_TIMEOUT = 60
+
 
 class ProfileDistribution(object):
     """
@@ -81,7 +87,7 @@ class ProfileDistribution(object):
             validation_assert(isinstance(self.choices_display_names, dict))
 
 
-def profile_distribution(course_id, feature):
+def profile_distribution(course_id, feature, use_cache=False):
     """
     Retrieve distribution of students over a given feature.
     feature is one of AVAILABLE_PROFILE_FEATURES.
@@ -91,80 +97,95 @@ def profile_distribution(course_id, feature):
     NOTE: no_data will appear as a key instead of None/null to adhere to the json spec.
     data types are EASY_CHOICE or OPEN_CHOICE
     """
+    return profile_distributions(course_id, [feature], use_cache=use_cache)[feature]
+
+
+def profile_distributions(course_id, features=AVAILABLE_PROFILE_FEATURES, use_cache=False):
+    """
+    Retrieve the distributions of students over each of `features`, with a
+    single query grouping the enrollments of the course by all of them.
+
+    Returns a dict of feature to ProfileDistribution instance.
+
+    If `use_cache`, the distributions over all AVAILABLE_PROFILE_FEATURES are
+    computed together, and kept in the cache for DISTRIBUTION_CACHE_TIMEOUT
+    seconds, so requests for the other features of the course are free.
+    """
+    for feature in features:
+        if not feature in AVAILABLE_PROFILE_FEATURES:
+            raise ValueError(
+                "unsupported feature requested for distribution '{}'".format(
+                    feature)
+            )
+
+    if not use_cache:
+        return _compute_distributions(course_id, features)
+
+    key = distributions_cache_key(course_id)
+    distributions = cache.get(key)
+    if distributions is None:
+        distributions = _compute_distributions(course_id, AVAILABLE_PROFILE_FEATURES)
+        cache.set(key, distributions, DISTRIBUTION_CACHE_TIMEOUT)
+    return dict((feature, distributions[feature]) for feature in features)
 
-    if not feature in AVAILABLE_PROFILE_FEATURES:
-        raise ValueError(
-            "unsupported feature requested for distribution '{}'".format(
-                feature)
-        )
-
-    prd = ProfileDistribution(feature)
-
-    if feature in _EASY_CHOICE_FEATURES:
-        prd.type = 'EASY_CHOICE'
-
-        if feature == 'gender':
-            raw_choices = UserProfile.GENDER_CHOICES
-        elif feature == 'level_of_education':
-            raw_choices = UserProfile.LEVEL_OF_EDUCATION_CHOICES
-
-        # short name and display name (full) of the choices.
-        choices = [(short, full)
-                   for (short, full) in raw_choices] + [('no_data', 'No Data')]
-
-        def get_filter(feature, value):
-            """ Get the orm filter parameters for a feature. """
-            return {
-                'gender': {'user__profile__gender': value},
-                'level_of_education': {'user__profile__level_of_education': value},
-            }[feature]
-
-        def get_count(feature, value):
-            """ Get the count of enrolled students matching the feature value. """
-            return CourseEnrollment.objects.filter(
-                course_id=course_id,
-                **get_filter(feature, value)
-            ).count()
-
-        distribution = {}
-        for (short, full) in choices:
+
+def distributions_cache_key(course_id):
+    """ Cache key of the profile distributions of a course. """
+    return u"analytics.distributions.{0}".format(course_id).encode('utf-8')
+
+
+def _compute_distributions(course_id, features):
+    """
+    Build the ProfileDistribution of each of `features` from the counts of
+    the enrollments in the course grouped by all of them.
+    """
+    fields = ['user__profile__' + feature for feature in features]
+    # counting ids rather than the grouped fields, which would skip NULLs
+    grouped_counts = CourseEnrollment.objects.filter(
+        course_id=course_id
+    ).values(*fields).annotate(count=Count('id')).order_by()
+    # grouped_counts is of the form [{'user__profile__gender': 'm',
+    #    'user__profile__year_of_birth': 1980, 'count': 4}, ...]
+
+    counts = dict((feature, defaultdict(int)) for feature in features)
+    for group in grouped_counts:
+        for feature, field in zip(features, fields):
+            counts[feature][group[field]] += group['count']
+
+    distributions = {}
+    for feature in features:
+        prd = ProfileDistribution(feature)
+        feature_counts = counts[feature]
+
+        if feature in _EASY_CHOICE_FEATURES:
+            prd.type = 'EASY_CHOICE'
+
+            if feature == 'gender':
+                raw_choices = UserProfile.GENDER_CHOICES
+            elif feature == 'level_of_education':
+                raw_choices = UserProfile.LEVEL_OF_EDUCATION_CHOICES
+
+            # short name and display name (full) of the choices.
+            choices = [(short, full)
+                       for (short, full) in raw_choices] + [('no_data', 'No Data')]
+
+            distribution = dict((short, feature_counts[short]) for (short, _) in raw_choices)
             # handle no data case
-            if short == 'no_data':
-                distribution['no_data'] = 0
-                distribution['no_data'] += get_count(feature, None)
-                distribution['no_data'] += get_count(feature, '')
-            else:
-                distribution[short] = get_count(feature, short)
-
-        prd.data = distribution
-        prd.choices_display_names = dict(choices)
-    elif feature in _OPEN_CHOICE_FEATURES:
-        prd.type = 'OPEN_CHOICE'
-        profiles = UserProfile.objects.filter(
-            user__courseenrollment__course_id=course_id
-        )
-        query_distribution = profiles.values(
-            feature).annotate(Count(feature)).order_by()
-        # query_distribution is of the form [{'featureval': 'value1', 'featureval__count': 4},
-        #    {'featureval': 'value2', 'featureval__count': 2}, ...]
-
-        distribution = dict((vald[feature], vald[feature + '__count'])
-                            for vald in query_distribution)
-        # distribution is of the form {'value1': 4, 'value2': 2, ...}
-
-        # change none to no_data for valid json key
-        if None in distribution:
-            # django does not properly count NULL values when using annotate Count
-            # so
-            #     distribution['no_data'] = distribution.pop(None)
-            # would always be 0.
-
-            # Correctly count null values
-            distribution['no_data'] = profiles.filter(
-                **{feature: None}
-            ).count()
-
-        prd.data = distribution
-
-    prd.validate()
-    return prd
+            distribution['no_data'] = feature_counts[None] + feature_counts['']
+
+            prd.data = distribution
+            prd.choices_display_names = dict(choices)
+        elif feature in _OPEN_CHOICE_FEATURES:
+            prd.type = 'OPEN_CHOICE'
+
+            # distribution is of the form {'value1': 4, 'value2': 2, ...}
+            distribution = dict(feature_counts)
+            # change none to no_data for valid json key
+            if None in distribution:
+                distribution['no_data'] = distribution.pop(None)
+
+            prd.data = distribution
+
+        prd.validate()
+        distributions[feature] = prd
+    return distributions
@@ -6,7 +6,10 @@ from django.test import TestCase
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory
 
-from analytics.basic import enrolled_students_features, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
+from analytics.basic import (
+    enrolled_students_features, enrolled_students_batches, iter_enrolled_students_features,
+    AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
+)
 
 
 class TestAnalyticsBasic(TestCase):
@@ -38,6 +41,29 @@ class TestAnalyticsBasic(TestCase):
             self.assertIn(userreport['email'], [user.email for user in self.users])
             self.assertIn(userreport['name'], [user.profile.name for user in self.users])
 
+    def test_enrolled_students_batches(self):
+        # students who aren't enrolled, or are no longer, are left out
+        UserFactory()
+        CourseEnrollment.unenroll(self.users[0], self.course_id)
+        batches = list(enrolled_students_batches(self.course_id, batch_size=7))
+        self.assertEqual([len(batch) for batch in batches], [7, 7, 7, 7, 1])
+        self.assertEqual(
+            [student.id for batch in batches for student in batch],
+            sorted(user.id for user in self.users[1:])
+        )
+
+    def test_enrolled_students_batches_exact(self):
+        batches = list(enrolled_students_batches(self.course_id, batch_size=10))
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 10])
+
+    def test_iter_enrolled_students_features(self):
+        query_features = ('username', 'name')
+        userreports = list(iter_enrolled_students_features(self.course_id, query_features))
+        self.assertEqual(
+            sorted(userreports),
+            sorted(enrolled_students_features(self.course_id, query_features))
+        )
+
     def test_available_features(self):
         self.assertEqual(len(AVAILABLE_FEATURES), len(STUDENT_FEATURES + PROFILE_FEATURES))
         self.assertEqual(set(AVAILABLE_FEATURES), set(STUDENT_FEATURES + PROFILE_FEATURES))
@@ -3,7 +3,9 @@
 from django.test import TestCase
 from nose.tools import raises
 
-from analytics.csvs import create_csv_response, format_dictlist, format_instances
+from analytics.csvs import (
+    create_csv_response, format_dictlist, format_instances, iter_format_dictlist, stream_csv
+)
 
 
 class TestAnalyticsCSVS(TestCase):
@@ -37,6 +39,40 @@ class TestAnalyticsCSVS(TestCase):
         self.assertEqual(res.content.strip(), '')
 
 
+    def test_create_csv_response_generator(self):
+        header = ['Name', 'Email']
+        read = []
+
+        def datarows():
+            """ rows which record when they're read """
+            for name in ['Jim', 'Jake']:
+                read.append(name)
+                yield [name, u'{0}@\u00e9dy.org'.format(name.lower())]
+
+        res = create_csv_response('robot.csv', header, datarows())
+        self.assertEqual(read, [])
+        self.assertEqual(res.content.strip(), '"Name","Email"\r\n"Jim","jim@\xc3\xa9dy.org"\r\n"Jake","jake@\xc3\xa9dy.org"')
+        self.assertEqual(read, ['Jim', 'Jake'])
+
+
+class TestAnalyticsStreamCSV(TestCase):
+    """ Test stream_csv """
+
+    def test_chunks(self):
+        datarows = [[str(index)] for index in xrange(5)]
+        chunks = list(stream_csv(['Index'], datarows, rows_per_chunk=2))
+        self.assertEqual(chunks, [
+            '"Index"\r\n"0"\r\n"1"\r\n',
+            '"2"\r\n"3"\r\n',
+            '"4"\r\n',
+        ])
+
+    def test_exact_chunks(self):
+        datarows = [[str(index)] for index in xrange(4)]
+        chunks = list(stream_csv(['Index'], datarows, rows_per_chunk=2))
+        self.assertEqual(''.join(chunks), '"Index"\r\n"0"\r\n"1"\r\n"2"\r\n"3"\r\n')
+
+
 class TestAnalyticsFormatDictlist(TestCase):
     """ Test format_dictlist method """
 
@@ -66,6 +102,12 @@ class TestAnalyticsFormatDictlist(TestCase):
         self.assertEqual(header, ideal_header)
         self.assertEqual(datarows, ideal_datarows)
 
+    def test_iter_format_dictlist(self):
+        dicts = ({'label1': index, 'label2': -index} for index in xrange(3))
+        header, datarows = iter_format_dictlist(dicts, ['label2', 'label1'])
+        self.assertEqual(header, ['label2', 'label1'])
+        self.assertEqual(list(datarows), [[0, 0], [-1, 1], [-2, 2]])
+
     def test_format_dictlist_empty(self):
         header, datarows = format_dictlist([], [])
         self.assertEqual(header, [])
@@ -1,11 +1,14 @@
 """ Tests for analytics.distributions """
 
+from django.core.cache import cache
 from django.test import TestCase
 from nose.tools import raises
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory
 
-from analytics.distributions import profile_distribution, AVAILABLE_PROFILE_FEATURES
+from analytics.distributions import (
+    profile_distribution, profile_distributions, AVAILABLE_PROFILE_FEATURES
+)
 
 
 class TestAnalyticsDistributions(TestCase):
@@ -48,6 +51,33 @@ class TestAnalyticsDistributions(TestCase):
         self.assertNotIn('no_data', distribution.data)
         self.assertEqual(distribution.data[1930], 1)
 
+    def test_profile_distributions_single_query(self):
+        with self.assertNumQueries(1):
+            distributions = profile_distributions(self.course_id)
+        self.assertItemsEqual(distributions.keys(), AVAILABLE_PROFILE_FEATURES)
+        for feature in AVAILABLE_PROFILE_FEATURES:
+            self.assertEqual(
+                distributions[feature].data,
+                profile_distribution(self.course_id, feature).data
+            )
+        self.assertEqual(distributions['level_of_education'].data['no_data'], len(self.users))
+
+    def test_profile_distributions_cached(self):
+        cache.clear()
+        with self.assertNumQueries(1):
+            gender = profile_distribution(self.course_id, 'gender', use_cache=True)
+            year_of_birth = profile_distribution(self.course_id, 'year_of_birth', use_cache=True)
+        self.assertEqual(gender.data['m'], len(self.users) / 3)
+        self.assertEqual(year_of_birth.data[1930], 1)
+
+        # without the cache, new enrollments are counted straight away
+        CourseEnrollment.enroll(UserFactory(profile__gender='m'), self.course_id)
+        self.assertEqual(profile_distribution(self.course_id, 'gender').data['m'], len(self.users) / 3 + 1)
+        self.assertEqual(
+            profile_distribution(self.course_id, 'gender', use_cache=True).data['m'],
+            len(self.users) / 3
+        )
+
 
 class TestAnalyticsDistributionsNoData(TestCase):
     '''Test analytics distribution gathering.'''
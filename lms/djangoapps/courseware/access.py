@@ -16,6 +16,7 @@ from xmodule.x_module import XModule, XModuleDescriptor
 from student.models import CourseEnrollmentAllowed
 from external_auth.models import ExternalAuthMap
 from courseware.masquerade import is_masquerading_as_student
+from courseware.outline import OutlineItem
 from django.utils.timezone import UTC
 from student.models import CourseEnrollment
 
@@ -72,6 +73,9 @@ def has_access(user, obj, action, course_context=None):
     if isinstance(obj, ErrorDescriptor):
         return _has_access_error_desc(user, obj, action, course_context)
 
+    if isinstance(obj, OutlineItem):
+        return _has_access_outline_item(user, obj, action, course_context)
+
     # NOTE: any descriptor access checkers need to go above this
     if isinstance(obj, XModuleDescriptor):
         return _has_access_descriptor(user, obj, action, course_context)
@@ -294,6 +298,19 @@ def _has_access_descriptor(user, descriptor, action, course_context=None):
     return _dispatch(checkers, action, user, descriptor)
 
 
+def _has_access_outline_item(user, item, action, course_context):
+    """
+    Check if user has access to this chapter or section of a course outline,
+    which is the access they have to the descriptor it was made from.
+
+    Valid actions:
+      - same as the valid actions for the descriptor
+    """
+    if item.is_error:
+        return _has_access_error_desc(user, item, action, course_context)
+    return _has_access_descriptor(user, item, action, course_context)
+
+
 def _has_access_xmodule(user, xmodule, action, course_context):
     """
     Check if user has access to this xmodule.
@@ -0,0 +1,118 @@
+"""
+Persistent store of per-section scores, so that grading a student doesn't have
+to rebuild every problem module of the course.
+
+Each StudentSectionScore row holds the scores of one student on the problems
+of one graded section they have been graded on; the max scores of the others
+depend on the problems' contents, so they are worked out when reading, as
+grade() does. Rows are only kept for sections that can be graded from
+stored StudentModule scores (no dynamic children, nothing that always needs
+recalculating), and are rewritten by courseware.grades.update_stored_scores
+whenever one of the student's StudentModules in that section is created,
+deleted, or has its grade changed.
+
+Rows are tagged with a version hash of the graded structure of the course
+(sections, their problems, weights and graded flags). The rows of a course are
+only used once `rebuild_grade_store` has been run for the current version;
+after a change to that structure (for instance through
+CourseDescriptor.set_grading_policy and a change of subsection formats), grading
+falls back to computing scores from modules until the store is rebuilt. The
+grader and grade cutoffs are always applied when reading, so changing those
+doesn't invalidate the store.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+
+from .models import StudentSectionScore, SectionScoreStoreState
+
+
+def is_enabled():
+    """
+    Returns True if section scores should be persisted and read back.
+    """
+    return settings.MITX_FEATURES.get('ENABLE_PERSISTENT_GRADES', False)
+
+
+def store_version(sections):
+    """
+    Returns a hash identifying the graded structure of the given section
+    descriptors, as a list of (section descriptor, scored descriptors).
+    """
+    structure = sorted(
+        [section.location.url(), [
+            [descriptor.location.url(), descriptor.weight, descriptor.graded]
+            for descriptor in scored_descriptors
+        ]]
+        for section, scored_descriptors in sections
+    )
+    return hashlib.sha1(json.dumps(structure, sort_keys=True)).hexdigest()
+
+
+def is_fresh(course_id, version):
+    """
+    Returns True if the store for course_id has been built for `version`.
+    """
+    return SectionScoreStoreState.objects.filter(course_id=course_id, version=version).exists()
+
+
+def mark_rebuilt(course_id, version):
+    """
+    Record that the store for course_id has been rebuilt for `version`.
+    """
+    state, _ = SectionScoreStoreState.objects.get_or_create(course_id=course_id, defaults={'version': version})
+    state.version = version
+    state.save()
+
+
+def clear(course_id):
+    """
+    Remove all stored section scores of a course, and mark the store as stale.
+    """
+    SectionScoreStoreState.objects.filter(course_id=course_id).delete()
+    StudentSectionScore.objects.filter(course_id=course_id).delete()
+
+
+def get_scores(student, course_id, version):
+    """
+    Returns a dict mapping section location urls to the list of stored
+    [problem location url, earned, possible, graded] entries of the student,
+    for the rows that were computed for `version`.
+    """
+    rows = StudentSectionScore.objects.filter(student=student, course_id=course_id, version=version)
+    return dict((row.section_id, json.loads(row.scores)) for row in rows)
+
+
+def get_section_scores(student, course_id, section_id, version):
+    """
+    Returns the stored entries for one section of the student, or None if
+    there are none for `version`.
+    """
+    try:
+        row = StudentSectionScore.objects.get(student=student, course_id=course_id, section_id=section_id)
+    except StudentSectionScore.DoesNotExist:
+        return None
+    if row.version != version:
+        return None
+    return json.loads(row.scores)
+
+
+def set_section_scores(student, course_id, section_id, version, entries):
+    """
+    Store the entries for one section of the student. If entries is None, the
+    student has not started the section, and any stored row is removed.
+    """
+    if entries is None:
+        StudentSectionScore.objects.filter(student=student, course_id=course_id, section_id=section_id).delete()
+        return
+
+    row, _ = StudentSectionScore.objects.get_or_create(
+        student=student,
+        course_id=course_id,
+        section_id=section_id,
+        defaults={'version': version},
+    )
+    row.version = version
+    row.scores = json.dumps(entries)
+    row.save()
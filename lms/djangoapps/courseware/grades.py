@@ -1,23 +1,39 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 
+import json
 import random
 import logging
+import threading
 
 from collections import defaultdict
+
+import numpy
+
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 
-from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware import grade_store
+from courseware.model_data import FieldDataCache, DjangoKeyValueStore, chunks
 from xblock.fields import Scope
 from .module_render import get_module, get_module_for_descriptor
 from xmodule import graders
-from xmodule.capa_module import CapaModule
+from xmodule.capa_module import CapaModule, CapaDescriptor
+from xmodule.course_module import CourseDescriptor
 from xmodule.graders import Score
+from xmodule.modulestore.django import course_contents_version, modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
+from xmodule.x_module import XModuleDescriptor
 from .models import StudentModule
 
 log = logging.getLogger("mitx.courseware")
 
+# Number of problem locations, and of StudentModule rows, read per query by
+# answer_distributions
+ANSWER_DISTRIBUTION_LOCATIONS_PER_QUERY = 250
+ANSWER_DISTRIBUTION_ROWS_PER_QUERY = 1000
+
 
 def yield_module_descendents(module):
     stack = module.get_display_items()
@@ -94,7 +110,7 @@ def yield_problems(request, course, student):
                 yield problem
 
 
-def answer_distributions(request, course):
+def answer_distributions(course, update_progress=None):
     """
     Given a course_descriptor, compute frequencies of answers for each problem:
 
@@ -102,23 +118,76 @@ def answer_distributions(request, course):
 
     dict: (problem url_name, problem display_name, problem_id) -> (dict : answer ->  count)
 
-    TODO (vshnayder): this is currently doing a full linear pass through all
-    students and all problems.  This will be just a little slow.
+    The answers are read straight from the state of the StudentModules of the
+    problems in the graded sections of the course, of the students enrolled in
+    it, without creating any XModules. The rows are read in chunks, in order of
+    id, so only one chunk of states is in memory at a time.
+
+    If `update_progress` is given, it is called after each chunk with the
+    number of StudentModules read so far and the number there are to read.
     """
+    problems = dict(
+        (descriptor.location.url(), descriptor)
+        for descriptor in course.grading_context['all_descriptors']
+        if isinstance(descriptor, CapaDescriptor)
+    )
+    student_modules = StudentModule.objects.filter(
+        course_id=course.id,
+        student__courseenrollment__course_id=course.id,
+    )
+    location_chunks = list(chunks(problems.keys(), ANSWER_DISTRIBUTION_LOCATIONS_PER_QUERY))
+
+    num_total = None
+    if update_progress is not None:
+        num_total = sum(
+            student_modules.filter(module_state_key__in=locations).count()
+            for locations in location_chunks
+        )
+    num_read = 0
 
     counts = defaultdict(lambda: defaultdict(int))
+    for locations in location_chunks:
+        rows = student_modules.filter(module_state_key__in=locations).order_by('id')
+        last_id = 0
+        while True:
+            chunk = list(
+                rows.filter(id__gt=last_id).values_list('id', 'module_state_key', 'state')
+                [:ANSWER_DISTRIBUTION_ROWS_PER_QUERY]
+            )
+            for _, module_state_key, state in chunk:
+                student_answers = _student_answers(state)
+                if not student_answers:
+                    continue
+                problem = problems[module_state_key]
+                for problem_id, answer in student_answers.iteritems():
+                    # Answer can be a list or some other unhashable element.  Convert to string.
+                    if not isinstance(answer, basestring):
+                        answer = str(answer)
+                    key = (problem.url_name, problem.display_name_with_default, problem_id)
+                    counts[key][answer] += 1
+
+            num_read += len(chunk)
+            if update_progress is not None:
+                update_progress(num_read, num_total)
+            if len(chunk) < ANSWER_DISTRIBUTION_ROWS_PER_QUERY:
+                break
+            last_id = chunk[-1][0]
 
-    enrolled_students = User.objects.filter(courseenrollment__course_id=course.id)
+    return counts
 
-    for student in enrolled_students:
-        for capa_module in yield_problems(request, course, student):
-            for problem_id in capa_module.lcp.student_answers:
-                # Answer can be a list or some other unhashable element.  Convert to string.
-                answer = str(capa_module.lcp.student_answers[problem_id])
-                key = (capa_module.url_name, capa_module.display_name_with_default, problem_id)
-                counts[key][answer] += 1
 
-    return counts
+def _student_answers(state):
+    """
+    The student_answers of a problem's StudentModule `state`, or None if it
+    has none (or can't be read).
+    """
+    if not state:
+        return None
+    try:
+        return json.loads(state).get('student_answers')
+    except (ValueError, AttributeError):
+        log.warning("Unreadable StudentModule state: %r", state[:100])
+        return None
 
 
 def grade(student, request, course, field_data_cache=None, keep_raw_scores=False):
@@ -143,8 +212,8 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
     grading_context = course.grading_context
     raw_scores = []
 
-    if field_data_cache is None:
-        field_data_cache = FieldDataCache(grading_context['all_descriptors'], course.id, student)
+    # Scores of sections in the persistent grade store, if it is up to date
+    stored_scores = _stored_scores(student, request, course)
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -155,55 +224,40 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
-            should_grade_section = False
-            # If we haven't seen a single problem in the section, we don't have to grade it at all! We can assume 0%
-            for moduledescriptor in section['xmoduledescriptors']:
-                # some problems have state that is updated independently of interaction
-                # with the LMS, so they need to always be scored. (E.g. foldit.)
-                if moduledescriptor.always_recalculate_grades:
-                    should_grade_section = True
-                    break
-
-                # Create a fake key to pull out a StudentModule object from the FieldDataCache
-
-                key = DjangoKeyValueStore.Key(
-                    Scope.user_state,
-                    student.id,
-                    moduledescriptor.location,
-                    None
-                )
-                if field_data_cache.find(key):
-                    should_grade_section = True
-                    break
+            scores = None
+            section_id = section_descriptor.location.url()
+            if stored_scores is not None and section_id in stored_scores:
+                # The grade store only has scores for sections the student has started
+                scores = stored_scores[section_id]
+                should_grade_section = scores is not None
+            else:
+                if field_data_cache is None:
+                    field_data_cache = FieldDataCache(grading_context['all_descriptors'], course.id, student)
+
+                should_grade_section = False
+                # If we haven't seen a single problem in the section, we don't have to grade it at all! We can assume 0%
+                for moduledescriptor in section['xmoduledescriptors']:
+                    # some problems have state that is updated independently of interaction
+                    # with the LMS, so they need to always be scored. (E.g. foldit.)
+                    if moduledescriptor.always_recalculate_grades:
+                        should_grade_section = True
+                        break
+
+                    # Create a fake key to pull out a StudentModule object from the FieldDataCache
+
+                    key = DjangoKeyValueStore.Key(
+                        Scope.user_state,
+                        student.id,
+                        moduledescriptor.location,
+                        None
+                    )
+                    if field_data_cache.find(key):
+                        should_grade_section = True
+                        break
 
             if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
-
-                    (correct, total) = get_score(course.id, student, module_descriptor, create_module, field_data_cache)
-                    if correct is None and total is None:
-                        continue
-
-                    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
-                        if total > 1:
-                            correct = random.randrange(max(total - 2, 1), total + 1)
-                        else:
-                            correct = total
-
-                    graded = module_descriptor.graded
-                    if not total > 0:
-                        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                        graded = False
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
-
+                if scores is None:
+                    scores = _section_scores(student, request, course, section_descriptor, field_data_cache)
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -219,6 +273,49 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
 
         totaled_scores[section_format] = format_scores
 
+    return _grade_summary(course, totaled_scores, raw_scores if keep_raw_scores else None)
+
+
+def _section_scores(student, request, course, section_descriptor, field_data_cache):
+    """
+    Return the list of Scores for every scored descendant of section_descriptor,
+    creating XModules for the student where the stored state is not enough.
+    """
+    scores = []
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+
+    for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
+
+        (correct, total) = get_score(course.id, student, module_descriptor, create_module, field_data_cache)
+        if correct is None and total is None:
+            continue
+
+        if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
+            if total > 1:
+                correct = random.randrange(max(total - 2, 1), total + 1)
+            else:
+                correct = total
+
+        graded = module_descriptor.graded
+        if not total > 0:
+            #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+            graded = False
+
+        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+
+    return scores
+
+
+def _grade_summary(course, totaled_scores, raw_scores=None):
+    """
+    Run the course grader over totaled_scores and decorate the result with the
+    letter grade. If raw_scores is not None, it is included in the summary.
+    """
     grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
 
     # We round the grade here, to make sure that the grade is an whole percentage and
@@ -228,12 +325,521 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
     letter_grade = grade_for_percentage(course.grade_cutoffs, grade_summary['percent'])
     grade_summary['grade'] = letter_grade
     grade_summary['totaled_scores'] = totaled_scores  	# make this available, eg for instructor download & debugging
-    if keep_raw_scores:
+    if raw_scores is not None:
         grade_summary['raw_scores'] = raw_scores        # way to get all RAW scores out to instructor
                                                         # so grader can be double-checked
     return grade_summary
 
 
+def grade_batch(students, request, course, keep_raw_scores=False):
+    """
+    Grade a batch of students at once. Returns a list of (student, grade_summary)
+    tuples in the same order as `students`, where each grade_summary is identical
+    to what grade() returns for that student.
+
+    Rather than building a FieldDataCache and XModules per student, this loads
+    the grade/max_grade columns of every relevant StudentModule row for the
+    whole batch in a few chunked queries, and totals each section as array math
+    across the batch. XModules are only created for sections that contain
+    problems that must always be recalculated or descriptors with dynamic
+    children, and for each student of the batch who started a section but has
+    no stored max score for one of its problems.
+
+    students: a sequence of User objects enrolled in the course
+    request: a request used when XModules do have to be created
+    course: a CourseDescriptor
+    """
+    students = list(students)
+    if settings.GENERATE_PROFILE_SCORES or not students:
+        return [(student, grade(student, request, course, keep_raw_scores=keep_raw_scores)) for student in students]
+
+    grading_context = course.grading_context
+    student_index = dict((student.id, index) for index, student in enumerate(students))
+    stored_scores = _stored_scores_for_batch(
+        course.id,
+        student_index.keys(),
+        set(descriptor.location.url() for descriptor in grading_context['all_descriptors'])
+    )
+
+    raw_scores = [[] for _ in students]
+    totaled_scores = [defaultdict(list) for _ in students]
+    for section_format, sections in grading_context['graded_sections'].iteritems():
+        for section in sections:
+            section_descriptor = section['section_descriptor']
+            section_name = section_descriptor.display_name_with_default
+
+            if _is_statically_gradable(section_descriptor):
+                section_totals = _batch_section_totals(
+                    students, student_index, request, course, section, stored_scores, keep_raw_scores
+                )
+            else:
+                section_totals = _per_student_section_totals(
+                    students, student_index, request, course, section, stored_scores, keep_raw_scores
+                )
+
+            for index, (graded_total, scores) in enumerate(section_totals):
+                if scores is not None:
+                    raw_scores[index] += scores
+                if graded_total.possible > 0:
+                    totaled_scores[index][section_format].append(graded_total)
+                else:
+                    log.exception("Unable to grade a section with a total possible score of zero. " +
+                                  str(section_descriptor.location))
+
+    results = []
+    for index, student in enumerate(students):
+        # Every section format is present in the output of grade(), even if empty
+        student_totals = dict((section_format, totaled_scores[index][section_format])
+                              for section_format in grading_context['graded_sections'])
+        results.append((student, _grade_summary(course, student_totals,
+                                                raw_scores[index] if keep_raw_scores else None)))
+    return results
+
+
+def _stored_scores_for_batch(course_id, student_ids, locations, chunk_size=250):
+    """
+    Return a dict mapping a module_state_key to a dict of
+    student_id -> (grade, max_grade) for all StudentModule rows of the given
+    students and locations. Only the score columns are loaded.
+    """
+    stored_scores = defaultdict(dict)
+    for student_chunk in chunks(student_ids, chunk_size):
+        for location_chunk in chunks(locations, chunk_size):
+            rows = StudentModule.objects.filter(
+                course_id=course_id,
+                student__in=student_chunk,
+                module_state_key__in=location_chunk,
+            ).values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+            for student_id, module_state_key, module_grade, max_grade in rows:
+                stored_scores[module_state_key][student_id] = (module_grade, max_grade)
+    return stored_scores
+
+
+def _is_statically_gradable(section_descriptor):
+    """
+    Returns True if every descendant of section_descriptor can be scored from
+    stored StudentModule rows, i.e. no descendant has dynamic children or has to
+    always recalculate its grade.
+    """
+    stack = [section_descriptor]
+    while stack:
+        descriptor = stack.pop()
+        if descriptor.has_dynamic_children() or descriptor.always_recalculate_grades:
+            return False
+        stack.extend(descriptor.get_children())
+    return True
+
+
+def _started_students(student_index, section, stored_scores):
+    """
+    Returns a boolean array marking the students in the batch who have state
+    for at least one scored module in the section.
+    """
+    started = numpy.zeros(len(student_index), dtype=bool)
+    for descriptor in section['xmoduledescriptors']:
+        for student_id in stored_scores.get(descriptor.location.url(), {}):
+            started[student_index[student_id]] = True
+    return started
+
+
+def _default_max_score(student, request, course, descriptor):
+    """
+    Returns the max score of descriptor for a student who has no stored
+    max_grade for it, by instantiating the module like get_score() does.
+    Another student's stored max_grade can't stand in for it: it may be
+    stale, or differ for a randomized problem, and the student may not have
+    access to the module. Returns None if the problem can't be scored.
+    """
+    field_data_cache = FieldDataCache([descriptor], course.id, student)
+    problem = get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+    if problem is None:
+        return None
+    return problem.max_score()
+
+
+def _batch_section_totals(students, student_index, request, course, section, stored_scores, keep_raw_scores):
+    """
+    Total a statically gradable section for the whole batch using only stored
+    scores. Returns a list of (graded_total, raw_scores_or_None) in batch order.
+
+    Problem scores are summed column by column in the same order as grade()
+    walks the section, so the totals are bit-for-bit identical to it.
+    """
+    section_descriptor = section['section_descriptor']
+    section_name = section_descriptor.display_name_with_default
+    num_students = len(students)
+
+    started = _started_students(student_index, section, stored_scores)
+    earned_total = numpy.zeros(num_students)
+    possible_total = numpy.zeros(num_students)
+    columns = []
+
+    if started.any():
+        # Static sections never call the module creator
+        for descriptor in yield_dynamic_descriptor_descendents(section_descriptor, None):
+            if not descriptor.has_score:
+                continue
+
+            stored_rows = stored_scores.get(descriptor.location.url(), {})
+            correct = numpy.zeros(num_students)
+            total = numpy.zeros(num_students)
+            # Students without a score for this problem are skipped, as in get_score()
+            present = numpy.zeros(num_students, dtype=bool)
+            for student_id, (module_grade, max_grade) in stored_rows.iteritems():
+                if max_grade is not None:
+                    index = student_index[student_id]
+                    correct[index] = module_grade if module_grade is not None else 0
+                    total[index] = max_grade
+                    present[index] = True
+
+            for index in numpy.flatnonzero(started & ~present):
+                default_total = _default_max_score(students[index], request, course, descriptor)
+                if default_total is not None:
+                    total[index] = default_total
+                    present[index] = True
+
+            weight = descriptor.weight
+            if weight is not None:
+                reweight = present & (total != 0)
+                correct[reweight] = correct[reweight] * weight / total[reweight]
+                total[reweight] = weight
+
+            graded = present & (total > 0) if descriptor.graded else numpy.zeros(num_students, dtype=bool)
+            earned_total += numpy.where(graded, correct, 0)
+            possible_total += numpy.where(graded, total, 0)
+            columns.append((descriptor.display_name_with_default, correct, total, present, graded))
+
+    section_totals = []
+    for index in xrange(num_students):
+        if not started[index]:
+            section_totals.append((Score(0.0, 1.0, True, section_name), [] if keep_raw_scores else None))
+            continue
+
+        scores = None
+        if keep_raw_scores:
+            scores = [
+                Score(float(correct[index]), float(total[index]), bool(graded[index]), display_name)
+                for display_name, correct, total, present, graded in columns
+                if present[index]
+            ]
+        section_totals.append((
+            Score(float(earned_total[index]), float(possible_total[index]), True, section_name),
+            scores
+        ))
+    return section_totals
+
+
+def _per_student_section_totals(students, student_index, request, course, section, stored_scores, keep_raw_scores):
+    """
+    Total a section that needs XModules to be graded, one student at a time.
+    Returns a list of (graded_total, raw_scores_or_None) in batch order.
+    """
+    section_descriptor = section['section_descriptor']
+    section_name = section_descriptor.display_name_with_default
+
+    always_recalculate = any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors'])
+    started = _started_students(student_index, section, stored_scores)
+
+    section_totals = []
+    for index, student in enumerate(students):
+        if not (always_recalculate or started[index]):
+            section_totals.append((Score(0.0, 1.0, True, section_name), [] if keep_raw_scores else None))
+            continue
+
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course.id, student, section_descriptor)
+        scores = _section_scores(student, request, course, section_descriptor, field_data_cache)
+        _, graded_total = graders.aggregate_scores(scores, section_name)
+        section_totals.append((graded_total, scores if keep_raw_scores else None))
+    return section_totals
+
+
+# Set while scores are being written to the grade store, so that StudentModules
+# created as a side effect of computing them don't trigger nested updates.
+_grade_store_update = threading.local()
+
+# how long the grade store structure of a course stays in the cache; new
+# versions of the course get new keys, so this only bounds how long unused
+# structures linger
+STORE_STRUCTURE_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _scored_descriptors(section_descriptor):
+    """
+    Returns the scored descriptors of a section kept in the grade store, in
+    the order grade() visits them.
+    """
+    # Static sections never call the module creator
+    return [
+        descriptor
+        for descriptor in yield_dynamic_descriptor_descendents(section_descriptor, None)
+        if descriptor.has_score
+    ]
+
+
+def _stored_sections(course):
+    """
+    Returns a list of (section descriptor, scored descriptors) for every graded
+    section of the course whose scores are kept in the grade store. The scored
+    descriptors are in the order grade() visits them.
+    """
+    stored_sections = []
+    for sections in course.grading_context['graded_sections'].itervalues():
+        for section in sections:
+            section_descriptor = section['section_descriptor']
+            if not _is_statically_gradable(section_descriptor):
+                continue
+            stored_sections.append((section_descriptor, _scored_descriptors(section_descriptor)))
+    return stored_sections
+
+
+def store_structure_cache_key(course):
+    """Cache key of the grade store structure of `course` at its current version"""
+    return u"courseware.grades.store_structure.{0}.{1}".format(
+        course.id, course_contents_version(course)
+    ).encode('utf-8')
+
+
+def _store_structure(course):
+    """
+    Returns a dict describing the graded sections of `course` kept in the
+    grade store, with:
+
+    'version': their grade_store.store_version
+    'problems': the location urls of the scored problems of each section, in
+        the order grade() visits them, by location url of the section
+    'sections': the location url of the section of each problem
+    'names', 'weights', 'graded': the display name, weight and graded flag of
+        each problem
+
+    Walking and hashing the graded sections takes the whole course, so this
+    is done once per version of the course, and kept in the cache.
+    """
+    key = store_structure_cache_key(course)
+    structure = cache.get(key)
+    if structure is not None:
+        return structure
+
+    stored_sections = _stored_sections(course)
+    structure = {
+        'version': grade_store.store_version(stored_sections),
+        'problems': {},
+        'sections': {},
+        'names': {},
+        'weights': {},
+        'graded': {},
+    }
+    for section_descriptor, scored_descriptors in stored_sections:
+        section_id = section_descriptor.location.url()
+        structure['problems'][section_id] = [descriptor.location.url() for descriptor in scored_descriptors]
+        for descriptor in scored_descriptors:
+            location = descriptor.location.url()
+            structure['sections'].setdefault(location, section_id)
+            structure['names'][location] = descriptor.display_name_with_default
+            structure['weights'][location] = descriptor.weight
+            structure['graded'][location] = descriptor.graded
+    cache.set(key, structure, STORE_STRUCTURE_CACHE_TIMEOUT)
+    return structure
+
+
+def _stored_scores(student, request, course):
+    """
+    Returns a dict mapping the location url of every section kept in the grade
+    store to the list of the student's Scores for it, or to None if the student
+    hasn't started the section.
+
+    The store has no entries for the problems of a started section the student
+    hasn't been graded on, since their max score depends on the problem's
+    current contents: their modules are created for the student, as grade()
+    would.
+
+    Returns None if the grade store is disabled or out of date for the course.
+    """
+    if not grade_store.is_enabled() or not student.is_authenticated():
+        return None
+
+    structure = _store_structure(course)
+    version = structure['version']
+    if not grade_store.is_fresh(course.id, version):
+        return None
+
+    rows = grade_store.get_scores(student, course.id, version)
+    descriptors = None
+    stored_scores = {}
+    for section_id, problems in structure['problems'].iteritems():
+        entries = rows.get(section_id)
+        if entries is None:
+            stored_scores[section_id] = None
+            continue
+
+        scores = dict((location, (earned, possible, graded)) for location, earned, possible, graded in entries)
+        unscored = [location for location in problems if location not in scores]
+        if unscored:
+            if descriptors is None:
+                descriptors = dict(
+                    (descriptor.location.url(), descriptor)
+                    for descriptor in course.grading_context['all_descriptors']
+                )
+            scores.update(_unscored_problem_scores(
+                student, request, course, [descriptors[location] for location in unscored]
+            ))
+
+        stored_scores[section_id] = [
+            Score(scores[location][0], scores[location][1], scores[location][2], structure['names'][location])
+            for location in problems
+            if location in scores
+        ]
+    return stored_scores
+
+
+def _unscored_problem_scores(student, request, course, descriptors):
+    """
+    Returns the (earned, possible, graded) of the student for each of the
+    problem descriptors that can be scored, by location url, creating their
+    modules as grade() would.
+    """
+    field_data_cache = FieldDataCache(descriptors, course.id, student)
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+
+    scores = {}
+    for descriptor in descriptors:
+        (correct, total) = get_score(course.id, student, descriptor, create_module, field_data_cache)
+        if correct is None and total is None:
+            continue
+        scores[descriptor.location.url()] = (correct, total, descriptor.graded and total > 0)
+    return scores
+
+
+def _store_entry(location, module_grade, max_grade, structure):
+    """
+    Returns the grade store entry of the problem at `location`, from the
+    grade and max_grade of a student's StudentModule for it, weighted as
+    get_score() does. Returns None if the module hasn't been graded.
+    """
+    if max_grade is None:
+        return None
+    correct = module_grade if module_grade is not None else 0
+    total = max_grade
+    weight = structure['weights'][location]
+    if weight is not None:
+        if total == 0:
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + location)
+        else:
+            correct = correct * weight / total
+            total = weight
+    return [location, correct, total, structure['graded'][location] and total > 0]
+
+
+def _section_store_entries(problems, module_scores, structure):
+    """
+    Returns the grade store entries of a student for the section of the
+    problems at `problems`, from the (grade, max_grade) of each of the
+    student's StudentModules, by location url. Returns None if the student
+    hasn't started the section.
+    """
+    if not any(location in module_scores for location in problems):
+        return None
+
+    entries = []
+    for location in problems:
+        if location in module_scores:
+            entry = _store_entry(location, module_scores[location][0], module_scores[location][1], structure)
+            if entry is not None:
+                entries.append(entry)
+    return entries
+
+
+def update_stored_scores(student_module, deleted=False):
+    """
+    Update the grade store after student_module was created, deleted or had
+    its grade changed. Only the entries of the section containing the module
+    are recomputed, and only the module's own entry if the section is already
+    stored.
+    """
+    if not grade_store.is_enabled() or getattr(_grade_store_update, 'active', False):
+        return
+    if not XModuleDescriptor.load_class(student_module.module_type, XModuleDescriptor).has_score:
+        return
+
+    course_id = student_module.course_id
+    try:
+        # The course's descendants are only loaded when the structure of this
+        # version of the course isn't cached yet
+        course = modulestore().get_instance(course_id, CourseDescriptor.id_to_location(course_id))
+        if cache.get(store_structure_cache_key(course)) is None:
+            course = modulestore().get_instance(course_id, course.location, depth=None)
+    except (ItemNotFoundError, ValueError):
+        log.warning("Could not load course %s to update the grade store", course_id)
+        return
+
+    structure = _store_structure(course)
+    location = student_module.module_state_key
+    section_id = structure['sections'].get(location)
+    if section_id is None:
+        return
+
+    version = structure['version']
+    student = student_module.student
+    problems = structure['problems'][section_id]
+    _grade_store_update.active = True
+    try:
+        entries = grade_store.get_section_scores(student, course_id, section_id, version)
+        if entries is not None and not deleted:
+            # Only this problem's score changed
+            entries = [entry for entry in entries if entry[0] != location]
+            entry = _store_entry(location, student_module.grade, student_module.max_grade, structure)
+            if entry is not None:
+                entries.append(entry)
+        else:
+            module_scores = _stored_scores_for_batch(course_id, [student.id], problems)
+            entries = _section_store_entries(problems, dict(
+                (problem, scores[student.id]) for problem, scores in module_scores.iteritems()
+            ), structure)
+        grade_store.set_section_scores(student, course_id, section_id, version, entries)
+    finally:
+        _grade_store_update.active = False
+
+
+def rebuild_stored_scores(course):
+    """
+    Recompute the grade store of every student with state in the course, and
+    mark the store as up to date. This has to be run when the graded structure
+    of the course changes. Returns the number of students processed.
+    """
+    structure = _store_structure(course)
+    version = structure['version']
+    grade_store.clear(course.id)
+
+    locations = structure['sections'].keys()
+    student_ids = set()
+    for location_chunk in chunks(locations, 500):
+        student_ids.update(StudentModule.objects.filter(
+            course_id=course.id,
+            module_state_key__in=location_chunk,
+        ).values_list('student', flat=True))
+
+    _grade_store_update.active = True
+    try:
+        for student_chunk in chunks(sorted(student_ids), 500):
+            module_scores = _stored_scores_for_batch(course.id, student_chunk, locations)
+            for student in User.objects.filter(id__in=student_chunk):
+                student_scores = dict(
+                    (location, scores[student.id])
+                    for location, scores in module_scores.iteritems()
+                    if student.id in scores
+                )
+                for section_id, problems in structure['problems'].iteritems():
+                    entries = _section_store_entries(problems, student_scores, structure)
+                    grade_store.set_section_scores(student, course.id, section_id, version, entries)
+    finally:
+        _grade_store_update.active = False
+
+    grade_store.mark_rebuilt(course.id, version)
+    return len(student_ids)
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -288,6 +894,9 @@ def progress_summary(student, request, course, field_data_cache):
         # This student must not have access to the course.
         return None
 
+    # Scores of sections in the persistent grade store, if it is up to date
+    stored_scores = _stored_scores(student, request, course)
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -307,14 +916,24 @@ def progress_summary(student, request, course, field_data_cache):
 
             module_creator = section_module.xmodule_runtime.get_module
 
-            for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+            stored_section_scores = None
+            if stored_scores is not None:
+                stored_section_scores = stored_scores.get(section_module.location.url())
 
-                course_id = course.id
-                (correct, total) = get_score(course_id, student, module_descriptor, module_creator, field_data_cache)
-                if correct is None and total is None:
-                    continue
+            if stored_section_scores is not None:
+                scores = [
+                    Score(score.earned, score.possible, graded, score.section)
+                    for score in stored_section_scores
+                ]
+            else:
+                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
 
-                scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                    course_id = course.id
+                    (correct, total) = get_score(course_id, student, module_descriptor, module_creator, field_data_cache)
+                    if correct is None and total is None:
+                        continue
+
+                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
             scores.reverse()
             section_total, _ = graders.aggregate_scores(
@@ -0,0 +1,111 @@
+"""
+django management command: compare incrementing a counter kept in a
+user_state_summary field from many threads at once, by rewriting the value of
+the field the way DjangoKeyValueStore does, and with the sharded rows of
+UserStateSummaryCounters. Reports the throughput of each, and the increments
+each lost.
+
+The rows are made for a module that doesn't exist, and deleted at the end.
+This is meant to be run against the production database engine: sqlite
+serializes all writes anyway.
+"""
+
+import json
+import threading
+import time
+import uuid
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from courseware.model_data import (
+    compact_user_state_summary_counters, increment_user_state_summary_counter, user_state_summary_counts
+)
+from courseware.models import XModuleUserStateSummaryCounter, XModuleUserStateSummaryField
+
+FIELD_NAME = 'poll_answers'
+KEY = 'Yes'
+
+
+def rewrite_field(usage_id):
+    """ Increment the counter by reading, changing and saving the whole field. """
+    field, _ = XModuleUserStateSummaryField.objects.get_or_create(usage_id=usage_id, field_name=FIELD_NAME)
+    counts = json.loads(field.value) or {}
+    counts[KEY] = counts.get(KEY, 0) + 1
+    field.value = json.dumps(counts)
+    field.save()
+
+
+class Command(BaseCommand):
+    help = ("Benchmark incrementing a user_state_summary counter from concurrent threads, by rewriting\n"
+            "the field and with sharded counter rows.")
+
+    option_list = BaseCommand.option_list + (
+        make_option('--threads',
+                    type='int',
+                    dest='num_threads',
+                    default=16,
+                    help='Number of threads incrementing the counter at the same time'),
+        make_option('--increments',
+                    type='int',
+                    dest='increments',
+                    default=200,
+                    help='Number of increments made by each thread'),
+        make_option('--shards',
+                    type='int',
+                    dest='shards',
+                    default=settings.USER_STATE_SUMMARY_COUNTER_SHARDS,
+                    help='Number of rows each counter is spread over'),
+    )
+
+    def handle(self, *args, **options):
+        num_threads = options['num_threads']
+        increments = options['increments']
+        expected = num_threads * increments
+        usage_id = 'i4x://edX/benchmark/poll_question/{0}'.format(uuid.uuid4().hex)
+
+        try:
+            rewrite_time = self.time_threads(num_threads, increments, lambda: rewrite_field(usage_id))
+            rewritten = json.loads(
+                XModuleUserStateSummaryField.objects.get(usage_id=usage_id, field_name=FIELD_NAME).value
+            )[KEY]
+
+            counter_time = self.time_threads(num_threads, increments, lambda: increment_user_state_summary_counter(
+                usage_id, FIELD_NAME, KEY, shards=options['shards']
+            ))
+            counted = user_state_summary_counts(usage_id, FIELD_NAME)[KEY]
+            rows = XModuleUserStateSummaryCounter.objects.filter(usage_id=usage_id).count()
+            compact_user_state_summary_counters(usage_id)
+            compacted = user_state_summary_counts(usage_id, FIELD_NAME)[KEY]
+        finally:
+            XModuleUserStateSummaryField.objects.filter(usage_id=usage_id).delete()
+            XModuleUserStateSummaryCounter.objects.filter(usage_id=usage_id).delete()
+
+        self.stdout.write("{0} threads making {1} increments each\n".format(num_threads, increments))
+        self.stdout.write("rewriting the field: {0:.0f} increments/s, {1} lost\n".format(
+            expected / rewrite_time, expected - rewritten
+        ))
+        self.stdout.write("counter rows:        {0:.0f} increments/s, {1} lost, in {2} rows\n".format(
+            expected / counter_time, expected - counted, rows
+        ))
+        self.stdout.write("after compaction:    {0} lost\n".format(expected - compacted))
+
+    def time_threads(self, num_threads, increments, fcn):
+        """ The time taken by num_threads threads to call fcn() `increments` times each. """
+        def run():
+            """ Call fcn, then close the connection this thread opened. """
+            try:
+                for _ in xrange(increments):
+                    fcn()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in xrange(num_threads)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.time() - start
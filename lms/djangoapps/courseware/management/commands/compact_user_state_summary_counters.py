@@ -0,0 +1,28 @@
+# pylint: disable=missing-docstring
+
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courseware.model_data import compact_user_state_summary_counters
+
+
+class Command(BaseCommand):
+    """
+    Merge the rows of each counter kept in a user_state_summary field (poll
+    votes, word cloud words, hint votes) into one, for one module or all of them.
+
+    Every counter is spread over up to USER_STATE_SUMMARY_COUNTER_SHARDS rows
+    as students increment it; run this periodically (e.g. from cron) so that
+    reading the counters stays a scan of a few rows. It can run while students
+    keep voting: no increment is lost.
+    """
+    args = '[<module location>]'
+    help = dedent(__doc__).strip()
+
+    def handle(self, *args, **options):
+        if len(args) > 1:
+            raise CommandError("Usage: compact_user_state_summary_counters [<module location>]")
+
+        deleted = compact_user_state_summary_counters(args[0] if args else None)
+        return "Merged away {0} counter rows\n".format(deleted)
@@ -0,0 +1,31 @@
+# pylint: disable=missing-docstring
+
+import time
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courseware.courses import get_course_by_id
+from courseware.grades import rebuild_stored_scores
+
+
+class Command(BaseCommand):
+    """
+    Recompute the persistent section scores of every student in a course.
+
+    This has to be run after enabling ENABLE_PERSISTENT_GRADES, and whenever the
+    graded structure of the course changes (graded subsections, their problems,
+    or problem weights), e.g. after the grading policy is edited in Studio.
+    Until it is run, grades are computed without the store.
+    """
+    args = '<course_id>'
+    help = dedent(__doc__).strip()
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: rebuild_grade_store <course_id>")
+
+        course = get_course_by_id(args[0])
+        start = time.time()
+        num_students = rebuild_stored_scores(course)
+        return "Rebuilt the grade store of {0} students in {1:.1f}s\n".format(num_students, time.time() - start)
@@ -0,0 +1,23 @@
+"""
+Middleware for the courseware app
+"""
+import logging
+
+from dogapi import dog_stats_api
+
+from courseware.module_render import module_constructions
+
+log = logging.getLogger(__name__)
+
+
+class ModuleConstructionMiddleware(object):
+    """
+    Reports how many modules each request constructed, as the
+    lms.courseware.module_constructions histogram.
+    """
+    def process_response(self, request, response):
+        count = module_constructions(request)
+        if count:
+            log.debug("%s constructed %d modules", request.path, count)
+            dog_stats_api.histogram('lms.courseware.module_constructions', count)
+        return response
@@ -2,18 +2,22 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import hashlib
 import json
+import random
 from collections import defaultdict
 from itertools import chain
 from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
+    XModuleUserStateSummaryCounter,
     XModuleStudentPrefsField,
     XModuleStudentInfoField
 )
 import logging
 
-from django.db import DatabaseError
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -378,3 +382,122 @@ class DjangoKeyValueStore(KeyValueStore):
             return key.field_name in json.loads(field_object.state)
         else:
             return True
+
+
+class UserStateSummaryCounters(object):
+    """
+    Counters kept in Scope.user_state_summary Dict fields, such as the votes
+    for each answer of a poll, that many students change at the same time.
+
+    Rather than rewriting the whole value of the field, which loses the
+    changes of students who read it at the same time, each increment is a
+    single UPDATE of one of `shards` XModuleUserStateSummaryCounter rows,
+    chosen at random. The count of a key is the value stored in the field,
+    if any, plus the sum of its rows; compact_user_state_summary_counters
+    merges the rows of each key back into one.
+    """
+    def __init__(self, shards=1):
+        self.shards = shards
+
+    def increment(self, block, field_name, key, amount=1):
+        """
+        Add `amount` to the count of `key` in the field `field_name` of `block`
+        """
+        increment_user_state_summary_counter(block.location.url(), field_name, key, amount, self.shards)
+
+    def totals(self, block, field_name, keys=None):
+        """
+        The count of each key of the field `field_name` of `block`, or only of
+        `keys` if given
+        """
+        totals = dict(getattr(block, field_name) or {})
+        if keys is not None:
+            totals = dict((key, totals[key]) for key in keys if key in totals)
+        for key, count in user_state_summary_counts(block.location.url(), field_name, keys).iteritems():
+            totals[key] = totals.get(key, 0) + count
+        return totals
+
+
+def counter_key_hash(key):
+    """
+    The XModuleUserStateSummaryCounter.key_hash of `key`
+    """
+    if isinstance(key, unicode):
+        key = key.encode('utf-8')
+    return hashlib.sha1(key).hexdigest()
+
+
+def increment_user_state_summary_counter(usage_id, field_name, key, amount=1, shards=1):
+    """
+    Add `amount` to the count of `key` in the field `field_name` of the module
+    `usage_id`, in one of `shards` XModuleUserStateSummaryCounter rows.
+    """
+    lookup = {
+        'usage_id': usage_id,
+        'field_name': field_name,
+        'key_hash': counter_key_hash(key),
+        'shard': random.randrange(shards),
+    }
+    counter = XModuleUserStateSummaryCounter.objects.filter(**lookup)
+    # The row may not exist yet, or be deleted by a compaction between
+    # get_or_create and the update, so try again until one of them works
+    while not counter.update(count=F('count') + amount):
+        try:
+            _, created = XModuleUserStateSummaryCounter.objects.get_or_create(
+                defaults={'key': key, 'count': amount}, **lookup
+            )
+        except IntegrityError:
+            # Created by another request since this transaction started,
+            # so only the update can see it
+            continue
+        if created:
+            break
+
+
+def user_state_summary_counts(usage_id, field_name, keys=None):
+    """
+    The sum of the XModuleUserStateSummaryCounter rows of each key of the
+    field `field_name` of the module `usage_id`, or only of `keys` if given,
+    read in a single query.
+    """
+    counters = XModuleUserStateSummaryCounter.objects.filter(usage_id=usage_id, field_name=field_name)
+    if keys is not None:
+        counters = counters.filter(key_hash__in=[counter_key_hash(key) for key in keys])
+    # The rows of a key_hash all have the same key
+    return dict(
+        (row['key_text'], row['total'])
+        for row in counters.values('key_hash').annotate(key_text=Max('key'), total=Sum('count')).order_by()
+    )
+
+
+def compact_user_state_summary_counters(usage_id=None):
+    """
+    Merge the rows of each counter kept by UserStateSummaryCounters into the
+    one with the lowest shard, either of the module `usage_id` or of all
+    modules. Returns the number of rows deleted.
+
+    Each counter is merged in its own transaction, with its rows locked, so
+    increments made meanwhile wait or go to a new row, and none is lost.
+    """
+    counters = XModuleUserStateSummaryCounter.objects.all()
+    if usage_id is not None:
+        counters = counters.filter(usage_id=usage_id)
+    sharded = counters.values('usage_id', 'field_name', 'key_hash').annotate(rows=Count('id')).filter(rows__gt=1)
+
+    deleted = 0
+    for counter in list(sharded.order_by()):
+        lookup = dict((name, counter[name]) for name in ('usage_id', 'field_name', 'key_hash'))
+        with transaction.commit_on_success():
+            rows = list(
+                XModuleUserStateSummaryCounter.objects.select_for_update().filter(**lookup).order_by('shard')
+            )
+            if len(rows) < 2:
+                continue
+            merged, others = rows[0], rows[1:]
+            XModuleUserStateSummaryCounter.objects.filter(pk=merged.pk).update(
+                count=F('count') + sum(row.count for row in others)
+            )
+            XModuleUserStateSummaryCounter.objects.filter(pk__in=[row.pk for row in others]).delete()
+            deleted += len(others)
+    return deleted
+
@@ -14,7 +14,7 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 """
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
 
@@ -71,6 +71,38 @@ class StudentModule(models.Model):
         return unicode(repr(self))
 
 
+@receiver(post_init, sender=StudentModule)
+def remember_stored_score(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remember the score a StudentModule was loaded with, so that a change can be
+    detected when it is saved.
+    """
+    instance._stored_score = (instance.grade, instance.max_grade)  # pylint: disable=protected-access
+
+
+@receiver(post_save, sender=StudentModule)
+def update_section_score(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keep the persistent section score store up to date when a StudentModule is
+    created or its grade/max_grade change.
+    """
+    if created or instance._stored_score != (instance.grade, instance.max_grade):  # pylint: disable=protected-access
+        # Imported here, since grading needs the models defined in this file
+        from courseware.grades import update_stored_scores
+        update_stored_scores(instance)
+    instance._stored_score = (instance.grade, instance.max_grade)  # pylint: disable=protected-access
+
+
+@receiver(post_delete, sender=StudentModule)
+def remove_section_score(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keep the persistent section score store up to date when a StudentModule is
+    deleted, e.g. when an instructor resets a student's attempts.
+    """
+    from courseware.grades import update_stored_scores
+    update_stored_scores(instance, deleted=True)
+
+
 class StudentModuleHistory(models.Model):
     """Keeps a complete history of state changes for a given XModule for a given
     Student. Right now, we restrict this to problems so that the table doesn't
@@ -133,6 +165,49 @@ class XModuleUserStateSummaryField(models.Model):
         return unicode(repr(self))
 
 
+class XModuleUserStateSummaryCounter(models.Model):
+    """
+    Stores one shard of a counter kept in a Scope.user_state_summary field,
+    such as the votes for one answer of a poll. Each increment goes to a
+    random shard, so that concurrent increments rarely wait on the same row;
+    the value of the counter is the sum of its shards.
+    See courseware.model_data.UserStateSummaryCounters.
+    """
+
+    class Meta:
+        unique_together = (('usage_id', 'field_name', 'key_hash', 'shard'),)
+
+    # The name of the field
+    field_name = models.CharField(max_length=64)
+
+    # The definition id for the module
+    usage_id = models.CharField(max_length=255, db_index=True)
+
+    # What is counted, such as the id of an answer or a word
+    key = models.TextField()
+
+    # The sha1 hexdigest of key, which identifies the counter: keys can be
+    # longer than an indexed column, and the database collation may consider
+    # different keys equal (such as 'resume' and u'r\xe9sum\xe9' on MySQL)
+    key_hash = models.CharField(max_length=40)
+
+    shard = models.IntegerField(default=0)
+
+    count = models.IntegerField(default=0)
+
+    def __repr__(self):
+        return 'XModuleUserStateSummaryCounter<%r>' % ({
+            'field_name': self.field_name,
+            'usage_id': self.usage_id,
+            'key': self.key,
+            'shard': self.shard,
+            'count': self.count,
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+
 class XModuleStudentPrefsField(models.Model):
     """
     Stores data set in the Scope.preferences scope by an xmodule field
@@ -229,6 +304,47 @@ class OfflineComputedGradeLog(models.Model):
     created = models.DateTimeField(auto_now_add=True, null=True, db_index=True)
     seconds = models.IntegerField(default=0)  	# seconds elapsed for computation
     nstudents = models.IntegerField(default=0)
+    students_per_second = models.FloatField(default=0)  	# throughput of the computation
+    finished = models.BooleanField(default=True)  	# False while a parallel computation is running, or was interrupted
+
+    def __unicode__(self):
+        return "[OCGLog] %s: %s (%.1f students/sec)" % (self.course_id, self.created, self.students_per_second)
+
+
+class StudentSectionScore(models.Model):
+    """
+    Persisted scores of one student for every problem in one graded section
+    (subsection) of a course, kept up to date as StudentModule grades change.
+    See courseware.grade_store.
+    """
+    class Meta:
+        unique_together = (('student', 'course_id', 'section_id'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = models.CharField(max_length=255, db_index=True)
+    # Location url of the section
+    section_id = models.CharField(max_length=255)
+
+    # grade_store.store_version() of the course structure the scores were computed for
+    version = models.CharField(max_length=40)
+
+    # JSON list of [problem location url, earned, possible, graded], in grading order
+    scores = models.TextField(default='[]')
+
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __unicode__(self):
+        return "[StudentSectionScore] %s: %s %s = %s" % (self.student, self.course_id, self.section_id, self.scores)
+
+
+class SectionScoreStoreState(models.Model):
+    """
+    Records that the StudentSectionScore rows of a course were (re)built for a
+    given version of the course structure, and so can be trusted for grading.
+    """
+    course_id = models.CharField(max_length=255, unique=True)
+    version = models.CharField(max_length=40)
+    rebuilt = models.DateTimeField(auto_now=True)
 
     def __unicode__(self):
-        return "[OCGLog] %s: %s" % (self.course_id, self.created)
+        return "[SectionScoreStoreState] %s: %s (%s)" % (self.course_id, self.version, self.rebuilt)
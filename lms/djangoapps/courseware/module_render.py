@@ -25,7 +25,7 @@ from xmodule.modulestore import Location
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.x_module import ModuleSystem
-from xmodule_modifiers import replace_course_urls, replace_jump_to_id_urls, replace_static_urls, add_histogram, wrap_xblock
+from xmodule_modifiers import replace_urls, add_histogram, wrap_xblock
 
 import static_replace
 from psychometrics.psychoanalyze import make_psychometrics_data_update_handler
@@ -33,7 +33,8 @@ from student.models import unique_id_for_user
 
 from courseware.access import has_access
 from courseware.masquerade import setup_masquerade
-from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.model_data import FieldDataCache, DjangoKeyValueStore, UserStateSummaryCounters
+from courseware.outline import course_outline
 from xblock.runtime import KeyValueStore
 from xblock.fields import Scope
 from util.sandboxing import can_execute_unsafe_code
@@ -88,9 +89,54 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
     NOTE: assumes that if we got this far, user has access to course.  Returns
     None if this is not the case.
 
+    The chapters and sections come from the cached course outline when there is
+    one, which doesn't need any modules to be loaded. Otherwise,
     field_data_cache must include data from the course module and 2 levels of its descendents
     '''
 
+    chapters = course_outline(course)
+    if chapters is None:
+        return _toc_from_modules(user, request, course, active_chapter, active_section, field_data_cache)
+
+    # The same checks get_module_for_descriptor would make of the course
+    if has_access(user, course, 'staff', course.id):
+        setup_masquerade(request, True)
+    if not has_access(user, course, 'load', course.id):
+        return None
+
+    toc = list()
+    for chapter in chapters:
+        if chapter.hide_from_toc or not has_access(user, chapter, 'load', course.id):
+            continue
+
+        sections = list()
+        for section in chapter.children:
+            if section.hide_from_toc or not has_access(user, section, 'load', course.id):
+                continue
+
+            active = (chapter.url_name == active_chapter and
+                      section.url_name == active_section)
+
+            sections.append({'display_name': section.display_name,
+                             'url_name': section.url_name,
+                             'format': section.format,
+                             'due': section.due,
+                             'active': active,
+                             'graded': section.graded,
+                             })
+
+        toc.append({'display_name': chapter.display_name,
+                    'url_name': chapter.url_name,
+                    'sections': sections,
+                    'active': chapter.url_name == active_chapter})
+    return toc
+
+
+def _toc_from_modules(user, request, course, active_chapter, active_section, field_data_cache):
+    '''
+    toc_for_course for courses without a shareable outline, read from the
+    course's modules.
+    '''
     course_module = get_module_for_descriptor(user, request, course, field_data_cache, course.id)
     if course_module is None:
         return None
@@ -196,245 +242,351 @@ def get_module_for_descriptor(user, request, descriptor, field_data_cache, cours
     if has_access(user, descriptor, 'staff', course_id):
         setup_masquerade(request, True)
 
-    track_function = make_track_function(request)
-    xqueue_callback_url_prefix = get_xqueue_callback_url_prefix(request)
-
     return get_module_for_descriptor_internal(user, descriptor, field_data_cache, course_id,
-                                              track_function, xqueue_callback_url_prefix,
+                                              None, None,
                                               position, wrap_xmodule_display, grade_bucket_type,
-                                              static_asset_path)
+                                              static_asset_path,
+                                              system_factory=module_system_factory(request, user, course_id))
+
+
+def module_system_factory(request, user, course_id):
+    """
+    Returns the ModuleSystemFactory for the modules `user` loads in `course_id`
+    during `request`.
+
+    The factory of the request's own user is kept on the request, and made the
+    first time it's asked for. Other users, such as the students a gradebook
+    grades one after the other, get a new factory each time, so that the
+    request doesn't hold on to one for each of them.
+    """
+    request_user = getattr(request, 'user', None)
+    if request_user is not user and (request_user is None or user.id is None or request_user.id != user.id):
+        return ModuleSystemFactory(
+            user, course_id, make_track_function(request), get_xqueue_callback_url_prefix(request)
+        )
+
+    factories = getattr(request, '_module_system_factories', None)
+    if not isinstance(factories, dict):
+        factories = request._module_system_factories = {}  # pylint: disable=protected-access
+
+    if course_id not in factories:
+        factories[course_id] = ModuleSystemFactory(
+            user, course_id, make_track_function(request), get_xqueue_callback_url_prefix(request)
+        )
+    return factories[course_id]
+
+
+def module_constructions(request):
+    """
+    The number of modules constructed by the ModuleSystemFactories kept on
+    `request`, for its own user
+    """
+    factories = getattr(request, '_module_system_factories', None)
+    if not isinstance(factories, dict):
+        return 0
+    return sum(factory.modules_built for factory in factories.values())
 
 
 def get_module_for_descriptor_internal(user, descriptor, field_data_cache, course_id,
                                        track_function, xqueue_callback_url_prefix,
                                        position=None, wrap_xmodule_display=True, grade_bucket_type=None,
-                                       static_asset_path=''):
+                                       static_asset_path='', system_factory=None):
     """
     Actually implement get_module, without requiring a request.
 
+    system_factory: the ModuleSystemFactory for `user` and `course_id` to build the
+        module's system with. If it isn't given, one is made from `track_function`
+        and `xqueue_callback_url_prefix`, which are ignored otherwise.
+
     See get_module() docstring for further details.
     """
+    if system_factory is None:
+        system_factory = ModuleSystemFactory(user, course_id, track_function, xqueue_callback_url_prefix)
 
-    # Short circuit--if the user shouldn't have access, bail without doing any work
-    if not has_access(user, descriptor, 'load', course_id):
-        return None
+    return system_factory.get_module(descriptor, field_data_cache, position, wrap_xmodule_display,
+                                     grade_bucket_type, static_asset_path)
 
-    student_data = DbModel(DjangoKeyValueStore(field_data_cache))
-    descriptor._field_data = lms_field_data(descriptor._field_data, student_data)
 
-    # Setup system context for module instance
-    ajax_url = reverse(
-        'modx_dispatch',
-        kwargs=dict(
+class ModuleSystemFactory(object):
+    """
+    Builds the ModuleSystems of the modules a user loads in a course.
+
+    Everything those systems share (urls, the user's anonymous id, their staff
+    access, the url replacing functions) is worked out once, so loading a
+    container and all its children doesn't work it out again for every child.
+    """
+    def __init__(self, user, course_id, track_function, xqueue_callback_url_prefix):
+        self.user = user
+        self.course_id = course_id
+        self.track_function = track_function
+        self.xqueue_callback_url_prefix = xqueue_callback_url_prefix
+
+        # NOTE: module_id is empty string here. The 'module_id' will get assigned in the replacement
+        # function, we just need to specify something to get the reverse() to work.
+        self.jump_to_id_base_url = reverse('jump_to_id', kwargs={'course_id': course_id, 'module_id': ''})
+        self.anonymous_student_id = unique_id_for_user(user)
+        self.replace_course_urls = partial(
+            static_replace.replace_course_urls,
+            course_id=course_id
+        )
+        self.replace_jump_to_id_urls = partial(
+            static_replace.replace_jump_to_id_urls,
             course_id=course_id,
-            location=descriptor.location.url(),
-            dispatch=''
-        ),
-    )
-    # Intended use is as {ajax_url}/{dispatch_command}, so get rid of the trailing slash.
-    ajax_url = ajax_url.rstrip('/')
+            jump_to_id_base_url=self.jump_to_id_base_url
+        )
+        self.can_execute_unsafe_code = lambda: can_execute_unsafe_code(course_id)
+        self.user_state_summary_counters = UserStateSummaryCounters(settings.USER_STATE_SUMMARY_COUNTER_SHARDS)
+
+        self._staff_access = {}
+        self._block_wrappers = {}
+        # How replace_urls resolved static urls for the blocks of this request
+        self._url_cache = {}
+        # The number of modules this has built, for instrumentation
+        self.modules_built = 0
+
+    def has_staff_access(self, location):
+        """
+        Whether the user has staff access to `location`. That only depends on the
+        course of the location and the course run, so it's only checked once for
+        each of those.
+        """
+        course_run = location.course_id if location.category == 'course' else self.course_id
+        key = (location.course, course_run)
+        if key not in self._staff_access:
+            self._staff_access[key] = has_access(self.user, location, 'staff', self.course_id)
+        return self._staff_access[key]
+
+    def block_wrappers(self, descriptor, wrap_xmodule_display, static_asset_path):
+        """
+        Returns a list of wrapping functions that will be applied in order to the
+        Fragment content coming out of the xblocks that are about to be rendered.
+        """
+        data_dir = getattr(descriptor, 'data_dir', None)
+        show_histogram = (
+            settings.MITX_FEATURES.get('DISPLAY_HISTOGRAMS_TO_STAFF') and
+            self.has_staff_access(descriptor.location)
+        )
+        key = (wrap_xmodule_display, data_dir, static_asset_path, show_histogram)
+        if key not in self._block_wrappers:
+            block_wrappers = []
+
+            # Wrap the output display in a single div to allow for the XModule
+            # javascript to be bound correctly
+            if wrap_xmodule_display is True:
+                block_wrappers.append(wrap_xblock)
+
+            # TODO (cpennington): When modules are shared between courses, the static
+            # prefix is going to have to be specific to the module, not the directory
+            # that the xml was loaded from
+
+            # Rewrite urls beginning in /static to point to course-specific content,
+            # allow URLs of the form '/course/' to refer to the root of multicourse
+            # directory hierarchy of this course, and rewrite intra-courseware links
+            # (/jump_to_id/<id>), all in one pass. The jump_to_id format is an
+            # improvement over the /course/... format for studio authored courses,
+            # because it is agnostic to course-hierarchy.
+            block_wrappers.append(partial(
+                replace_urls,
+                data_dir,
+                self.course_id,
+                self.jump_to_id_base_url,
+                static_asset_path=static_asset_path,
+                url_cache=self._url_cache,
+            ))
+
+            if show_histogram:
+                block_wrappers.append(partial(add_histogram, self.user))
+
+            self._block_wrappers[key] = block_wrappers
+
+        # Runtimes may add wrappers of their own, so each gets its own list
+        return list(self._block_wrappers[key])
+
+    def get_module(self, descriptor, field_data_cache, position=None, wrap_xmodule_display=True,
+                   grade_bucket_type=None, static_asset_path=''):
+        """
+        Bind `descriptor` to a ModuleSystem for the user, and return it, or None
+        if the user doesn't have access to it.
+
+        See get_module() docstring for details of the arguments.
+        """
+        user = self.user
+        course_id = self.course_id
+
+        # Short circuit--if the user shouldn't have access, bail without doing any work
+        if not has_access(user, descriptor, 'load', course_id):
+            return None
+
+        self.modules_built += 1
+
+        student_data = DbModel(DjangoKeyValueStore(field_data_cache))
+        descriptor._field_data = lms_field_data(descriptor._field_data, student_data)
 
-    def make_xqueue_callback(dispatch='score_update'):
-        # Fully qualified callback URL for external queueing system
-        relative_xqueue_callback_url = reverse(
-            'xqueue_callback',
+        # Setup system context for module instance
+        ajax_url = reverse(
+            'modx_dispatch',
             kwargs=dict(
                 course_id=course_id,
-                userid=str(user.id),
-                mod_id=descriptor.location.url(),
-                dispatch=dispatch
+                location=descriptor.location.url(),
+                dispatch=''
             ),
         )
-        return xqueue_callback_url_prefix + relative_xqueue_callback_url
-
-    # Default queuename is course-specific and is derived from the course that
-    #   contains the current module.
-    # TODO: Queuename should be derived from 'course_settings.json' of each course
-    xqueue_default_queuename = descriptor.location.org + '-' + descriptor.location.course
-
-    xqueue = {
-        'interface': xqueue_interface,
-        'construct_callback': make_xqueue_callback,
-        'default_queuename': xqueue_default_queuename.replace(' ', '_'),
-        'waittime': settings.XQUEUE_WAITTIME_BETWEEN_REQUESTS
-    }
-
-    # This is a hacky way to pass settings to the combined open ended xmodule
-    # It needs an S3 interface to upload images to S3
-    # It needs the open ended grading interface in order to get peer grading to be done
-    # this first checks to see if the descriptor is the correct one, and only sends settings if it is
-
-    # Get descriptor metadata fields indicating needs for various settings
-    needs_open_ended_interface = getattr(descriptor, "needs_open_ended_interface", False)
-    needs_s3_interface = getattr(descriptor, "needs_s3_interface", False)
-
-    # Initialize interfaces to None
-    open_ended_grading_interface = None
-    s3_interface = None
-
-    # Create interfaces if needed
-    if needs_open_ended_interface:
-        open_ended_grading_interface = settings.OPEN_ENDED_GRADING_INTERFACE
-        open_ended_grading_interface['mock_peer_grading'] = settings.MOCK_PEER_GRADING
-        open_ended_grading_interface['mock_staff_grading'] = settings.MOCK_STAFF_GRADING
-    if needs_s3_interface:
-        s3_interface = {
-            'access_key': getattr(settings, 'AWS_ACCESS_KEY_ID', ''),
-            'secret_access_key': getattr(settings, 'AWS_SECRET_ACCESS_KEY', ''),
-            'storage_bucket_name': getattr(settings, 'AWS_STORAGE_BUCKET_NAME', 'openended')
+        # Intended use is as {ajax_url}/{dispatch_command}, so get rid of the trailing slash.
+        ajax_url = ajax_url.rstrip('/')
+
+        def make_xqueue_callback(dispatch='score_update'):
+            # Fully qualified callback URL for external queueing system
+            relative_xqueue_callback_url = reverse(
+                'xqueue_callback',
+                kwargs=dict(
+                    course_id=course_id,
+                    userid=str(user.id),
+                    mod_id=descriptor.location.url(),
+                    dispatch=dispatch
+                ),
+            )
+            return self.xqueue_callback_url_prefix + relative_xqueue_callback_url
+
+        # Default queuename is course-specific and is derived from the course that
+        #   contains the current module.
+        # TODO: Queuename should be derived from 'course_settings.json' of each course
+        xqueue_default_queuename = descriptor.location.org + '-' + descriptor.location.course
+
+        xqueue = {
+            'interface': xqueue_interface,
+            'construct_callback': make_xqueue_callback,
+            'default_queuename': xqueue_default_queuename.replace(' ', '_'),
+            'waittime': settings.XQUEUE_WAITTIME_BETWEEN_REQUESTS
         }
 
-    def inner_get_module(descriptor):
-        """
-        Delegate to get_module_for_descriptor_internal() with all values except `descriptor` set.
-
-        Because it does an access check, it may return None.
-        """
-        # TODO: fix this so that make_xqueue_callback uses the descriptor passed into
-        # inner_get_module, not the parent's callback.  Add it as an argument....
-        return get_module_for_descriptor_internal(user, descriptor, field_data_cache, course_id,
-                                                  track_function, make_xqueue_callback,
-                                                  position, wrap_xmodule_display, grade_bucket_type,
-                                                  static_asset_path)
-
-    def publish(event):
-        """A function that allows XModules to publish events. This only supports grade changes right now."""
-        if event.get('event_name') != 'grade':
-            return
-
-        # Construct the key for the module
-        key = KeyValueStore.Key(
-            scope=Scope.user_state,
-            user_id=user.id,
-            block_scope_id=descriptor.location,
-            field_name='grade'
-        )
+        # This is a hacky way to pass settings to the combined open ended xmodule
+        # It needs an S3 interface to upload images to S3
+        # It needs the open ended grading interface in order to get peer grading to be done
+        # this first checks to see if the descriptor is the correct one, and only sends settings if it is
+
+        # Get descriptor metadata fields indicating needs for various settings
+        needs_open_ended_interface = getattr(descriptor, "needs_open_ended_interface", False)
+        needs_s3_interface = getattr(descriptor, "needs_s3_interface", False)
+
+        # Initialize interfaces to None
+        open_ended_grading_interface = None
+        s3_interface = None
+
+        # Create interfaces if needed
+        if needs_open_ended_interface:
+            open_ended_grading_interface = settings.OPEN_ENDED_GRADING_INTERFACE
+            open_ended_grading_interface['mock_peer_grading'] = settings.MOCK_PEER_GRADING
+            open_ended_grading_interface['mock_staff_grading'] = settings.MOCK_STAFF_GRADING
+        if needs_s3_interface:
+            s3_interface = {
+                'access_key': getattr(settings, 'AWS_ACCESS_KEY_ID', ''),
+                'secret_access_key': getattr(settings, 'AWS_SECRET_ACCESS_KEY', ''),
+                'storage_bucket_name': getattr(settings, 'AWS_STORAGE_BUCKET_NAME', 'openended')
+            }
+
+        def inner_get_module(descriptor):
+            """
+            Delegate to get_module() with all values except `descriptor` set.
+
+            Because it does an access check, it may return None.
+            """
+            return self.get_module(descriptor, field_data_cache, position, wrap_xmodule_display,
+                                   grade_bucket_type, static_asset_path)
+
+        def publish(event):
+            """A function that allows XModules to publish events. This only supports grade changes right now."""
+            if event.get('event_name') != 'grade':
+                return
+
+            # Construct the key for the module
+            key = KeyValueStore.Key(
+                scope=Scope.user_state,
+                user_id=user.id,
+                block_scope_id=descriptor.location,
+                field_name='grade'
+            )
 
-        student_module = field_data_cache.find_or_create(key)
-        # Update the grades
-        student_module.grade = event.get('value')
-        student_module.max_grade = event.get('max_value')
-        # Save all changes to the underlying KeyValueStore
-        student_module.save()
-
-        # Bin score into range and increment stats
-        score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
-        org, course_num, run = course_id.split("/")
-
-        tags = [
-            "org:{0}".format(org),
-            "course:{0}".format(course_num),
-            "run:{0}".format(run),
-            "score_bucket:{0}".format(score_bucket)
-        ]
-
-        if grade_bucket_type is not None:
-            tags.append('type:%s' % grade_bucket_type)
-
-        dog_stats_api.increment("lms.courseware.question_answered", tags=tags)
-
-    # Build a list of wrapping functions that will be applied in order
-    # to the Fragment content coming out of the xblocks that are about to be rendered.
-    block_wrappers = []
-
-    # Wrap the output display in a single div to allow for the XModule
-    # javascript to be bound correctly
-    if wrap_xmodule_display is True:
-        block_wrappers.append(wrap_xblock)
-
-    # TODO (cpennington): When modules are shared between courses, the static
-    # prefix is going to have to be specific to the module, not the directory
-    # that the xml was loaded from
-
-    # Rewrite urls beginning in /static to point to course-specific content
-    block_wrappers.append(partial(
-        replace_static_urls,
-        getattr(descriptor, 'data_dir', None),
-        course_id=course_id,
-        static_asset_path=static_asset_path or descriptor.static_asset_path
-    ))
-
-    # Allow URLs of the form '/course/' refer to the root of multicourse directory
-    #   hierarchy of this course
-    block_wrappers.append(partial(replace_course_urls, course_id))
-
-    # this will rewrite intra-courseware links (/jump_to_id/<id>). This format
-    # is an improvement over the /course/... format for studio authored courses,
-    # because it is agnostic to course-hierarchy.
-    # NOTE: module_id is empty string here. The 'module_id' will get assigned in the replacement
-    # function, we just need to specify something to get the reverse() to work.
-    block_wrappers.append(partial(
-        replace_jump_to_id_urls,
-        course_id,
-        reverse('jump_to_id', kwargs={'course_id': course_id, 'module_id': ''}),
-    ))
-
-    if settings.MITX_FEATURES.get('DISPLAY_HISTOGRAMS_TO_STAFF'):
-        if has_access(user, descriptor, 'staff', course_id):
-            block_wrappers.append(partial(add_histogram, user))
-
-    system = ModuleSystem(
-        track_function=track_function,
-        render_template=render_to_string,
-        static_url=settings.STATIC_URL,
-        ajax_url=ajax_url,
-        xqueue=xqueue,
-        # TODO (cpennington): Figure out how to share info between systems
-        filestore=descriptor.runtime.resources_fs,
-        get_module=inner_get_module,
-        user=user,
-        debug=settings.DEBUG,
-        hostname=settings.SITE_NAME,
-        # TODO (cpennington): This should be removed when all html from
-        # a module is coming through get_html and is therefore covered
-        # by the replace_static_urls code below
-        replace_urls=partial(
-            static_replace.replace_static_urls,
-            data_directory=getattr(descriptor, 'data_dir', None),
-            course_id=course_id,
-            static_asset_path=static_asset_path or descriptor.static_asset_path,
-        ),
-        replace_course_urls=partial(
-            static_replace.replace_course_urls,
-            course_id=course_id
-        ),
-        replace_jump_to_id_urls=partial(
-            static_replace.replace_jump_to_id_urls,
+            student_module = field_data_cache.find_or_create(key)
+            # Update the grades
+            student_module.grade = event.get('value')
+            student_module.max_grade = event.get('max_value')
+            # Save all changes to the underlying KeyValueStore
+            student_module.save()
+
+            # Bin score into range and increment stats
+            score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
+            org, course_num, run = course_id.split("/")
+
+            tags = [
+                "org:{0}".format(org),
+                "course:{0}".format(course_num),
+                "run:{0}".format(run),
+                "score_bucket:{0}".format(score_bucket)
+            ]
+
+            if grade_bucket_type is not None:
+                tags.append('type:%s' % grade_bucket_type)
+
+            dog_stats_api.increment("lms.courseware.question_answered", tags=tags)
+
+        system = ModuleSystem(
+            track_function=self.track_function,
+            render_template=render_to_string,
+            static_url=settings.STATIC_URL,
+            ajax_url=ajax_url,
+            xqueue=xqueue,
+            # TODO (cpennington): Figure out how to share info between systems
+            filestore=descriptor.runtime.resources_fs,
+            get_module=inner_get_module,
+            user=user,
+            debug=settings.DEBUG,
+            hostname=settings.SITE_NAME,
+            # TODO (cpennington): This should be removed when all html from
+            # a module is coming through get_html and is therefore covered
+            # by the replace_static_urls code below
+            replace_urls=partial(
+                static_replace.replace_static_urls,
+                data_directory=getattr(descriptor, 'data_dir', None),
+                course_id=course_id,
+                static_asset_path=static_asset_path or descriptor.static_asset_path,
+            ),
+            replace_course_urls=self.replace_course_urls,
+            replace_jump_to_id_urls=self.replace_jump_to_id_urls,
+            node_path=settings.NODE_PATH,
+            publish=publish,
+            anonymous_student_id=self.anonymous_student_id,
             course_id=course_id,
-            jump_to_id_base_url=reverse('jump_to_id', kwargs={'course_id': course_id, 'module_id': ''})
-        ),
-        node_path=settings.NODE_PATH,
-        publish=publish,
-        anonymous_student_id=unique_id_for_user(user),
-        course_id=course_id,
-        open_ended_grading_interface=open_ended_grading_interface,
-        s3_interface=s3_interface,
-        cache=cache,
-        can_execute_unsafe_code=(lambda: can_execute_unsafe_code(course_id)),
-        # TODO: When we merge the descriptor and module systems, we can stop reaching into the mixologist (cpennington)
-        mixins=descriptor.runtime.mixologist._mixins,  # pylint: disable=protected-access
-        wrappers=block_wrappers,
-    )
-
-    # pass position specified in URL to module through ModuleSystem
-    system.set('position', position)
-    if settings.MITX_FEATURES.get('ENABLE_PSYCHOMETRICS'):
-        system.set(
-            'psychometrics_handler',  # set callback for updating PsychometricsData
-            make_psychometrics_data_update_handler(course_id, user, descriptor.location.url())
+            open_ended_grading_interface=open_ended_grading_interface,
+            s3_interface=s3_interface,
+            cache=cache,
+            can_execute_unsafe_code=self.can_execute_unsafe_code,
+            user_state_summary_counters=self.user_state_summary_counters,
+            # TODO: When we merge the descriptor and module systems, we can stop reaching into the mixologist (cpennington)
+            mixins=descriptor.runtime.mixologist._mixins,  # pylint: disable=protected-access
+            wrappers=self.block_wrappers(
+                descriptor, wrap_xmodule_display, static_asset_path or descriptor.static_asset_path
+            ),
         )
 
-    system.set('user_is_staff', has_access(user, descriptor.location, 'staff', course_id))
+        # pass position specified in URL to module through ModuleSystem
+        system.set('position', position)
+        if settings.MITX_FEATURES.get('ENABLE_PSYCHOMETRICS'):
+            system.set(
+                'psychometrics_handler',  # set callback for updating PsychometricsData
+                make_psychometrics_data_update_handler(course_id, user, descriptor.location.url())
+            )
+
+        system.set('user_is_staff', self.has_staff_access(descriptor.location))
 
-    # make an ErrorDescriptor -- assuming that the descriptor's system is ok
-    if has_access(user, descriptor.location, 'staff', course_id):
-        system.error_descriptor_class = ErrorDescriptor
-    else:
-        system.error_descriptor_class = NonStaffErrorDescriptor
+        # make an ErrorDescriptor -- assuming that the descriptor's system is ok
+        if self.has_staff_access(descriptor.location):
+            system.error_descriptor_class = ErrorDescriptor
+        else:
+            system.error_descriptor_class = NonStaffErrorDescriptor
 
-    descriptor.xmodule_runtime = system
-    descriptor.scope_ids = descriptor.scope_ids._replace(user_id=user.id)
-    return descriptor
+        descriptor.xmodule_runtime = system
+        descriptor.scope_ids = descriptor.scope_ids._replace(user_id=user.id)
+        return descriptor
 
 
 def find_target_student_module(request, user_id, course_id, mod_id):
@@ -0,0 +1,117 @@
+"""
+The outline of a course: its chapters and their sections, as shown in the
+courseware navigation.
+
+Building the navigation from XModules means binding the course and every
+chapter and section to a user, just to read a few settings. The outline reads
+them from the descriptors instead, once per version of the course, and keeps
+them in the cache. Only what depends on the user (which items they can see,
+and which are active) is worked out per request, by toc_for_course.
+"""
+from collections import namedtuple
+import logging
+
+from django.core.cache import cache
+
+from xmodule.error_module import ErrorDescriptor
+from xmodule.modulestore.django import course_contents_version
+from xmodule.x_module import XModule
+
+log = logging.getLogger(__name__)
+
+# how long an outline stays in the cache; new versions of the course get new
+# keys, so this only bounds how long unused outlines linger
+OUTLINE_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class OutlineItem(namedtuple('OutlineItem', [
+        'location', 'url_name', 'display_name', 'format', 'due', 'graded',
+        'hide_from_toc', 'start', 'days_early_for_beta', 'is_error', 'children'])):
+    """
+    A chapter or section of a course outline. It has what has_access needs to
+    decide whether a user can load the descriptor it was made from.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_descriptor(cls, descriptor, children=()):
+        """Returns the OutlineItem of `descriptor`, with `children`"""
+        return cls(
+            location=descriptor.location,
+            url_name=descriptor.url_name,
+            display_name=descriptor.display_name_with_default,
+            format=descriptor.format if descriptor.format is not None else '',
+            due=descriptor.due,
+            graded=descriptor.graded,
+            hide_from_toc=descriptor.hide_from_toc,
+            start=descriptor.start,
+            days_early_for_beta=descriptor.days_early_for_beta,
+            is_error=isinstance(descriptor, ErrorDescriptor),
+            children=tuple(children),
+        )
+
+
+class UnsupportedOutline(Exception):
+    """
+    Raised when what a user sees of a course's outline depends on more than
+    access to its items (e.g. an A/B test), so the outline can't be shared.
+    """
+    pass
+
+
+def _check_display_items(descriptor):
+    """
+    Raise UnsupportedOutline unless the XModule of `descriptor` displays its
+    own children as they are, like XModule does.
+    """
+    module_class = getattr(descriptor, 'module_class', None)
+    if module_class is None or not issubclass(module_class, XModule):
+        raise UnsupportedOutline(descriptor.location)
+    for method in ('displayable_items', 'get_child_descriptors', 'get_display_items'):
+        if getattr(module_class, method).im_func is not getattr(XModule, method).im_func:
+            raise UnsupportedOutline(descriptor.location)
+
+
+def build_course_outline(course):
+    """
+    Returns a tuple of the OutlineItems of the chapters of `course`, each with
+    its sections as children, read from the descriptors.
+
+    Raises UnsupportedOutline if the outline can't be shared between users.
+    """
+    _check_display_items(course)
+    chapters = []
+    for chapter in course.get_children():
+        _check_display_items(chapter)
+        sections = []
+        for section in chapter.get_children():
+            _check_display_items(section)
+            sections.append(OutlineItem.from_descriptor(section))
+        chapters.append(OutlineItem.from_descriptor(chapter, sections))
+    return tuple(chapters)
+
+
+def outline_cache_key(course, version):
+    """Cache key of the outline of `course` at `version`"""
+    return u"courseware.outline.{0}.{1}".format(course.id, version).encode('utf-8')
+
+
+def course_outline(course):
+    """
+    Returns the outline of `course` (see build_course_outline), from the cache
+    if the course hasn't changed since it was built, or None if it can't be
+    shared between users.
+    """
+    key = outline_cache_key(course, course_contents_version(course))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached['chapters']
+
+    try:
+        chapters = build_course_outline(course)
+    except UnsupportedOutline as err:
+        log.debug("Not caching the outline of %s, because of %s", course.id, err)
+        chapters = None
+
+    cache.set(key, {'chapters': chapters}, OUTLINE_CACHE_TIMEOUT)
+    return chapters
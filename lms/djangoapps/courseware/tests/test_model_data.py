@@ -2,12 +2,15 @@
 Test for lms courseware app, module data (runtime data storage for XBlocks)
 """
 import json
+import threading
+import unittest
 from mock import Mock, patch
 from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
 from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule, XModuleUserStateSummaryField
+from courseware.model_data import UserStateSummaryCounters, compact_user_state_summary_counters
+from courseware.models import StudentModule, XModuleUserStateSummaryField, XModuleUserStateSummaryCounter
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -17,8 +20,9 @@ from courseware.tests.factories import StudentPrefsFactory, StudentInfoFactory
 
 from xblock.fields import Scope, BlockScope
 from xmodule.modulestore import Location
-from django.test import TestCase
-from django.db import DatabaseError
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase
+from django.db import DatabaseError, connection
 from xblock.core import KeyValueMultiSaveError
 
 
@@ -304,3 +308,119 @@ class TestStudentInfoStorage(StorageTestBase, TestCase):
     scope = Scope.user_info
     key_factory = user_info_key
     storage_class = XModuleStudentInfoField
+
+
+class TestUserStateSummaryCounters(TestCase):
+    def setUp(self):
+        self.counters = UserStateSummaryCounters(shards=4)
+        self.block = Mock(location=location('def_id'), poll_answers={'Yes': 2})
+
+    def counter_rows(self):
+        return XModuleUserStateSummaryCounter.objects.filter(usage_id=location('def_id').url())
+
+    def test_totals_add_to_field_value(self):
+        for _ in xrange(3):
+            self.counters.increment(self.block, 'poll_answers', 'Yes')
+        self.counters.increment(self.block, 'poll_answers', 'No', 5)
+        self.counters.increment(self.block, 'poll_answers', 'No', -1)
+        self.assertEquals({'Yes': 5, 'No': 4}, self.counters.totals(self.block, 'poll_answers'))
+        # the value of the field itself is left alone
+        self.assertEquals({'Yes': 2}, self.block.poll_answers)
+
+    def test_totals_of_keys(self):
+        self.counters.increment(self.block, 'poll_answers', 'Yes')
+        self.counters.increment(self.block, 'poll_answers', 'No', 5)
+        self.counters.increment(self.block, 'poll_answers', 'Maybe')
+        self.assertEquals({'Yes': 3, 'No': 5}, self.counters.totals(self.block, 'poll_answers', ['Yes', 'No', 'Never']))
+        self.assertEquals({}, self.counters.totals(self.block, 'poll_answers', []))
+
+    def test_similar_keys(self):
+        # Keys that MySQL's collation considers equal, or that only differ
+        # after 255 characters, are counted apart
+        long_key = 'a' * 300
+        keys = ['resume', u'r\xe9sum\xe9', 'Resume', long_key + 'x', long_key + 'y']
+        for count, key in enumerate(keys, 1):
+            for _ in xrange(count):
+                self.counters.increment(self.block, 'poll_answers', key)
+        expected = dict((key, count) for count, key in enumerate(keys, 1))
+        expected['Yes'] = 2
+        self.assertEquals(expected, self.counters.totals(self.block, 'poll_answers'))
+
+        compact_user_state_summary_counters()
+        self.assertEquals(len(keys), self.counter_rows().count())
+        self.assertEquals(expected, self.counters.totals(self.block, 'poll_answers'))
+
+    def test_interleaved_requests(self):
+        # Two students load the poll, then both vote: rewriting the field would
+        # keep only the last vote
+        other_block = Mock(location=location('def_id'), poll_answers={'Yes': 2})
+        self.counters.totals(self.block, 'poll_answers')
+        self.counters.totals(other_block, 'poll_answers')
+        self.counters.increment(self.block, 'poll_answers', 'Yes')
+        self.counters.increment(other_block, 'poll_answers', 'Yes')
+        self.assertEquals({'Yes': 4}, self.counters.totals(other_block, 'poll_answers'))
+
+    def test_compaction(self):
+        for _ in xrange(50):
+            self.counters.increment(self.block, 'poll_answers', 'Yes')
+            self.counters.increment(self.block, 'poll_answers', 'No')
+        rows = self.counter_rows().count()
+        self.assertGreater(rows, 2)
+
+        self.assertEquals(rows - 2, compact_user_state_summary_counters())
+        self.assertEquals(2, self.counter_rows().count())
+        self.assertEquals({'Yes': 52, 'No': 50}, self.counters.totals(self.block, 'poll_answers'))
+
+        # increments to the shards merged away make new rows
+        for _ in xrange(20):
+            self.counters.increment(self.block, 'poll_answers', 'Yes')
+        self.assertEquals({'Yes': 72, 'No': 50}, self.counters.totals(self.block, 'poll_answers'))
+
+    def test_compaction_of_one_module(self):
+        other_block = Mock(location=location('other_id'), poll_answers={})
+        for _ in xrange(20):
+            self.counters.increment(self.block, 'poll_answers', 'Yes')
+            self.counters.increment(other_block, 'poll_answers', 'Yes')
+
+        compact_user_state_summary_counters(location('def_id').url())
+        self.assertEquals(1, self.counter_rows().count())
+        self.assertGreater(XModuleUserStateSummaryCounter.objects.filter(usage_id=location('other_id').url()).count(), 1)
+        self.assertEquals({'Yes': 20}, self.counters.totals(other_block, 'poll_answers'))
+
+
+@unittest.skipIf(
+    settings.DATABASES['default']['ENGINE'].endswith('sqlite3'),
+    "Each thread gets its own in-memory sqlite database"
+)
+class TestConcurrentUserStateSummaryCounters(TransactionTestCase):
+    def test_no_lost_increments(self):
+        counters = UserStateSummaryCounters(shards=4)
+        block = Mock(location=location('def_id'), poll_answers={})
+        done = threading.Event()
+
+        def vote():
+            try:
+                for _ in xrange(50):
+                    counters.increment(block, 'poll_answers', 'Yes')
+            finally:
+                connection.close()
+
+        def compact():
+            try:
+                while not done.is_set():
+                    compact_user_state_summary_counters()
+            finally:
+                connection.close()
+
+        compactor = threading.Thread(target=compact)
+        compactor.start()
+        voters = [threading.Thread(target=vote) for _ in xrange(8)]
+        for voter in voters:
+            voter.start()
+        for voter in voters:
+            voter.join()
+        done.set()
+        compactor.join()
+
+        self.assertEquals({'Yes': 400}, counters.totals(block, 'poll_answers'))
+
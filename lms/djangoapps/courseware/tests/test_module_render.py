@@ -261,6 +261,56 @@ class TestTOC(TestCase):
             self.assertIn(toc_section, actual)
 
 
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestModuleSystemFactory(TestCase):
+    """Check that the modules of a request share what their systems have in common"""
+    def setUp(self):
+        self.course_id = 'edX/toy/2012_Fall'
+        self.toy_course = modulestore().get_course(self.course_id)
+        self.portal_user = UserFactory()
+        self.request = RequestFactory().get('/courses/{0}/courseware'.format(self.course_id))
+        self.request.user = self.portal_user
+        self.field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            self.toy_course.id, self.portal_user, self.toy_course, depth=2)
+
+    def test_factory_per_request(self):
+        factory = render.module_system_factory(self.request, self.portal_user, self.course_id)
+        self.assertIs(factory, render.module_system_factory(self.request, self.portal_user, self.course_id))
+
+        other_request = RequestFactory().get('/')
+        self.assertIsNot(factory, render.module_system_factory(other_request, self.portal_user, self.course_id))
+
+    def test_factory_only_kept_for_request_user(self):
+        other_user = UserFactory()
+        factory = render.module_system_factory(self.request, other_user, self.course_id)
+        self.assertIsNot(factory, render.module_system_factory(self.request, other_user, self.course_id))
+        self.assertEqual({}, getattr(self.request, '_module_system_factories', {}))
+
+        # Requests without a user, such as the ones of background tasks, keep none
+        request = RequestFactory().get('/')
+        self.assertIsNot(
+            render.module_system_factory(request, self.portal_user, self.course_id),
+            render.module_system_factory(request, self.portal_user, self.course_id)
+        )
+
+    def test_children_share_factory(self):
+        with patch('courseware.module_render.unique_id_for_user', wraps=render.unique_id_for_user) as unique_id:
+            with patch('courseware.module_render.has_access', wraps=render.has_access) as access:
+                render.toc_for_course(self.portal_user, self.request, self.toy_course, 'Overview', None,
+                                      self.field_data_cache)
+
+        # The course and its chapters were constructed...
+        self.assertGreater(render.module_constructions(self.request), 1)
+        # ...but the anonymous id was only computed once...
+        self.assertEqual(unique_id.call_count, 1)
+        # ...and staff access only checked for masquerading, and once for all the systems
+        staff_checks = [args for args, _ in access.call_args_list if args[2] == 'staff']
+        self.assertEqual(len(staff_checks), 2)
+
+    def test_constructions_without_modules(self):
+        self.assertEqual(render.module_constructions(self.request), 0)
+
+
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
 class TestHtmlModifiers(ModuleStoreTestCase):
     """
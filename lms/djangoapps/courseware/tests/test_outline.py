@@ -0,0 +1,136 @@
+"""
+Tests for the cached course outline
+"""
+import datetime
+
+from mock import patch, Mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from django.utils.timezone import UTC
+
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore, editable_modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+import courseware.module_render as render
+from courseware.access import has_access
+from courseware.model_data import FieldDataCache
+from courseware.outline import (
+    OutlineItem, UnsupportedOutline, build_course_outline, course_outline
+)
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE, TEST_DATA_MONGO_MODULESTORE
+
+from .factories import UserFactory
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class CourseOutlineTestCase(TestCase):
+    """Check the outline of an XML course, and the navigation made from it"""
+    def setUp(self):
+        cache.clear()
+        self.course = modulestore().get_course('edX/toy/2012_Fall')
+        self.user = UserFactory()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def test_outline_matches_descriptors(self):
+        chapters = course_outline(self.course)
+        self.assertEqual(
+            [chapter.url_name for chapter in chapters],
+            [chapter.url_name for chapter in self.course.get_children()]
+        )
+        for chapter, descriptor in zip(chapters, self.course.get_children()):
+            self.assertEqual(chapter.display_name, descriptor.display_name_with_default)
+            self.assertEqual(
+                [section.url_name for section in chapter.children],
+                [section.url_name for section in descriptor.get_children()]
+            )
+
+    def test_outline_is_cached(self):
+        with patch('courseware.outline.build_course_outline', wraps=build_course_outline) as build:
+            first = course_outline(self.course)
+            second = course_outline(self.course)
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_toc_without_modules(self):
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            self.course.id, self.user, self.course, depth=2)
+        with patch('courseware.module_render._toc_from_modules') as toc_from_modules:
+            toc = render.toc_for_course(self.user, self.request, self.course, 'Overview', 'Welcome', field_data_cache)
+        self.assertFalse(toc_from_modules.called)
+        self.assertEqual(
+            toc,
+            render._toc_from_modules(self.user, self.request, self.course, 'Overview', 'Welcome', field_data_cache)
+        )
+
+    def test_unsupported_outline(self):
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            self.course.id, self.user, self.course, depth=2)
+        with patch('courseware.outline.build_course_outline', side_effect=UnsupportedOutline):
+            self.assertIsNone(course_outline(self.course))
+            toc = render.toc_for_course(self.user, self.request, self.course, 'Overview', None, field_data_cache)
+        self.assertIn('Overview', [chapter['url_name'] for chapter in toc])
+
+
+class OutlineItemAccessTestCase(TestCase):
+    """Check that access to an outline item is access to its descriptor"""
+    def item(self, start, days_early_for_beta=None, is_error=False):
+        """An OutlineItem for a section of the toy course"""
+        return OutlineItem(
+            location=Location('i4x://edX/toy/sequential/Toy_Videos'),
+            url_name='Toy_Videos', display_name='Toy Videos', format='', due=None, graded=False,
+            hide_from_toc=False, start=start, days_early_for_beta=days_early_for_beta,
+            is_error=is_error, children=(),
+        )
+
+    def test_started(self):
+        user = Mock(is_staff=False)
+        yesterday = datetime.datetime.now(UTC()) - datetime.timedelta(days=1)
+        self.assertTrue(has_access(user, self.item(yesterday), 'load', 'edX/toy/2012_Fall'))
+
+    def test_not_started(self):
+        user = Mock(is_staff=False)
+        user.groups.all.return_value = []
+        tomorrow = datetime.datetime.now(UTC()) + datetime.timedelta(days=1)
+        self.assertFalse(has_access(user, self.item(tomorrow), 'load', 'edX/toy/2012_Fall'))
+        self.assertTrue(has_access(Mock(is_staff=True), self.item(tomorrow), 'load', 'edX/toy/2012_Fall'))
+
+    def test_beta_tester(self):
+        beta_group = Mock()
+        beta_group.name = 'beta_testers_toy'
+        user = Mock(is_staff=False)
+        user.groups.all.return_value = [beta_group]
+        tomorrow = datetime.datetime.now(UTC()) + datetime.timedelta(days=1)
+        self.assertTrue(has_access(user, self.item(tomorrow, days_early_for_beta=2), 'load', 'edX/toy/2012_Fall'))
+
+    def test_error(self):
+        user = Mock(is_staff=False)
+        user.groups.all.return_value = []
+        yesterday = datetime.datetime.now(UTC()) - datetime.timedelta(days=1)
+        self.assertFalse(has_access(user, self.item(yesterday, is_error=True), 'load', 'edX/toy/2012_Fall'))
+
+
+@override_settings(MODULESTORE=TEST_DATA_MONGO_MODULESTORE)
+class CourseOutlineVersionTestCase(ModuleStoreTestCase):
+    """Check that writing to a course replaces its outline"""
+    def setUp(self):
+        cache.clear()
+        self.course = CourseFactory.create()
+        self.chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.section = ItemFactory.create(
+            parent_location=self.chapter.location, category='sequential', display_name='Before'
+        )
+
+    def test_outline_rebuilt_after_write(self):
+        course = modulestore().get_instance(self.course.id, self.course.location)
+        self.assertEqual(course_outline(course)[0].children[0].display_name, 'Before')
+
+        editable_modulestore('direct').update_metadata(self.section.location, {'display_name': 'After'})
+
+        course = modulestore().get_instance(self.course.id, self.course.location)
+        self.assertEqual(course_outline(course)[0].children[0].display_name, 'After')
@@ -2,8 +2,11 @@
 
 # text processing dependancies
 import json
+from collections import defaultdict
+from mock import patch
 from textwrap import dedent
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.test.client import RequestFactory
 from django.core.urlresolvers import reverse
@@ -12,6 +15,9 @@ from django.test.utils import override_settings
 # Need access to internal func to put users in the right group
 from courseware import grades
 from courseware.model_data import FieldDataCache
+from courseware.models import SectionScoreStoreState, StudentModule, StudentSectionScore
+from courseware.tests.factories import UserFactory
+from student.models import CourseEnrollment
 
 from xmodule.modulestore.django import modulestore, editable_modulestore
 
@@ -267,6 +273,29 @@ class TestCourseGrader(TestSubmittingProblems):
                                                    field_data_cache)
         return progress_summary
 
+    def check_batch_grade(self, students=None):
+        """
+        Assert that grades.grade_batch gives the same summaries as grades.grade,
+        by default both for the current user and for a student who hasn't
+        attempted anything.
+        """
+        if students is None:
+            other_student = UserFactory.create()
+            CourseEnrollment.enroll(other_student, self.course.id)
+            students = [self.student_user, other_student]
+
+        fake_request = self.factory.get(reverse('progress',
+                                        kwargs={'course_id': self.course.id}))
+
+        for keep_raw_scores in (False, True):
+            expected = [
+                grades.grade(student, fake_request, self.course, keep_raw_scores=keep_raw_scores)
+                for student in students
+            ]
+            batch = grades.grade_batch(students, fake_request, self.course, keep_raw_scores=keep_raw_scores)
+            self.assertEqual([student for student, _ in batch], students)
+            self.assertEqual([summary for _, summary in batch], expected)
+
     def check_grade_percent(self, percent):
         """
         Assert that percent grade is as expected.
@@ -388,6 +417,58 @@ class TestCourseGrader(TestSubmittingProblems):
         self.add_dropdown_to_section(self.homework3.location, self.hw3_names[0], 1)
         self.add_dropdown_to_section(self.homework3.location, self.hw3_names[1], 1)
 
+    def started_student(self, problem_url_name):
+        """
+        Returns a new enrolled student with a graded StudentModule for the given
+        problem only.
+        """
+        student = UserFactory.create()
+        CourseEnrollment.enroll(student, self.course.id)
+        StudentModule.objects.create(
+            student=student,
+            course_id=self.course.id,
+            module_state_key=self.problem_location(problem_url_name),
+            module_type='problem',
+            state='{}',
+            grade=0,
+            max_grade=1,
+        )
+        return student
+
+    def test_batch_grade_other_stored_max_grade(self):
+        """
+        Check that grade_batch doesn't take the max score of a problem a student
+        hasn't attempted from the max_grade stored for another student.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.submit_question_answer('p2', {'2_1': 'Correct'})
+        # e.g. stored before the problem was changed
+        student_module = StudentModule.objects.get(
+            student=self.student_user, module_state_key=self.problem_location('p2')
+        )
+        student_module.max_grade = 5
+        student_module.save()
+
+        self.check_batch_grade([self.student_user, self.started_student('p1')])
+
+    @patch.dict(settings.MITX_FEATURES, {'DISABLE_START_DATES': False})
+    def test_batch_grade_access_differs(self):
+        """
+        Check that grade_batch creates the modules of unattempted problems for
+        each student, when only some students have access to them.
+        """
+        self.basic_setup()
+        editable_modulestore('direct').update_metadata(self.problem_location('p3'), {'start': '2100-01-01T00:00'})
+        self.refresh_course()
+
+        without_access = self.started_student('p1')
+        with_access = self.started_student('p1')
+        with_access.is_staff = True
+        with_access.save()
+
+        self.check_batch_grade([without_access, with_access])
+
     def test_submission_late(self):
         """Test problem for due date in the past"""
         self.basic_setup(late=True)
@@ -484,6 +565,14 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.earned_hw_scores(), [2.0])  # Order matters
         self.assertEqual(self.score_for_hw('homework'), [2.0])
 
+    def test_batch_grade_weighted(self):
+        """
+        Test that batch grading matches grading one student at a time for weighted problems.
+        """
+        self.weighted_setup()
+        self.submit_question_answer('H1P1', {'2_1': 'Correct', '2_2': 'Incorrect'})
+        self.check_batch_grade()
+
     def test_weighted_exam(self):
         """
         Test that the exam section has the proper weight.
@@ -536,6 +625,14 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.earned_hw_scores(), [1.0, 2.0, 1.0])  # Order matters
         self.check_grade_percent(0.75)
 
+    def test_batch_grade_dropping(self):
+        """
+        Test that batch grading matches grading one student at a time when dropping scores.
+        """
+        self.dropping_setup()
+        self.dropping_homework_stage1()
+        self.check_batch_grade()
+
     def test_dropping_all_correct(self):
         """
         Test that the lowest is dropped for a perfect score.
@@ -550,6 +647,108 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.earned_hw_scores(), [1.0, 2.0, 2.0])  # Order matters
         self.assertEqual(self.score_for_hw('homework3'), [1.0, 1.0])
 
+    def test_answer_distributions(self):
+        """
+        Test that the answer distributions read from StudentModule states count
+        the answers the problems' modules have.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.submit_question_answer('p2', {'2_1': 'Incorrect'})
+
+        fake_request = self.factory.get(reverse('progress',
+                                        kwargs={'course_id': self.course.id}))
+        expected = defaultdict(lambda: defaultdict(int))
+        for capa_module in grades.yield_problems(fake_request, self.course, self.student_user):
+            for problem_id, answer in capa_module.lcp.student_answers.items():
+                expected[(capa_module.url_name, capa_module.display_name_with_default, problem_id)][str(answer)] += 1
+
+        progress = []
+        with patch('courseware.grades.ANSWER_DISTRIBUTION_ROWS_PER_QUERY', 1):
+            dist = grades.answer_distributions(self.course, lambda read, total: progress.append((read, total)))
+
+        self.assertEqual(dist, expected)
+        problem_id = 'i4x-{0}-{1}-problem-p1_2_1'.format(self.course.org, self.COURSE_SLUG)
+        self.assertEqual(dist[('p1', 'p1', problem_id)], {'Correct': 1})
+        read, total = progress[-1]
+        self.assertEqual(read, total)
+
+
+@patch.dict(settings.MITX_FEATURES, {'ENABLE_PERSISTENT_GRADES': True})
+class TestCourseGraderWithGradeStore(TestCourseGrader):
+    """
+    Run the course grader tests with grades read from the persistent grade store.
+    """
+
+    def refresh_course(self):
+        """
+        Re-fetch the course, and rebuild the grade store for its new structure.
+        """
+        super(TestCourseGraderWithGradeStore, self).refresh_course()
+        grades.rebuild_stored_scores(self.course)
+
+    def test_store_updated_on_submission(self):
+        """
+        Check that submitting an answer updates the stored score of its section only.
+        """
+        self.dropping_setup()
+        self.submit_question_answer(self.hw1_names[0], {'2_1': 'Correct'})
+
+        rows = StudentSectionScore.objects.filter(student=self.student_user, course_id=self.course.id)
+        self.assertEqual([row.section_id for row in rows], [self.homework1.location.url()])
+        # Problems the student hasn't been graded on aren't stored
+        self.assertEqual([entry[1:] for entry in json.loads(rows[0].scores)], [[1.0, 1.0, True]])
+
+        self.submit_question_answer(self.hw1_names[1], {'2_1': 'Correct'})
+        self.assertEqual(self.score_for_hw('homework1'), [1.0, 1.0])
+        self.assertEqual(self.earned_hw_scores(), [2.0, 0, 0])
+
+    def test_structure_cached(self):
+        """
+        Check that updating the store doesn't walk the graded sections of the course
+        again while the course hasn't changed.
+        """
+        self.dropping_setup()
+        self.submit_question_answer(self.hw1_names[0], {'2_1': 'Correct'})
+
+        with patch('courseware.grades._stored_sections') as stored_sections:
+            self.submit_question_answer(self.hw1_names[1], {'2_1': 'Correct'})
+        self.assertFalse(stored_sections.called)
+        self.assertEqual(self.score_for_hw('homework1'), [1.0, 1.0])
+
+    def test_unattempted_problem_changed(self):
+        """
+        Check that the max score of a problem the student hasn't attempted, in a
+        section they started, is read from the problem's current contents.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+
+        prob_xml = OptionResponseXMLFactory().build_xml(
+            question_text='The correct answer is Correct',
+            num_inputs=3,
+            weight=3,
+            options=['Correct', 'Incorrect'],
+            correct_option='Correct'
+        )
+        editable_modulestore('direct').update_item(self.problem_location('p2'), prob_xml)
+        self.refresh_course()
+
+        self.assertTrue(StudentSectionScore.objects.filter(student=self.student_user).exists())
+        self.assertEqual(self.get_grade_summary()['totaled_scores']['Homework'][0].possible, 5)
+
+    def test_stale_store_not_used(self):
+        """
+        Check that grading falls back to computing scores when the store is out of date.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        StudentSectionScore.objects.filter(student=self.student_user).update(scores='[]')
+        self.check_grade_percent(0)
+
+        SectionScoreStoreState.objects.filter(course_id=self.course.id).update(version='stale')
+        self.check_grade_percent(0.33)
+
 
 class TestPythonGradedResponse(TestSubmittingProblems):
     """
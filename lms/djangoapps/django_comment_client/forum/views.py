@@ -109,11 +109,12 @@ def inline_discussion(request, course_id, discussion_id):
     Renders JSON for DiscussionModules
     """
     course = get_course_with_access(request.user, course_id, 'load_forum')
+    # fetched while get_threads works out the query and searches
+    pending_user_info = cc.utils.RequestBatch().add(cc.User.from_django_user(request.user).to_dict)
 
     try:
         threads, query_params = get_threads(request, course_id, discussion_id, per_page=INLINE_THREADS_PER_PAGE)
-        cc_user = cc.User.from_django_user(request.user)
-        user_info = cc_user.to_dict()
+        user_info = pending_user_info.result()
     except (cc.utils.CommentClientError, cc.utils.CommentClientUnknownError):
         log.error("Error loading inline discussion threads.")
         raise
@@ -167,6 +168,8 @@ def forum_form_discussion(request, course_id):
     """
 
     course = get_course_with_access(request.user, course_id, 'load_forum')
+    # fetched while get_threads works out the query and searches
+    pending_user_info = cc.utils.RequestBatch().add(cc.User.from_django_user(request.user).to_dict)
     category_map = utils.get_discussion_category_map(course)
 
     try:
@@ -179,8 +182,7 @@ def forum_form_discussion(request, course_id):
         log.error("Error loading forum discussion threads: %s", str(err))
         raise
 
-    user = cc.User.from_django_user(request.user)
-    user_info = user.to_dict()
+    user_info = pending_user_info.result()
 
     annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
 
@@ -238,13 +240,18 @@ def forum_form_discussion(request, course_id):
 def single_thread(request, course_id, discussion_id, thread_id):
     course = get_course_with_access(request.user, course_id, 'load_forum')
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
+    batch = cc.utils.RequestBatch()
+    pending_user_info = batch.add(cc_user.to_dict)
+    pending_thread = batch.add(
+        lambda: cc.Thread.find(thread_id).retrieve(recursive=True, user_id=request.user.id)
+    )
 
     try:
-        thread = cc.Thread.find(thread_id).retrieve(recursive=True, user_id=request.user.id)
+        thread = pending_thread.result()
     except (cc.utils.CommentClientError, cc.utils.CommentClientUnknownError):
         log.error("Error loading single thread.")
         raise
+    user_info = pending_user_info.result()
 
     if request.is_ajax():
         courseware_context = get_courseware_context(thread, course)
@@ -340,10 +347,13 @@ def user_profile(request, course_id, user_id):
             'per_page': THREADS_PER_PAGE,   # more than threads_per_page to show more activities
         }
 
-        threads, page, num_pages = profiled_user.active_threads(query_params)
+        batch = cc.utils.RequestBatch()
+        pending_threads = batch.add(lambda: profiled_user.active_threads(query_params))
+        pending_user_info = batch.add(cc.User.from_django_user(request.user).to_dict)
+        threads, page, num_pages = pending_threads.result()
         query_params['page'] = page
         query_params['num_pages'] = num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
+        user_info = pending_user_info.result()
 
         annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
 
@@ -384,10 +394,13 @@ def followed_threads(request, course_id, user_id):
             'sort_order': request.GET.get('sort_order', 'desc'),
         }
 
-        threads, page, num_pages = profiled_user.subscribed_threads(query_params)
+        batch = cc.utils.RequestBatch()
+        pending_threads = batch.add(lambda: profiled_user.subscribed_threads(query_params))
+        pending_user_info = batch.add(cc.User.from_django_user(request.user).to_dict)
+        threads, page, num_pages = pending_threads.result()
         query_params['page'] = page
         query_params['num_pages'] = num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
+        user_info = pending_user_info.result()
 
         annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
         if request.is_ajax():
@@ -0,0 +1,123 @@
+"""
+Tests of the comment client's connection pooling and request batches, against
+a stub comment service.
+"""
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+import json
+import threading
+import time
+import unittest
+
+from mock import patch
+
+import comment_client.settings as cc_settings
+from comment_client.utils import (
+    CommentClientError, CommentClientUnknownError, RequestBatch, endpoint_name,
+    perform_concurrently, perform_request
+)
+
+
+class StubCommentServiceHandler(BaseHTTPRequestHandler):
+    """
+    Responds to GETs with the path and the port the client connected from,
+    after sleeping for the `sleep` query parameter; /error responds with a 500.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        params = dict(param.split('=', 1) for param in query.split('&') if '=' in param)
+        time.sleep(float(params.get('sleep', 0)))
+        self.server.client_ports.add(self.client_address[1])
+
+        if path == '/error':
+            body, status = 'Internal error', 500
+        else:
+            body, status = json.dumps({'path': path}), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubCommentService(ThreadingMixIn, HTTPServer):
+    """A comment service on a free local port, handling requests in parallel"""
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubCommentServiceHandler)
+        self.client_ports = set()
+
+
+class CommentClientRequestsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = StubCommentService()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_address[1])
+
+        # start from a new session, with no connections yet
+        patcher = patch('comment_client.utils._session', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_connections_are_reused(self):
+        for index in xrange(5):
+            response = perform_request('get', self.url + '/threads/{0}'.format(index))
+            self.assertEqual(response, {'path': '/threads/{0}'.format(index)})
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_calls_in_parallel(self):
+        calls = [
+            lambda path=path: perform_request('get', self.url + path, {'sleep': 0.5})
+            for path in ('/users/1', '/threads', '/commentables/2/threads')
+        ]
+        start = time.time()
+        results = perform_concurrently(calls)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(
+            [result['path'] for result in results],
+            ['/users/1', '/threads', '/commentables/2/threads']
+        )
+        # one connection per call in flight, all kept for later requests
+        self.assertEqual(len(self.server.client_ports), 3)
+
+    def test_shared_deadline(self):
+        batch = RequestBatch(timeout=0.5)
+        quick = batch.add(lambda: perform_request('get', self.url + '/users/1', {'sleep': 0.1}))
+        slow = batch.add(lambda: perform_request('get', self.url + '/users/2', {'sleep': 2}))
+        self.assertEqual(quick.result(), {'path': '/users/1'})
+        start = time.time()
+        with self.assertRaises(CommentClientError):
+            slow.result()
+        self.assertLess(time.time() - start, 1)
+
+    def test_errors_are_raised(self):
+        batch = RequestBatch()
+        error = batch.add(lambda: perform_request('get', self.url + '/error'))
+        found = batch.add(lambda: perform_request('get', self.url + '/users/1'))
+        with self.assertRaises(CommentClientUnknownError):
+            error.result()
+        self.assertEqual(found.result(), {'path': '/users/1'})
+
+    def test_endpoint_name(self):
+        self.assertEqual(
+            endpoint_name('get', cc_settings.PREFIX + '/users/42/active_threads'),
+            'get users/:id/active_threads'
+        )
+        self.assertEqual(
+            endpoint_name('post', cc_settings.PREFIX + '/i4x-MITx-999-course-Robot/threads'),
+            'post :id/threads'
+        )
+        self.assertEqual(
+            endpoint_name('get', cc_settings.PREFIX + '/users/42/stats?course_id=MITx/999/Robot'),
+            'get users/:id/stats'
+        )
@@ -1,5 +1,13 @@
+from mock import patch
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.test.utils import override_settings
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
+from xmodule.modulestore.django import modulestore, editable_modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from courseware.tests.modulestore_config import TEST_DATA_MONGO_MODULESTORE
 from django_comment_common.models import Role, Permission
 from factories import RoleFactory
 import django_comment_client.utils as utils
@@ -179,3 +187,52 @@ class AccessUtilsTestCase(TestCase):
 
         ret = utils.has_forum_access('student', self.course_id, 'NotARole')
         self.assertFalse(ret)
+
+
+@override_settings(MODULESTORE=TEST_DATA_MONGO_MODULESTORE)
+class DiscussionInfoTestCase(ModuleStoreTestCase):
+    """Check that the discussion info of a course is built once per version"""
+    def setUp(self):
+        cache.clear()
+        patcher = patch.dict(utils._DISCUSSIONINFO, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.discussion = ItemFactory.create(
+            parent_location=chapter.location, category='discussion',
+            metadata={'discussion_id': 'lecture_1', 'discussion_category': 'Week 1', 'discussion_target': 'Lecture'}
+        )
+
+    def lookup_all(self):
+        """Use each of the lookups served from the discussion info"""
+        utils.get_discussion_id_map(self.course)
+        utils.get_discussion_category_map(self.course)
+        utils.get_courseware_context({'commentable_id': 'lecture_1'}, self.course)
+        return utils.get_discussion_title(self.course, 'lecture_1')
+
+    def test_single_query_per_course_version(self):
+        store = modulestore()
+        with patch.object(store, 'get_items', wraps=store.get_items) as get_items:
+            for _ in xrange(3):
+                self.assertEqual(self.lookup_all(), 'Week 1 / Lecture')
+            self.assertEqual(get_items.call_count, 1)
+
+            # other processes get it from the cache
+            utils._DISCUSSIONINFO.clear()
+            self.lookup_all()
+            self.assertEqual(get_items.call_count, 1)
+
+            editable_modulestore('direct').update_metadata(
+                self.discussion.location, {'discussion_target': 'Recitation'}
+            )
+            self.assertEqual(self.lookup_all(), 'Week 1 / Recitation')
+            self.assertEqual(self.lookup_all(), 'Week 1 / Recitation')
+            self.assertEqual(get_items.call_count, 2)
+
+    def test_build_discussion_info(self):
+        info = utils.build_discussion_info(self.course)
+        self.assertEqual(info['id_map']['lecture_1']['location'], self.discussion.location)
+        self.assertEqual(info['category_map']['children'], ['Week 1'])
+        self.assertEqual(info['category_map']['subcategories']['Week 1']['entries']['Lecture']['id'], 'lecture_1')
@@ -5,6 +5,7 @@ import urllib
 from datetime import datetime
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -15,14 +16,21 @@ from django_comment_client.permissions import check_permissions_by_view
 import mitxmako
 import pystache_custom as pystache
 
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import modulestore, course_contents_version
 from django.utils.timezone import UTC
 
 log = logging.getLogger(__name__)
 
 # TODO these should be cached via django's caching rather than in-memory globals
 _FULLMODULES = None
-_DISCUSSIONINFO = defaultdict(dict)
+
+# the discussion info of each course seen by this process, with the version of
+# the course it was built from
+_DISCUSSIONINFO = {}
+
+# how long discussion info stays in the cache; new versions of the course get
+# new keys, so this only bounds how long unused info lingers
+DISCUSSION_INFO_CACHE_TIMEOUT = 24 * 60 * 60
 
 
 def extract(dic, keys):
@@ -73,19 +81,41 @@ def get_discussion_id_map(course):
     """
         return a dict of the form {category: modules}
     """
-    initialize_discussion_info(course)
-    return _DISCUSSIONINFO[course.id]['id_map']
+    return get_discussion_info(course)['id_map']
 
 
 def get_discussion_title(course, discussion_id):
-    initialize_discussion_info(course)
-    title = _DISCUSSIONINFO[course.id]['id_map'].get(discussion_id, {}).get('title', '(no title)')
+    title = get_discussion_info(course)['id_map'].get(discussion_id, {}).get('title', '(no title)')
     return title
 
 
 def get_discussion_category_map(course):
-    initialize_discussion_info(course)
-    return filter_unstarted_categories(_DISCUSSIONINFO[course.id]['category_map'])
+    return filter_unstarted_categories(get_discussion_info(course)['category_map'])
+
+
+def discussion_info_cache_key(course, version):
+    """Cache key of the discussion info of `course` at `version`"""
+    return u"django_comment_client.discussion_info.{0}.{1}".format(course.id, version).encode('utf-8')
+
+
+def get_discussion_info(course):
+    """
+    Returns the discussion info of `course` (see build_discussion_info), built
+    once per version of the course and shared through the cache.
+    """
+    version = course_contents_version(course)
+    info = _DISCUSSIONINFO.get(course.id)
+    if info is not None and info['version'] == version:
+        return info
+
+    key = discussion_info_cache_key(course, version)
+    info = cache.get(key)
+    if info is None:
+        info = build_discussion_info(course)
+        info['version'] = version
+        cache.set(key, info, DISCUSSION_INFO_CACHE_TIMEOUT)
+    _DISCUSSIONINFO[course.id] = info
+    return info
 
 
 def filter_unstarted_categories(category_map):
@@ -138,7 +168,11 @@ def sort_map_entries(category_map, sort_alpha):
     category_map["children"] = [x[0] for x in sorted(things, key=lambda x: x[1]["sort_key"])]
 
 
-def initialize_discussion_info(course):
+def build_discussion_info(course):
+    """
+    Returns a dict with the 'id_map' of the discussion modules of `course` by
+    discussion id, and its 'category_map', the tree of discussion categories.
+    """
     course_id = course.id
 
     discussion_id_map = {}
@@ -216,9 +250,11 @@ def initialize_discussion_info(course):
 
     sort_map_entries(category_map, course.discussion_sort_alpha)
 
-    _DISCUSSIONINFO[course.id]['id_map'] = discussion_id_map
-    _DISCUSSIONINFO[course.id]['category_map'] = category_map
-    _DISCUSSIONINFO[course.id]['timestamp'] = datetime.now(UTC())
+    return {
+        'id_map': discussion_id_map,
+        'category_map': category_map,
+        'timestamp': datetime.now(UTC()),
+    }
 
 
 class JsonResponse(HttpResponse):
@@ -118,8 +118,11 @@ def get_hints(request, course_id, field):
                 # Put all non-numerical answers first.
                 return float('-inf')
 
+        hints = json.loads(hints_by_problem.value)
+        if field == 'hints':
+            add_counted_votes(hints, hints_by_problem.usage_id)
         # Answer list contains [answer, dict_of_hints] pairs.
-        answer_list = sorted(json.loads(hints_by_problem.value).items(), key=answer_sorter)
+        answer_list = sorted(hints.items(), key=answer_sorter)
         big_out_dict[hints_by_problem.usage_id] = answer_list
 
     render_dict = {'field': field,
@@ -131,6 +134,18 @@ def get_hints(request, course_id, field):
     return render_dict
 
 
+def add_counted_votes(hints, problem_id):
+    """
+    Add the votes students gave each of `hints`, the approved hints of
+    `problem_id`, since it was added. The hinter counts them apart from the
+    hints, in its hint_votes field.
+    """
+    votes = model_data.user_state_summary_counts(problem_id, 'hint_votes')
+    for answer_hints in hints.itervalues():
+        for pk, hint in answer_hints.iteritems():
+            hint[1] += votes.get(pk, 0)
+
+
 def location_to_problem_name(course_id, loc):
     """
     Given the location of a crowdsource_hinter module, try to return the name of the
@@ -194,6 +209,10 @@ def change_votes(request, course_id, field):
         problem_dict = json.loads(this_problem.value)
         # problem_dict[answer][pk] points to a [hint_text, #votes] pair.
         problem_dict[answer][pk][1] = int(new_votes)
+        if field == 'hints':
+            # Leave out the votes counted in hint_votes, which still add up.
+            counted = model_data.user_state_summary_counts(problem_id, 'hint_votes')
+            problem_dict[answer][pk][1] -= counted.get(pk, 0)
         this_problem.value = json.dumps(problem_dict)
         this_problem.save()
 
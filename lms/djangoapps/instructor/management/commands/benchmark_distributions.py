@@ -0,0 +1,144 @@
+"""
+django management command: compare the time taken to compute the profile
+distributions of a course by counting the enrollments for each choice, and by
+grouping them in a single query, on synthetic enrollments.
+
+The synthetic users, profiles and enrollments are created inside a transaction
+that is always rolled back, so nothing is left behind.
+"""
+
+import random
+import time
+from optparse import make_option
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from analytics.distributions import AVAILABLE_PROFILE_FEATURES, profile_distributions
+from courseware.model_data import chunks
+from student.models import CourseEnrollment, UserProfile
+
+
+def count_per_choice(course_id, feature):
+    """
+    The distribution of the enrolled students over `feature`, counted the way
+    profile_distribution used to: one query per choice, two for no data.
+    """
+    def get_count(value):
+        """ Count the enrolled students with `value` for the feature. """
+        return CourseEnrollment.objects.filter(
+            course_id=course_id, **{'user__profile__' + feature: value}
+        ).count()
+
+    if feature == 'year_of_birth':
+        profiles = UserProfile.objects.filter(user__courseenrollment__course_id=course_id)
+        distribution = dict(
+            (vald[feature], vald[feature + '__count'])
+            for vald in profiles.values(feature).annotate(Count(feature)).order_by()
+        )
+        if None in distribution:
+            del distribution[None]
+            distribution['no_data'] = profiles.filter(**{feature: None}).count()
+        return distribution
+
+    choices = {
+        'gender': UserProfile.GENDER_CHOICES,
+        'level_of_education': UserProfile.LEVEL_OF_EDUCATION_CHOICES,
+    }[feature]
+    distribution = dict((short, get_count(short)) for (short, _) in choices)
+    distribution['no_data'] = get_count(None) + get_count('')
+    return distribution
+
+
+class Command(BaseCommand):
+    args = "<course_id>"
+    help = ("Benchmark counting profile distributions per choice against grouping them in one query,\n"
+            "for a course with synthetic enrollments.")
+
+    option_list = BaseCommand.option_list + (
+        make_option('--students',
+                    type='int',
+                    dest='num_students',
+                    default=100000,
+                    help='Number of synthetic students to enroll'),
+        make_option('--repeat',
+                    type='int',
+                    dest='repeat',
+                    default=3,
+                    help='Number of times each way is timed; the best time is reported'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: benchmark_distributions <course_id>")
+
+        with transaction.commit_manually():
+            try:
+                self.benchmark(args[0], options['num_students'], options['repeat'])
+            finally:
+                transaction.rollback()
+
+    def populate(self, course_id, num_students):
+        """
+        Create num_students enrolled users, with profiles of random gender,
+        level of education and year of birth, some of them missing.
+        """
+        User.objects.bulk_create(
+            User(username='distbench_{0}'.format(index), email='distbench_{0}@example.com'.format(index))
+            for index in xrange(num_students)
+        )
+        students = list(User.objects.filter(username__startswith='distbench_'))
+
+        genders = [short for (short, _) in UserProfile.GENDER_CHOICES] + [None, '']
+        levels = [short for (short, _) in UserProfile.LEVEL_OF_EDUCATION_CHOICES] + [None, '']
+        years = range(1930, 2000) + [None]
+        for student_chunk in chunks(students, 1000):
+            UserProfile.objects.bulk_create(
+                UserProfile(
+                    user=student,
+                    name=student.username,
+                    gender=random.choice(genders),
+                    level_of_education=random.choice(levels),
+                    year_of_birth=random.choice(years),
+                )
+                for student in student_chunk
+            )
+            CourseEnrollment.objects.bulk_create(
+                CourseEnrollment(user=student, course_id=course_id) for student in student_chunk
+            )
+        return students
+
+    def best_time(self, repeat, fcn):
+        """ The best of `repeat` timings of fcn(), and its last result. """
+        times = []
+        for _ in xrange(repeat):
+            start = time.time()
+            result = fcn()
+            times.append(time.time() - start)
+        return min(times), result
+
+    def benchmark(self, course_id, num_students, repeat):
+        """Populate the course, then time and compare both ways"""
+        start = time.time()
+        students = self.populate(course_id, num_students)
+        self.stdout.write("Created {0} synthetic students in {1:.1f}s\n".format(len(students), time.time() - start))
+
+        per_choice_time, expected = self.best_time(repeat, lambda: dict(
+            (feature, count_per_choice(course_id, feature)) for feature in AVAILABLE_PROFILE_FEATURES
+        ))
+        per_feature_time, _ = self.best_time(repeat, lambda: [
+            profile_distributions(course_id, [feature]) for feature in AVAILABLE_PROFILE_FEATURES
+        ])
+        grouped_time, distributions = self.best_time(repeat, lambda: profile_distributions(course_id))
+
+        mismatches = [
+            feature for feature in AVAILABLE_PROFILE_FEATURES
+            if distributions[feature].data != expected[feature]
+        ]
+
+        self.stdout.write("one query per choice:  {0:.1f}ms\n".format(per_choice_time * 1000))
+        self.stdout.write("one query per feature: {0:.1f}ms\n".format(per_feature_time * 1000))
+        self.stdout.write("one query in all:      {0:.1f}ms\n".format(grouped_time * 1000))
+        self.stdout.write("Distributions that differ: {0}\n".format(', '.join(mismatches) or 'none'))
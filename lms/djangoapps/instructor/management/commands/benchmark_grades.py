@@ -0,0 +1,136 @@
+"""
+django management command: compare the time taken by grades.grade and
+grades.grade_batch on a course populated with synthetic students.
+
+The synthetic students, enrollments and StudentModule rows are created inside
+a transaction that is always rolled back, so nothing is left behind.
+"""
+
+import random
+import time
+from optparse import make_option
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from courseware import grades
+from courseware.courses import get_course_by_id
+from courseware.model_data import chunks
+from courseware.models import StudentModule
+from instructor.offline_gradecalc import GRADE_BATCH_SIZE
+from student.models import CourseEnrollment
+
+
+class DummyRequest(object):
+    """Stand-in for the request that grading needs to create XModules"""
+    META = {}
+    session = {}
+
+    def get_host(self):
+        return 'edx.mit.edu'
+
+    def is_secure(self):
+        return False
+
+
+class Command(BaseCommand):
+    args = "<course_id>"
+    help = ("Benchmark grades.grade against grades.grade_batch for a course, using synthetic students.\n"
+            "Per-student grading is only timed on a sample, and extrapolated to all students.")
+
+    option_list = BaseCommand.option_list + (
+        make_option('--students',
+                    type='int',
+                    dest='num_students',
+                    default=10000,
+                    help='Number of synthetic students to enroll'),
+        make_option('--sample',
+                    type='int',
+                    dest='sample_size',
+                    default=100,
+                    help='Number of students graded with grades.grade, and compared against grade_batch'),
+        make_option('--attempt-rate',
+                    type='float',
+                    dest='attempt_rate',
+                    default=0.6,
+                    help='Probability that a synthetic student has attempted any given problem'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: benchmark_grades <course_id>")
+
+        course = get_course_by_id(args[0])
+        with transaction.commit_manually():
+            try:
+                self.benchmark(course, options['num_students'], options['sample_size'], options['attempt_rate'])
+            finally:
+                transaction.rollback()
+
+    def populate(self, course, num_students, attempt_rate):
+        """
+        Create num_students enrolled users, with scored StudentModule rows for a
+        random subset of the graded problems of the course.
+        """
+        User.objects.bulk_create(
+            User(username='gradebench_{0}'.format(index), email='gradebench_{0}@example.com'.format(index))
+            for index in xrange(num_students)
+        )
+        students = list(User.objects.filter(username__startswith='gradebench_'))
+        CourseEnrollment.objects.bulk_create(
+            CourseEnrollment(user=student, course_id=course.id) for student in students
+        )
+
+        problems = [
+            descriptor
+            for sections in course.grading_context['graded_sections'].itervalues()
+            for section in sections
+            for descriptor in section['xmoduledescriptors']
+        ]
+        for student_chunk in chunks(students, 500):
+            StudentModule.objects.bulk_create(
+                StudentModule(
+                    student=student,
+                    course_id=course.id,
+                    module_state_key=problem.location.url(),
+                    module_type=problem.location.category,
+                    state='{}',
+                    grade=random.randint(0, 4),
+                    max_grade=4,
+                )
+                for student in student_chunk
+                for problem in problems
+                if random.random() < attempt_rate
+            )
+        return students
+
+    def benchmark(self, course, num_students, sample_size, attempt_rate):
+        """Populate the course, then time and compare both grading modes"""
+        start = time.time()
+        students = self.populate(course, num_students, attempt_rate)
+        self.stdout.write("Created {0} synthetic students in {1:.1f}s\n".format(len(students), time.time() - start))
+
+        request = DummyRequest()
+        sample = students[:sample_size]
+
+        start = time.time()
+        expected = [grades.grade(student, request, course, keep_raw_scores=True) for student in sample]
+        per_student_time = (time.time() - start) / max(len(sample), 1)
+
+        start = time.time()
+        batch_results = []
+        for student_batch in chunks(students, GRADE_BATCH_SIZE):
+            batch_results.extend(grades.grade_batch(student_batch, request, course, keep_raw_scores=True))
+        batch_time = time.time() - start
+
+        mismatches = sum(
+            1 for expected_summary, (_, actual_summary) in zip(expected, batch_results)
+            if expected_summary != actual_summary
+        )
+
+        self.stdout.write("grades.grade:       {0:.2f}ms/student, {1:.1f}s estimated for all students\n".format(
+            per_student_time * 1000, per_student_time * len(students)))
+        self.stdout.write("grades.grade_batch: {0:.2f}ms/student, {1:.1f}s for all students\n".format(
+            batch_time * 1000 / len(students), batch_time))
+        self.stdout.write("{0} of {1} sampled grade summaries differ\n".format(mismatches, len(sample)))
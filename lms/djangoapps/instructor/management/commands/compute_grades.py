@@ -3,7 +3,9 @@
 # django management command: dump grades to csv files
 # for use by batch processes
 
-from instructor.offline_gradecalc import offline_grade_calculation
+from optparse import make_option
+
+from instructor.offline_gradecalc import offline_grade_calculation, parallel_offline_grade_calculation
 from courseware.courses import get_course_by_id
 from xmodule.modulestore.django import modulestore
 
@@ -12,10 +14,25 @@ from django.core.management.base import BaseCommand
 
 class Command(BaseCommand):
     help = "Compute grades for all students in a course, and store result in DB.\n"
-    help += "Usage: compute_grades course_id_or_dir \n"
+    help += "Usage: compute_grades [--processes N [--resume]] course_id_or_dir \n"
     help += "   course_id_or_dir: either course_id or course_dir\n"
+    help += "   --processes: grade students in parallel with N worker processes\n"
+    help += "   --resume: with --processes, continue an interrupted parallel run\n"
     help += 'Example course_id: MITx/8.01rq_MW/Classical_Mechanics_Reading_Questions_Fall_2012_MW_Section'
 
+    option_list = BaseCommand.option_list + (
+        make_option('--processes',
+                    type='int',
+                    dest='processes',
+                    default=None,
+                    help='Number of worker processes to grade students with'),
+        make_option('--resume',
+                    action='store_true',
+                    dest='resume',
+                    default=False,
+                    help='Skip students already graded by an interrupted parallel run'),
+    )
+
     def handle(self, *args, **options):
 
         print "args = ", args
@@ -40,4 +57,7 @@ class Command(BaseCommand):
         print "-----------------------------------------------------------------------------"
         print "Computing grades for %s" % (course.id)
 
-        offline_grade_calculation(course.id)
+        if options['processes']:
+            parallel_offline_grade_calculation(course.id, processes=options['processes'], resume=options['resume'])
+        else:
+            offline_grade_calculation(course.id)
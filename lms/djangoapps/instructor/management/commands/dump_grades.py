@@ -5,7 +5,7 @@
 
 import csv
 
-from instructor.views.legacy import get_student_grade_summary_data
+from instructor.views.legacy import iter_student_grade_summary_data
 from courseware.courses import get_course_by_id
 from xmodule.modulestore.django import modulestore
 
@@ -51,18 +51,20 @@ class Command(BaseCommand):
 
         print "-----------------------------------------------------------------------------"
         print "Dumping grades from %s to file %s (get_raw_scores=%s)" % (course.id, fn, get_raw_scores)
-        datatable = get_student_grade_summary_data(request, course, course.id, get_raw_scores=get_raw_scores)
+        datatable = iter_student_grade_summary_data(request, course, course.id, get_raw_scores=get_raw_scores)
 
         fp = open(fn, 'w')
 
         writer = csv.writer(fp, dialect='excel', quotechar='"', quoting=csv.QUOTE_ALL)
         writer.writerow(datatable['header'])
+        nrecords = 0
         for datarow in datatable['data']:
             encoded_row = [unicode(s).encode('utf-8') for s in datarow]
             writer.writerow(encoded_row)
+            nrecords += 1
 
         fp.close()
-        print "Done: %d records dumped" % len(datatable['data'])
+        print "Done: %d records dumped" % nrecords
 
     class DummyRequest(object):
         META = {}
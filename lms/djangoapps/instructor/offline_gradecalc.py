@@ -6,12 +6,24 @@
 # The grades are stored in the OfflineComputedGrade table of the courseware model.
 
 import json
+import multiprocessing
 import time
 
 from json import JSONEncoder
 from courseware import grades, models
 from courseware.courses import get_course_by_id
+from courseware.model_data import chunks
 from django.contrib.auth.models import User
+from django.db import connection, transaction
+from xmodule.modulestore.django import clear_existing_modulestores
+
+# Number of students graded together by grades.grade_batch
+GRADE_BATCH_SIZE = 1000
+
+# Number of students handed to a worker process at a time by
+# parallel_offline_grade_calculation. Each shard is saved in one transaction,
+# so this is also the most work a killed run can lose per worker.
+GRADE_SHARD_SIZE = 500
 
 
 class MyEncoder(JSONEncoder):
@@ -25,6 +37,16 @@ class MyEncoder(JSONEncoder):
             yield chunk
 
 
+class DummyRequest(object):
+    META = {}
+    def __init__(self):
+        return
+    def get_host(self):
+        return 'edx.mit.edu'
+    def is_secure(self):
+        return False
+
+
 def offline_grade_calculation(course_id):
     '''
     Compute grades for all students for a specified course, and save results to the DB.
@@ -38,29 +60,19 @@ def offline_grade_calculation(course_id):
 
     enc = MyEncoder()
 
-    class DummyRequest(object):
-        META = {}
-        def __init__(self):
-            return
-        def get_host(self):
-            return 'edx.mit.edu'
-        def is_secure(self):
-            return False
-
     print "%d enrolled students" % len(enrolled_students)
     course = get_course_by_id(course_id)
 
-    for student in enrolled_students:
-        request = DummyRequest()
-        request.user = student
-        request.session = {}
+    request = DummyRequest()
+    request.session = {}
 
-        gradeset = grades.grade(student, request, course, keep_raw_scores=True)
-        gs = enc.encode(gradeset)
-        ocg, created = models.OfflineComputedGrade.objects.get_or_create(user=student, course_id=course_id)
-        ocg.gradeset = gs
-        ocg.save()
-        print "%s done" % student  	# print statement used because this is run by a management command
+    for student_batch in chunks(enrolled_students, GRADE_BATCH_SIZE):
+        for student, gradeset in grades.grade_batch(student_batch, request, course, keep_raw_scores=True):
+            gs = enc.encode(gradeset)
+            ocg, created = models.OfflineComputedGrade.objects.get_or_create(user=student, course_id=course_id)
+            ocg.gradeset = gs
+            ocg.save()
+            print "%s done" % student  	# print statement used because this is run by a management command
 
     tend = time.time()
     dt = tend - tstart
@@ -71,12 +83,114 @@ def offline_grade_calculation(course_id):
     print "All Done!"
 
 
+def _init_grading_worker():
+    '''
+    Make a freshly forked worker process open its own database and modulestore
+    connections, instead of sharing the ones inherited from the parent.
+    '''
+    connection.close()
+    clear_existing_modulestores()
+
+
+def _grade_student_shard(args):
+    '''
+    Grade a shard of students of a course, given as (course_id, student_ids), and
+    replace their OfflineComputedGrade rows in a single transaction.
+    Returns the number of students graded.
+    '''
+    course_id, student_ids = args
+    course = get_course_by_id(course_id)
+    students = User.objects.filter(id__in=student_ids).prefetch_related("groups").order_by('id')
+
+    enc = MyEncoder()
+    request = DummyRequest()
+    request.session = {}
+    rows = [
+        models.OfflineComputedGrade(user=student, course_id=course_id, gradeset=enc.encode(gradeset))
+        for student, gradeset in grades.grade_batch(students, request, course, keep_raw_scores=True)
+    ]
+
+    # Django has no upsert, so replace the shard's rows wholesale
+    with transaction.commit_on_success():
+        models.OfflineComputedGrade.objects.filter(course_id=course_id, user__in=student_ids).delete()
+        models.OfflineComputedGrade.objects.bulk_create(rows)
+
+    return len(rows)
+
+
+def parallel_offline_grade_calculation(course_id, processes=None, resume=False):
+    '''
+    Compute grades for all students for a specified course using a pool of worker
+    processes, and save results to the DB.
+
+    processes is the number of worker processes (defaults to the number of CPUs).
+    If resume is True and the last parallel run for the course didn't finish,
+    students whose grades were saved by that run are skipped.
+    '''
+    tstart = time.time()
+    student_ids = list(User.objects.filter(
+        courseenrollment__course_id=course_id,
+        courseenrollment__is_active=1
+    ).order_by('id').values_list('id', flat=True))
+
+    ocgl = None
+    if resume:
+        unfinished = models.OfflineComputedGradeLog.objects.filter(course_id=course_id, finished=False)
+        if unfinished.exists():
+            ocgl = unfinished.latest('created')
+
+    if ocgl is not None:
+        # The grades saved since the interrupted run started are its checkpoint
+        done = set(models.OfflineComputedGrade.objects.filter(
+            course_id=course_id,
+            updated__gte=ocgl.created,
+        ).values_list('user', flat=True))
+        print "Resuming run started %s: %d of %d students already graded" % (ocgl.created, len(done), len(student_ids))
+    else:
+        done = set()
+        ocgl = models.OfflineComputedGradeLog(course_id=course_id, finished=False)
+    previous_seconds = ocgl.seconds
+    ocgl.nstudents = len(student_ids)
+    ocgl.save()
+
+    todo = [student_id for student_id in student_ids if student_id not in done]
+    shards = [(course_id, shard) for shard in chunks(todo, GRADE_SHARD_SIZE)]
+    print "%d enrolled students, %d to grade in %d shards" % (len(student_ids), len(todo), len(shards))
+
+    # Workers must not inherit this process's database connection
+    connection.close()
+    pool = multiprocessing.Pool(processes, initializer=_init_grading_worker)
+    ngraded = 0
+    try:
+        for count in pool.imap_unordered(_grade_student_shard, shards):
+            ngraded += count
+            dt = time.time() - tstart
+            ocgl.seconds = previous_seconds + dt
+            ocgl.students_per_second = ngraded / dt
+            ocgl.save()
+            print "%d/%d students graded (%.1f students/sec)" % (ngraded + len(done), len(student_ids), ocgl.students_per_second)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    dt = time.time() - tstart
+    ocgl.seconds = previous_seconds + dt
+    ocgl.students_per_second = ngraded / dt if dt else 0
+    ocgl.finished = True
+    ocgl.save()
+    print ocgl
+    print "All Done!"
+
+
 def offline_grades_available(course_id):
     '''
     Returns False if no offline grades available for specified course.
     Otherwise returns latest log field entry about the available pre-computed grades.
     '''
-    ocgl = models.OfflineComputedGradeLog.objects.filter(course_id=course_id)
+    ocgl = models.OfflineComputedGradeLog.objects.filter(course_id=course_id, finished=True)
     if not ocgl:
         return False
     return ocgl.latest('created')
@@ -5,11 +5,14 @@ Unit tests for instructor.api methods.
 import unittest
 import json
 import requests
+import shutil
+import tempfile
 from urllib import quote
 from django.test import TestCase
 from nose.tools import raises
 from mock import Mock, patch
 from django.test.utils import override_settings
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.http import HttpRequest, HttpResponse
 
@@ -31,6 +34,7 @@ import instructor.views.api
 from instructor.views.api import (
     _split_input_list, _msk_from_problem_urlname, common_exceptions_400)
 from instructor_task.api_helper import AlreadyRunningError
+from instructor_task.models import ReportStore
 
 
 @common_exceptions_400
@@ -125,6 +129,9 @@ class TestInstructorAPIDenyLevels(ModuleStoreTestCase, LoginEnrollmentTestCase):
             'update_forum_role_membership',
             'proxy_legacy_analytics',
             'send_email',
+            'generate_report',
+            'list_report_downloads',
+            'get_report_download',
         ]
         for endpoint in staff_level_endpoints:
             url = reverse(endpoint, kwargs={'course_id': self.course.id})
@@ -421,6 +428,8 @@ class TestInstructorAPILevelsDataDump(ModuleStoreTestCase, LoginEnrollmentTestCa
     Test endpoints that show data without side effects.
     """
     def setUp(self):
+        # distributions are cached per course
+        cache.clear()
         self.instructor = AdminFactory.create()
         self.course = CourseFactory.create()
         self.client.login(username=self.instructor.username, password='test')
@@ -851,6 +860,64 @@ class TestInstructorAPITaskLists(ModuleStoreTestCase, LoginEnrollmentTestCase):
         self.assertEqual(json.loads(response.content), expected_res)
 
 
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestInstructorAPIReports(ModuleStoreTestCase, LoginEnrollmentTestCase):
+    """
+    Test endpoints that generate reports in the background, and serve them.
+    """
+    def setUp(self):
+        self.instructor = AdminFactory.create()
+        self.course = CourseFactory.create()
+        self.client.login(username=self.instructor.username, password='test')
+
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir)
+        storage_settings = override_settings(INSTRUCTOR_REPORT_STORAGE={
+            'STORAGE_CLASS': 'django.core.files.storage.FileSystemStorage',
+            'STORAGE_KWARGS': {'location': report_dir},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+    def test_generate_report(self):
+        url = reverse('generate_report', kwargs={'course_id': self.course.id})
+        with patch('instructor_task.api.submit_course_report') as submit:
+            response = self.client.get(url, {'report_type': 'grades'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'report_type': 'grades', 'task': 'created'})
+        self.assertEqual(submit.call_args[0][1:], (self.course.id, 'grades'))
+
+    def test_generate_unknown_report(self):
+        url = reverse('generate_report', kwargs={'course_id': self.course.id})
+        response = self.client.get(url, {'report_type': 'horoscopes'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_generate_running_report(self):
+        url = reverse('generate_report', kwargs={'course_id': self.course.id})
+        with patch('instructor_task.api.submit_course_report', side_effect=AlreadyRunningError()):
+            response = self.client.get(url, {'report_type': 'grades'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_and_download_reports(self):
+        ReportStore.from_config().store_rows(self.course.id, 'report.csv', ['Name'], [['Jim'], ['Jake']])
+
+        url = reverse('list_report_downloads', kwargs={'course_id': self.course.id})
+        response = self.client.get(url, {})
+        downloads = json.loads(response.content)['downloads']
+        self.assertEqual([download['name'] for download in downloads], ['report.csv'])
+
+        response = self.client.get(downloads[0]['url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=report.csv')
+        self.assertEqual(response.content.replace('\r', ''), '"Name"\n"Jim"\n"Jake"\n')
+
+    def test_download_missing_report(self):
+        url = reverse('get_report_download', kwargs={'course_id': self.course.id})
+        response = self.client.get(url, {'name': '../../etc/passwd'})
+        self.assertEqual(response.status_code, 404)
+
+
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
 @override_settings(ANALYTICS_SERVER_URL="http://robotanalyticsserver.netbot:900/")
 @override_settings(ANALYTICS_API_KEY="robot_api_key")
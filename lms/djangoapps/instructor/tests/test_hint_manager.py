@@ -4,6 +4,7 @@ from django.test.client import Client, RequestFactory
 from django.test.utils import override_settings
 from mock import patch, MagicMock
 
+from courseware.model_data import increment_user_state_summary_counter
 from courseware.models import XModuleUserStateSummaryField
 from courseware.tests.factories import UserStateSummaryFactory
 from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
@@ -134,6 +135,23 @@ class HintManagerTest(ModuleStoreTestCase):
         print json.loads(problem_hints)['1.0']['1']
         self.assertTrue(json.loads(problem_hints)['1.0']['1'][1] == 5)
 
+    def test_counted_votes(self):
+        """
+        Checks that the votes the hinter counted apart from the hints are shown,
+        and taken into account when votes are changed.
+        """
+        increment_user_state_summary_counter(self.problem_id, 'hint_votes', '1', 4)
+        out = view.get_hints(None, self.course_id, 'hints')
+        self.assertEqual(dict(out['all_hints'][self.problem_id])['1.0']['1'], ['Hint 1', 6])
+
+        request = RequestFactory()
+        post = request.post(self.url, {'field': 'hints',
+                                       'op': 'change votes',
+                                       1: [self.problem_id, '1.0', '1', 5]})
+        view.change_votes(post, self.course_id, 'hints')
+        out = view.get_hints(None, self.course_id, 'hints')
+        self.assertEqual(dict(out['all_hints'][self.problem_id])['1.0']['1'], ['Hint 1', 5])
+
     def test_addhint(self):
         """
         Check that instructors can add new hints.
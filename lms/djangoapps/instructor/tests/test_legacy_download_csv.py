@@ -14,8 +14,10 @@ from django.test.utils import override_settings
 from django.contrib.auth.models import Group, User
 
 from django.core.urlresolvers import reverse
+from django.test.client import RequestFactory
 
 from courseware.access import _course_staff_group_name
+from instructor.views.legacy import get_student_grade_summary_data, iter_student_grade_summary_data
 from courseware.tests.helpers import LoginEnrollmentTestCase
 from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
@@ -77,3 +79,35 @@ class TestInstructorDashboardGradeDownloadCSV(ModuleStoreTestCase, LoginEnrollme
 '''
 
         self.assertEqual(body, expected_body, msg)
+
+    def test_download_profile_csv(self):
+        url = reverse('instructor_dashboard', kwargs={'course_id': self.toy.id})
+        response = self.client.post(url, {'action': 'Download CSV of all student profile data for this course'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=profiledata_{0}.csv'.format(self.toy.id))
+        rows = response.content.replace('\r', '').splitlines()
+        self.assertEqual(
+            rows[0],
+            '"username","email","name","language","location","year_of_birth","gender",'
+            '"level_of_education","mailing_address","goals"'
+        )
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(rows[1].startswith('"u2","view2@test.com","username"'))
+
+    def test_iter_grade_summary_data(self):
+        self.logout()
+        self.login(self.student, self.password)
+        self.enroll(self.toy)
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(email=self.instructor)
+        request.session = {}
+        datatable = get_student_grade_summary_data(request, self.toy, self.toy.id)
+        streamed = iter_student_grade_summary_data(request, self.toy, self.toy.id)
+
+        self.assertEqual(streamed['header'], datatable['header'])
+        self.assertEqual(streamed['assignments'], datatable['assignments'])
+        self.assertEqual(
+            list(streamed['data']),
+            sorted(datatable['data'], key=lambda datarow: datarow[0])
+        )
@@ -0,0 +1,109 @@
+"""
+Tests of the offline grade calculation
+"""
+import itertools
+import json
+
+from django.test.utils import override_settings
+from mock import Mock, patch
+
+from courseware.models import OfflineComputedGrade, OfflineComputedGradeLog
+from courseware.tests.tests import TEST_DATA_MIXED_MODULESTORE
+from instructor.offline_gradecalc import (
+    _grade_student_shard, offline_grades_available, parallel_offline_grade_calculation
+)
+from student.tests.factories import UserFactory, CourseEnrollmentFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
+
+
+class InProcessPool(object):
+    """
+    Stands in for multiprocessing.Pool, running the tasks in this process, where
+    the test database is.
+    """
+    def __init__(self, processes=None, initializer=None):
+        pass
+
+    def imap_unordered(self, func, iterable):
+        return itertools.imap(func, iterable)
+
+    def close(self):
+        pass
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestOfflineGradeCalc(ModuleStoreTestCase):
+    """
+    Tests of the pieces of the parallel offline grade calculation
+    """
+
+    def setUp(self):
+        self.course = CourseFactory.create()
+        self.students = [UserFactory.create() for _ in xrange(3)]
+        for student in self.students:
+            CourseEnrollmentFactory.create(user=student, course_id=self.course.id)
+
+    def test_grade_student_shard(self):
+        # An outdated grade should be replaced, not duplicated
+        OfflineComputedGrade.objects.create(user=self.students[0], course_id=self.course.id, gradeset='{}')
+
+        count = _grade_student_shard((self.course.id, [student.id for student in self.students]))
+
+        self.assertEqual(count, 3)
+        rows = OfflineComputedGrade.objects.filter(course_id=self.course.id)
+        self.assertEqual(set(row.user_id for row in rows), set(student.id for student in self.students))
+        for row in rows:
+            self.assertEqual(json.loads(row.gradeset)['percent'], 0)
+
+    def test_unfinished_runs_not_available(self):
+        self.assertFalse(offline_grades_available(self.course.id))
+
+        OfflineComputedGradeLog.objects.create(course_id=self.course.id, finished=False)
+        self.assertFalse(offline_grades_available(self.course.id))
+
+        finished = OfflineComputedGradeLog.objects.create(course_id=self.course.id, nstudents=3)
+        self.assertEqual(offline_grades_available(self.course.id), finished)
+
+    @patch('instructor.offline_gradecalc.connection', Mock())
+    @patch('instructor.offline_gradecalc.multiprocessing.Pool', InProcessPool)
+    @patch('instructor.offline_gradecalc.GRADE_SHARD_SIZE', 2)
+    def test_parallel_calculation(self):
+        parallel_offline_grade_calculation(self.course.id, processes=1)
+
+        rows = OfflineComputedGrade.objects.filter(course_id=self.course.id)
+        self.assertEqual(set(row.user_id for row in rows), set(student.id for student in self.students))
+        ocgl = OfflineComputedGradeLog.objects.get(course_id=self.course.id)
+        self.assertTrue(ocgl.finished)
+        self.assertEqual(ocgl.nstudents, 3)
+        self.assertGreater(ocgl.students_per_second, 0)
+        self.assertEqual(offline_grades_available(self.course.id), ocgl)
+
+    @patch('instructor.offline_gradecalc.connection', Mock())
+    @patch('instructor.offline_gradecalc.multiprocessing.Pool', InProcessPool)
+    @patch('instructor.offline_gradecalc.GRADE_SHARD_SIZE', 2)
+    def test_resume(self):
+        # A run that was interrupted after saving the shard of the first student
+        unfinished = OfflineComputedGradeLog.objects.create(course_id=self.course.id, finished=False, seconds=10)
+        OfflineComputedGrade.objects.create(user=self.students[0], course_id=self.course.id, gradeset='{}')
+
+        with patch('instructor.offline_gradecalc._grade_student_shard', Mock(side_effect=_grade_student_shard)) as grade:
+            parallel_offline_grade_calculation(self.course.id, processes=1, resume=True)
+
+        # Each call is given (course_id, student_ids)
+        graded = [student_id for args, _ in grade.call_args_list for student_id in args[0][1]]
+        self.assertEqual(sorted(graded), sorted(student.id for student in self.students[1:]))
+        # The interrupted run's grade is kept
+        self.assertEqual(OfflineComputedGrade.objects.get(user=self.students[0]).gradeset, '{}')
+
+        ocgl = OfflineComputedGradeLog.objects.get(course_id=self.course.id)
+        self.assertEqual(ocgl.pk, unfinished.pk)
+        self.assertTrue(ocgl.finished)
+        self.assertGreaterEqual(ocgl.seconds, 10)
+        self.assertGreater(ocgl.students_per_second, 0)
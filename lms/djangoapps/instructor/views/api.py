@@ -14,7 +14,8 @@ from django_future.csrf import ensure_csrf_cookie
 from django.views.decorators.cache import cache_control
 from django.core.urlresolvers import reverse
 from django.utils.translation import ugettext as _
-from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.http import urlencode
 from util.json_request import JsonResponse
 
 from courseware.access import has_access
@@ -392,9 +393,8 @@ def get_students_features(request, course_id, csv=False):  # pylint: disable=W06
     query_features = ['username', 'name', 'email', 'language', 'location', 'year_of_birth', 'gender',
                       'level_of_education', 'mailing_address', 'goals']
 
-    student_data = analytics.basic.enrolled_students_features(course_id, query_features)
-
     if not csv:
+        student_data = analytics.basic.enrolled_students_features(course_id, query_features)
         response_payload = {
             'course_id': course_id,
             'students': student_data,
@@ -404,7 +404,8 @@ def get_students_features(request, course_id, csv=False):  # pylint: disable=W06
         }
         return JsonResponse(response_payload)
     else:
-        header, datarows = analytics.csvs.format_dictlist(student_data, query_features)
+        student_data = analytics.basic.iter_enrolled_students_features(course_id, query_features)
+        header, datarows = analytics.csvs.iter_format_dictlist(student_data, query_features)
         return analytics.csvs.create_csv_response("enrolled_profiles.csv", header, datarows)
 
 
@@ -475,7 +476,7 @@ def get_distribution(request, course_id):
 
     p_dist = None
     if not feature is None:
-        p_dist = analytics.distributions.profile_distribution(course_id, feature)
+        p_dist = analytics.distributions.profile_distribution(course_id, feature, use_cache=True)
         response_payload['feature_results'] = {
             'feature': p_dist.feature,
             'feature_display_name': p_dist.feature_display_name,
@@ -685,6 +686,70 @@ def list_instructor_tasks(request, course_id):
     return JsonResponse(response_payload)
 
 
+@ensure_csrf_cookie
+@cache_control(no_cache=True, no_store=True, must_revalidate=True)
+@require_level('staff')
+@require_query_params(report_type="'grades', 'raw_grades', 'student_profiles', 'anon_ids' or 'answer_distribution'")
+@common_exceptions_400
+def generate_report(request, course_id):
+    """
+    Starts a background task generating a report of the course as a .csv file.
+    When it's done, the report is listed by list_report_downloads.
+
+    Query parameters:
+        - report_type is the kind of report
+    """
+    report_type = request.GET.get('report_type')
+    try:
+        instructor_task.api.submit_course_report(request, course_id, report_type)
+    except ValueError:
+        return HttpResponseBadRequest("Unknown report_type.")
+
+    response_payload = {
+        'report_type': report_type,
+        'task': 'created',
+    }
+    return JsonResponse(response_payload)
+
+
+@ensure_csrf_cookie
+@cache_control(no_cache=True, no_store=True, must_revalidate=True)
+@require_level('staff')
+def list_report_downloads(request, course_id):  # pylint: disable=W0613
+    """
+    List the reports generated for the course, newest first, with the urls to
+    download them from.
+    """
+    def extract_report_features(report_name):
+        """ Convert report name to dict for json rendering """
+        url = reverse('get_report_download', kwargs={'course_id': course_id})
+        return {'name': report_name, 'url': u'{0}?{1}'.format(url, urlencode({'name': report_name}))}
+
+    response_payload = {
+        'downloads': map(extract_report_features, instructor_task.api.get_course_report_names(course_id)),
+    }
+    return JsonResponse(response_payload)
+
+
+@ensure_csrf_cookie
+@cache_control(no_cache=True, no_store=True, must_revalidate=True)
+@require_level('staff')
+@require_query_params(name="name of the report")
+def get_report_download(request, course_id):
+    """
+    Respond with a report generated for the course, as an attachment.
+    """
+    report_name = request.GET.get('name')
+    try:
+        report = instructor_task.api.open_course_report(course_id, report_name)
+    except ValueError:
+        return HttpResponseNotFound()
+
+    response = HttpResponse(report.chunks(), mimetype='text/csv')
+    response['Content-Disposition'] = 'attachment; filename={0}'.format(report_name)
+    return response
+
+
 @ensure_csrf_cookie
 @cache_control(no_cache=True, no_store=True, must_revalidate=True)
 @require_level('staff')
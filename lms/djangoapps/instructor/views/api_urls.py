@@ -27,6 +27,12 @@ urlpatterns = patterns('',  # nopep8
         'instructor.views.api.rescore_problem', name="rescore_problem"),
     url(r'^list_instructor_tasks$',
         'instructor.views.api.list_instructor_tasks', name="list_instructor_tasks"),
+    url(r'^generate_report$',
+        'instructor.views.api.generate_report', name="generate_report"),
+    url(r'^list_report_downloads$',
+        'instructor.views.api.list_report_downloads', name="list_report_downloads"),
+    url(r'^get_report_download$',
+        'instructor.views.api.get_report_download', name="get_report_download"),
     url(r'^list_forum_members$',
         'instructor.views.api.list_forum_members', name="list_forum_members"),
     url(r'^update_forum_role_membership$',
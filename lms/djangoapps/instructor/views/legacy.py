@@ -30,18 +30,22 @@ from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.html_module import HtmlDescriptor
 
+from analytics.basic import enrolled_students_batches
+from analytics.csvs import create_csv_response
 from bulk_email.models import CourseEmail, CourseAuthorization
 from courseware import grades
 from courseware.access import (has_access, get_access_group_name,
                                course_beta_test_group_name)
 from courseware.courses import get_course_with_access, get_cms_course_link_by_id
+from courseware.model_data import chunks
 from courseware.models import StudentModule
 from django_comment_common.models import (Role,
                                           FORUM_ROLE_ADMINISTRATOR,
                                           FORUM_ROLE_MODERATOR,
                                           FORUM_ROLE_COMMUNITY_TA)
 from django_comment_client.utils import has_forum_access
-from instructor.offline_gradecalc import student_grades, offline_grades_available
+from external_auth.models import ExternalAuthMap
+from instructor.offline_gradecalc import GRADE_BATCH_SIZE, student_grades, offline_grades_available
 from instructor.views.tools import strip_if_string
 from instructor_task.api import (get_running_instructor_tasks,
                                  get_instructor_task_history,
@@ -123,12 +127,13 @@ def instructor_dashboard(request, course_id):
         return datatable
 
     def return_csv(func, datatable, file_pointer=None):
-        """Outputs a CSV file from the contents of a datatable."""
+        """
+        Outputs a CSV file from the contents of a datatable. Without a
+        file_pointer, the file is streamed as datatable['data'] is read.
+        """
         if file_pointer is None:
-            response = HttpResponse(mimetype='text/csv')
-            response['Content-Disposition'] = 'attachment; filename={0}'.format(func)
-        else:
-            response = file_pointer
+            return create_csv_response(func, datatable['header'], datatable['data'])
+        response = file_pointer
         writer = csv.writer(response, dialect='excel', quotechar='"', quoting=csv.QUOTE_ALL)
         writer.writerow(datatable['header'])
         for datarow in datatable['data']:
@@ -256,12 +261,12 @@ def instructor_dashboard(request, course_id):
     elif 'Download CSV of all student grades' in action:
         track.views.server_track(request, "dump-grades-csv", {}, page="idashboard")
         return return_csv('grades_{0}.csv'.format(course_id),
-                          get_student_grade_summary_data(request, course, course_id, use_offline=use_offline))
+                          iter_student_grade_summary_data(request, course, course_id, use_offline=use_offline))
 
     elif 'Download CSV of all RAW grades' in action:
         track.views.server_track(request, "dump-grades-csv-raw", {}, page="idashboard")
         return return_csv('grades_{0}_raw.csv'.format(course_id),
-                          get_student_grade_summary_data(request, course, course_id, get_raw_scores=True, use_offline=use_offline))
+                          iter_student_grade_summary_data(request, course, course_id, get_raw_scores=True, use_offline=use_offline))
 
     elif 'Download CSV of answer distributions' in action:
         track.views.server_track(request, "dump-answer-dist-csv", {}, page="idashboard")
@@ -552,10 +557,6 @@ def instructor_dashboard(request, course_id):
     # DataDump
 
     elif 'Download CSV of all student profile data' in action:
-        enrolled_students = User.objects.filter(
-            courseenrollment__course_id=course_id,
-            courseenrollment__is_active=1,
-        ).order_by('username').select_related("profile")
         profkeys = ['name', 'language', 'location', 'year_of_birth', 'gender', 'level_of_education',
                     'mailing_address', 'goals']
         datatable = {'header': ['username', 'email'] + profkeys}
@@ -564,7 +565,9 @@ def instructor_dashboard(request, course_id):
             p = u.profile
             return [u.username, u.email] + [getattr(p, x, '') for x in profkeys]
 
-        datatable['data'] = [getdat(u) for u in enrolled_students]
+        datatable['data'] = (
+            getdat(u) for student_batch in enrolled_students_batches(course_id) for u in student_batch
+        )
         datatable['title'] = 'Student profile data for course %s' % course_id
         return return_csv('profiledata_%s.csv' % course_id, datatable)
 
@@ -1120,42 +1123,105 @@ def get_student_grade_summary_data(request, course, course_id, get_grades=True,
         courseenrollment__is_active=1,
     ).prefetch_related("groups").order_by('username')
 
+    header = ['ID', 'Username', 'Full Name', 'edX email', 'External email']
+    assignments = None
+    data = []
+
+    for student_batch in chunks(enrolled_students, GRADE_BATCH_SIZE):
+        batch_assignments, batch_data = _student_grade_summary_rows(
+            request, course, student_batch, get_grades, get_raw_scores, use_offline
+        )
+        if assignments is None:
+            assignments = batch_assignments
+        data += batch_data
+
+    assignments = assignments or []
+    header += assignments
+    return {'header': header, 'assignments': assignments, 'students': enrolled_students, 'data': data}
+
+
+def iter_student_grade_summary_data(request, course, course_id, get_grades=True, get_raw_scores=False, use_offline=False):
+    '''
+    Like get_student_grade_summary_data, but for large courses: the data of the
+    returned datatable is a generator, which loads and grades the students in
+    batches as it is read, so only one batch is in memory at a time. The rows
+    are in order of student id, and there is no list of students.
+
+    Only the first batch is loaded and graded up front, for the header.
+    '''
+    student_batches = enrolled_students_batches(course_id, GRADE_BATCH_SIZE, prefetch_related=["groups"])
+
     header = ['ID', 'Username', 'Full Name', 'edX email', 'External email']
     assignments = []
-    if get_grades and enrolled_students.count() > 0:
-        # just to construct the header
-        gradeset = student_grades(enrolled_students[0], request, course, keep_raw_scores=get_raw_scores, use_offline=use_offline)
-        # log.debug('student {0} gradeset {1}'.format(enrolled_students[0], gradeset))
-        if get_raw_scores:
-            assignments += [score.section for score in gradeset['raw_scores']]
-        else:
-            assignments += [x['label'] for x in gradeset['section_breakdown']]
+    first_rows = []
+    for student_batch in student_batches:
+        assignments, first_rows = _student_grade_summary_rows(
+            request, course, student_batch, get_grades, get_raw_scores, use_offline
+        )
+        break
     header += assignments
 
-    datatable = {'header': header, 'assignments': assignments, 'students': enrolled_students}
-    data = []
+    def generate_rows():
+        """Yield the rows of the first batch, then grade the rest"""
+        for datarow in first_rows:
+            yield datarow
+        del first_rows[:]
+        for student_batch in student_batches:
+            _, batch_data = _student_grade_summary_rows(
+                request, course, student_batch, get_grades, get_raw_scores, use_offline
+            )
+            for datarow in batch_data:
+                yield datarow
 
-    for student in enrolled_students:
-        datarow = [student.id, student.username, student.profile.name, student.email]
-        try:
-            datarow.append(student.externalauthmap.external_email)
-        except:  # ExternalAuthMap.DoesNotExist
-            datarow.append('')
+    return {'header': header, 'assignments': assignments, 'data': generate_rows()}
+
+
+def _student_grade_summary_rows(request, course, students, get_grades, get_raw_scores, use_offline):
+    '''
+    Return (assignments, data) for a batch of students, as in the datatable of
+    get_student_grade_summary_data. The assignments are those of the first
+    student of the batch, or [] if not get_grades.
 
-        if get_grades:
-            gradeset = student_grades(student, request, course, keep_raw_scores=get_raw_scores, use_offline=use_offline)
+    Each student's grades are also stored in student.grades.
+    '''
+    external_emails = dict(
+        ExternalAuthMap.objects.filter(user__in=students).values_list('user', 'external_email')
+    )
+
+    if get_grades and not use_offline:
+        gradesets = grades.grade_batch(students, request, course, keep_raw_scores=get_raw_scores)
+    elif get_grades:
+        gradesets = [
+            (student, student_grades(student, request, course, keep_raw_scores=get_raw_scores, use_offline=True))
+            for student in students
+        ]
+    else:
+        gradesets = [(student, None) for student in students]
+
+    assignments = []
+    data = []
+    for student, gradeset in gradesets:
+        datarow = [student.id, student.username, student.profile.name, student.email,
+                   external_emails.get(student.id, '')]
+
+        if gradeset is not None:
             log.debug('student={0}, gradeset={1}'.format(student, gradeset))
             if get_raw_scores:
                 # TODO (ichuang) encode Score as dict instead of as list, so score[0] -> score['earned']
                 sgrades = [(getattr(score, 'earned', '') or score[0]) for score in gradeset['raw_scores']]
             else:
                 sgrades = [x['percent'] for x in gradeset['section_breakdown']]
+            if not data:
+                # the header is made from the first student's gradeset
+                if get_raw_scores:
+                    assignments = [score.section for score in gradeset['raw_scores']]
+                else:
+                    assignments = [x['label'] for x in gradeset['section_breakdown']]
             datarow += sgrades
             student.grades = sgrades  	# store in student object
 
         data.append(datarow)
-    datatable['data'] = data
-    return datatable
+    return assignments, data
 
 #-----------------------------------------------------------------------------
 
@@ -1458,7 +1524,7 @@ def get_answers_distribution(request, course_id):
     """
     course = get_course_with_access(request.user, course_id, 'staff')
 
-    dist = grades.answer_distributions(request, course)
+    dist = grades.answer_distributions(course)
 
     d = {}
     d['header'] = ['url_name', 'display name', 'answer id', 'answer', 'count']
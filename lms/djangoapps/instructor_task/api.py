@@ -12,11 +12,13 @@ from celery.states import READY_STATES
 
 from xmodule.modulestore.django import modulestore
 
-from instructor_task.models import InstructorTask
+from instructor_task.models import InstructorTask, ReportStore
 from instructor_task.tasks import (rescore_problem,
                                    reset_problem_attempts,
                                    delete_problem_state,
-                                   send_bulk_course_email)
+                                   send_bulk_course_email,
+                                   generate_course_report)
+from instructor_task.tasks_helper import REPORT_TYPES
 
 from instructor_task.api_helper import (check_arguments_for_rescoring,
                                         encode_problem_and_student_input,
@@ -206,3 +208,48 @@ def submit_bulk_course_email(request, course_id, email_id):
     # create the key value by using MD5 hash:
     task_key = hashlib.md5(task_key_stub).hexdigest()
     return submit_task(request, task_type, task_class, course_id, task_input, task_key)
+
+
+def submit_course_report(request, course_id, report_type):
+    """
+    Request a report of a course to be generated as a background task.
+
+    The `report_type` is one of the keys of tasks_helper.REPORT_TYPES: 'grades',
+    'raw_grades', 'student_profiles', 'anon_ids' or 'answer_distribution'.  The report
+    is kept in the ReportStore when it is done; see get_course_report_names.
+
+    ValueError is raised if the `report_type` is unknown, or AlreadyRunningError if
+    the same report is already being generated for the course.
+
+    This method makes sure the InstructorTask entry is committed.
+    When called from any view that is wrapped by TransactionMiddleware,
+    and thus in a "commit-on-success" transaction, an autocommit buried within here
+    will cause any pending transaction to be committed by a successful
+    save here.  Any future database operations will take place in a
+    separate transaction.
+    """
+    if report_type not in REPORT_TYPES:
+        raise ValueError("Unknown report type: {0}".format(report_type))
+
+    task_type = 'generate_course_report'
+    task_class = generate_course_report
+    task_input = {'report_type': report_type}
+    # create the key value by using MD5 hash:
+    task_key = hashlib.md5(report_type).hexdigest()
+    return submit_task(request, task_type, task_class, course_id, task_input, task_key)
+
+
+def get_course_report_names(course_id):
+    """
+    Returns the names of the reports generated for a given course, newest first.
+    """
+    return ReportStore.from_config().report_names(course_id)
+
+
+def open_course_report(course_id, report_name):
+    """
+    Opens the report `report_name` of a given course for reading.
+
+    ValueError is raised if there is no such report.
+    """
+    return ReportStore.from_config().open(course_id, report_name)
@@ -13,11 +13,19 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
 from uuid import uuid4
+import hashlib
 import json
+import os.path
+from tempfile import TemporaryFile
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import get_storage_class
 from django.db import models, transaction
 
+from analytics.csvs import stream_csv
+
 
 # define custom states used by InstructorTask
 QUEUING = 'QUEUING'
@@ -176,3 +184,84 @@ class InstructorTask(models.Model):
     def create_output_for_revoked():
         """Creates standard message to store in output format for revoked tasks."""
         return json.dumps({'message': 'Task revoked before running'})
+
+
+class ReportStore(object):
+    """
+    Keeps the report files generated by instructor tasks, for course staff to
+    download later.
+
+    Files are kept in a Django storage, configured by
+    settings.INSTRUCTOR_REPORT_STORAGE with the dotted path of its
+    'STORAGE_CLASS' and the 'STORAGE_KWARGS' to construct it with. Each course
+    has its own directory in the storage.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+
+    @classmethod
+    def from_config(cls):
+        """Return a ReportStore using the storage in the settings"""
+        config = settings.INSTRUCTOR_REPORT_STORAGE
+        storage_class = get_storage_class(config['STORAGE_CLASS'])
+        return cls(storage_class(**config.get('STORAGE_KWARGS', {})))
+
+    def _course_dir(self, course_id):
+        """The directory of the reports of `course_id`"""
+        return hashlib.sha1(course_id).hexdigest()
+
+    def path_to(self, course_id, filename):
+        """The path in the storage of the report `filename` of `course_id`"""
+        return os.path.join(self._course_dir(course_id), filename)
+
+    def store(self, course_id, filename, content):
+        """
+        Store the File `content` as report `filename` of `course_id`. Returns
+        the name it is stored as, which differs from `filename` if a report of
+        that name already exists.
+        """
+        path = self.storage.save(self.path_to(course_id, filename), content)
+        return os.path.basename(path)
+
+    def store_rows(self, course_id, filename, header, rows):
+        """
+        Store a .csv file of `header` and `rows` as report `filename` of
+        `course_id`, writing it through a temporary file as the rows are read.
+        Returns the name it is stored as, and the number of rows.
+        """
+        num_rows = [0]
+
+        def counted(rows):
+            """Count the rows as they are read"""
+            for row in rows:
+                num_rows[0] += 1
+                yield row
+
+        with TemporaryFile() as csv_file:
+            for chunk in stream_csv(header, counted(rows)):
+                csv_file.write(chunk)
+            csv_file.seek(0)
+            name = self.store(course_id, filename, File(csv_file))
+        return name, num_rows[0]
+
+    def report_names(self, course_id):
+        """The names of the reports of `course_id`, newest first"""
+        try:
+            _, filenames = self.storage.listdir(self._course_dir(course_id))
+        except OSError:
+            # nothing's been stored for the course yet
+            return []
+        return sorted(
+            filenames,
+            key=lambda filename: self.storage.modified_time(self.path_to(course_id, filename)),
+            reverse=True
+        )
+
+    def open(self, course_id, filename):
+        """
+        Open the report `filename` of `course_id` for reading. Raises
+        ValueError if there's no such report.
+        """
+        if filename not in self.report_names(course_id):
+            raise ValueError("No report {0} for course {1}".format(filename, course_id))
+        return self.storage.open(self.path_to(course_id, filename))
@@ -29,6 +29,7 @@ from instructor_task.tasks_helper import (
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
+    perform_report_generation,
 )
 from bulk_email.tasks import perform_delegate_email_batches
 
@@ -127,3 +128,25 @@ def send_bulk_course_email(entry_id, _xmodule_instance_args):
     action_name = ugettext_noop('emailed')
     visit_fcn = perform_delegate_email_batches
     return run_main_task(entry_id, visit_fcn, action_name)
+
+
+@task(base=BaseInstructorTask)  # pylint: disable=E1102
+def generate_course_report(entry_id, xmodule_instance_args):
+    """Generates a report of a course as a .csv file, and stores it for course staff to download.
+
+    `entry_id` is the id value of the InstructorTask entry that corresponds to this task.
+    The entry contains the `course_id` that identifies the course, as well as the
+    `task_input`, which contains task-specific input.
+
+    The task_input should be a dict with the following entries:
+
+      'report_type': the kind of report to generate, one of the keys of
+          tasks_helper.REPORT_TYPES.  (required)
+
+    `xmodule_instance_args` provides information needed by _get_module_instance_for_task()
+    to instantiate an xmodule instance.
+    """
+    # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
+    action_name = ugettext_noop('generated')
+    visit_fcn = partial(perform_report_generation, xmodule_instance_args)
+    return run_main_task(entry_id, visit_fcn, action_name)
@@ -4,6 +4,7 @@ running state of a course.
 
 """
 import json
+from datetime import datetime
 from time import time
 
 from celery import Task, current_task
@@ -13,15 +14,21 @@ from celery.states import SUCCESS, FAILURE
 from django.contrib.auth.models import User
 from django.db import transaction, reset_queries
 from dogapi import dog_stats_api
+from pytz import UTC
 
 from xmodule.modulestore.django import modulestore
 
 from track.views import task_track
 
+from analytics.basic import iter_enrolled_students_features
+from courseware import grades
+from courseware.courses import get_course_by_id
 from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
-from instructor_task.models import InstructorTask, PROGRESS
+from instructor.offline_gradecalc import DummyRequest
+from instructor_task.models import InstructorTask, ReportStore, PROGRESS
+from student.models import CourseEnrollment, unique_id_for_user
 
 # define different loggers for use within tasks and on client side
 TASK_LOG = get_task_logger(__name__)
@@ -29,6 +36,13 @@ TASK_LOG = get_task_logger(__name__)
 # define value to use when no task_id is provided:
 UNKNOWN_TASK_ID = 'unknown-task_id'
 
+# number of rows between updates of a report task's progress
+REPORT_PROGRESS_INTERVAL = 100
+
+# profile fields in the student profiles report
+REPORT_PROFILE_FEATURES = ['username', 'name', 'email', 'language', 'location', 'year_of_birth', 'gender',
+                           'level_of_education', 'mailing_address', 'goals']
+
 # define values for update functions to use to return status to perform_module_state_update
 UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
@@ -314,6 +328,126 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     return task_progress
 
 
+def _grades_report(course_id, request, _update_progress, get_raw_scores=False):
+    """Rows of the grades of the students enrolled in a course"""
+    # imported here, as the instructor views import this module's tasks
+    from instructor.views.legacy import iter_student_grade_summary_data
+    course = get_course_by_id(course_id)
+    datatable = iter_student_grade_summary_data(request, course, course_id, get_raw_scores=get_raw_scores)
+    return datatable['header'], datatable['data']
+
+
+def _raw_grades_report(course_id, request, update_progress):
+    """Rows of the raw scores of the students enrolled in a course"""
+    return _grades_report(course_id, request, update_progress, get_raw_scores=True)
+
+
+def _student_profiles_report(course_id, _request, _update_progress):
+    """Rows of the profiles of the students enrolled in a course"""
+    rows = (
+        [student.get(feature, '') for feature in REPORT_PROFILE_FEATURES]
+        for student in iter_enrolled_students_features(course_id, REPORT_PROFILE_FEATURES)
+    )
+    return REPORT_PROFILE_FEATURES, rows
+
+
+def _anon_ids_report(course_id, _request, _update_progress):
+    """Rows of the anonymized ids of everyone who has enrolled in a course"""
+    students = User.objects.filter(courseenrollment__course_id=course_id).order_by('id')
+    rows = ([student.id, unique_id_for_user(student)] for student in students.iterator())
+    return ['User ID', 'Anonymized user ID'], rows
+
+
+def _answer_distribution_report(course_id, _request, update_progress):
+    """
+    Rows of how often each answer was given to each problem of a course. The
+    progress is that of reading the students' answers, which takes longest.
+    """
+    course = get_course_by_id(course_id)
+    dist = grades.answer_distributions(course, update_progress)
+    rows = (
+        [url_name, display_name, answer_id, answer, answers[answer]]
+        for (url_name, display_name, answer_id), answers in dist.items()
+        for answer in answers
+    )
+    return ['url_name', 'display name', 'answer id', 'answer', 'count'], rows
+
+
+# report_type -> function of (course_id, request, update_progress) returning the report's header
+# and rows. The function can report progress made before the rows are read by calling
+# update_progress(attempted, total).
+REPORT_TYPES = {
+    'grades': _grades_report,
+    'raw_grades': _raw_grades_report,
+    'student_profiles': _student_profiles_report,
+    'anon_ids': _anon_ids_report,
+    'answer_distribution': _answer_distribution_report,
+}
+
+
+def perform_report_generation(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
+    """
+    Generates a report of a course as a .csv file, and keeps it in the ReportStore.
+
+    The task_input should be a dict with the entry 'report_type', one of the keys of REPORT_TYPES.
+
+    The return value is a dict containing the task's results, with the keys that
+    perform_module_state_update returns, where 'attempted' and 'succeeded' count
+    the rows of the report, and 'total' is an estimate of how many there will be
+    (the number of students enrolled), until the report is done.  It also has:
+
+          'report_name': the name the report is stored as in the ReportStore.
+    """
+    start_time = time()
+    report_type = task_input['report_type']
+    report_fcn = REPORT_TYPES[report_type]
+
+    num_rows = [0]
+    num_total = CourseEnrollment.objects.filter(course_id=course_id, is_active=1).count()
+
+    def get_task_progress(attempted=None, total=None):
+        """Return a dict containing info about current task"""
+        attempted = num_rows[0] if attempted is None else attempted
+        return {'action_name': action_name,
+                'attempted': attempted,
+                'succeeded': attempted,
+                'skipped': 0,
+                'failed': 0,
+                'total': num_total if total is None else total,
+                'duration_ms': int((time() - start_time) * 1000),
+                }
+
+    def update_progress(attempted, total):
+        """Update the task's progress before the rows are written"""
+        _get_current_task().update_state(state=PROGRESS, meta=get_task_progress(attempted, total))
+
+    _get_current_task().update_state(state=PROGRESS, meta=get_task_progress())
+    request = DummyRequest()
+    request.session = {}
+    header, rows = report_fcn(course_id, request, update_progress)
+
+    def report_progress(rows):
+        """Update the task's progress as the rows are written"""
+        for row in rows:
+            yield row
+            num_rows[0] += 1
+            if num_rows[0] % REPORT_PROGRESS_INTERVAL == 0:
+                _get_current_task().update_state(state=PROGRESS, meta=get_task_progress())
+
+    filename = u"{course_prefix}_{report_type}_{timestamp}.csv".format(
+        course_prefix=course_id.replace('/', '-'),
+        report_type=report_type,
+        timestamp=datetime.now(UTC).strftime("%Y-%m-%d-%H%M"),
+    )
+    with dog_stats_api.timer('instructor_tasks.report.time', tags=['report:{0}'.format(report_type)]):
+        report_name, _ = ReportStore.from_config().store_rows(course_id, filename, header, report_progress(rows))
+
+    num_total = num_rows[0]
+    task_progress = get_task_progress()
+    task_progress['report_name'] = report_name
+    return task_progress
+
+
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
     """Gets task_id from `xmodule_instance_args` dict, or returns default value if missing."""
     return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID) if xmodule_instance_args is not None else UNKNOWN_TASK_ID
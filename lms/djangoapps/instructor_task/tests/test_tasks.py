@@ -6,9 +6,13 @@ paths actually work.
 
 """
 import json
+import shutil
+import tempfile
 from uuid import uuid4
 
-from mock import Mock, MagicMock, patch
+from mock import Mock, MagicMock, patch, ANY
+
+from django.test.utils import override_settings
 
 from celery.states import SUCCESS, FAILURE
 
@@ -18,10 +22,11 @@ from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
 
-from instructor_task.models import InstructorTask
+from instructor_task.models import InstructorTask, ReportStore
 from instructor_task.tests.test_base import InstructorTaskModuleTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
-from instructor_task.tasks import rescore_problem, reset_problem_attempts, delete_problem_state
+from instructor_task.tasks import (rescore_problem, reset_problem_attempts, delete_problem_state,
+                                   generate_course_report)
 from instructor_task.tasks_helper import UpdateProblemModuleStateError
 
 PROBLEM_URL_NAME = "test_urlname"
@@ -437,3 +442,90 @@ class TestDeleteStateInstructorTask(TestInstructorTasks):
                 StudentModule.objects.get(course_id=self.course.id,
                                           student=student,
                                           module_state_key=self.problem_url)
+
+
+class TestReportInstructorTask(TestInstructorTasks):
+    """Tests instructor task that generates reports."""
+
+    def setUp(self):
+        super(TestReportInstructorTask, self).setUp()
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir)
+        storage_settings = override_settings(INSTRUCTOR_REPORT_STORAGE={
+            'STORAGE_CLASS': 'django.core.files.storage.FileSystemStorage',
+            'STORAGE_KWARGS': {'location': report_dir},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+    def _run_report(self, report_type):
+        """Run the task for a report, and return its status and the report's rows"""
+        task_entry = InstructorTaskFactory.create(course_id=self.course.id,
+                                                  requester=self.instructor,
+                                                  task_input=json.dumps({'report_type': report_type}),
+                                                  task_key='dummy value',
+                                                  task_id=str(uuid4()))
+        status = self._run_task_with_mock_celery(generate_course_report, task_entry.id, task_entry.task_id)
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(json.loads(entry.task_output), status)
+        self.assertEquals(entry.task_state, SUCCESS)
+
+        report_store = ReportStore.from_config()
+        self.assertEquals(report_store.report_names(self.course.id), [status['report_name']])
+        report = report_store.open(self.course.id, status['report_name'])
+        return status, report.read().replace('\r', '').splitlines()
+
+    def test_report_missing_current_task(self):
+        self._test_missing_current_task(generate_course_report)
+
+    def test_student_profiles_report(self):
+        # the instructor is enrolled too
+        enrolled = [self.instructor] + self._create_students_with_state(3)
+        status, rows = self._run_report('student_profiles')
+        self.assertEquals(status['action_name'], 'generated')
+        self.assertEquals(status['attempted'], 4)
+        self.assertEquals(status['succeeded'], 4)
+        self.assertEquals(status['total'], 4)
+        self.assertTrue(rows[0].startswith('"username","name","email"'))
+        self.assertEquals(
+            [row.split(',')[0] for row in rows[1:]],
+            ['"{0}"'.format(user.username) for user in enrolled]
+        )
+
+    def test_anon_ids_report(self):
+        enrolled = [self.instructor] + self._create_students_with_state(2)
+        with patch('instructor_task.tasks_helper.unique_id_for_user', return_value='42'):
+            status, rows = self._run_report('anon_ids')
+        self.assertEquals(status['attempted'], 3)
+        self.assertEquals(rows, ['"User ID","Anonymized user ID"'] + [
+            '"{0}","42"'.format(user.id) for user in enrolled
+        ])
+
+    def test_grades_report(self):
+        self._create_students_with_state(2, grade=1, max_grade=1)
+        status, rows = self._run_report('grades')
+        self.assertEquals(status['attempted'], 3)
+        self.assertEquals(len(rows), 4)
+        self.assertTrue(rows[0].startswith('"ID","Username","Full Name","edX email","External email"'))
+
+    def test_answer_distribution_report(self):
+        self._create_students_with_state(2, state=json.dumps({'student_answers': {'2_1': 'Option 1'}}))
+        status, rows = self._run_report('answer_distribution')
+        self.assertEquals(status['attempted'], 1)
+        self.assertEquals(rows, [
+            '"url_name","display name","answer id","answer","count"',
+            '"{0}","{0}","2_1","Option 1","2"'.format(PROBLEM_URL_NAME),
+        ])
+        # the answers were read with progress reported along the way
+        self.current_task.update_state.assert_any_call(state='PROGRESS', meta=ANY)
+
+    def test_reports_are_kept(self):
+        report_store = ReportStore.from_config()
+        first, num_rows = report_store.store_rows(self.course.id, 'report.csv', ['Name'], [['Jim']])
+        self.assertEquals((first, num_rows), ('report.csv', 1))
+        second, _ = report_store.store_rows(self.course.id, 'report.csv', ['Name'], [['Jake']])
+        self.assertNotEquals(first, second)
+        self.assertEquals(set(report_store.report_names(self.course.id)), set([first, second]))
+        self.assertEquals(report_store.report_names('other/course/id'), [])
+        with self.assertRaises(ValueError):
+            report_store.open('other/course/id', first)
@@ -142,6 +142,7 @@ def get_task_completion_info(instructor_task):
     student = None
     problem_url = None
     email_id = None
+    report_type = None
     try:
         task_input = json.loads(instructor_task.task_input)
     except ValueError:
@@ -151,6 +152,7 @@ def get_task_completion_info(instructor_task):
         student = task_input.get('student')
         problem_url = task_input.get('problem_url')
         email_id = task_input.get('email_id')
+        report_type = task_input.get('report_type')
 
     if instructor_task.task_state == PROGRESS:
         # special message for providing progress updates:
@@ -198,6 +200,11 @@ def get_task_completion_info(instructor_task):
         else:  # num_succeeded < num_attempted
             # Translators: {action} is a past-tense verb that is localized separately. {succeeded} and {attempted} are counts.
             msg_format = _("Message {action} for {succeeded} of {attempted} recipients")
+    elif report_type is not None:
+        # this reports on generating a report
+        succeeded = True
+        # Translators: {action} is a past-tense verb that is localized separately. {attempted} is a count.
+        msg_format = _("Report successfully {action} with {attempted} rows")
     else:
         # provide a default:
         # Translators: {action} is a past-tense verb that is localized separately. {succeeded} and {attempted} are counts.
@@ -1,4 +1,5 @@
 from django.conf import settings
+from dogapi import dog_stats_api
 from xmodule.open_ended_grading_classes import peer_grading_service
 from .staff_grading_service import StaffGradingService
 from xmodule.open_ended_grading_classes.controller_query_service import ControllerQueryService
@@ -9,13 +10,27 @@ import logging
 from courseware.access import has_access
 from util.cache import cache
 import datetime
+import threading
+import time
 from xmodule.x_module import ModuleSystem
 from mitxmako.shortcuts import render_to_string
-import datetime
 
 log = logging.getLogger(__name__)
 
 NOTIFICATION_CACHE_TIME = 300
+# How long notifications older than NOTIFICATION_CACHE_TIME are still shown,
+# while they're refreshed in the background
+NOTIFICATION_STALE_TIME = 60 * 60
+# The longest a page waits for notifications which aren't in the cache at all
+NOTIFICATION_DEADLINE = 1
+# How long one process may take to refresh notifications before another tries
+NOTIFICATION_REFRESH_LOCK_TIME = 60
+# How long one request to the grading controller for notifications may take
+NOTIFICATION_REQUEST_TIMEOUT = 10
+# How many failed requests in a row stop us asking the grading controller for
+# notifications, and for how long
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 60
 KEY_PREFIX = "open_ended_"
 
 NOTIFICATION_TYPES = (
@@ -26,39 +41,175 @@ NOTIFICATION_TYPES = (
 )
 
 
+class CircuitBreaker(object):
+    """
+    Stops calls to a failing service. After `threshold` failures in a row it
+    opens, and no calls are allowed for `cooldown` seconds. Then a single call
+    is let through, and the breaker closes if it succeeds.
+    """
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    def allow(self):
+        """Whether a call may be made now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.time() - self._opened_at >= self.cooldown:
+                # Let this call through, and hold the others off until it's done.
+                self._opened_at = time.time()
+                return True
+            return False
+
+    def success(self):
+        """Record a call that succeeded, closing the breaker"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def failure(self):
+        """Record a call that failed"""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.time()
+
+
+# All the notifications come from the grading controller
+controller_breaker = CircuitBreaker(CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN)
+
+
+def empty_notifications():
+    """The notifications shown when there are none, or we don't know them"""
+    return {'pending_grading': False, 'img_path': "", 'response': {}}
+
+
+def notification_dict_for(notifications, pending_grading):
+    """The notifications to show for the response `notifications` of the grading controller"""
+    img_path = "/static/images/grading_notification.png" if pending_grading else ""
+    return {'pending_grading': pending_grading, 'img_path': img_path, 'response': notifications}
+
+
+class NotificationRefresh(threading.Thread):
+    """
+    Gets notifications from the grading controller with `fetch`, and stores
+    them in the cache under `key_name`. `fetch` runs in this thread, so it
+    mustn't use the database.
+    """
+    def __init__(self, key_name, notification_type, fetch):
+        super(NotificationRefresh, self).__init__()
+        self.daemon = True
+        self.key_name = key_name
+        self.notification_type = notification_type
+        self.fetch = fetch
+        self.notification_dict = None
+        self._lock = threading.Lock()
+        self._counted = False
+
+    def _count(self, succeeded):
+        """
+        Record the outcome of the refresh in the circuit breaker, unless it's
+        already been counted
+        """
+        with self._lock:
+            if self._counted:
+                return
+            self._counted = True
+        if succeeded:
+            controller_breaker.success()
+        else:
+            controller_breaker.failure()
+
+    def deadline_exceeded(self):
+        """Count a refresh that a page gave up waiting for as a failure"""
+        self._count(False)
+
+    def run(self):
+        try:
+            notification_dict = self.fetch()
+        except Exception:
+            self._count(False)
+            dog_stats_api.increment('open_ended_notifications.refresh_failure',
+                                    tags=['type:{0}'.format(self.notification_type)])
+            #This is a dev_facing_error
+            log.exception("Problem with getting {0} notifications from the grading controller.".format(
+                self.notification_type))
+        else:
+            self._count(True)
+            _set_value_in_cache(self.key_name, {'notifications': notification_dict, 'fetched': time.time()})
+            self.notification_dict = notification_dict
+        finally:
+            cache.delete(self.key_name + "_refreshing")
+
+
+def _start_refresh(key_name, notification_type, fetch):
+    """
+    Start a NotificationRefresh, and return it, unless the grading controller
+    is failing or another refresh of the same notifications is under way.
+    """
+    if not controller_breaker.allow():
+        dog_stats_api.increment('open_ended_notifications.circuit_open',
+                                tags=['type:{0}'.format(notification_type)])
+        return None
+    if not cache.add(key_name + "_refreshing", True, NOTIFICATION_REFRESH_LOCK_TIME):
+        return None
+    refresh = NotificationRefresh(key_name, notification_type, fetch)
+    refresh.start()
+    return refresh
+
+
+def get_notifications(student_id, course_id, notification_type, fetch):
+    """
+    Return the notifications of `notification_type` for the student in the
+    course. They're served from the cache, and when they're older than
+    NOTIFICATION_CACHE_TIME, refreshed in the background with fetch(), which
+    returns the notification dict or raises.
+
+    If they aren't cached, wait up to NOTIFICATION_DEADLINE for them, and
+    return empty notifications if they don't come. A refresh that misses the
+    deadline counts as a failure of the grading controller.
+    """
+    key_name = create_key_name(student_id, course_id, notification_type)
+    success, entry = _get_value_from_cache(key_name)
+    if success and 'fetched' in entry:
+        if time.time() - entry['fetched'] >= NOTIFICATION_CACHE_TIME:
+            dog_stats_api.increment('open_ended_notifications.stale_hit',
+                                    tags=['type:{0}'.format(notification_type)])
+            _start_refresh(key_name, notification_type, fetch)
+        return entry['notifications']
+
+    refresh = _start_refresh(key_name, notification_type, fetch)
+    if refresh is not None:
+        refresh.join(NOTIFICATION_DEADLINE)
+        if refresh.notification_dict is not None:
+            return refresh.notification_dict
+        if refresh.is_alive():
+            refresh.deadline_exceeded()
+            dog_stats_api.increment('open_ended_notifications.deadline_exceeded',
+                                    tags=['type:{0}'.format(notification_type)])
+    return empty_notifications()
+
+
+def _service_config():
+    """The config of the grading services that fetch notifications"""
+    return dict(settings.OPEN_ENDED_GRADING_INTERFACE, timeout=NOTIFICATION_REQUEST_TIMEOUT)
+
+
 def staff_grading_notifications(course, user):
-    staff_gs = StaffGradingService(settings.OPEN_ENDED_GRADING_INTERFACE)
-    pending_grading = False
-    img_path = ""
+    staff_gs = StaffGradingService(_service_config())
     course_id = course.id
     student_id = unique_id_for_user(user)
-    notification_type = "staff"
-
-    success, notification_dict = get_value_from_cache(student_id, course_id, notification_type)
-    if success:
-        return notification_dict
 
-    try:
+    def fetch():
         notifications = json.loads(staff_gs.get_notifications(course_id))
-        if notifications['success']:
-            if notifications['staff_needs_to_grade']:
-                pending_grading = True
-    except:
-        #Non catastrophic error, so no real action
-        notifications = {}
-        #This is a dev_facing_error
-        log.info(
-            "Problem with getting notifications from staff grading service for course {0} user {1}.".format(course_id,
-                                                                                                            student_id))
+        pending_grading = bool(notifications['success'] and notifications['staff_needs_to_grade'])
+        return notification_dict_for(notifications, pending_grading)
 
-    if pending_grading:
-        img_path = "/static/images/grading_notification.png"
-
-    notification_dict = {'pending_grading': pending_grading, 'img_path': img_path, 'response': notifications}
-
-    set_value_in_cache(student_id, course_id, notification_type, notification_dict)
-
-    return notification_dict
+    return get_notifications(student_id, course_id, "staff", fetch)
 
 
 def peer_grading_notifications(course, user):
@@ -69,37 +220,16 @@ def peer_grading_notifications(course, user):
         render_template=render_to_string,
         replace_urls=None,
     )
-    peer_gs = peer_grading_service.PeerGradingService(settings.OPEN_ENDED_GRADING_INTERFACE, system)
-    pending_grading = False
-    img_path = ""
+    peer_gs = peer_grading_service.PeerGradingService(_service_config(), system)
     course_id = course.id
     student_id = unique_id_for_user(user)
-    notification_type = "peer"
-
-    success, notification_dict = get_value_from_cache(student_id, course_id, notification_type)
-    if success:
-        return notification_dict
 
-    try:
+    def fetch():
         notifications = json.loads(peer_gs.get_notifications(course_id, student_id))
-        if notifications['success']:
-            if notifications['student_needs_to_peer_grade']:
-                pending_grading = True
-    except:
-        #Non catastrophic error, so no real action
-        notifications = {}
-        #This is a dev_facing_error
-        log.info(
-            "Problem with getting notifications from peer grading service for course {0} user {1}.".format(course_id,
-                                                                                                           student_id))
-    if pending_grading:
-        img_path = "/static/images/grading_notification.png"
-
-    notification_dict = {'pending_grading': pending_grading, 'img_path': img_path, 'response': notifications}
+        pending_grading = bool(notifications['success'] and notifications['student_needs_to_peer_grade'])
+        return notification_dict_for(notifications, pending_grading)
 
-    set_value_in_cache(student_id, course_id, notification_type, notification_dict)
-
-    return notification_dict
+    return get_notifications(student_id, course_id, "peer", fetch)
 
 
 def combined_notifications(course, user):
@@ -111,15 +241,9 @@ def combined_notifications(course, user):
     @return: A dictionary with boolean pending_grading (true if there is pending grading), img_path (for notification
     image), and response (actual response from grading controller server).
     """
-    #Set up return values so that we can return them for error cases
-    pending_grading = False
-    img_path = ""
-    notifications={}
-    notification_dict = {'pending_grading': pending_grading, 'img_path': img_path, 'response': notifications}
-
     #We don't want to show anonymous users anything.
     if not user.is_authenticated():
-        return notification_dict
+        return empty_notifications()
 
     #Define a mock modulesystem
     system = ModuleSystem(
@@ -131,57 +255,25 @@ def combined_notifications(course, user):
         replace_urls=None,
     )
     #Initialize controller query service using our mock system
-    controller_qs = ControllerQueryService(settings.OPEN_ENDED_GRADING_INTERFACE, system)
+    controller_qs = ControllerQueryService(_service_config(), system)
     student_id = unique_id_for_user(user)
     user_is_staff = has_access(user, course, 'staff')
     course_id = course.id
-    notification_type = "combined"
-
-    #See if we have a stored value in the cache
-    success, notification_dict = get_value_from_cache(student_id, course_id, notification_type)
-    if success:
-        return notification_dict
 
     #Get the time of the last login of the user
     last_login = user.last_login
     last_time_viewed = last_login - datetime.timedelta(seconds=(NOTIFICATION_CACHE_TIME + 60))
 
-    try:
+    def fetch():
         #Get the notifications from the grading controller
-        controller_response = controller_qs.check_combined_notifications(course.id, student_id, user_is_staff,
+        controller_response = controller_qs.check_combined_notifications(course_id, student_id, user_is_staff,
                                                                          last_time_viewed)
         notifications = json.loads(controller_response)
-        if notifications.get('success'):
-            if (notifications.get('staff_needs_to_grade') or
-                notifications.get('student_needs_to_peer_grade')):
-                pending_grading = True
-    except:
-        #Non catastrophic error, so no real action
-        #This is a dev_facing_error
-        log.exception(
-            "Problem with getting notifications from controller query service for course {0} user {1}.".format(
-                course_id, student_id))
-
-    if pending_grading:
-        img_path = "/static/images/grading_notification.png"
+        pending_grading = bool(notifications.get('success') and (
+            notifications.get('staff_needs_to_grade') or notifications.get('student_needs_to_peer_grade')))
+        return notification_dict_for(notifications, pending_grading)
 
-    notification_dict = {'pending_grading': pending_grading, 'img_path': img_path, 'response': notifications}
-
-    #Store the notifications in the cache
-    set_value_in_cache(student_id, course_id, notification_type, notification_dict)
-
-    return notification_dict
-
-
-def get_value_from_cache(student_id, course_id, notification_type):
-    key_name = create_key_name(student_id, course_id, notification_type)
-    success, value = _get_value_from_cache(key_name)
-    return success, value
-
-
-def set_value_in_cache(student_id, course_id, notification_type, value):
-    key_name = create_key_name(student_id, course_id, notification_type)
-    _set_value_in_cache(key_name, value)
+    return get_notifications(student_id, course_id, "combined", fetch)
 
 
 def create_key_name(student_id, course_id, notification_type):
@@ -204,4 +296,4 @@ def _get_value_from_cache(key_name):
 
 
 def _set_value_in_cache(key_name, value):
-    cache.set(key_name, json.dumps(value), NOTIFICATION_CACHE_TIME)
+    cache.set(key_name, json.dumps(value), NOTIFICATION_CACHE_TIME + NOTIFICATION_STALE_TIME)
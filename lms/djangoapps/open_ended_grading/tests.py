@@ -5,8 +5,12 @@ Tests for open ended grading interfaces
 """
 
 import json
+import threading
+import time
+import unittest
 from mock import MagicMock, patch, Mock
 
+from django.core.cache import get_cache
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import Group, User
 from django.conf import settings
@@ -19,7 +23,7 @@ from xmodule.x_module import ModuleSystem
 from xmodule.error_module import ErrorDescriptor
 from xblock.fields import ScopeIds
 
-from open_ended_grading import staff_grading_service, views, utils
+from open_ended_grading import staff_grading_service, views, utils, open_ended_notifications
 from courseware.access import _course_staff_group_name
 from student.models import unique_id_for_user
 
@@ -473,3 +477,146 @@ class TestStudentProblemList(ModuleStoreTestCase):
         self.assertEqual(len(valid_problems), 2)
         # Ensure that human names are being set properly.
         self.assertEqual(valid_problems[0]['grader_type_display_name'], "Instructor Assessment")
+
+
+class TestNotificationCache(unittest.TestCase):
+    """
+    Notifications are served from the cache, refreshed in the background when
+    they're stale, and never wait long for the grading controller.
+    """
+    def setUp(self):
+        self.cache = get_cache('django.core.cache.backends.locmem.LocMemCache', LOCATION='open_ended_notifications')
+        self.cache.clear()
+        self.breaker = open_ended_notifications.CircuitBreaker(2, 60)
+        for name, value in [('cache', self.cache), ('controller_breaker', self.breaker), ('NOTIFICATION_DEADLINE', 0.5)]:
+            patcher = patch.object(open_ended_notifications, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(open_ended_notifications, 'dog_stats_api')
+        self.dog_stats_api = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.key_name = open_ended_notifications.create_key_name('student', 'course', 'peer')
+
+    def get_notifications(self, fetch):
+        """Get the notifications of the student, with `fetch`"""
+        return open_ended_notifications.get_notifications('student', 'course', 'peer', fetch)
+
+    def counted(self, metric):
+        """Whether `metric` was incremented"""
+        return any(call[0][0] == metric for call in self.dog_stats_api.increment.call_args_list)
+
+    def test_fetched_once(self):
+        fetch = Mock(return_value=open_ended_notifications.notification_dict_for({'success': True}, True))
+        for _ in xrange(3):
+            notifications = self.get_notifications(fetch)
+            self.assertTrue(notifications['pending_grading'])
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_stale_while_revalidate(self):
+        stale = open_ended_notifications.notification_dict_for({'success': True}, False)
+        fresh = open_ended_notifications.notification_dict_for({'success': True}, True)
+        open_ended_notifications._set_value_in_cache(self.key_name, {
+            'notifications': stale,
+            'fetched': time.time() - open_ended_notifications.NOTIFICATION_CACHE_TIME - 1,
+        })
+
+        self.assertEqual(self.get_notifications(Mock(return_value=fresh)), stale)
+        self.assertTrue(self.counted('open_ended_notifications.stale_hit'))
+
+        # the refresh stores the fresh notifications for the next page
+        fetch = Mock(side_effect=AssertionError("fetched again"))
+        for _ in xrange(20):
+            if self.get_notifications(fetch) == fresh:
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.get_notifications(fetch), fresh)
+
+    def test_deadline(self):
+        release = threading.Event()
+        fresh = open_ended_notifications.notification_dict_for({'success': True}, True)
+
+        def slow_fetch():
+            release.wait(5)
+            return fresh
+
+        start = time.time()
+        self.assertEqual(self.get_notifications(slow_fetch), open_ended_notifications.empty_notifications())
+        self.assertLess(time.time() - start, 2)
+        self.assertTrue(self.counted('open_ended_notifications.deadline_exceeded'))
+
+        release.set()
+        for _ in xrange(20):
+            if self.get_notifications(slow_fetch) == fresh:
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.get_notifications(slow_fetch), fresh)
+
+    def test_circuit_breaker(self):
+        fetch = Mock(side_effect=ValueError("controller is down"))
+        for _ in xrange(5):
+            self.assertEqual(self.get_notifications(fetch), open_ended_notifications.empty_notifications())
+        # the breaker opened after two failures
+        self.assertEqual(fetch.call_count, 2)
+        self.assertTrue(self.counted('open_ended_notifications.refresh_failure'))
+        self.assertTrue(self.counted('open_ended_notifications.circuit_open'))
+
+    def test_deadline_counts_as_failure(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        fresh = open_ended_notifications.notification_dict_for({'success': True}, True)
+
+        def slow_fetch():
+            release.wait(5)
+            return fresh
+
+        refreshes = []
+        start_refresh = open_ended_notifications._start_refresh
+
+        def recording_start_refresh(*args):
+            refresh = start_refresh(*args)
+            refreshes.append(refresh)
+            return refresh
+
+        with patch.object(open_ended_notifications, 'NOTIFICATION_DEADLINE', 0.1), \
+                patch.object(open_ended_notifications, '_start_refresh', recording_start_refresh):
+            for student_id in ('student1', 'student2'):
+                open_ended_notifications.get_notifications(student_id, 'course', 'peer', slow_fetch)
+        # two slow refreshes opened the breaker
+        self.assertFalse(self.breaker.allow())
+
+        # and finishing late doesn't close it again
+        release.set()
+        for refresh in refreshes:
+            refresh.join(5)
+        self.assertEqual(refreshes[0].notification_dict, fresh)
+        self.assertFalse(self.breaker.allow())
+
+    @override_settings(OPEN_ENDED_GRADING_INTERFACE={
+        'url': 'http://controller',
+        'username': 'lms',
+        'password': 'abcd',
+        'grading_controller': '/grading_controller',
+    })
+    def test_request_timeout(self):
+        controller_qs = controller_query_service.ControllerQueryService(open_ended_notifications._service_config(), None)
+        controller_qs.session = Mock()
+        controller_qs.session.get.return_value.json.return_value = {'success': True}
+        controller_qs.check_combined_notifications('course', 'student', False, None)
+        self.assertEqual(controller_qs.session.get.call_args[1]['timeout'],
+                         open_ended_notifications.NOTIFICATION_REQUEST_TIMEOUT)
+        # the other grading services keep their own timeout
+        self.assertNotIn('timeout', settings.OPEN_ENDED_GRADING_INTERFACE)
+
+    def test_circuit_breaker_recovers(self):
+        breaker = open_ended_notifications.CircuitBreaker(2, 0.1)
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+        time.sleep(0.15)
+        # one call is let through to try the service again
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.success()
+        self.assertTrue(breaker.allow())
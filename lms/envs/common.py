@@ -191,6 +191,11 @@ MITX_FEATURES = {
     # Disable instructor dash buttons for downloading course data
     # when enrollment exceeds this number
     'MAX_ENROLLMENT_INSTR_BUTTONS': 200,
+
+    # Keep per-section scores up to date in the database as students answer problems,
+    # and grade from them. Run the rebuild_grade_store command for a course after
+    # enabling this or changing its graded structure.
+    'ENABLE_PERSISTENT_GRADES': False,
 }
 
 # Used for A/B testing
@@ -362,6 +367,11 @@ if MITX_FEATURES.get('ENABLE_SQL_TRACKING_LOGS'):
 TRACKING_IGNORE_URL_PATTERNS = [r'^/event', r'^/login', r'^/heartbeat']
 TRACKING_ENABLED = True
 
+# The deep heartbeat gives each backend check this many seconds to finish
+HEARTBEAT_CHECK_TIMEOUT = 2
+# and each process makes the checks at most once in this many seconds
+HEARTBEAT_DEEP_CACHE_TIMEOUT = 30
+
 ######################## subdomain specific settings ###########################
 COURSE_LISTINGS = {}
 SUBDOMAIN_BRANDING = {}
@@ -380,6 +390,11 @@ MODULESTORE = {
 CONTENTSTORE = None
 DOC_STORE_CONFIG = None
 
+# Local disk cache for static content too large for memcached, e.g.
+# {'ROOT': '/var/cache/edx/static_content', 'MAX_BYTES': 1073741824}
+# None serves it straight from the contentstore
+STATIC_CONTENT_DISK_CACHE = None
+
 # Should we initialize the modulestores at startup, or wait until they are
 # needed?
 INIT_MODULESTORE_ON_STARTUP = True
@@ -390,6 +405,12 @@ INIT_MODULESTORE_ON_STARTUP = True
 # once the responsibility of XBlock creation is moved out of modulestore - cpennington
 XBLOCK_MIXINS = (LmsBlockMixin, InheritanceMixin, XModuleMixin)
 
+# Each counter kept in a user_state_summary field (poll votes, word cloud words,
+# hint votes) is spread over this many rows, so that students incrementing it at
+# the same time rarely wait for each other. compact_user_state_summary_counters
+# merges them back.
+USER_STATE_SUMMARY_COUNTER_SHARDS = 8
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -397,6 +418,9 @@ CODE_JAIL = {
     'python_bin': None,
     # User to run as in the sandbox.
     'user': 'sandbox',
+    # How many warm sandboxed Pythons each process keeps to run code in.
+    # 0 means start a new one for every execution.
+    'pool_size': 0,
 
     # Configurable limits.
     'limits': {
@@ -617,6 +641,9 @@ MIDDLEWARE_CLASSES = (
 
     # For A/B testing
     'waffle.middleware.WaffleMiddleware',
+
+    # Reports how many modules each request constructed
+    'courseware.middleware.ModuleConstructionMiddleware',
 )
 
 ############################### Pipeline #######################################
@@ -849,6 +876,15 @@ CELERY_QUEUES = {
 # let logging work as configured:
 CELERYD_HIJACK_ROOT_LOGGER = False
 
+############################# Instructor Reports ##############################
+
+# Where reports generated in the background for course staff are kept: a
+# Django storage class, and the keyword arguments to construct it with.
+INSTRUCTOR_REPORT_STORAGE = {
+    'STORAGE_CLASS': 'django.core.files.storage.FileSystemStorage',
+    'STORAGE_KWARGS': {'location': '/tmp/edx-instructor-reports'},
+}
+
 ################################ Bulk Email ###################################
 
 # Suffix used to construct 'from' email address for bulk emails.
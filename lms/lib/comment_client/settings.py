@@ -11,3 +11,15 @@ if hasattr(settings, "COMMENTS_SERVICE_KEY"):
     API_KEY = settings.COMMENTS_SERVICE_KEY
 else:
     API_KEY = "PUT_YOUR_API_KEY_HERE"
+
+# how many connections to the comment service each process keeps alive
+if hasattr(settings, "COMMENTS_SERVICE_POOL_SIZE"):
+    POOL_SIZE = settings.COMMENTS_SERVICE_POOL_SIZE
+else:
+    POOL_SIZE = 10
+
+# the longest a request to the comment service may take, in seconds
+if hasattr(settings, "COMMENTS_SERVICE_TIMEOUT"):
+    TIMEOUT = settings.COMMENTS_SERVICE_TIMEOUT
+else:
+    TIMEOUT = 5
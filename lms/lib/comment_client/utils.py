@@ -1,14 +1,35 @@
 from contextlib import contextmanager
+import cookielib
 from dogapi import dog_stats_api
 import json
 import logging
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import settings
+import sys
+import threading
 from time import time
 from uuid import uuid4
 
 log = logging.getLogger(__name__)
 
+# The path segments of comment service urls which name resources, rather than
+# identify them; any other segment is an id, left out of the endpoint name
+_ENDPOINT_WORDS = frozenset([
+    'users', 'threads', 'comments', 'commentables', 'search', 'tags', 'votes',
+    'subscriptions', 'active_threads', 'subscribed_threads', 'stats', 'abuse_flag',
+    'abuse_unflag', 'pin', 'unpin', 'more_like_this', 'recent_active', 'trending',
+    'autocomplete', 'notifications',
+])
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# the deadline of the RequestBatch the current thread is making a request for
+_batch = threading.local()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -31,13 +52,65 @@ def merge_dict(dic1, dic2):
     return dict(dic1.items() + dic2.items())
 
 
+def get_session():
+    """
+    The requests Session of this process, which keeps up to
+    settings.POOL_SIZE connections to the comment service alive between
+    requests.
+    """
+    global _session, _session_pid  # pylint: disable=W0603
+    with _session_lock:
+        # connections can't be shared with a forked process
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=settings.POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            # the session is shared by all users, so it mustn't keep cookies
+            session.cookies.set_policy(cookielib.DefaultCookiePolicy(allowed_domains=[]))
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+def endpoint_name(method, url):
+    """
+    The name of the comment service endpoint `url` is for, with the ids left
+    out, e.g. 'get users/:id/active_threads'.
+    """
+    path = url.split('?', 1)[0]
+    if path.startswith(settings.PREFIX):
+        path = path[len(settings.PREFIX):]
+    segments = [
+        segment if segment in _ENDPOINT_WORDS else ':id'
+        for segment in path.split('/') if segment
+    ]
+    return "{method} {path}".format(method=method, path='/'.join(segments))
+
+
+def _request_timeout():
+    """
+    How long the request being made may take: settings.TIMEOUT, or what's
+    left until the deadline of its RequestBatch if that's sooner.
+    """
+    deadline = getattr(_batch, 'deadline', None)
+    if deadline is None:
+        return settings.TIMEOUT
+    remaining = deadline - time()
+    if remaining <= 0:
+        raise CommentClientError("Deadline for comment service requests passed")
+    return min(settings.TIMEOUT, remaining)
+
+
 @contextmanager
 def request_timer(request_id, method, url):
     start = time()
     yield
     end = time()
     duration = end - start
-    dog_stats_api.histogram('comment_client.request.time', duration, end)
+    dog_stats_api.histogram(
+        'comment_client.request.time', duration, end,
+        tags=['endpoint:{0}'.format(endpoint_name(method, url))]
+    )
     log.info(
         "comment_client_request_log: request_id={request_id}, method={method}, "
         "url={url}, duration={duration}".format(
@@ -62,14 +135,15 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
         else:
             data = None
             params = merge_dict(data_or_params, request_id_dict)
+        timeout = _request_timeout()
         with request_timer(request_id, method, url):
-            response = requests.request(
+            response = get_session().request(
                 method,
                 url,
                 data=data,
                 params=params,
                 headers=headers,
-                timeout=5
+                timeout=timeout
             )
     except Exception as err:
         log.exception("Trying to call {method} on {url} with params {params}".format(
@@ -91,6 +165,78 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
             return json.loads(response.text)
 
 
+class PendingRequest(object):
+    """
+    A call to the comment service made in a thread of its own; see
+    RequestBatch.
+    """
+    def __init__(self, call, deadline):
+        self.deadline = deadline
+        self._result = None
+        self._exc_info = None
+        self._thread = threading.Thread(target=self._run, args=(call,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, call):
+        _batch.deadline = self.deadline
+        try:
+            self._result = call()
+        except Exception:
+            self._exc_info = sys.exc_info()
+
+    def result(self):
+        """
+        Wait until the deadline for the call to finish, and return what it
+        returned or raise what it raised.
+
+        Raises CommentClientError if it's still running at the deadline.
+        """
+        self._thread.join(max(self.deadline - time(), 0))
+        if self._thread.is_alive():
+            raise CommentClientError("Comment service request timed out")
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+
+class RequestBatch(object):
+    """
+    Independent comment service calls, made in parallel, which all have to
+    finish within `timeout` seconds (settings.TIMEOUT by default) of the batch
+    being created.
+
+        batch = RequestBatch()
+        user_info = batch.add(cc_user.to_dict)
+        thread = batch.add(lambda: cc.Thread.find(thread_id).retrieve())
+        ...
+        user_info = user_info.result()
+
+    The calls run in threads of their own, so they mustn't use the database.
+    """
+    def __init__(self, timeout=None):
+        if timeout is None:
+            timeout = settings.TIMEOUT
+        self.deadline = time() + timeout
+
+    def add(self, call):
+        """
+        Start calling `call`, which takes no arguments, and return its
+        PendingRequest.
+        """
+        return PendingRequest(call, self.deadline)
+
+
+def perform_concurrently(calls, timeout=None):
+    """
+    Make the comment service calls in `calls`, functions taking no arguments,
+    in parallel in a RequestBatch, and return a list of their results.
+    """
+    batch = RequestBatch(timeout)
+    pending = [batch.add(call) for call in calls]
+    return [request.result() for request in pending]
+
+
 class CommentClientError(Exception):
     def __init__(self, msg):
         self.message = msg